@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔬 تحليلات السجل الكامل
+Vectorized history analytics (pandas/NumPy)
+
+تحليل كل المواعيد والجلسات (ملايين الصفوف) بعمليات متجهة بدلاً من
+الحلقات صفاً بصف:
+- القراءة على دفعات بأنواع محددة: اليوم رقم (أيام منذ 1970)، والحلاق
+  والخدمة والحالة وطريقة الدفع category، والمبالغ float64. الحالة وطريقة
+  الدفع تُحوَّلان إلى رموز داخل SQLite فكل الصف أرقام: لا تُنشأ نصوص بايثون
+  لكل صف، والدفعة تتحول إلى مصفوفة NumPy واحدة بنداء واحد.
+- كل دفعة تُجمَّع فوراً في "مكعب" صغير (شهر × حلاق × خدمة × مصدر × حالة)
+  ثم تُحذف، فالذاكرة محدودة بحجم الدفعة مهما كبر السجل.
+- حجم الدفعة يُحسب من ميزانية ذاكرة صريحة (memory_budget_mb)، و load_frame
+  يرفض تحميل السجل كاملاً إن تجاوز الميزانية.
+- التقارير (الربحية، متوسط الفاتورة، إنتاجية الحلاقين، توزيع الخدمات)
+  تُحسب من المكعب بعمليات pandas متجهة.
+
+مثال:
+    analytics = HistoryAnalytics(db, reference).load()
+    print(analytics.profitability('month'))
+    print(analytics.barber_productivity())
+
+قياس الأداء (المتجه مقابل الحلقة صفاً بصف، والذاكرة):
+    python analytics.py bench [عدد_المواعيد]
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from daily_stats import FIRST_DAY, LAST_DAY, SESSION_DAY
+from rollups import SESSION_SERVICE, UNKNOWN_PAYMENT
+
+# ميزانية الذاكرة الافتراضية للتحليل (ميغابايت)
+MEMORY_BUDGET_MB = 256
+
+# ذاكرة الصف الواحد: ذروة الصف الخام أثناء التحويل (tuple من sqlite3 وكائناته
+# ونسخ الأعمدة) ثم بعد تحويل الأنواع. مقاسة بـ tracemalloc على بيانات المولّد
+# (~500 و 37 بايت)؛ الصف الخام هو الأكبر ولذلك يحدد حجم الدفعة.
+RAW_ROW_BYTES = 512
+TYPED_ROW_BYTES = 40
+
+# الفترات الأطول من هذا تُقرأ بمسح الجدول بترتيبه بدلاً من فهرس التاريخ
+# (المسح المتسلسل أسرع من القفز بين الصفحات عندما تُقرأ أغلب الصفوف)
+SCAN_DAYS = 90
+
+# أقل وأكبر حجم دفعة
+MIN_BATCH_ROWS = 1000
+MAX_BATCH_ROWS = 250000
+
+# ترتيب الحالات هو رمزها في الإطار (category codes)
+STATUSES = ('pending', 'confirmed', 'completed', 'cancelled', 'no_show')
+SOURCES = ('appointment', 'session')
+
+COLUMNS = ('source', 'day', 'barber_id', 'service_id', 'status',
+           'price', 'cost', 'commission', 'duration', 'payment_method')
+
+# أعمدة المكعب التي تُجمع
+MEASURES = ('count', 'price', 'cost', 'commission', 'duration')
+CUBE_KEYS = ['month', 'barber_id', 'service_id', 'source', 'status']
+
+
+class MemoryBudgetError(Exception):
+    """البيانات المطلوبة لا تتسع في ميزانية الذاكرة"""
+
+
+def _code(column, values, default=None):
+    """تحويل قيمة نصية إلى رقمها في values داخل SQLite (-1 لقيمة غير معروفة)"""
+    if not values:
+        return '-1'
+    cases = ' '.join(f"WHEN '{value}' THEN {code}" for code, value in enumerate(values))
+    column = f"COALESCE({column}, '{default}')" if default else column
+    return f"CASE {column} {cases} ELSE -1 END"
+
+
+def payment_methods(db):
+    """طرق الدفع المعروفة (من تجميعات الدفع بدلاً من مسح المواعيد والجلسات)"""
+    return tuple(row[0] for row in db.fetchall(
+        "SELECT DISTINCT payment_method FROM rollup_payment ORDER BY 1", op='analytics_payments'))
+
+
+def _history_sql(methods=(), scan=False):
+    """المواعيد والجلسات في شكل واحد بأعمدة رقمية فقط؛ اليوم رقم أيام منذ 1970
+
+    scan: تعطيل فهارس التاريخ (+العمود) لقراءة الجداول بالترتيب.
+    """
+    session_day = SESSION_DAY.format(row='s')
+    plus = '+' if scan else ''
+    epoch_day = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+    return f"""
+        SELECT 0, {epoch_day.format('a.appointment_date')}, a.barber_id, a.service_id,
+               {_code('a.status', STATUSES)}, a.price, COALESCE(a.cost, 0),
+               COALESCE(a.commission, 0), COALESCE(a.duration, 0),
+               {_code('a.payment_method', methods, UNKNOWN_PAYMENT)}
+        FROM appointments a
+        WHERE {plus}a.appointment_date BETWEEN :start AND :end
+        UNION ALL
+        SELECT 1, {epoch_day.format(session_day)}, s.barber_id,
+               {SESSION_SERVICE.format(row='s')},
+               {_code('s.status', STATUSES)}, s.final_price, COALESCE(s.total_cost, 0),
+               COALESCE(s.total_commission, 0), COALESCE(s.duration, 0),
+               {_code('s.payment_method', methods, UNKNOWN_PAYMENT)}
+        FROM sessions s
+        WHERE ({plus}s.check_out_time >= :start AND s.check_out_time < :end || '~')
+           OR (s.check_out_time IS NULL AND {session_day} BETWEEN :start AND :end)
+    """
+
+
+def batch_rows_for(memory_budget_mb):
+    """حجم الدفعة الذي يتسع في الميزانية (نصفها للصفوف الخام والباقي للتحويل والمكعب)"""
+    rows = int(memory_budget_mb * 1024 * 1024 / 2 / (RAW_ROW_BYTES + TYPED_ROW_BYTES))
+    if rows < MIN_BATCH_ROWS:
+        raise MemoryBudgetError(f"ميزانية {memory_budget_mb}MB أصغر من أقل دفعة "
+                                f"({MIN_BATCH_ROWS:,} صف)")
+    return min(rows, MAX_BATCH_ROWS)
+
+
+def to_frame(rows, methods=()):
+    """تحويل دفعة صفوف رقمية إلى DataFrame بأنواع محددة (متجه بالكامل)
+
+    طريقة دفع غير موجودة في methods تظهر فارغة (NaN).
+    """
+    values = np.array(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+    source, day, barber, service, status, price, cost, commission, duration, payment = values.T
+    return pd.DataFrame({
+        'source': pd.Categorical.from_codes(source.astype(np.int8), SOURCES),
+        'day': day.astype(np.int32),
+        'barber_id': pd.Categorical(barber.astype(np.int32)),
+        'service_id': pd.Categorical(service.astype(np.int32)),
+        'status': pd.Categorical.from_codes(status.astype(np.int8), STATUSES),
+        'price': price,
+        'cost': cost,
+        'commission': commission,
+        'duration': duration.astype(np.int32),
+        'payment_method': pd.Categorical.from_codes(payment.astype(np.int8), methods),
+    })
+
+
+def _long_period(start, end):
+    try:
+        return (date.fromisoformat(end) - date.fromisoformat(start)).days > SCAN_DAYS
+    except ValueError:
+        # FIRST_DAY (السنة 0) ليست تاريخاً في بايثون: فترة مفتوحة
+        return True
+
+
+def iter_batches(db, start=FIRST_DAY, end=LAST_DAY, batch_rows=None, job=None):
+    """دفعات DataFrame من السجل بين start و end"""
+    batch_rows = batch_rows or batch_rows_for(MEMORY_BUDGET_MB)
+    methods = payment_methods(db)
+    cursor = db.connection().execute(_history_sql(methods, _long_period(start, end)),
+                                     {'start': start, 'end': end})
+    try:
+        while True:
+            if job:
+                job.check()
+            with db.timed('analytics_fetch'):
+                rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                break
+            frame = to_frame(rows, methods)
+            del rows
+            yield frame
+    finally:
+        cursor.close()
+
+
+def months_of(days):
+    """أيام منذ 1970 إلى أرقام أشهر منذ 1970 (متجه)"""
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+
+
+def month_label(month):
+    return str(np.datetime64(int(month), 'M'))
+
+
+# ==================== التحليلات ====================
+
+class HistoryAnalytics:
+    """مكعب مجمّع من السجل الكامل والتقارير المحسوبة منه"""
+
+    def __init__(self, db, reference=None, memory_budget_mb=MEMORY_BUDGET_MB):
+        self.db = db
+        self.reference = reference
+        self.memory_budget_mb = memory_budget_mb
+        self.batch_rows = batch_rows_for(memory_budget_mb)
+        self.cube = None
+        self.working_days = None
+        self.rows = 0
+
+    def count_rows(self, start=FIRST_DAY, end=LAST_DAY):
+        """عدد صفوف السجل في الفترة"""
+        return self.db.fetchvalue(f"SELECT COUNT(*) FROM ({_history_sql()})",
+                                  {'start': start, 'end': end}, op='analytics_count')
+
+    def load_frame(self, start=FIRST_DAY, end=LAST_DAY, job=None):
+        """السجل كاملاً في DataFrame واحد (للتحليل الحر)؛ يرفع MemoryBudgetError إن لم يتسع"""
+        rows = self.count_rows(start, end)
+        needed = rows * TYPED_ROW_BYTES / 1024 / 1024
+        # الإطار النهائي + دفعة التحميل الحالية
+        if needed + self.memory_budget_mb / 2 > self.memory_budget_mb:
+            raise MemoryBudgetError(
+                f"{rows:,} صف تحتاج نحو {needed:,.0f}MB والميزانية {self.memory_budget_mb}MB؛ "
+                f"استخدم load() للتحليل المجمّع أو فترة أقصر")
+        frames = list(iter_batches(self.db, start, end, self.batch_rows, job))
+        if not frames:
+            return to_frame([])
+        # توحيد الفئات بين الدفعات حتى تبقى الأعمدة category بعد الدمج
+        for column in ('barber_id', 'service_id'):
+            categories = pd.api.types.union_categoricals([f[column] for f in frames]).categories
+            for frame in frames:
+                frame[column] = frame[column].cat.set_categories(categories)
+        return pd.concat(frames, ignore_index=True)
+
+    def load(self, start=FIRST_DAY, end=LAST_DAY, job=None):
+        """بناء المكعب دفعة بدفعة (الذاكرة محدودة بحجم الدفعة)"""
+        total = self.count_rows(start, end) if job else 0
+        cube = None
+        working_days = []
+        self.rows = 0
+
+        for frame in iter_batches(self.db, start, end, self.batch_rows, job):
+            self.rows += len(frame)
+            frame['month'] = months_of(frame['day'].to_numpy())
+            frame['count'] = 1
+            part = (frame.groupby(CUBE_KEYS, observed=True, sort=False)[list(MEASURES)]
+                    .sum().reset_index())
+            cube = part if cube is None else _merge_cube(cube, part)
+
+            # أيام عمل كل حلاق (أيام فيها خدمة مكتملة)
+            done = frame[frame['status'] == 'completed']
+            working_days.append(pd.DataFrame({
+                'barber_id': done['barber_id'].to_numpy(np.int32),
+                'day': done['day'].to_numpy()}).drop_duplicates())
+            if job and total:
+                job.set_progress(self.rows / total)
+
+        self.cube = cube if cube is not None else pd.DataFrame(columns=CUBE_KEYS + list(MEASURES))
+        self.working_days = (pd.concat(working_days).drop_duplicates() if working_days
+                             else pd.DataFrame(columns=['barber_id', 'day']))
+        return self
+
+    # ==================== التقارير ====================
+
+    def _completed(self):
+        return self.cube[self.cube['status'] == 'completed']
+
+    def _grouped(self, frame, by):
+        """تجميع المكعب بعمود ('month' أو 'barber_id' أو 'service_id') مع أسماء مقروءة"""
+        grouped = frame.groupby(by, observed=True)[list(MEASURES)].sum()
+        return self._label(grouped, by)
+
+    def _label(self, frame, by):
+        if by == 'month':
+            frame.index = [month_label(m) for m in frame.index]
+        else:
+            kind = 'barber' if by == 'barber_id' else 'service'
+            frame.index = [self._name(kind, item_id) for item_id in frame.index]
+        frame.index.name = by
+        return frame
+
+    def profitability(self, by='month'):
+        """الإيرادات والتكلفة والعمولة والربح وهامشه"""
+        totals = self._grouped(self._completed(), by)
+        result = pd.DataFrame({
+            'revenue': totals['price'],
+            'cost': totals['cost'],
+            'commission': totals['commission'],
+        })
+        result['profit'] = result['revenue'] - result['cost'] - result['commission']
+        result['margin'] = (result['profit'] / result['revenue'].replace(0, np.nan)).fillna(0)
+        return result
+
+    def average_ticket(self, by='month'):
+        """عدد الفواتير (موعد مكتمل أو جلسة) ومتوسط قيمتها"""
+        totals = self._grouped(self._completed(), by)
+        return pd.DataFrame({
+            'tickets': totals['count'].astype(np.int64),
+            'revenue': totals['price'],
+            'average_ticket': totals['price'] / totals['count'].replace(0, np.nan),
+        })
+
+    def barber_productivity(self):
+        """إنتاجية كل حلاق: الخدمات والإيرادات لكل يوم عمل ولكل ساعة، ونسب الإلغاء والغياب"""
+        cube = self.cube
+        barber = cube['barber_id'].to_numpy(np.int32)
+        status = cube['status']
+        frame = pd.DataFrame({
+            'barber_id': barber,
+            'bookings': np.where(cube['source'] == 'appointment', cube['count'], 0),
+            'completed': np.where(status == 'completed', cube['count'], 0),
+            'cancelled': np.where(status == 'cancelled', cube['count'], 0),
+            'no_show': np.where(status == 'no_show', cube['count'], 0),
+            'revenue': np.where(status == 'completed', cube['price'], 0.0),
+            'commission': np.where(status == 'completed', cube['commission'], 0.0),
+            'minutes': np.where(status == 'completed', cube['duration'], 0),
+        })
+        result = frame.groupby('barber_id').sum()
+        result['working_days'] = self.working_days.groupby('barber_id').size()
+        result['working_days'] = result['working_days'].fillna(0).astype(np.int64)
+
+        days = result['working_days'].replace(0, np.nan)
+        bookings = result['bookings'].replace(0, np.nan)
+        result['services_per_day'] = result['completed'] / days
+        result['revenue_per_day'] = result['revenue'] / days
+        result['revenue_per_hour'] = result['revenue'] / (result['minutes'] / 60).replace(0, np.nan)
+        result['cancellation_rate'] = (result['cancelled'] / bookings).fillna(0)
+        result['no_show_rate'] = (result['no_show'] / bookings).fillna(0)
+        return self._label(result.sort_values('revenue', ascending=False), 'barber_id')
+
+    def service_mix(self, by_barber=False):
+        """حصة كل خدمة من العدد والإيرادات (أو نسبها لكل حلاق: صف لكل حلاق)"""
+        completed = self._completed()
+        if by_barber:
+            counts = (completed.groupby(['barber_id', 'service_id'], observed=True)['count']
+                      .sum().unstack(fill_value=0))
+            shares = counts.div(counts.sum(axis=1).replace(0, np.nan), axis=0).fillna(0)
+            shares.columns = [self._name('service', s) for s in shares.columns]
+            return self._label(shares, 'barber_id')
+
+        totals = completed.groupby('service_id', observed=True)[list(MEASURES)].sum()
+        result = pd.DataFrame({
+            'count': totals['count'].astype(np.int64),
+            'count_share': totals['count'] / totals['count'].sum(),
+            'revenue': totals['price'],
+            'revenue_share': totals['price'] / totals['price'].sum(),
+            'profit': totals['price'] - totals['cost'] - totals['commission'],
+        })
+        return self._label(result.sort_values('count', ascending=False), 'service_id')
+
+    def _name(self, kind, item_id):
+        item = getattr(self.reference, kind)(int(item_id)) if self.reference else None
+        return item.name if item else f'#{item_id}'
+
+
+def _merge_cube(cube, part):
+    """دمج مكعب دفعة في المكعب التراكمي"""
+    merged = pd.concat([cube, part], ignore_index=True)
+    # الفئات تختلف بين الدفعات: التجميع على الأرقام ثم إعادة الفئات
+    for column in ('barber_id', 'service_id'):
+        merged[column] = merged[column].astype(np.int32)
+    merged = merged.groupby(CUBE_KEYS, observed=True, sort=False)[list(MEASURES)].sum()
+    merged = merged.reset_index()
+    for column in ('barber_id', 'service_id'):
+        merged[column] = merged[column].astype('category')
+    return merged
+
+
+# ==================== قياس الأداء ====================
+
+def _python_loop(db, start=FIRST_DAY, end=LAST_DAY):
+    """نفس المكعب بحلقة بايثون صفاً بصف (للمقارنة فقط)؛ يُرجع ربح كل حلاق"""
+    cube = {}
+    months = {}
+    for row in db.connection().execute(_history_sql(payment_methods(db), scan=True),
+                                       {'start': start, 'end': end}):
+        source, day, barber, service, status, price, cost, commission, duration, _ = row
+        month = months.get(day)
+        if month is None:
+            month = months[day] = int(months_of(np.array([day]))[0])
+        key = (month, barber, service, source, status)
+        totals = cube.get(key)
+        if totals is None:
+            cube[key] = [1, price, cost, commission, duration]
+        else:
+            totals[0] += 1
+            totals[1] += price
+            totals[2] += cost
+            totals[3] += commission
+            totals[4] += duration
+
+    completed = STATUSES.index('completed')
+    profits = {}
+    for (_, barber, _, _, status), (_, price, cost, commission, _) in cube.items():
+        if status == completed:
+            profits[barber] = profits.get(barber, 0) + price - cost - commission
+    return profits
+
+
+def benchmark(appointments=10000000, memory_budget_mb=MEMORY_BUDGET_MB):
+    """زمن بناء المكعب والتقارير وذروة الذاكرة، مقابل حلقة بايثون صفاً بصف"""
+    import os
+    import resource
+    import tempfile
+    import time
+    from multiprocessing import Process
+    from database import Database
+    from benchmarks.generator import generate
+    from reference_data import ReferenceData
+
+    path = os.path.join(tempfile.mkdtemp(), 'analytics_bench.db')
+    print(f"⏳ توليد {appointments:,} موعد...")
+    # التوليد في عملية مستقلة حتى لا تدخل ذاكرته في ذروة ذاكرة هذه العملية
+    worker = Process(target=generate, args=(path, appointments, max(1000, appointments // 10)),
+                     kwargs={'days': 3 * 365, 'verbose': False})
+    worker.start()
+    worker.join()
+    db = Database(path)
+    reference = ReferenceData(db).load()
+
+    def peak_mb():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    baseline = peak_mb()
+    analytics = HistoryAnalytics(db, reference, memory_budget_mb)
+    started = time.perf_counter()
+    analytics.load()
+    load_seconds = time.perf_counter() - started
+    print(f"load: {analytics.rows:,} صف في {load_seconds:.1f}s "
+          f"({analytics.rows / load_seconds:,.0f} صف/ث)، دفعة {analytics.batch_rows:,}، "
+          f"مكعب {len(analytics.cube):,} صف، ذروة الذاكرة +{peak_mb() - baseline:,.0f}MB "
+          f"(الميزانية {memory_budget_mb}MB)")
+
+    for label, report in (('profitability', lambda: analytics.profitability('month')),
+                          ('average_ticket', lambda: analytics.average_ticket('barber_id')),
+                          ('productivity', analytics.barber_productivity),
+                          ('service_mix', lambda: analytics.service_mix(by_barber=True))):
+        started = time.perf_counter()
+        report()
+        print(f"{label:<16} {(time.perf_counter() - started) * 1000:>8.1f}ms")
+
+    # القراءة من SQLite هي أغلب الزمن: المقارنة بعد أن أصبحت الصفحات في الذاكرة
+    started = time.perf_counter()
+    loop = _python_loop(db)
+    loop_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    analytics.load()
+    warm_seconds = time.perf_counter() - started
+    vectorized = analytics.profitability('barber_id')['profit']
+    same = all(abs(vectorized[analytics._name('barber', b)] - profit) < 0.01
+               for b, profit in loop.items())
+    print(f"نفس المكعب بحلقة بايثون: {loop_seconds:.1f}s، load مرة ثانية: {warm_seconds:.1f}s، "
+          f"مطابقة: {same}")
+
+    try:
+        analytics.load_frame()
+        print(f"load_frame: ذروة الذاكرة +{peak_mb() - baseline:,.0f}MB")
+    except MemoryBudgetError as e:
+        print(f"load_frame: {e}")
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 10000000,
+                  int(sys.argv[3]) if len(sys.argv) > 3 else MEMORY_BUDGET_MB)
+    else:
+        print(__doc__)
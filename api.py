@@ -0,0 +1,664 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌐 واجهة HTTP/JSON محلية للحجز والاستقبال
+Local JSON HTTP API
+
+صفحة الحجز الإلكتروني وأجهزة الاستقبال (تابلت) تتعامل مع النظام عبر
+HTTP/JSON بنفس المحرك الذي تستخدمه الواجهة (engine.py و availability.py):
+
+    GET    /api/services                              الخدمات الفعالة
+    GET    /api/barbers                               الحلاقون الفعالون
+    GET    /api/availability?service_id=&date=[&barber_id=&after=]
+    GET    /api/appointments?date=[&search=]          مواعيد يوم
+    POST   /api/appointments                          حجز موعد
+    POST   /api/appointments/<id>/status              {"status": "...", "expected": "..."}
+    DELETE /api/appointments/<id>[?expected=]
+    POST   /api/checkout                              جلسة فورية
+    GET    /api/stats[?date=]                         إحصائيات اليوم
+
+- الطلبات تُخدم من مجموعة خيوط ثابتة (كل خيط له اتصال قراءة دائم من
+  Database)، بدل خيط جديد واتصال جديد لكل طلب.
+- كل الكتابات تمر بطابور كتابة واحد، فلا يتنافس اتصالان على قفل SQLite:
+  مستقلاً (python api.py serve) خيط كتابة واحد يجمع الطلبات المتزامنة في
+  معاملة واحدة (SAVEPOINT لكل طلب، فخطأ طلب لا يلغي غيره)؛ وداخل البرنامج
+  (BARBERSHOP_API=المنفذ) تمر بخيط الكتابة نفسه في BackgroundWorker.
+- الخادم يستمع على 127.0.0.1 افتراضياً؛ للشبكة المحلية يُمرر العنوان صراحة.
+
+الاستخدام:
+    python api.py serve [المنفذ] [العنوان]
+    BARBERSHOP_API=8080 python barbershop.py     (مع البرنامج)
+
+اختبار الحمل (طلبات في الثانية على قاعدة محلية):
+    python api.py bench [عدد_الطلبات] [عدد_العملاء]
+"""
+
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from availability import SlotTakenError, to_minutes
+from database import DatabaseBusyError
+from engine import (BookingError, BookingRequest, BookingService, CheckoutRequest,
+                    CheckoutService, StaleStatusError, StatsService, list_day_appointments)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# متغير البيئة لتشغيل الخادم مع البرنامج: المنفذ أو العنوان:المنفذ
+ENV_API = 'BARBERSHOP_API'
+
+# خيوط خدمة الطلبات
+SERVER_THREADS = 8
+
+# أقصى عدد طلبات كتابة في معاملة واحدة
+GROUP_WRITES = 32
+
+# انتظار نتيجة الكتابة (ثوانٍ)
+WRITE_TIMEOUT = 30
+
+# إغلاق اتصال keep-alive الخامل (ثوانٍ) حتى لا يحجز خيطاً
+IDLE_SECONDS = 5
+
+MAX_BODY = 64 * 1024
+
+# الحالة المطلوبة -> دالة BookingService
+STATUS_ACTIONS = {'confirmed': 'confirm', 'completed': 'complete', 'cancelled': 'cancel'}
+
+DAY_COLUMNS = ('id', 'time', 'customer_name', 'phone', 'barber_name', 'service_name',
+               'price', 'status', 'appointment_number')
+
+
+class ApiError(Exception):
+    """خطأ يُعاد للعميل برمز HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ==================== طابور الكتابة ====================
+
+class WriteQueue:
+    """خيط كتابة واحد يجمع طلبات الكتابة المتزامنة في معاملة واحدة
+
+    كل طلب داخل SAVEPOINT: إن فشل يُتراجع عنه وحده وتكمل المجموعة. النتائج
+    تُسلَّم بعد نجاح commit فقط؛ إن فشل commit تفشل المجموعة كلها وتُستدعى
+    on_abort (لإسقاط ما حدّثته الطلبات في الذاكرة، مثل فهرس الأوقات).
+    """
+
+    def __init__(self, db, group=GROUP_WRITES, on_abort=None):
+        self.db = db
+        self.group = max(1, group)
+        self.on_abort = on_abort
+        self.groups = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name='api-writer', daemon=True)
+        self._thread.start()
+
+    def run_write(self, fn, *args):
+        """إرسال fn(*args) لخيط الكتابة؛ يُرجع Future"""
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def _loop(self):
+        running = True
+        while running:
+            item = self._queue.get()
+            if item is None:
+                break
+            group = [item]
+            while len(group) < self.group:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                group.append(item)
+            self._run_group(group)
+
+    def _run_group(self, group):
+        outcomes = []
+        try:
+            with self.db.transaction('api_writes') as cursor:
+                for future, fn, args in group:
+                    if not future.set_running_or_notify_cancel():
+                        outcomes.append(None)
+                        continue
+                    cursor.execute("SAVEPOINT api_write")
+                    try:
+                        outcomes.append((fn(*args), None))
+                    except Exception as e:
+                        cursor.execute("ROLLBACK TO api_write")
+                        outcomes.append((None, e))
+                    cursor.execute("RELEASE api_write")
+        except Exception as e:
+            # لم يُحفظ شيء من المجموعة
+            if self.on_abort:
+                self.on_abort()
+            for future, _, _ in group:
+                if future.running():
+                    future.set_exception(e)
+            return
+
+        self.groups += 1
+        self.writes += len(group)
+        for (future, _, _), outcome in zip(group, outcomes):
+            if outcome is None:
+                continue
+            value, error = outcome
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        """إيقاف الخيط بعد تنفيذ ما في الطابور"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+# ==================== منطق الطلبات ====================
+
+def _field(params, name, cast=str):
+    value = params.get(name)
+    if value is None or value == '':
+        raise ApiError(400, f"الحقل {name} مطلوب")
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"قيمة غير صحيحة للحقل {name}: {value}")
+
+
+def _day(params, name='date', default=None):
+    value = params.get(name) or default
+    if value is None:
+        raise ApiError(400, f"الحقل {name} مطلوب")
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ApiError(400, f"تاريخ غير صحيح: {value} (الصيغة YYYY-MM-DD)")
+
+
+def _time(params, name):
+    value = _field(params, name)
+    try:
+        minutes = to_minutes(value)
+    except (AttributeError, ValueError):
+        minutes = -1
+    if not 0 <= minutes < 24 * 60:
+        raise ApiError(400, f"وقت غير صحيح: {value} (الصيغة HH:MM)")
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class ApiService:
+    """طلبات الـ API بدون HTTP: كل دالة تستقبل المعاملات (dict) وتُرجع JSON قابل للتسلسل
+
+    writes: أي كائن فيه run_write(fn, *args) -> Future (مثل BackgroundWorker)؛
+    بدونه يُنشأ WriteQueue خاص بالخدمة يدمج حتى group كتابة في معاملة.
+    """
+
+    def __init__(self, db, reference, availability, writes=None, group=GROUP_WRITES):
+        self.db = db
+        self.reference = reference
+        self.availability = availability
+        self.booking = BookingService(db, reference, availability)
+        self.checkout_service = CheckoutService(db, reference)
+        self.stats_service = StatsService(db)
+        self._owns_writes = writes is None
+        self.writes = writes or WriteQueue(db, group, on_abort=availability.invalidate)
+        self._seen = threading.local()
+
+    def _write(self, fn, *args):
+        return self.writes.run_write(fn, *args).result(timeout=WRITE_TIMEOUT)
+
+    def _fresh(self):
+        """كتابات من اتصال آخر (البرنامج أو جهاز آخر) منذ آخر قراءة: إعادة تحميل الأوقات"""
+        version = self.db.fetchvalue("PRAGMA data_version", op='api_data_version')
+        if version != getattr(self._seen, 'version', None):
+            self._seen.version = version
+            self.availability.invalidate()
+
+    def _active_barber(self, params):
+        barber = self.reference.barber(_field(params, 'barber_id', int))
+        if barber is None or barber.status != 'active':
+            raise ApiError(400, "الحلاق غير موجود أو غير فعّال")
+        return barber
+
+    def _active_service(self, params):
+        service = self.reference.service(_field(params, 'service_id', int))
+        if service is None or service.status != 'active':
+            raise ApiError(400, "الخدمة غير موجودة أو غير فعّالة")
+        return service
+
+    # ==================== القراءة ====================
+
+    def services(self, params):
+        return [{'id': s.id, 'name': s.name, 'category': s.category, 'price': s.price,
+                 'duration': s.duration} for s in self.reference.active_services()]
+
+    def barbers(self, params):
+        return [{'id': b.id, 'name': b.name, 'working_days': b.working_days,
+                 'working_hours': b.working_hours} for b in self.reference.active_barbers()]
+
+    def free_slots(self, params):
+        service = self._active_service(params)
+        day = _day(params)
+        after = _time(params, 'after') if params.get('after') else None
+        self._fresh()
+        if params.get('barber_id'):
+            barber = self._active_barber(params)
+            return {'date': day, 'service_id': service.id, 'barber_id': barber.id,
+                    'slots': self.availability.free_slots(barber.id, service.id, day, after)}
+        barbers = [{'barber_id': b.id, 'barber_name': b.name,
+                    'slots': self.availability.free_slots(b.id, service.id, day, after)}
+                   for b in self.reference.active_barbers()]
+        first = min(((b['slots'][0], b['barber_id']) for b in barbers if b['slots']),
+                    default=None)
+        return {'date': day, 'service_id': service.id, 'barbers': barbers,
+                'first': {'barber_id': first[1], 'time': first[0]} if first else None}
+
+    def day_appointments(self, params):
+        day = _day(params, default=datetime.now().strftime('%Y-%m-%d'))
+        rows = list_day_appointments(self.db, day, params.get('search', ''))
+        return [dict(zip(DAY_COLUMNS, row)) for row in rows]
+
+    def stats(self, params):
+        return asdict(self.stats_service.day(_day(params, default=datetime.now().strftime('%Y-%m-%d'))))
+
+    # ==================== الكتابة ====================
+
+    def book(self, params):
+        barber = self._active_barber(params)
+        service = self._active_service(params)
+        request = BookingRequest(
+            customer_name=_field(params, 'customer_name'),
+            phone=_field(params, 'phone'),
+            barber_id=barber.id, barber_name=barber.name,
+            service_id=service.id, service_name=service.name,
+            date=_day(params), time=_time(params, 'time'),
+            price=_field(params, 'price', float) if params.get('price') is not None
+            else service.price,
+            notes=str(params.get('notes') or ''))
+        if params.get('payment_method'):
+            request.payment_method = str(params['payment_method'])
+        return asdict(self._write(self.booking.book, request))
+
+    def checkout(self, params):
+        barber = self._active_barber(params)
+        service = self._active_service(params)
+        request = CheckoutRequest(
+            customer_name=_field(params, 'customer_name'),
+            phone=_field(params, 'phone'),
+            barber_id=barber.id, barber_name=barber.name,
+            service_id=service.id, service_name=service.name,
+            price=_field(params, 'price', float) if params.get('price') is not None
+            else service.price)
+        if params.get('payment_method'):
+            request.payment_method = str(params['payment_method'])
+        return asdict(self._write(self.checkout_service.checkout, request))
+
+    def _existing(self, appointment_id, action, expected=None):
+        # في خيط الكتابة: لا يُحذف الموعد بين الفحص والتغيير
+        if self.db.fetchone("SELECT 1 FROM appointments WHERE id = ?", (appointment_id,),
+                            op='api_appointment_exists') is None:
+            raise ApiError(404, f"الموعد {appointment_id} غير موجود")
+        return getattr(self.booking, action)(appointment_id, expected)
+
+    def set_status(self, params, appointment_id):
+        status = _field(params, 'status')
+        action = STATUS_ACTIONS.get(status)
+        if action is None:
+            raise ApiError(400, f"حالة غير معروفة: {status} "
+                                f"(المتاح: {', '.join(STATUS_ACTIONS)})")
+        # expected: الحالة التي يعرضها العميل (409 إن تغيّرت من جهاز آخر)
+        return asdict(self._write(self._existing, int(appointment_id), action,
+                                  params.get('expected')))
+
+    def delete(self, params, appointment_id):
+        return asdict(self._write(self._existing, int(appointment_id), 'delete',
+                                  params.get('expected')))
+
+    def close(self):
+        if self._owns_writes:
+            self.writes.close()
+
+
+# ==================== HTTP ====================
+
+ROUTES = tuple((method, re.compile(pattern + '$'), name) for method, pattern, name in (
+    ('GET', r'/api/services', 'services'),
+    ('GET', r'/api/barbers', 'barbers'),
+    ('GET', r'/api/availability', 'free_slots'),
+    ('GET', r'/api/appointments', 'day_appointments'),
+    ('POST', r'/api/appointments', 'book'),
+    ('POST', r'/api/appointments/(\d+)/status', 'set_status'),
+    ('DELETE', r'/api/appointments/(\d+)', 'delete'),
+    ('POST', r'/api/checkout', 'checkout'),
+    ('GET', r'/api/stats', 'stats'),
+))
+
+# الطلبات التي تنشئ شيئاً جديداً
+CREATED = ('book', 'checkout')
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """توجيه الطلب إلى ApiService وتحويل الأخطاء إلى رموز HTTP"""
+
+    protocol_version = 'HTTP/1.1'
+    timeout = IDLE_SECONDS
+    # الرد (الرأس ثم الجسم) بدون انتظار تأخير Nagle/delayed ACK (~40ms لكل طلب)
+    disable_nagle_algorithm = True
+
+    def _route(self, method):
+        path = urlsplit(self.path).path.rstrip('/')
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                return name, match.groups()
+        raise ApiError(404, f"المسار غير موجود: {method} {path}")
+
+    def _params(self, method):
+        if method == 'GET' or method == 'DELETE' and not self.headers.get('Content-Length'):
+            return dict(parse_qsl(urlsplit(self.path).query))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY:
+            raise ApiError(413, "حجم الطلب أكبر من المسموح")
+        if not length:
+            return {}
+        try:
+            params = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ApiError(400, "JSON غير صحيح")
+        if not isinstance(params, dict):
+            raise ApiError(400, "المتوقع كائن JSON")
+        return params
+
+    def _dispatch(self, method):
+        api = self.server.api
+        started = time.perf_counter()
+        name = 'unknown'
+        try:
+            name, groups = self._route(method)
+            status, body = (201 if name in CREATED else 200), \
+                getattr(api, name)(self._params(method), *groups)
+        except ApiError as e:
+            status, body = e.status, {'error': str(e)}
+        except SlotTakenError as e:
+            status, body = 409, {'error': str(e)}
+        except StaleStatusError as e:
+            status, body = 409, {'error': str(e), 'current': e.current}
+        except BookingError as e:
+            status, body = 400, {'error': str(e)}
+        except DatabaseBusyError as e:
+            status, body = 503, {'error': str(e)}
+        except Exception as e:
+            print(f"خطأ في {method} {self.path}: {e}")
+            status, body = 500, {'error': 'خطأ داخلي في الخادم'}
+        self._send(status, body)
+        tracer = api.db.tracer
+        if tracer is not None:
+            tracer.record_handler(f'api_{name}', 'total', time.perf_counter() - started)
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        # بدون سطر لكل طلب؛ الأخطاء تُطبع في _dispatch
+        pass
+
+
+class ApiServer(HTTPServer):
+    """خادم HTTP بمجموعة خيوط ثابتة (اتصال قراءة دائم لكل خيط)"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, api, host=DEFAULT_HOST, port=DEFAULT_PORT, threads=SERVER_THREADS):
+        super().__init__((host, port), ApiHandler)
+        self.api = api
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api')
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def start(self):
+        """تشغيل الخادم في خيط خلفي"""
+        self._thread = threading.Thread(target=self.serve_forever, name='api-server',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """إيقاف خيط start() ثم close()"""
+        self.shutdown()
+        self.close()
+
+    def close(self):
+        """إغلاق المنفذ وإنهاء الطلبات الجارية وطابور الكتابة"""
+        self.server_close()
+        self._pool.shutdown(wait=True)
+        self.api.close()
+
+
+def from_environment(db, reference, availability, worker=None):
+    """ApiServer يعمل في الخلفية إن كان BARBERSHOP_API مضبوطاً، وإلا None"""
+    value = os.environ.get(ENV_API, '').strip()
+    if not value:
+        return None
+    host, _, port = value.rpartition(':')
+    try:
+        server = ApiServer(ApiService(db, reference, availability, writes=worker),
+                           host or DEFAULT_HOST, int(port))
+    except (OSError, ValueError) as e:
+        print(f"⚠️ تعذر تشغيل واجهة HTTP ({value}): {e}")
+        return None
+    print(f"🌐 واجهة HTTP تعمل على http://{server.server_address[0]}:{server.port}/api/")
+    return server.start()
+
+
+def serve(path='database/barbershop.db', host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """تشغيل الخادم مستقلاً (بدون الواجهة)"""
+    from availability import Availability
+    from database import Database
+    from migrations import schema_is_current
+    from reference_data import ReferenceData
+
+    db = Database(path)
+    if not schema_is_current(db):
+        db.close()
+        raise SystemExit("❌ قاعدة البيانات غير مهيأة: شغّل البرنامج مرة واحدة أولاً")
+    reference = ReferenceData(db).load()
+    server = ApiServer(ApiService(db, reference, Availability(db, reference)), host, port)
+    print(f"🌐 واجهة HTTP تعمل على http://{host}:{server.port}/api/ (Ctrl+C للإيقاف)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        db.close()
+
+
+# ==================== اختبار الحمل ====================
+
+def _load_clients(port, requests, clients, services, barbers):
+    """عملاء متزامنون (اتصال keep-alive لكل عميل) بمزيج طلبات يشبه يوم عمل"""
+    import http.client
+    from datetime import timedelta
+
+    latencies = {}
+    statuses = {}
+    lock = threading.Lock()
+    today = date.today()
+
+    def client(number):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=WRITE_TIMEOUT)
+        booked = []
+        free = []
+        mine = {}
+        for i in range(requests // clients):
+            n = i * clients + number
+            service = services[n % len(services)]
+            barber = barbers[n % len(barbers)]
+            day = (today + timedelta(days=1 + n % 30)).isoformat()
+            kind = ('availability', 'availability', 'availability', 'availability', 'book',
+                    'book', 'status', 'checkout', 'stats', 'appointments')[i % 10]
+            if kind == 'availability':
+                method, url, body = 'GET', (f'/api/availability?service_id={service}'
+                                            f'&barber_id={barber}&date={day}'), None
+            elif kind == 'book':
+                # أول وقت متاح من آخر استعلام (وقد يسبقه عميل آخر إليه: 409)
+                barber, service, day, when = free.pop(0) if free else \
+                    (barber, service, day, '10:00')
+                method, url, body = 'POST', '/api/appointments', {
+                    'customer_name': f'عميل الموقع {n}', 'phone': f'07{n % 5000:08d}',
+                    'barber_id': barber, 'service_id': service, 'date': day, 'time': when}
+            elif kind == 'status' and booked:
+                method, url, body = 'POST', f'/api/appointments/{booked.pop()}/status', \
+                    {'status': ('completed', 'cancelled', 'confirmed')[n % 3]}
+            elif kind in ('checkout', 'status'):
+                kind = 'checkout'
+                method, url, body = 'POST', '/api/checkout', {
+                    'customer_name': f'عميل الاستقبال {n}', 'phone': f'07{n % 5000:08d}',
+                    'barber_id': barber, 'service_id': service}
+            elif kind == 'stats':
+                method, url, body = 'GET', f'/api/stats?date={today.isoformat()}', None
+            else:
+                method, url, body = 'GET', f'/api/appointments?date={day}', None
+
+            started = time.perf_counter()
+            conn.request(method, url, body=json.dumps(body).encode('utf-8') if body else None,
+                         headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            data = json.loads(response.read())
+            elapsed = time.perf_counter() - started
+
+            mine.setdefault(kind, []).append(elapsed)
+            key = (kind, response.status)
+            with lock:
+                statuses[key] = statuses.get(key, 0) + 1
+            if kind == 'availability' and response.status == 200:
+                free = [(barber, service, day, when) for when in data['slots'][:2]]
+            elif kind == 'book' and response.status == 201:
+                booked.append(data['appointment_id'])
+        conn.close()
+        with lock:
+            for kind, values in mine.items():
+                latencies.setdefault(kind, []).extend(values)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, statuses
+
+
+def benchmark(requests=6000, clients=8):
+    """اختبار حمل: خادم على قاعدة مولدة، بدون دمج الكتابات ومعه"""
+    import shutil
+    import tempfile
+    from availability import Availability
+    from database import Database
+    from benchmarks.generator import generate
+    from reference_data import ReferenceData
+
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, 'api_source.db')
+    generate(source, 50000, 10000, days=90, verbose=False)
+
+    for group in (1, GROUP_WRITES):
+        path = os.path.join(folder, f'api_bench_{group}.db')
+        shutil.copy(source, path)
+        db = Database(path)
+        reference = ReferenceData(db).load()
+        availability = Availability(db, reference)
+        api = ApiService(db, reference, availability, group=group)
+        server = ApiServer(api, port=0, threads=max(SERVER_THREADS, clients)).start()
+        before, last_id = db.fetchone("SELECT COUNT(*), MAX(id) FROM appointments")
+
+        elapsed, latencies, statuses = _load_clients(
+            server.port, requests, clients,
+            [s.id for s in reference.active_services()],
+            [b.id for b in reference.active_barbers()])
+        server.stop()
+
+        total = sum(statuses.values())
+        created = statuses.get(('book', 201), 0)
+        after = db.fetchvalue("SELECT COUNT(*) FROM appointments")
+        overlaps = db.fetchvalue("""
+            SELECT COUNT(*) FROM appointments a JOIN appointments b
+              ON a.barber_id = b.barber_id AND a.appointment_date = b.appointment_date
+             AND a.id < b.id AND b.id > ?
+             AND a.status NOT IN ('cancelled', 'no_show') AND b.status NOT IN ('cancelled', 'no_show')
+             AND time(a.appointment_time) < time(b.appointment_time, '+' || b.duration || ' minutes')
+             AND time(b.appointment_time) < time(a.appointment_time, '+' || a.duration || ' minutes')
+        """, (last_id,))
+        print(f"\n🌐 دمج حتى {group} كتابة/معاملة، {clients} عملاء: {total:,} طلب في "
+              f"{elapsed:.2f}s = {total / elapsed:,.0f} طلب/ث "
+              f"(الكتابات {api.writes.writes:,} في {api.writes.groups:,} معاملة)")
+        for kind, values in sorted(latencies.items()):
+            values.sort()
+            codes = ' '.join(f"{status}×{count}" for (k, status), count in sorted(statuses.items())
+                             if k == kind)
+            print(f"  {kind:<13} n={len(values):<6} p50={values[len(values) // 2] * 1000:7.2f}ms "
+                  f"p99={values[int(len(values) * 0.99)] * 1000:7.2f}ms  {codes}")
+        errors = sum(count for (_, status), count in statuses.items() if status >= 500)
+        print(f"  أخطاء 5xx: {errors}؛ مواعيد جديدة في القاعدة {after - before:,} "
+              f"(حُجز عبر API {created:,})؛ مواعيد جديدة متداخلة: {overlaps}")
+        db.close()
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else (None, [])
+    if command == 'bench':
+        benchmark(int(args[0]) if args else 6000, int(args[1]) if len(args) > 1 else 8)
+    elif command == 'serve':
+        serve(port=int(args[0]) if args else DEFAULT_PORT,
+              host=args[1] if len(args) > 1 else DEFAULT_HOST)
+    else:
+        print(__doc__)
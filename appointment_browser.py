@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📚 تصفح المواعيد لفترات طويلة
+Keyset-paginated appointment browser
+
+تصفح المواعيد لأي فترة (مع فلترة بالحلاق والحالة) بدون تحميلها كلها:
+- صفحات بمفتاح الترتيب (appointment_date, appointment_time, id) بدلاً من
+  OFFSET: كل صفحة بحث في الفهرس من آخر صف معروض، فزمنها ثابت مهما ابتعد
+  التمرير (OFFSET يقرأ كل الصفوف السابقة ثم يرميها).
+- AppointmentPager يحتفظ بنافذة منزلقة من الصفوف فقط (الظاهر + صفحات
+  احتياطية قبله وبعده)؛ عند التمرير تُضاف صفحة في جهة ويُحذف ما زاد من
+  الجهة الأخرى، فيبقى عدد صفوف Treeview محدوداً حتى لسنة كاملة.
+
+قياس الأداء (تصفح سنة كاملة صفحة بصفحة، مقابل OFFSET):
+    python appointment_browser.py bench [عدد_المواعيد]
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+PAGE_SIZE = 100
+
+# أقصى عدد صفوف في النافذة المنزلقة (الظاهر + الاحتياطي قبله وبعده)
+WINDOW_ROWS = 5 * PAGE_SIZE
+
+BROWSE_COLUMNS = """id, appointment_date, appointment_time, customer_name, phone,
+                    barber_name, service_name, price, status, appointment_number"""
+
+
+@dataclass
+class BrowseFilter:
+    """فترة التصفح والفلاتر الاختيارية"""
+    start: str
+    end: str
+    barber_id: Optional[int] = None
+    status: Optional[str] = None
+
+
+def _where(browse, params):
+    conditions = []
+    if browse.barber_id:
+        conditions.append("barber_id = :barber_id")
+        params['barber_id'] = browse.barber_id
+    if browse.status:
+        conditions.append("status = :status")
+        params['status'] = browse.status
+    return ''.join(f" AND {c}" for c in conditions)
+
+
+def fetch_page(db, browse, after=None, before=None, limit=PAGE_SIZE):
+    """صفحة مرتبة تصاعدياً: بعد المفتاح after أو قبل before (أو أول صفحة)
+
+    المفتاح (appointment_date, appointment_time, id). شرط (التاريخ، الوقت)
+    المنفصل يجعل SQLite يبدأ البحث في الفهرس من المفتاح مباشرة، والشرط
+    الكامل مع id يحسم الصفوف المتساوية في الوقت.
+    """
+    params = {'start': browse.start, 'end': browse.end, 'limit': limit}
+    where = _where(browse, params)
+
+    if before is not None:
+        params.update(date=before[0], time=before[1], id=before[2])
+        rows = db.fetchall(f"""
+            SELECT {BROWSE_COLUMNS} FROM appointments
+            WHERE appointment_date >= :start
+              AND (appointment_date, appointment_time) <= (:date, :time)
+              AND (appointment_date, appointment_time, id) < (:date, :time, :id){where}
+            ORDER BY appointment_date DESC, appointment_time DESC, id DESC
+            LIMIT :limit
+        """, params, op='browse_page')
+        rows.reverse()
+        return rows
+
+    if after is not None:
+        # بدون شرط start: المفتاح داخل الفترة دائماً، ووجود الشرطين معاً قد يجعل
+        # SQLite يبدأ من start ويمسح كل ما قبل المفتاح في كل صفحة
+        params.update(date=max(after[0], browse.start), time=after[1], id=after[2])
+        seek = """(appointment_date, appointment_time) >= (:date, :time)
+              AND (appointment_date, appointment_time, id) > (:date, :time, :id)"""
+    else:
+        seek = "appointment_date >= :start"
+    return db.fetchall(f"""
+        SELECT {BROWSE_COLUMNS} FROM appointments
+        WHERE {seek} AND appointment_date <= :end{where}
+        ORDER BY appointment_date, appointment_time, id
+        LIMIT :limit
+    """, params, op='browse_page')
+
+
+def count_appointments(db, browse):
+    """عدد مواعيد الفترة (لشريط الحالة)"""
+    params = {'start': browse.start, 'end': browse.end}
+    where = _where(browse, params)
+    return db.fetchvalue(f"""
+        SELECT COUNT(*) FROM appointments
+        WHERE appointment_date BETWEEN :start AND :end{where}
+    """, params, op='browse_count', default=0)
+
+
+def row_key(row):
+    """مفتاح الترتيب (date, time, id) لصف من BROWSE_COLUMNS"""
+    return row[1], row[2], row[0]
+
+
+# ==================== النافذة المنزلقة ====================
+
+class AppointmentPager:
+    """نافذة منزلقة من الصفوف حول موضع التمرير
+
+    next_page و previous_page تُرجعان (الصفوف المضافة، عدد المحذوف من الجهة
+    الأخرى) حتى تطبّق الواجهة الفرق فقط على Treeview.
+    """
+
+    def __init__(self, db, browse, page_size=PAGE_SIZE, window_rows=WINDOW_ROWS):
+        self.db = db
+        self.browse = browse
+        self.page_size = page_size
+        self.window_rows = max(window_rows, 2 * page_size)
+        self.rows = []
+        self.at_start = True
+        self.at_end = True
+
+    def first_page(self):
+        """بداية الفترة"""
+        self.rows = fetch_page(self.db, self.browse, limit=self.page_size)
+        self.at_start = True
+        self.at_end = len(self.rows) < self.page_size
+        return self.rows
+
+    def last_page(self):
+        """نهاية الفترة"""
+        end = (self.browse.end, '~', 0)
+        self.rows = fetch_page(self.db, self.browse, before=end, limit=self.page_size)
+        self.at_start = len(self.rows) < self.page_size
+        self.at_end = True
+        return self.rows
+
+    def jump(self, day):
+        """الانتقال إلى أول موعد في يوم معيّن (أو بعده)"""
+        if day <= self.browse.start:
+            return self.first_page()
+        self.rows = fetch_page(self.db, self.browse, after=(day, '', 0), limit=self.page_size)
+        self.at_end = len(self.rows) < self.page_size
+        self.at_start = False
+        if not self.rows:
+            return self.last_page()
+        return self.rows
+
+    def next_page(self):
+        """الصفحة بعد آخر صف في النافذة"""
+        if self.at_end or not self.rows:
+            return [], 0
+        page = fetch_page(self.db, self.browse, after=row_key(self.rows[-1]),
+                          limit=self.page_size)
+        self.at_end = len(page) < self.page_size
+        self.rows.extend(page)
+        dropped = max(0, len(self.rows) - self.window_rows)
+        if dropped:
+            del self.rows[:dropped]
+            self.at_start = False
+        return page, dropped
+
+    def previous_page(self):
+        """الصفحة قبل أول صف في النافذة"""
+        if self.at_start or not self.rows:
+            return [], 0
+        page = fetch_page(self.db, self.browse, before=row_key(self.rows[0]),
+                          limit=self.page_size)
+        self.at_start = len(page) < self.page_size
+        self.rows[:0] = page
+        dropped = max(0, len(self.rows) - self.window_rows)
+        if dropped:
+            del self.rows[-dropped:]
+            self.at_end = False
+        return page, dropped
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(appointments=1000000):
+    """تصفح سنة كاملة بالنافذة المنزلقة، ومقارنة صفحة عميقة بـ OFFSET"""
+    import os
+    import statistics
+    import tempfile
+    import time
+    from datetime import date, timedelta
+    from database import Database
+    from benchmarks.generator import generate
+
+    path = os.path.join(tempfile.mkdtemp(), 'browse_bench.db')
+    generate(path, appointments, max(1000, appointments // 10), days=365, verbose=False)
+    db = Database(path)
+    today = date.today()
+    browse = BrowseFilter((today - timedelta(days=364)).isoformat(),
+                          (today + timedelta(days=30)).isoformat())
+    total = count_appointments(db, browse)
+
+    pager = AppointmentPager(db, browse)
+    timings = []
+    seen = len(pager.first_page())
+    started = time.perf_counter()
+    while not pager.at_end:
+        page_started = time.perf_counter()
+        page, _ = pager.next_page()
+        timings.append((time.perf_counter() - page_started) * 1000)
+        seen += len(page)
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    print(f"سنة كاملة: {seen:,} من {total:,} موعد في {len(timings):,} صفحة، {elapsed:.2f}s؛ "
+          f"الصفحة p50={statistics.median(timings):.2f}ms "
+          f"p99={timings[int(len(timings) * 0.99)]:.2f}ms؛ "
+          f"الصفوف في النافذة: {len(pager.rows)}")
+
+    started = time.perf_counter()
+    for _ in range(50):
+        pager.previous_page()
+    print(f"previous_page: {(time.perf_counter() - started) / 50 * 1000:.2f}ms")
+
+    for fraction in (0.1, 0.5, 0.9):
+        offset = int(total * fraction)
+        started = time.perf_counter()
+        db.fetchall(f"""
+            SELECT {BROWSE_COLUMNS} FROM appointments
+            WHERE appointment_date BETWEEN ? AND ?
+            ORDER BY appointment_date, appointment_time, id LIMIT ? OFFSET ?
+        """, (browse.start, browse.end, PAGE_SIZE, offset))
+        offset_ms = (time.perf_counter() - started) * 1000
+        print(f"OFFSET {offset:>9,}: {offset_ms:>8.2f}ms")
+
+    started = time.perf_counter()
+    rows = db.fetchall(f"""
+        SELECT {BROWSE_COLUMNS} FROM appointments
+        WHERE appointment_date BETWEEN ? AND ?
+        ORDER BY appointment_date, appointment_time, id
+    """, (browse.start, browse.end))
+    print(f"تحميل السنة كاملة مرة واحدة: {len(rows):,} صف في "
+          f"{time.perf_counter() - started:.2f}s (قبل إدخالها في Treeview)")
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        print(__doc__)
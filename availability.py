@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗓️ محرك التوفر والأوقات المتاحة
+Barber availability and slot engine
+
+- فهرس في الذاكرة لكل (حلاق، يوم): فترات المواعيد المشغولة [بداية، نهاية)
+  بالدقائق مرتبة، يُحمَّل عند أول طلب باستعلام واحد على الفهرس
+  (barber_id, appointment_date) ثم يُحدَّث مع كل حجز وإلغاء وإنهاء وحذف.
+- الأوقات المتاحة تحترم أيام عمل الحلاق وساعاته ومدة الخدمة والمواعيد
+  الموجودة، وتشمل نهايات المواعيد (بعد موعد مدته 45 دقيقة يُعرض وقت نهايته).
+- "أول حلاق متاح" لخدمة في يوم معيّن.
+- check_free يُستدعى داخل معاملة الحجز بعد أول كتابة (قفل الكتابة محجوز)
+  ويقرأ من قاعدة البيانات نفسها، فيُرفض الحجز المتداخل حتى لو جاء من جهاز
+  آخر والفهرس في الذاكرة لم يعلم به بعد.
+- الموعد المنتهي قبل وقته المقدر يشغل الحلاق حتى completed_at فقط، بنفس
+  القاعدة في الفهرس (release و _load) وفي check_free.
+
+قياس الأداء:
+    python availability.py bench [عدد_المواعيد]
+"""
+
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime
+
+from engine import BookingError
+
+# الحالات التي لا تشغل وقت الحلاق
+FREE_STATUSES = ('cancelled', 'no_show')
+
+# المسافة بين الأوقات المعروضة بالدقائق
+SLOT_MINUTES = 30
+
+DEFAULT_WORKING_HOURS = '09:00-21:00'
+
+# أسماء الأيام كما تُحفظ في barbers.working_days (بترتيب date.weekday())
+WEEKDAYS = ('الاثنين', 'الثلاثاء', 'الأربعاء', 'الخميس', 'الجمعة', 'السبت', 'الأحد')
+
+
+class SlotTakenError(BookingError):
+    """الوقت المطلوب يتداخل مع موعد آخر للحلاق"""
+
+
+# ==================== تحويل الأوقات ====================
+
+def to_minutes(value):
+    """'HH:MM' إلى دقائق منذ منتصف الليل"""
+    hours, minutes = value.strip()[:5].split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def to_time(minutes):
+    """دقائق منذ منتصف الليل إلى 'HH:MM'"""
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+def parse_working_hours(value):
+    """'09:00-21:00' إلى (540, 1260)"""
+    start, end = (value or DEFAULT_WORKING_HOURS).split('-')
+    return to_minutes(start), to_minutes(end)
+
+
+def works_on(working_days, day):
+    """هل يعمل الحلاق في هذا اليوم؟ (بدون أيام محددة: كل الأيام)"""
+    if not working_days:
+        return True
+    return WEEKDAYS[date.fromisoformat(day).weekday()] in working_days
+
+
+def busy_until(day, start, duration, completed_at=None):
+    """نهاية الفترة المشغولة بالدقائق: المنتهي في نفس اليوم يشغل حتى وقت إنهائه فقط"""
+    end = start + int(duration)
+    if completed_at:
+        completed_at = str(completed_at)
+        if completed_at[:10] == day:
+            end = max(start, min(end, to_minutes(completed_at[11:16])))
+    return end
+
+
+# completed_at للمكتمل فقط (NULL لغيره)
+_BUSY_COLUMNS = ("appointment_time, COALESCE(duration, 30), id, "
+                 "CASE WHEN status = 'completed' THEN completed_at END")
+
+
+def _overlaps(intervals, start, end, exclude_id=None):
+    """هل تتداخل [start, end) مع فترة في قائمة مرتبة بالبداية؟"""
+    # الفترات التي تبدأ قبل end فقط يمكن أن تتداخل؛ أطول خدمة لا تتجاوز اليوم
+    for begin, finish, appointment_id in intervals[:bisect_left(intervals, (end,))]:
+        if finish > start and appointment_id != exclude_id:
+            return True
+    return False
+
+
+# ==================== الفهرس ====================
+
+class Availability:
+    """فترات الحلاقين المشغولة لكل يوم مع الاستعلامات عنها"""
+
+    def __init__(self, db, reference):
+        self.db = db
+        self.reference = reference
+        self._days = {}
+        self._where = {}
+        self._lock = threading.Lock()
+
+    def _load(self, barber_id, day):
+        rows = self.db.fetchall(f"""
+            SELECT {_BUSY_COLUMNS} FROM appointments
+            WHERE barber_id = ? AND appointment_date = ?
+              AND status NOT IN ({', '.join('?' * len(FREE_STATUSES))})
+        """, (barber_id, day, *FREE_STATUSES), op='load_availability')
+        return sorted((to_minutes(t), busy_until(day, to_minutes(t), d, c), i)
+                      for t, d, i, c in rows)
+
+    def _intervals(self, barber_id, day):
+        key = (barber_id, day)
+        intervals = self._days.get(key)
+        if intervals is None:
+            intervals = self._load(barber_id, day)
+            with self._lock:
+                self._days[key] = intervals
+                for _, _, appointment_id in intervals:
+                    self._where[appointment_id] = key
+        return intervals
+
+    def invalidate(self, day=None):
+        """إسقاط يوم (أو كل الأيام) من الذاكرة ليُعاد تحميله (بعد تغييرات من جهاز آخر)"""
+        with self._lock:
+            keys = [key for key in self._days if day is None or key[1] == day]
+            for key in keys:
+                for _, _, appointment_id in self._days.pop(key):
+                    self._where.pop(appointment_id, None)
+
+    # ==================== التحديث التزايدي ====================
+
+    def add(self, appointment_id, barber_id, day, time, duration):
+        """موعد جديد (بعد نجاح الحجز)"""
+        with self._lock:
+            intervals = self._days.get((barber_id, day))
+            if intervals is None:
+                # اليوم غير محمَّل: سيُقرأ من قاعدة البيانات عند أول طلب
+                return
+            start = to_minutes(time)
+            insort(intervals, (start, start + int(duration), appointment_id))
+            self._where[appointment_id] = (barber_id, day)
+
+    def remove(self, appointment_id):
+        """إلغاء موعد أو حذفه: تحرير وقته"""
+        with self._lock:
+            key = self._where.pop(appointment_id, None)
+            if key is not None:
+                self._days[key] = [i for i in self._days[key] if i[2] != appointment_id]
+
+    def release(self, appointment_id, at=None):
+        """إنهاء موعد قبل وقته المقدر: تحرير الباقي من مدته ابتداءً من at (الآن افتراضياً)"""
+        at = at or datetime.now()
+        with self._lock:
+            key = self._where.get(appointment_id)
+            if key is None or key[1] != at.strftime('%Y-%m-%d'):
+                return
+            self._days[key] = [
+                (start, busy_until(key[1], start, end - start, at) if i == appointment_id
+                 else end, i)
+                for start, end, i in self._days[key]
+            ]
+
+    # ==================== الاستعلامات ====================
+
+    def _barber_window(self, barber, day):
+        """(بداية، نهاية) ساعات عمل الحلاق في اليوم أو None إن لم يكن يوم عمله"""
+        if barber is None or barber.status != 'active' or not works_on(barber.working_days, day):
+            return None
+        return parse_working_hours(barber.working_hours
+                                   or self.reference.setting('working_hours'))
+
+    def free_slots(self, barber_id, service_id, day, after=None):
+        """الأوقات المتاحة ['HH:MM'] لحلاق وخدمة في يوم
+
+        after: 'HH:MM' لا تُعرض الأوقات قبله (الوقت الحالي لليوم نفسه افتراضياً).
+        """
+        window = self._barber_window(self.reference.barber(barber_id), day)
+        service = self.reference.service(service_id)
+        if window is None or service is None:
+            return []
+
+        opening, closing = window
+        if after is None and day == datetime.now().strftime('%Y-%m-%d'):
+            after = datetime.now().strftime('%H:%M')
+        earliest = max(opening, to_minutes(after)) if after else opening
+
+        intervals = self._intervals(barber_id, day)
+        candidates = set(range(opening, closing, SLOT_MINUTES))
+        candidates.update(end for _, end, _ in intervals if opening <= end < closing)
+
+        return [to_time(start) for start in sorted(candidates)
+                if start >= earliest and start + service.duration <= closing
+                and not _overlaps(intervals, start, start + service.duration)]
+
+    def first_available(self, service_id, day, after=None):
+        """(الحلاق، 'HH:MM') لأبكر وقت متاح بين كل الحلاقين، أو None"""
+        best = None
+        for barber in self.reference.active_barbers():
+            slots = self.free_slots(barber.id, service_id, day, after)
+            if slots and (best is None or slots[0] < best[1]):
+                best = (barber, slots[0])
+        return best
+
+    def is_free(self, barber_id, day, time, duration, exclude_id=None):
+        """هل الوقت متاح حسب الفهرس في الذاكرة؟"""
+        start = to_minutes(time)
+        return not _overlaps(self._intervals(barber_id, day), start, start + int(duration),
+                             exclude_id)
+
+    def check_free(self, cursor, barber_id, day, time, duration, exclude_id=None):
+        """التحقق داخل معاملة الكتابة من قاعدة البيانات (يرفع SlotTakenError)"""
+        cursor.execute(f"""
+            SELECT {_BUSY_COLUMNS}, appointment_number
+            FROM appointments
+            WHERE barber_id = ? AND appointment_date = ?
+              AND status NOT IN ({', '.join('?' * len(FREE_STATUSES))})
+        """, (barber_id, day, *FREE_STATUSES))
+        start = to_minutes(time)
+        end = start + int(duration)
+        for other_time, other_duration, appointment_id, completed_at, number in cursor.fetchall():
+            other_start = to_minutes(other_time)
+            if (appointment_id != exclude_id and other_start < end
+                    and busy_until(day, other_start, other_duration, completed_at) > start):
+                raise SlotTakenError(f"الوقت {time} يتداخل مع الموعد {number} "
+                                     f"({other_time}، {other_duration} دقيقة)")
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(appointments=200000, repeats=2000):
+    """زمن free_slots و first_available من الذاكرة، وزمن الحجز مع التحقق من التداخل"""
+    import os
+    import tempfile
+    import time
+    from datetime import timedelta
+    from database import Database
+    from benchmarks.generator import generate
+    from engine import BookingService, BookingRequest
+    from reference_data import ReferenceData
+
+    path = os.path.join(tempfile.mkdtemp(), 'availability_bench.db')
+    generate(path, appointments, max(1000, appointments // 10), days=365, verbose=False)
+    db = Database(path)
+    reference = ReferenceData(db).load()
+    availability = Availability(db, reference)
+    booking = BookingService(db, reference, availability)
+    barbers = [b.id for b in reference.active_barbers()]
+    services = [s.id for s in reference.active_services()]
+    day = (date.today() + timedelta(days=3)).isoformat()
+
+    def timed(label, fn):
+        fn(0)
+        started = time.perf_counter()
+        for i in range(repeats):
+            fn(i)
+        print(f"{label:<18} {(time.perf_counter() - started) / repeats * 1000:>8.3f}ms")
+
+    timed('free_slots', lambda i: availability.free_slots(
+        barbers[i % len(barbers)], services[i % len(services)], day, after='00:00'))
+    timed('first_available', lambda i: availability.first_available(
+        services[i % len(services)], day, after='00:00'))
+
+    booked = rejected = 0
+    started = time.perf_counter()
+    for i in range(repeats):
+        barber_id = barbers[i % len(barbers)]
+        barber = reference.barber(barber_id)
+        service = reference.service(services[i % len(services)])
+        slot_day = (date.today() + timedelta(days=20 + i // 200)).isoformat()
+        slots = availability.free_slots(barber_id, service.id, slot_day, after='00:00')
+        # نصف المحاولات على وقت محجوز عمداً للتحقق من الرفض
+        when = slots[0] if slots and i % 2 == 0 else '10:00'
+        try:
+            booking.book(BookingRequest(f'عميل {i}', f'06{i:08d}', barber_id, barber.name,
+                                        service.id, service.name, slot_day, when, service.price))
+            booked += 1
+        except SlotTakenError:
+            rejected += 1
+    elapsed = time.perf_counter() - started
+    print(f"{'book+check':<18} {elapsed / repeats * 1000:>8.3f}ms  "
+          f"(حُجز {booked:,}، رُفض {rejected:,})")
+
+    overlaps = db.fetchvalue(f"""
+        SELECT COUNT(*) FROM appointments a JOIN appointments b
+          ON a.barber_id = b.barber_id AND a.appointment_date = b.appointment_date
+         AND a.id < b.id AND a.appointment_date >= ?
+         AND a.status NOT IN {FREE_STATUSES} AND b.status NOT IN {FREE_STATUSES}
+         AND time(a.appointment_time) < time(b.appointment_time, '+' || b.duration || ' minutes')
+         AND time(b.appointment_time) < time(a.appointment_time, '+' || a.duration || ' minutes')
+    """, ((date.today() + timedelta(days=20)).isoformat(),))
+    print(f"مواعيد متداخلة بعد القياس: {overlaps}")
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 200000)
+    else:
+        print(__doc__)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💾 النسخ الاحتياطي لقاعدة البيانات
+Online database backup
+
+- النسخ بواجهة النسخ في SQLite على دفعات من الصفحات، من اتصال مستقل
+  يفتح معاملة قراءة طوال النسخ: النسخة لقطة متسقة (تشمل ما في ملف WAL)
+  والكتابة من الاتصالات الأخرى لا تتوقف ولا تعيد النسخ من البداية.
+- فحص سلامة النسخة (PRAGMA integrity_check) قبل اعتمادها.
+- ضغط متدفق (gzip، أو zstd إن كانت مكتبة zstandard منصبة) مع بصمة SHA-256،
+  ثم التحقق من الملف المضغوط بفك ضغطه ومقارنة البصمة.
+- تدوير النسخ حسب سياسة احتفاظ: آخر N نسخ + نسخة لكل يوم/أسبوع/شهر.
+
+الاستخدام:
+    python backup.py [مجلد_النسخ] [gzip|zstd|none]
+    python backup.py rotate [مجلد_النسخ]
+    python backup.py restore BACKUP_FILE DEST.db
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List
+
+import changelog
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BACKUP_FOLDER = 'backups'
+
+# عدد الصفحات في كل خطوة نسخ
+BACKUP_PAGES = 1024
+
+# حجم القطعة عند الضغط وفك الضغط
+CHUNK_SIZE = 1024 * 1024
+
+EXTENSIONS = {'gzip': '.db.gz', 'zstd': '.db.zst', 'none': '.db'}
+
+BACKUP_NAME = re.compile(r'^backup_(\d{8}_\d{6})(?:_\d+)?\.db(?:\.gz|\.zst)?$')
+
+
+@dataclass
+class RetentionPolicy:
+    """سياسة الاحتفاظ: آخر keep_last نسخ + أحدث نسخة في كل يوم/أسبوع/شهر"""
+    keep_last: int = 3
+    daily: int = 7
+    weekly: int = 4
+    monthly: int = 12
+
+    @classmethod
+    def from_settings(cls, reference):
+        """من إعدادات backup_keep_* (ReferenceData) مع القيم الافتراضية"""
+        policy = cls()
+        for name in ('keep_last', 'daily', 'weekly', 'monthly'):
+            value = reference.setting(f'backup_keep_{name}')
+            if value not in (None, ''):
+                setattr(policy, name, int(value))
+        return policy
+
+
+@dataclass
+class BackupResult:
+    """نتيجة نسخة احتياطية"""
+    path: str
+    compression: str
+    size: int
+    database_size: int
+    sha256: str
+    seconds: float
+    pages: int = 0
+    change_id: int = 0
+
+
+@dataclass
+class RotationResult:
+    kept: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+
+class BackupError(Exception):
+    """فشل فحص السلامة أو التحقق من النسخة"""
+
+
+# ==================== الضغط ====================
+
+def _check_compression(compression):
+    if compression not in EXTENSIONS:
+        raise ValueError(f"نوع ضغط غير معروف: {compression}")
+    if compression == 'zstd' and zstandard is None:
+        raise BackupError("ضغط zstd يحتاج مكتبة zstandard (pip install zstandard)")
+
+
+def compression_of(path):
+    """نوع الضغط من امتداد الملف"""
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+
+def _open_writer(path, compression):
+    if compression == 'gzip':
+        return gzip.open(path, 'wb', compresslevel=6)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    return open(path, 'wb')
+
+
+def _open_reader(path, compression=None):
+    compression = compression or compression_of(path)
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise BackupError("فك ضغط zstd يحتاج مكتبة zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    return open(path, 'rb')
+
+
+def _copy(source, target, job=None, progress=None, total=0):
+    """نسخ متدفق بين ملفين مع حساب البصمة؛ يُرجع sha256"""
+    digest = hashlib.sha256()
+    done = 0
+    while True:
+        chunk = source.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        if target is not None:
+            target.write(chunk)
+        done += len(chunk)
+        if job:
+            job.check()
+            if progress and total:
+                job.set_progress(progress[0] + (progress[1] - progress[0]) * done / total)
+    return digest.hexdigest()
+
+
+# ==================== النسخ ====================
+
+def _snapshot(db_path, target_path, job=None):
+    """نسخ لقطة متسقة من قاعدة البيانات إلى ملف؛ يُرجع (عدد الصفحات، آخر تغيير فيها)"""
+    source = sqlite3.connect(db_path, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    pages = {'total': 0}
+
+    def on_progress(status, remaining, total):
+        pages['total'] = total
+        if job:
+            job.check()
+            job.set_progress(0.5 * (total - remaining) / total if total else 0.5)
+
+    try:
+        # معاملة قراءة طوال النسخ: لقطة ثابتة لا تتأثر بالكتابة من الاتصالات الأخرى
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        change_id = changelog.sequence_position(source)
+        source.backup(target, pages=BACKUP_PAGES, progress=on_progress)
+        source.execute("COMMIT")
+        # النسخة ملف مستقل بدون WAL (يُفتح للقراءة فقط دون ملفات جانبية)
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+        source.close()
+    return pages['total'], change_id
+
+
+def integrity_check(path):
+    """فحص سلامة ملف قاعدة بيانات (يرفع BackupError عند وجود خلل)"""
+    conn = sqlite3.connect(path)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    if rows != [('ok',)]:
+        raise BackupError("فشل فحص السلامة: " + '; '.join(str(r[0]) for r in rows[:5]))
+
+
+def create_backup(db, folder=BACKUP_FOLDER, compression='gzip', verify=True, job=None):
+    """نسخة احتياطية كاملة مضغوطة ومفحوصة؛ يُرجع BackupResult
+
+    job (اختياري): كائن Job من worker لدعم الإلغاء ومؤشر التقدم.
+    """
+    _check_compression(compression)
+    os.makedirs(folder, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    backup_file = os.path.join(folder, f'backup_{timestamp}{EXTENSIONS[compression]}')
+    started = time.perf_counter()
+
+    # اللقطة في ملف مؤقت داخل نفس المجلد، ثم الضغط منه
+    fd, snapshot = tempfile.mkstemp(prefix='.snapshot_', suffix='.db', dir=folder)
+    os.close(fd)
+    partial = backup_file + '.part'
+    try:
+        with db.timed('backup_database'):
+            pages, change_id = _snapshot(db.path, snapshot, job)
+
+            integrity_check(snapshot)
+            database_size = os.path.getsize(snapshot)
+
+            with open(snapshot, 'rb') as source, _open_writer(partial, compression) as target:
+                sha256 = _copy(source, target, job, (0.6, 0.9), database_size)
+
+            if verify:
+                with _open_reader(partial, compression) as source:
+                    if _copy(source, None, job, (0.9, 1.0), database_size) != sha256:
+                        raise BackupError("الملف المضغوط لا يطابق النسخة الأصلية")
+
+            os.replace(partial, backup_file)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        os.remove(snapshot)
+
+    return BackupResult(backup_file, compression, os.path.getsize(backup_file), database_size,
+                        sha256, time.perf_counter() - started, pages, change_id)
+
+
+def restore_backup(backup_file, dest, overwrite=False):
+    """فك ضغط نسخة إلى ملف قاعدة بيانات وفحص سلامته"""
+    if os.path.exists(dest) and not overwrite:
+        raise FileExistsError(dest)
+
+    partial = dest + '.part'
+    try:
+        with _open_reader(backup_file) as source, open(partial, 'wb') as target:
+            _copy(source, target)
+        integrity_check(partial)
+        os.replace(partial, dest)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return dest
+
+
+# ==================== التدوير ====================
+
+def list_backups(folder=BACKUP_FOLDER):
+    """النسخ الموجودة [(التاريخ، المسار)] من الأحدث للأقدم"""
+    backups = []
+    if not os.path.isdir(folder):
+        return backups
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            match = BACKUP_NAME.match(entry.name)
+            if match and entry.is_file():
+                backups.append((datetime.strptime(match.group(1), '%Y%m%d_%H%M%S'), entry.path))
+    backups.sort(reverse=True)
+    return backups
+
+
+def select_backups_to_keep(backups, policy):
+    """مسارات النسخ المحتفظ بها حسب السياسة (backups من الأحدث للأقدم)"""
+    keep = {path for _, path in backups[:policy.keep_last]}
+    periods = (
+        (policy.daily, lambda when: when.date()),
+        (policy.weekly, lambda when: when.isocalendar()[:2]),
+        (policy.monthly, lambda when: (when.year, when.month)),
+    )
+    for count, period_of in periods:
+        seen = set()
+        for when, path in backups:
+            period = period_of(when)
+            if period in seen:
+                continue
+            if len(seen) >= count:
+                break
+            seen.add(period)
+            keep.add(path)
+    return keep
+
+
+def rotate_backups(folder=BACKUP_FOLDER, policy=None, job=None):
+    """حذف النسخ خارج سياسة الاحتفاظ؛ الملفات بأسماء أخرى لا تُلمس"""
+    policy = policy or RetentionPolicy()
+    backups = list_backups(folder)
+    keep = select_backups_to_keep(backups, policy)
+    result = RotationResult()
+    for _, path in backups:
+        if job:
+            job.check()
+        if path in keep:
+            result.kept.append(path)
+        else:
+            os.remove(path)
+            result.deleted.append(path)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    args = sys.argv[1:]
+    if args and args[0] == 'rotate':
+        result = rotate_backups(args[1] if len(args) > 1 else BACKUP_FOLDER)
+        print(f"🗑️ حُذفت {len(result.deleted)} نسخة، وبقيت {len(result.kept)}")
+    elif args and args[0] == 'restore' and len(args) == 3:
+        print(f"✅ تمت الاستعادة إلى {restore_backup(args[1], args[2])}")
+    elif args and args[0] in ('-h', '--help'):
+        print(__doc__)
+    else:
+        db = Database('database/barbershop.db')
+        result = create_backup(db, args[0] if args else BACKUP_FOLDER,
+                               args[1] if len(args) > 1 else 'gzip')
+        db.close()
+        print(f"✅ تم إنشاء نسخة احتياطية: {result.path} "
+              f"({result.size / 1e6:,.1f} MB من {result.database_size / 1e6:,.1f} MB، "
+              f"{result.seconds:.1f}s)")
@@ -14,13 +14,26 @@ Barbershop Management System
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import sqlite3
-import pandas as pd
 from datetime import datetime, date, timedelta
 import os
-import shutil
 from pathlib import Path
-import json
+
+from database import Database
+from schema import create_tables, insert_default_data
+from migrations import apply_migrations, schema_is_current
+from engine import (BookingService, CheckoutService, StatsService,
+                    BookingRequest, CheckoutRequest, list_day_appointments)
+from customer_search import CustomerSearch
+from reference_data import ReferenceData
+from availability import Availability, parse_working_hours, to_time, SLOT_MINUTES
+from tree_sync import TreeSync
+from worker import BackgroundWorker
+from instrumentation import from_environment as tracer_from_environment
+from reports import ReportsService
+from appointment_browser import AppointmentPager, BrowseFilter, count_appointments
+from backup import rotate_backups, RetentionPolicy
+from incremental_backup import incremental_backup, remove_orphan_deltas, DeltaResult
+import changelog
 
 # ==================== الألوان والإعدادات ====================
 COLORS = {
@@ -53,6 +66,21 @@ COLORS = {
     'no_show': '#94a3b8',        # غائب - رمادي
 }
 
+# مهلة انتظار توقف الكتابة قبل تنفيذ البحث (ميلي ثانية)
+SEARCH_DEBOUNCE_MS = 250
+
+# فترة فحص تغييرات الأجهزة الأخرى على نفس القاعدة (ميلي ثانية)
+CHANGE_POLL_MS = 3000
+
+# أسماء حالات المواعيد
+STATUS_NAMES = {
+    'pending': 'معلق',
+    'confirmed': 'مؤكد',
+    'completed': 'مكتمل',
+    'cancelled': 'ملغي',
+    'no_show': 'غائب'
+}
+
 FONTS = {
     'family': 'Segoe UI',
     'title': 16,
@@ -72,24 +100,60 @@ class BarbershopManagementSystem:
         # إنشاء المجلدات الضرورية
         self.create_folders()
 
+        # اتصال قاعدة البيانات الدائم
+        self.db = Database(self.db_path)
+
+        # الخدمات والحلاقون والإعدادات في الذاكرة (تُحمَّل بعد إعداد قاعدة البيانات)
+        self.reference = ReferenceData(self.db)
+
+        # أوقات الحلاقين المشغولة (لعرض المتاح ورفض الحجز المتداخل)
+        self.availability = Availability(self.db, self.reference)
+
+        # منطق الحجز والجلسات والإحصائيات (بدون واجهة)
+        self.booking = BookingService(self.db, self.reference, self.availability)
+        self.checkout = CheckoutService(self.db, self.reference)
+        self.stats = StatsService(self.db)
+        self.reports = ReportsService(self.db, self.reference)
+
+        # أعمال قاعدة البيانات والملفات في الخلفية
+        self.worker = BackgroundWorker(self.root, on_status=self.update_status_bar)
+        self._appointments_job = None
+        self._time_slots_job = None
+
+        # تتبع SQL وأزمنة الإجراءات (BARBERSHOP_TRACE=1)، قبل ربط الأزرار بالإجراءات
+        self.tracer = tracer_from_environment(self.db, self.worker, owner=self)
+
         # إعداد النافذة الرئيسية
         self.setup_window()
 
-        # إعداد قاعدة البيانات
-        self.setup_database()
-
-        # تحميل البيانات الافتراضية
-        self.load_default_data()
+        # إعداد قاعدة البيانات والبيانات الافتراضية (مرة واحدة فقط: بعدها يكفي فحص رقم المخطط)
+        if not schema_is_current(self.db):
+            self.setup_database()
+            self.load_default_data()
 
-        # بناء الواجهة الرئيسية
+        # بناء الواجهة الرئيسية (القوائم تُملأ بعد ظهور النافذة)
         self.create_main_interface()
 
-        # تحديث الإحصائيات
+        # الخدمات والحلاقون والإعدادات، ثم الإحصائيات، في الخلفية
+        self.load_reference_data()
         self.update_dashboard()
 
+        # واجهة HTTP للحجز الإلكتروني وأجهزة الاستقبال (BARBERSHOP_API=المنفذ)
+        self.api = None
+        if os.environ.get('BARBERSHOP_API'):
+            from api import from_environment as api_from_environment
+            self.api = api_from_environment(self.db, self.reference, self.availability,
+                                            self.worker)
+
         # اختصارات لوحة المفاتيح
         self.setup_keyboard_shortcuts()
 
+        # تحديث العرض عند تغيير القاعدة من جهاز آخر
+        self._seen_version = None
+        self._seen_commits = 0
+        self._watch_job = None
+        self.watch_external_changes()
+
     def create_folders(self):
         """إنشاء المجلدات الضرورية"""
         folders = ['database', 'backups', 'exports', 'assets']
@@ -122,219 +186,18 @@ class BarbershopManagementSystem:
 
     def setup_database(self):
         """إنشاء قاعدة البيانات والجداول"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # جدول العملاء
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT UNIQUE NOT NULL,
-                email TEXT,
-                birth_date DATE,
-                address TEXT,
-                preferences TEXT,
-                loyalty_points INTEGER DEFAULT 0,
-                total_visits INTEGER DEFAULT 0,
-                total_spent REAL DEFAULT 0,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                last_visit DATETIME
-            )
-        ''')
-
-        # جدول الحلاقين
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS barbers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT,
-                hire_date DATE,
-                specialization TEXT,
-                commission_rate REAL DEFAULT 30,
-                status TEXT DEFAULT 'active',
-                working_days TEXT,
-                working_hours TEXT,
-                total_services INTEGER DEFAULT 0,
-                total_revenue REAL DEFAULT 0,
-                rating REAL DEFAULT 5.0,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # جدول الخدمات
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS services (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                category TEXT NOT NULL,
-                description TEXT,
-                duration INTEGER NOT NULL,
-                price REAL NOT NULL,
-                cost REAL DEFAULT 0,
-                commission_rate REAL,
-                status TEXT DEFAULT 'active',
-                popularity INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-
-        # جدول المواعيد
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS appointments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                appointment_number TEXT UNIQUE NOT NULL,
-                customer_id INTEGER,
-                customer_name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                barber_id INTEGER NOT NULL,
-                barber_name TEXT NOT NULL,
-                service_id INTEGER NOT NULL,
-                service_name TEXT NOT NULL,
-                appointment_date DATE NOT NULL,
-                appointment_time TIME NOT NULL,
-                duration INTEGER,
-                status TEXT DEFAULT 'pending',
-                price REAL NOT NULL,
-                cost REAL DEFAULT 0,
-                commission REAL DEFAULT 0,
-                payment_method TEXT,
-                payment_status TEXT DEFAULT 'unpaid',
-                rating INTEGER,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                completed_at DATETIME,
-                FOREIGN KEY (customer_id) REFERENCES customers(id),
-                FOREIGN KEY (barber_id) REFERENCES barbers(id),
-                FOREIGN KEY (service_id) REFERENCES services(id)
-            )
-        ''')
-
-        # جدول الجلسات
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_number TEXT UNIQUE NOT NULL,
-                customer_id INTEGER,
-                customer_name TEXT NOT NULL,
-                barber_id INTEGER NOT NULL,
-                barber_name TEXT NOT NULL,
-                services TEXT NOT NULL,
-                total_price REAL NOT NULL,
-                total_cost REAL DEFAULT 0,
-                total_commission REAL DEFAULT 0,
-                discount REAL DEFAULT 0,
-                final_price REAL NOT NULL,
-                payment_method TEXT NOT NULL,
-                payment_status TEXT DEFAULT 'paid',
-                loyalty_points_earned INTEGER DEFAULT 0,
-                loyalty_points_used INTEGER DEFAULT 0,
-                status TEXT DEFAULT 'completed',
-                check_in_time DATETIME,
-                check_out_time DATETIME,
-                duration INTEGER,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (customer_id) REFERENCES customers(id),
-                FOREIGN KEY (barber_id) REFERENCES barbers(id)
-            )
-        ''')
-
-        # جدول الإعدادات
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-        ''')
+        with self.db.transaction('setup_database') as cursor:
+            create_tables(cursor)
 
-        conn.commit()
-        conn.close()
+        # الفهارس والتعديلات اللاحقة على المخطط
+        apply_migrations(self.db)
 
         print("✅ تم إنشاء قاعدة البيانات بنجاح")
 
     def load_default_data(self):
         """تحميل البيانات الافتراضية (الخدمات والحلاقين)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # التحقق من وجود خدمات
-        cursor.execute("SELECT COUNT(*) FROM services")
-        if cursor.fetchone()[0] == 0:
-            # تحميل الخدمات الافتراضية
-            services = [
-                # قص الشعر
-                ('قص شعر عادي', 'قص شعر', 'قص شعر كلاسيكي بسيط', 30, 40, 5, 30, 'active'),
-                ('قص شعر + تشكيل', 'قص شعر', 'قص شعر مع تشكيل الشعر', 40, 50, 6, 30, 'active'),
-                ('قص شعر للأطفال', 'قص شعر', 'قص شعر للأطفال تحت 12 سنة', 25, 30, 4, 30, 'active'),
-                ('قص شعر كلاسيكي', 'قص شعر', 'قص شعر بأسلوب كلاسيكي', 35, 45, 5, 30, 'active'),
-                ('قص شعر حديث (Fade)', 'قص شعر', 'قص شعر حديث مع تدرج', 45, 60, 8, 35, 'active'),
-
-                # حلاقة الذقن
-                ('حلاقة ذقن عادية', 'حلاقة ذقن', 'حلاقة الذقن بشكل عادي', 20, 30, 3, 30, 'active'),
-                ('حلاقة ذقن + تشذيب', 'حلاقة ذقن', 'حلاقة وتشذيب الذقن', 30, 40, 5, 30, 'active'),
-                ('تشذيب الذقن فقط', 'حلاقة ذقن', 'تشذيب وتنظيف الذقن', 15, 25, 3, 30, 'active'),
-                ('حلاقة ملكية', 'حلاقة ذقن', 'حلاقة فاخرة مع منشفة ساخنة', 40, 70, 10, 35, 'active'),
-
-                # الصبغة
-                ('صبغة شعر كاملة', 'صبغة', 'صبغة الشعر بالكامل', 90, 150, 40, 30, 'active'),
-                ('صبغة شعر جزئية', 'صبغة', 'صبغة جزء من الشعر', 60, 100, 25, 30, 'active'),
-                ('صبغة ذقن', 'صبغة', 'صبغة شعر الذقن', 45, 80, 20, 30, 'active'),
-                ('إزالة الشيب', 'صبغة', 'إخفاء الشعر الأبيض', 75, 120, 30, 30, 'active'),
-
-                # الباكجات
-                ('باكج VIP', 'باكجات', 'قص شعر + حلاقة + تدليك', 90, 120, 20, 35, 'active'),
-                ('باكج العريس', 'باكجات', 'باكج كامل للعريس', 120, 200, 40, 35, 'active'),
-                ('باكج تجديد كامل', 'باكجات', 'قص + حلاقة + صبغة', 100, 180, 35, 35, 'active'),
-
-                # خدمات إضافية
-                ('غسيل الشعر', 'إضافية', 'غسيل وتنظيف الشعر', 10, 15, 2, 30, 'active'),
-                ('تدليك الرأس', 'إضافية', 'تدليك فروة الرأس', 15, 25, 3, 30, 'active'),
-                ('ماسك للشعر', 'إضافية', 'ماسك معالج للشعر', 20, 40, 8, 30, 'active'),
-                ('تنظيف البشرة', 'إضافية', 'تنظيف عميق للبشرة', 30, 60, 10, 30, 'active'),
-                ('تشقير الحواجب', 'إضافية', 'تشقير وتنظيف الحواجب', 20, 35, 5, 30, 'active'),
-                ('حمام مغربي', 'إضافية', 'جلسة حمام مغربي', 60, 100, 20, 30, 'active'),
-            ]
-
-            cursor.executemany('''
-                INSERT INTO services (name, category, description, duration, price, cost, commission_rate, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', services)
-
-            print(f"✅ تم تحميل {len(services)} خدمة")
-
-        # التحقق من وجود حلاقين
-        cursor.execute("SELECT COUNT(*) FROM barbers")
-        if cursor.fetchone()[0] == 0:
-            # إضافة حلاق تجريبي
-            cursor.execute('''
-                INSERT INTO barbers (name, phone, specialization, commission_rate, status, working_days, working_hours)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', ('خالد محمد', '0501234567', 'قص شعر حديث', 35, 'active',
-                  'السبت,الأحد,الاثنين,الثلاثاء,الأربعاء,الخميس', '09:00-18:00'))
-
-            print("✅ تم إضافة حلاق تجريبي")
-
-        # الإعدادات الافتراضية
-        default_settings = [
-            ('shop_name', 'محل الحلاقة'),
-            ('shop_address', 'الرياض، المملكة العربية السعودية'),
-            ('shop_phone', '0501234567'),
-            ('shop_email', 'info@barbershop.com'),
-            ('working_hours', '09:00-21:00'),
-            ('tax_rate', '15'),
-        ]
-
-        for key, value in default_settings:
-            cursor.execute('''
-                INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
-            ''', (key, value))
-
-        conn.commit()
-        conn.close()
+        with self.db.transaction('load_default_data') as cursor:
+            insert_default_data(cursor)
 
     def create_main_interface(self):
         """بناء الواجهة الرئيسية"""
@@ -358,6 +221,9 @@ class BarbershopManagementSystem:
         # أزرار الإجراءات السفلية
         self.create_action_buttons(main_frame)
 
+        # شريط الحالة (الأعمال الجارية في الخلفية)
+        self.create_status_bar(main_frame)
+
     def create_stats_bar(self, parent):
         """إنشاء شريط الإحصائيات العلوي"""
         stats_frame = tk.Frame(parent, bg=COLORS['primary'], height=100)
@@ -457,7 +323,7 @@ class BarbershopManagementSystem:
         self.form_entries['barber'] = ttk.Combobox(inner_frame, font=(FONTS['family'], FONTS['body']),
                                                     state='readonly', width=28)
         self.form_entries['barber'].grid(row=row, column=1, sticky='ew', pady=5)
-        self.load_barbers()
+        self.form_entries['barber'].bind('<<ComboboxSelected>>', self.refresh_time_slots)
 
         # الخدمة
         row += 1
@@ -467,7 +333,6 @@ class BarbershopManagementSystem:
                                                      state='readonly', width=28)
         self.form_entries['service'].grid(row=row, column=1, sticky='ew', pady=5)
         self.form_entries['service'].bind('<<ComboboxSelected>>', self.on_service_selected)
-        self.load_services()
 
         # التاريخ
         row += 1
@@ -476,15 +341,20 @@ class BarbershopManagementSystem:
         self.form_entries['date'] = tk.Entry(inner_frame, font=(FONTS['family'], FONTS['body']), width=30)
         self.form_entries['date'].grid(row=row, column=1, sticky='ew', pady=5)
         self.form_entries['date'].insert(0, datetime.now().strftime('%Y-%m-%d'))
+        self.form_entries['date'].bind('<FocusOut>', self.refresh_time_slots)
+        self.form_entries['date'].bind('<Return>', self.refresh_time_slots)
 
         # الوقت
         row += 1
         tk.Label(inner_frame, text="🕐 الوقت:", bg=COLORS['card'],
                 font=(FONTS['family'], FONTS['body'])).grid(row=row, column=0, sticky='w', pady=5)
-        self.form_entries['time'] = ttk.Combobox(inner_frame, font=(FONTS['family'], FONTS['body']),
-                                                  state='readonly', width=28)
-        self.form_entries['time'].grid(row=row, column=1, sticky='ew', pady=5)
-        self.generate_time_slots()
+        time_frame = tk.Frame(inner_frame, bg=COLORS['card'])
+        time_frame.grid(row=row, column=1, sticky='ew', pady=5)
+        self.form_entries['time'] = ttk.Combobox(time_frame, font=(FONTS['family'], FONTS['body']),
+                                                  state='readonly', width=22)
+        self.form_entries['time'].pack(side=tk.LEFT, fill=tk.X, expand=True)
+        tk.Button(time_frame, text="⏱️ أول متاح", command=self.first_available_slot,
+                 bg=COLORS['info'], fg='white').pack(side=tk.LEFT, padx=(5, 0))
 
         # السعر
         row += 1
@@ -578,7 +448,8 @@ class BarbershopManagementSystem:
 
         self.search_entry = tk.Entry(search_frame, font=(FONTS['family'], FONTS['body']), width=25)
         self.search_entry.pack(side=tk.LEFT, padx=5)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.load_appointments())
+        self.search_entry.bind('<KeyRelease>', self.schedule_load_appointments)
+        self._load_job = None
 
         tk.Button(
             search_frame,
@@ -602,23 +473,27 @@ class BarbershopManagementSystem:
         x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
 
         # Treeview
-        columns = ('#', 'الوقت', 'العميل', 'الجوال', 'الحلاق', 'الخدمة', 'السعر', 'الحالة')
+        columns = ('رقم الموعد', 'الوقت', 'العميل', 'الجوال', 'الحلاق', 'الخدمة', 'السعر',
+                   'الحالة')
         self.appointments_tree = ttk.Treeview(
             table_container,
             columns=columns,
             show='headings',
+            # تحديد متعدد (Ctrl/Shift) لتغيير حالة عدة مواعيد دفعة واحدة
+            selectmode='extended',
             yscrollcommand=y_scrollbar.set,
             xscrollcommand=x_scrollbar.set,
             height=15
         )
 
         # تكوين الأعمدة
-        widths = [40, 80, 120, 100, 100, 120, 80, 100]
+        widths = [150, 80, 120, 100, 100, 120, 80, 100]
         for col, width in zip(columns, widths):
             self.appointments_tree.heading(col, text=col)
             self.appointments_tree.column(col, width=width, anchor='center')
 
         self.appointments_tree.pack(fill=tk.BOTH, expand=True)
+        self.appointments_sync = TreeSync(self.appointments_tree)
 
         y_scrollbar.config(command=self.appointments_tree.yview)
         x_scrollbar.config(command=self.appointments_tree.xview)
@@ -628,6 +503,9 @@ class BarbershopManagementSystem:
         self.context_menu.add_command(label="✏️ تعديل", command=self.edit_appointment)
         self.context_menu.add_command(label="✅ تأكيد", command=self.confirm_appointment)
         self.context_menu.add_command(label="✔️ إنهاء", command=self.complete_appointment)
+        self.context_menu.add_command(label="🚫 غائب", command=self.no_show_appointment)
+        self.context_menu.add_command(label="⏰ المتأخرون اليوم ← غائب",
+                                      command=self.no_show_past_due)
         self.context_menu.add_separator()
         self.context_menu.add_command(label="❌ إلغاء", command=self.cancel_appointment)
         self.context_menu.add_command(label="🗑️ حذف", command=self.delete_appointment)
@@ -640,6 +518,7 @@ class BarbershopManagementSystem:
         self.appointments_tree.tag_configure('confirmed', background='#d1ecf1')
         self.appointments_tree.tag_configure('completed', background='#d4edda')
         self.appointments_tree.tag_configure('cancelled', background='#f8d7da')
+        self.appointments_tree.tag_configure('no_show', background='#e2e8f0')
 
     def create_action_buttons(self, parent):
         """إنشاء أزرار الإجراءات السفلية"""
@@ -655,6 +534,7 @@ class BarbershopManagementSystem:
             ("✂️ الحلاقين", self.open_barbers_window, COLORS['info']),
             ("💈 الخدمات", self.open_services_window, COLORS['info']),
             ("📊 التقارير", self.open_reports_window, COLORS['secondary']),
+            ("📚 تصفح المواعيد", self.open_browse_window, COLORS['info']),
         ]
 
         for text, command, color in buttons_row1:
@@ -677,6 +557,7 @@ class BarbershopManagementSystem:
         buttons_row2 = [
             ("⚙️ الإعدادات", self.open_settings_window, COLORS['text_muted']),
             ("📤 تصدير Excel", self.export_to_excel, COLORS['success']),
+            ("📥 استيراد", self.import_data, COLORS['info']),
             ("💾 نسخ احتياطي", self.backup_database, COLORS['warning']),
             ("❌ خروج", self.exit_app, COLORS['danger']),
         ]
@@ -694,18 +575,69 @@ class BarbershopManagementSystem:
                 height=2
             ).pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
 
+    def create_status_bar(self, parent):
+        """إنشاء شريط الحالة ومؤشر التقدم"""
+        status_frame = tk.Frame(parent, bg=COLORS['background'])
+        status_frame.pack(fill=tk.X, pady=(5, 0))
+
+        self.status_label = tk.Label(status_frame, text="", bg=COLORS['background'],
+                                     fg=COLORS['text_muted'], font=(FONTS['family'], FONTS['small']))
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+        self.progress_bar = ttk.Progressbar(status_frame, length=200, maximum=1.0)
+        self.progress_bar.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_button = tk.Button(status_frame, text="إيقاف", command=self.worker.cancel_all,
+                                       bg=COLORS['danger'], fg='white',
+                                       font=(FONTS['family'], FONTS['small']), state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+        # تنبيه بتحديث العرض بعد تغييرات من جهاز آخر
+        self.sync_label = tk.Label(status_frame, text="", bg=COLORS['background'],
+                                   fg=COLORS['info'], font=(FONTS['family'], FONTS['small']))
+        self.sync_label.pack(side=tk.RIGHT, padx=5)
+
+    def update_status_bar(self, active, progress):
+        """تحديث شريط الحالة حسب الأعمال الجارية"""
+        if not hasattr(self, 'progress_bar'):
+            return
+
+        if not active:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', value=0)
+            self.status_label.config(text="")
+            self.cancel_button.config(state=tk.DISABLED)
+            return
+
+        self.status_label.config(text=f"⏳ جارٍ التنفيذ ({active})...")
+        self.cancel_button.config(state=tk.NORMAL)
+        if progress is None:
+            if str(self.progress_bar['mode']) != 'indeterminate':
+                self.progress_bar.config(mode='indeterminate')
+                self.progress_bar.start(15)
+        else:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', value=progress)
+
     # ==================== دوال مساعدة للنموذج ====================
 
+    def load_reference_data(self):
+        """تحميل الخدمات والحلاقين والإعدادات في الخلفية ثم ملء القوائم"""
+        def on_done(reference):
+            self.load_barbers()
+            self.load_services()
+            self.refresh_time_slots()
+
+        self.worker.submit(
+            lambda job: self.reference.load(),
+            on_done=on_done,
+            on_error=lambda e: print(f"خطأ في تحميل البيانات المرجعية: {e}"),
+            description='load_reference_data')
+
     def load_barbers(self):
         """تحميل قائمة الحلاقين"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name FROM barbers WHERE status='active' ORDER BY name")
-            barbers = cursor.fetchall()
-            conn.close()
-
-            barber_list = [f"{b[1]} (#{b[0]})" for b in barbers]
+            barber_list = [f"{b.name} (#{b.id})" for b in self.reference.active_barbers()]
             self.form_entries['barber']['values'] = barber_list
             if barber_list:
                 self.form_entries['barber'].current(0)
@@ -715,24 +647,93 @@ class BarbershopManagementSystem:
     def load_services(self):
         """تحميل قائمة الخدمات"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name, price FROM services WHERE status='active' ORDER BY category, name")
-            services = cursor.fetchall()
-            conn.close()
-
-            service_list = [f"{s[1]} - {s[2]} ر.س (#{s[0]})" for s in services]
+            service_list = [f"{s.name} - {s.price} ر.س (#{s.id})"
+                            for s in self.reference.active_services()]
             self.form_entries['service']['values'] = service_list
         except Exception as e:
             print(f"خطأ في تحميل الخدمات: {e}")
 
-    def generate_time_slots(self):
-        """إنشاء فتحات الوقت"""
-        time_slots = []
-        for hour in range(9, 21):  # من 9 صباحاً إلى 9 مساءً
-            for minute in ['00', '30']:
-                time_slots.append(f"{hour:02d}:{minute}")
+    def reference_data_changed(self, *kinds):
+        """بعد تعديل الخدمات أو الحلاقين أو الإعدادات: إسقاطها من الذاكرة وتحديث القوائم"""
+        self.reference.invalidate(*kinds)
+        if not kinds or 'barbers' in kinds:
+            self.load_barbers()
+        if not kinds or 'services' in kinds:
+            self.load_services()
+
+    def _selected_id(self, key):
+        """معرف العنصر المختار في قائمة الحلاقين أو الخدمات (أو None)"""
+        text = self.form_entries[key].get()
+        return int(text.split('#')[-1].strip(')')) if text else None
+
+    def refresh_time_slots(self, event=None):
+        """الأوقات المتاحة للحلاق والخدمة في التاريخ المختار (الحساب في الخلفية)"""
+        try:
+            barber_id = self._selected_id('barber')
+            service_id = self._selected_id('service')
+        except ValueError as e:
+            print(f"خطأ في تحميل الأوقات المتاحة: {e}")
+            return
+        day = self.form_entries['date'].get().strip()
+
+        def slots(job):
+            if barber_id is None or service_id is None:
+                # قبل اختيار الخدمة: كل أوقات يوم العمل
+                opening, closing = parse_working_hours(self.reference.setting('working_hours'))
+                return [to_time(m) for m in range(opening, closing, SLOT_MINUTES)]
+            datetime.strptime(day, '%Y-%m-%d')
+            return self.availability.free_slots(barber_id, service_id, day)
+
+        # أوقات اختيار سابق لم تعد مطلوبة
+        if self._time_slots_job:
+            self._time_slots_job.cancel()
+
+        self._time_slots_job = self.worker.submit(
+            slots,
+            on_done=self._show_time_slots,
+            on_error=lambda e: print(f"خطأ في تحميل الأوقات المتاحة: {e}"),
+            description='refresh_time_slots')
+
+    def _show_time_slots(self, time_slots, selected=None):
+        """ملء قائمة الأوقات (في خيط الواجهة)؛ selected: وقت يُختار إن كان متاحاً"""
+        self._time_slots_job = None
         self.form_entries['time']['values'] = time_slots
+        if selected in time_slots:
+            self.form_entries['time'].set(selected)
+        elif self.form_entries['time'].get() not in time_slots:
+            self.form_entries['time'].set(time_slots[0] if time_slots else '')
+
+    def first_available_slot(self):
+        """اختيار أول حلاق متاح للخدمة المختارة في التاريخ المختار"""
+        service_id = self._selected_id('service')
+        if service_id is None:
+            messagebox.showwarning("تحذير", "الرجاء اختيار الخدمة أولاً!")
+            return
+
+        day = self.form_entries['date'].get().strip()
+
+        def search(job):
+            found = self.availability.first_available(service_id, day)
+            if found is None:
+                return None
+            barber, slot = found
+            return barber, slot, self.availability.free_slots(barber.id, service_id, day)
+
+        def on_done(found):
+            if found is None:
+                messagebox.showinfo("غير متاح", "لا يوجد حلاق متاح لهذه الخدمة في هذا التاريخ")
+                return
+            barber, slot, time_slots = found
+            if self._time_slots_job:
+                self._time_slots_job.cancel()
+            self.form_entries['barber'].set(f"{barber.name} (#{barber.id})")
+            self._show_time_slots(time_slots, selected=slot)
+
+        self.worker.submit(
+            search,
+            on_done=on_done,
+            on_error=lambda e: messagebox.showerror("خطأ", f"فشل البحث عن وقت متاح:\n{e}"),
+            description='first_available_slot')
 
     def on_service_selected(self, event=None):
         """عند اختيار خدمة - تحديث السعر تلقائياً"""
@@ -742,15 +743,13 @@ class BarbershopManagementSystem:
                 # استخراج معرف الخدمة
                 service_id = int(service_text.split('#')[-1].strip(')'))
 
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT price FROM services WHERE id=?", (service_id,))
-                result = cursor.fetchone()
-                conn.close()
+                service = self.reference.service(service_id)
 
-                if result:
+                if service:
                     self.form_entries['price'].delete(0, tk.END)
-                    self.form_entries['price'].insert(0, str(result[0]))
+                    self.form_entries['price'].insert(0, str(service.price))
+
+                self.refresh_time_slots()
         except Exception as e:
             print(f"خطأ في تحديث السعر: {e}")
 
@@ -771,34 +770,82 @@ class BarbershopManagementSystem:
 
         # جدول النتائج
         columns = ('الاسم', 'الجوال', 'الزيارات', 'النقاط')
-        tree = ttk.Treeview(search_window, columns=columns, show='headings', height=12)
+        results_frame = tk.Frame(search_window, bg=COLORS['background'])
+        results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        y_scrollbar = ttk.Scrollbar(results_frame)
+        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        tree = ttk.Treeview(results_frame, columns=columns, show='headings', height=12)
 
         for col in columns:
             tree.heading(col, text=col)
             tree.column(col, width=140, anchor='center')
 
-        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-        def search_customers(event=None):
-            search_text = search_entry.get()
-            tree.delete(*tree.get_children())
+        tree.pack(fill=tk.BOTH, expand=True)
+        y_scrollbar.config(command=tree.yview)
+
+        # job: تأجيل البحث؛ loading: بحث أو صفحة قيد التحميل في الخلفية
+        pending = {'job': None, 'loading': None, 'searcher': None}
+
+        def show_rows(rows):
+            for row in rows:
+                tree.insert('', 'end', iid=str(row[0]), values=row[1:])
+
+        def load(fetch, on_done, on_error, description):
+            """fetch(job) في خيط قراءة؛ التحميل الجديد يلغي ما قبله"""
+            if pending['loading'] is not None:
+                pending['loading'].cancel()
+
+            def done(result):
+                pending['loading'] = None
+                if search_window.winfo_exists():
+                    on_done(result)
+
+            def failed(error):
+                pending['loading'] = None
+                if search_window.winfo_exists():
+                    on_error(error)
+
+            pending['loading'] = self.worker.submit(fetch, on_done=done, on_error=failed,
+                                                    description=description)
+
+        def search_customers():
+            pending['job'] = None
+            text = search_entry.get()
+
+            def fetch(job):
+                # باحث جديد لكل بحث: صفحة ملغاة من بحث سابق لا تغيّر حالته
+                searcher = CustomerSearch(self.db)
+                return searcher, searcher.start(text)
+
+            def show(result):
+                pending['searcher'], rows = result
+                tree.delete(*tree.get_children())
+                show_rows(rows)
+
+            load(fetch, show,
+                 lambda e: messagebox.showerror("خطأ", f"فشل البحث:\n{e}", parent=search_window),
+                 'search_customer')
+
+        def schedule_search(event=None):
+            # تأجيل البحث حتى يتوقف المستخدم عن الكتابة
+            if pending['job']:
+                search_window.after_cancel(pending['job'])
+            pending['job'] = search_window.after(SEARCH_DEBOUNCE_MS, search_customers)
+
+        def on_scroll(first, last):
+            # تحميل الصفحة التالية عند الاقتراب من نهاية القائمة (صفحة واحدة في كل مرة)
+            y_scrollbar.set(first, last)
+            searcher = pending['searcher']
+            if (float(last) < 0.95 or pending['loading'] is not None
+                    or searcher is None or searcher.exhausted):
+                return
+            load(lambda job: searcher.next_page(), show_rows,
+                 lambda e: print(f"خطأ في تحميل المزيد من النتائج: {e}"),
+                 'search_customer_page')
 
-            try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT name, phone, total_visits, loyalty_points
-                    FROM customers
-                    WHERE name LIKE ? OR phone LIKE ?
-                    ORDER BY name
-                """, (f'%{search_text}%', f'%{search_text}%'))
-
-                for row in cursor.fetchall():
-                    tree.insert('', 'end', values=row)
-
-                conn.close()
-            except Exception as e:
-                messagebox.showerror("خطأ", f"فشل البحث:\n{e}")
+        tree.configure(yscrollcommand=on_scroll)
 
         def select_customer(event=None):
             selection = tree.selection()
@@ -814,7 +861,7 @@ class BarbershopManagementSystem:
 
                 search_window.destroy()
 
-        search_entry.bind('<KeyRelease>', search_customers)
+        search_entry.bind('<KeyRelease>', schedule_search)
         tree.bind('<Double-1>', select_customer)
 
         # زر الاختيار
@@ -845,287 +892,193 @@ class BarbershopManagementSystem:
             self.form_entries['barber'].current(0)
 
         self.form_entries['payment'].current(0)
+        self.refresh_time_slots()
 
     # ==================== دوال المواعيد ====================
 
-    def generate_appointment_number(self):
-        """توليد رقم موعد تلقائي"""
-        today = datetime.now().strftime('%Y%m%d')
-
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT COUNT(*) FROM appointments
-                WHERE appointment_number LIKE ?
-            ''', (f'APP-{today}%',))
-            count = cursor.fetchone()[0] + 1
-            conn.close()
-
-            return f'APP-{today}-{count:03d}'
-        except Exception as e:
-            print(f"خطأ في توليد رقم الموعد: {e}")
-            return f'APP-{today}-001'
+    def _parse_booking_form(self):
+        """قراءة حقول النموذج المشتركة بين الحجز والجلسة"""
+        barber = self.form_entries['barber'].get()
+        service = self.form_entries['service'].get()
+
+        # استخراج المعرفات
+        return dict(
+            customer_name=self.form_entries['customer_name'].get().strip(),
+            phone=self.form_entries['phone'].get().strip(),
+            barber_id=int(barber.split('#')[-1].strip(')')),
+            barber_name=barber.split('(#')[0].strip(),
+            service_id=int(service.split('#')[-1].strip(')')),
+            service_name=service.split(' - ')[0].strip(),
+            price=float(self.form_entries['price'].get().strip()),
+            payment_method=self.form_entries['payment'].get(),
+        )
 
     def save_appointment(self):
         """حفظ موعد جديد"""
         try:
             # التحقق من الحقول المطلوبة
-            customer_name = self.form_entries['customer_name'].get().strip()
-            phone = self.form_entries['phone'].get().strip()
-            barber = self.form_entries['barber'].get()
-            service = self.form_entries['service'].get()
-            app_date = self.form_entries['date'].get().strip()
-            app_time = self.form_entries['time'].get()
-            price = self.form_entries['price'].get().strip()
-
-            if not all([customer_name, phone, barber, service, app_date, app_time, price]):
+            fields = [self.form_entries[name].get().strip() for name in
+                      ('customer_name', 'phone', 'barber', 'service', 'date', 'time', 'price')]
+            if not all(fields):
                 messagebox.showwarning("تحذير", "الرجاء ملء جميع الحقول المطلوبة!")
                 return
 
-            # استخراج المعرفات
-            barber_id = int(barber.split('#')[-1].strip(')'))
-            barber_name = barber.split('(#')[0].strip()
+            request = BookingRequest(
+                date=self.form_entries['date'].get().strip(),
+                time=self.form_entries['time'].get(),
+                notes=self.form_entries['notes'].get('1.0', tk.END).strip(),
+                **self._parse_booking_form())
 
-            service_id = int(service.split('#')[-1].strip(')'))
-            service_name = service.split(' - ')[0].strip()
-
-            # توليد رقم الموعد
-            app_number = self.generate_appointment_number()
-
-            # الحصول على بيانات إضافية
-            payment_method = self.form_entries['payment'].get()
-            notes = self.form_entries['notes'].get('1.0', tk.END).strip()
+        except Exception as e:
+            messagebox.showerror("خطأ", f"فشل حفظ الموعد:\n{e}")
+            return
 
-            # البحث عن العميل أو إضافته
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        # الحفظ في خيط الكتابة حتى لا تتجمد الواجهة
+        self.worker.submit(
+            lambda job: self.booking.book(request),
+            on_done=self._on_appointment_saved,
+            on_error=lambda e: messagebox.showerror("خطأ", f"فشل حفظ الموعد:\n{e}"),
+            write=True, description='save_appointment')
 
-            cursor.execute("SELECT id FROM customers WHERE phone=?", (phone,))
-            customer = cursor.fetchone()
+    def _on_appointment_saved(self, result):
+        """بعد حفظ الموعد (في خيط الواجهة)"""
+        messagebox.showinfo("نجح", f"✅ تم حجز الموعد بنجاح!\nرقم الموعد: {result.appointment_number}")
 
-            if customer:
-                customer_id = customer[0]
-            else:
-                # إضافة عميل جديد
-                cursor.execute("""
-                    INSERT INTO customers (name, phone)
-                    VALUES (?, ?)
-                """, (customer_name, phone))
-                customer_id = cursor.lastrowid
-
-            # الحصول على معلومات الخدمة
-            cursor.execute("SELECT duration, cost, commission_rate FROM services WHERE id=?", (service_id,))
-            service_data = cursor.fetchone()
-            duration = service_data[0]
-            cost = service_data[1]
-
-            # حساب العمولة
-            cursor.execute("SELECT commission_rate FROM barbers WHERE id=?", (barber_id,))
-            barber_commission_rate = cursor.fetchone()[0]
-            commission_rate = service_data[2] if service_data[2] else barber_commission_rate
-            commission = float(price) * (commission_rate / 100)
-
-            # إضافة الموعد
-            cursor.execute("""
-                INSERT INTO appointments (
-                    appointment_number, customer_id, customer_name, phone,
-                    barber_id, barber_name, service_id, service_name,
-                    appointment_date, appointment_time, duration,
-                    status, price, cost, commission, payment_method, notes
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?, ?)
-            """, (app_number, customer_id, customer_name, phone,
-                  barber_id, barber_name, service_id, service_name,
-                  app_date, app_time, duration, price, cost, commission,
-                  payment_method, notes))
-
-            conn.commit()
-            conn.close()
-
-            messagebox.showinfo("نجح", f"✅ تم حجز الموعد بنجاح!\nرقم الموعد: {app_number}")
-
-            self.clear_form()
-            self.load_appointments()
-            self.update_dashboard()
-
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل حفظ الموعد:\n{e}")
+        self.clear_form()
+        self.load_appointments()
+        self.update_dashboard()
 
     def quick_session(self):
         """جلسة سريعة (بدون موعد مسبق)"""
         # نفس التحقق من البيانات
         try:
-            customer_name = self.form_entries['customer_name'].get().strip()
-            phone = self.form_entries['phone'].get().strip()
-            barber = self.form_entries['barber'].get()
-            service = self.form_entries['service'].get()
-            price = self.form_entries['price'].get().strip()
-            payment_method = self.form_entries['payment'].get()
-
-            if not all([customer_name, phone, barber, service, price]):
+            fields = [self.form_entries[name].get().strip() for name in
+                      ('customer_name', 'phone', 'barber', 'service', 'price')]
+            if not all(fields):
                 messagebox.showwarning("تحذير", "الرجاء ملء جميع الحقول المطلوبة!")
                 return
 
-            # استخراج المعرفات
-            barber_id = int(barber.split('#')[-1].strip(')'))
-            barber_name = barber.split('(#')[0].strip()
-
-            service_id = int(service.split('#')[-1].strip(')'))
-            service_name = service.split(' - ')[0].strip()
-
-            # توليد رقم الجلسة
-            today = datetime.now().strftime('%Y%m%d')
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM sessions WHERE session_number LIKE ?", (f'SES-{today}%',))
-            count = cursor.fetchone()[0] + 1
-            session_number = f'SES-{today}-{count:03d}'
-
-            # البحث عن العميل أو إضافته
-            cursor.execute("SELECT id, loyalty_points FROM customers WHERE phone=?", (phone,))
-            customer = cursor.fetchone()
-
-            if customer:
-                customer_id = customer[0]
-                loyalty_points = customer[1]
-            else:
-                cursor.execute("INSERT INTO customers (name, phone) VALUES (?, ?)", (customer_name, phone))
-                customer_id = cursor.lastrowid
-                loyalty_points = 0
-
-            # حساب النقاط المكتسبة (كل 10 ريال = 1 نقطة)
-            points_earned = int(float(price) * 0.1)
-
-            # الحصول على تكلفة الخدمة
-            cursor.execute("SELECT cost, commission_rate FROM services WHERE id=?", (service_id,))
-            service_data = cursor.fetchone()
-            cost = service_data[0]
-
-            # حساب العمولة
-            cursor.execute("SELECT commission_rate FROM barbers WHERE id=?", (barber_id,))
-            barber_commission_rate = cursor.fetchone()[0]
-            commission_rate = service_data[1] if service_data[1] else barber_commission_rate
-            commission = float(price) * (commission_rate / 100)
-
-            # إضافة الجلسة
-            services_json = json.dumps([{
-                'id': service_id,
-                'name': service_name,
-                'price': float(price)
-            }])
-
-            cursor.execute("""
-                INSERT INTO sessions (
-                    session_number, customer_id, customer_name, barber_id, barber_name,
-                    services, total_price, total_cost, total_commission,
-                    discount, final_price, payment_method, loyalty_points_earned,
-                    check_in_time, check_out_time, status
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, 'completed')
-            """, (session_number, customer_id, customer_name, barber_id, barber_name,
-                  services_json, float(price), cost, commission, float(price),
-                  payment_method, points_earned, datetime.now(), datetime.now()))
-
-            # تحديث بيانات العميل
-            cursor.execute("""
-                UPDATE customers
-                SET loyalty_points = loyalty_points + ?,
-                    total_visits = total_visits + 1,
-                    total_spent = total_spent + ?,
-                    last_visit = ?
-                WHERE id = ?
-            """, (points_earned, float(price), datetime.now(), customer_id))
-
-            # تحديث بيانات الحلاق
-            cursor.execute("""
-                UPDATE barbers
-                SET total_services = total_services + 1,
-                    total_revenue = total_revenue + ?
-                WHERE id = ?
-            """, (float(price), barber_id))
-
-            conn.commit()
-            conn.close()
-
-            messagebox.showinfo("نجح",
-                f"✅ تمت الجلسة بنجاح!\n"
-                f"رقم الجلسة: {session_number}\n"
-                f"النقاط المكتسبة: {points_earned} نقطة\n"
-                f"إجمالي النقاط: {loyalty_points + points_earned}")
-
-            self.clear_form()
-            self.update_dashboard()
+            request = CheckoutRequest(**self._parse_booking_form())
 
         except Exception as e:
             messagebox.showerror("خطأ", f"فشلت الجلسة:\n{e}")
+            return
 
-    def load_appointments(self):
-        """تحميل المواعيد"""
-        try:
-            # مسح الجدول
-            for item in self.appointments_tree.get_children():
-                self.appointments_tree.delete(item)
-
-            # الحصول على نص البحث
-            search_text = self.search_entry.get() if hasattr(self, 'search_entry') else ''
-
-            # الاستعلام
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        self.worker.submit(
+            lambda job: self.checkout.checkout(request),
+            on_done=self._on_session_saved,
+            on_error=lambda e: messagebox.showerror("خطأ", f"فشلت الجلسة:\n{e}"),
+            write=True, description='quick_session')
+
+    def _on_session_saved(self, result):
+        """بعد تسجيل الجلسة (في خيط الواجهة)"""
+        messagebox.showinfo("نجح",
+            f"✅ تمت الجلسة بنجاح!\n"
+            f"رقم الجلسة: {result.session_number}\n"
+            f"النقاط المكتسبة: {result.points_earned} نقطة\n"
+            f"إجمالي النقاط: {result.total_points}")
+
+        self.clear_form()
+        self.update_dashboard()
 
-            today = datetime.now().strftime('%Y-%m-%d')
+    def schedule_load_appointments(self, event=None):
+        """تأجيل تحديث الجدول حتى يتوقف المستخدم عن الكتابة في البحث"""
+        if self._load_job:
+            self.root.after_cancel(self._load_job)
+        self._load_job = self.root.after(SEARCH_DEBOUNCE_MS, self.load_appointments)
+
+    def watch_external_changes(self):
+        """فحص دوري في الخلفية: آخر رقم في change_log يتغير عند أي حفظ من أي اتصال
+
+        (PRAGMA data_version يخص الاتصال الذي يقرؤه، واتصالات خيوط القراءة تتبدل)
+        الجدولة التالية هنا وليست في نتيجة الفحص، حتى لا يتوقف الفحص إن لم
+        تصل نتيجته؛ والفحص عمل خلفي لا يظهر في شريط الحالة ولا يلغيه "إيقاف".
+        """
+        self.root.after(CHANGE_POLL_MS, self.watch_external_changes)
+        if self._watch_job is not None:
+            # الفحص السابق ما زال ينتظر دوره
+            return
 
-            query = """
-                SELECT id, appointment_time, customer_name, phone, barber_name,
-                       service_name, price, status
-                FROM appointments
-                WHERE appointment_date = ?
-            """
-            params = [today]
-
-            if search_text:
-                query += """ AND (customer_name LIKE ? OR phone LIKE ?
-                            OR appointment_number LIKE ?)"""
-                params.extend([f'%{search_text}%', f'%{search_text}%', f'%{search_text}%'])
-
-            query += " ORDER BY appointment_time"
-
-            cursor.execute(query, params)
-            appointments = cursor.fetchall()
-            conn.close()
-
-            # عرض المواعيد
-            status_map = {
-                'pending': 'معلق',
-                'confirmed': 'مؤكد',
-                'completed': 'مكتمل',
-                'cancelled': 'ملغي',
-                'no_show': 'غائب'
-            }
+        def check(job):
+            return changelog.sequence_position(self.db.connection()), self.db.commits
+
+        self._watch_job = self.worker.submit(
+            check,
+            on_done=lambda result: self._external_changes_checked(*result),
+            on_error=self._external_changes_failed,
+            background=True,
+            description='watch_external_changes')
+
+    def _external_changes_failed(self, error):
+        self._watch_job = None
+        print(f"خطأ في فحص التغييرات: {error}")
+
+    def _external_changes_checked(self, version, commits):
+        """بعد قراءة رقم التغيير (في خيط الواجهة)؛ commits: عدد حفظ هذا البرنامج بعد القراءة"""
+        self._watch_job = None
+        if self._seen_version is not None and version != self._seen_version:
+            # يشمل حفظ خيط الكتابة في هذا البرنامج؛ التنبيه فقط إن لم نحفظ نحن شيئاً
+            self.availability.invalidate()
+            self.load_appointments()
+            self.update_dashboard()
+            if commits == self._seen_commits:
+                self.sync_label.config(text=f"🔄 {datetime.now():%H:%M:%S} "
+                                            f"تم تحديث المواعيد بتغييرات من جهاز آخر")
+        self._seen_version = version
+        self._seen_commits = commits
+
+    def refresh_view(self):
+        """تحديث كامل (F5): إعادة قراءة الأوقات المشغولة (ربما تغيرت من جهاز آخر) والمواعيد"""
+        self.availability.invalidate()
+        self.refresh_time_slots()
+        self.load_appointments()
 
-            for i, app in enumerate(appointments, 1):
-                values = (
-                    i,
-                    app[1],  # الوقت
-                    app[2],  # العميل
-                    app[3],  # الجوال
-                    app[4],  # الحلاق
-                    app[5],  # الخدمة
-                    f"{app[6]} ر.س",  # السعر
-                    status_map.get(app[7], app[7])  # الحالة
-                )
-
-                item_id = self.appointments_tree.insert('', 'end', values=values, iid=str(app[0]))
-                self.appointments_tree.item(item_id, tags=(app[7],))
+    def load_appointments(self):
+        """تحميل المواعيد (الاستعلام في الخلفية ثم تطبيق الفروقات فقط على الجدول)"""
+        self._load_job = None
+
+        # الحصول على نص البحث
+        search_text = self.search_entry.get() if hasattr(self, 'search_entry') else ''
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        # نتيجة تحميل سابق لم يكتمل لم تعد مطلوبة
+        if self._appointments_job:
+            self._appointments_job.cancel()
+
+        self._appointments_job = self.worker.submit(
+            lambda job: list_day_appointments(self.db, today, search_text),
+            on_done=self._show_appointments,
+            on_error=lambda e: print(f"خطأ في تحميل المواعيد: {e}"),
+            description='load_appointments')
+
+    def _show_appointments(self, appointments):
+        """عرض المواعيد (رقم الموعد الكامل بدلاً من رقم الصف حتى لا تتغير الصفوف الأخرى)
+
+        آخر جزء من الرقم يتكرر: يُعطى حسب يوم الحجز، وأرقام الفروع (B1/APP-…) مستقلة.
+        """
+        self._appointments_job = None
+        rows = []
+        for app in appointments:
+            values = (
+                app[8],  # رقم الموعد
+                app[1],  # الوقت
+                app[2],  # العميل
+                app[3],  # الجوال
+                app[4],  # الحلاق
+                app[5],  # الخدمة
+                f"{app[6]} ر.س",  # السعر
+                STATUS_NAMES.get(app[7], app[7])  # الحالة
+            )
+            rows.append((str(app[0]), values, (app[7],)))
 
-        except Exception as e:
-            print(f"خطأ في تحميل المواعيد: {e}")
+        self.appointments_sync.apply(rows)
 
     def show_context_menu(self, event):
-        """عرض القائمة السياقية"""
+        """عرض القائمة السياقية (يبقى التحديد المتعدد إن كان الصف ضمنه)"""
         try:
-            self.appointments_tree.selection_set(self.appointments_tree.identify_row(event.y))
+            row = self.appointments_tree.identify_row(event.y)
+            if row and row not in self.appointments_tree.selection():
+                self.appointments_tree.selection_set(row)
             self.context_menu.post(event.x_root, event.y_root)
         except:
             pass
@@ -1140,180 +1093,123 @@ class BarbershopManagementSystem:
         # TODO: نافذة تعديل الموعد
         messagebox.showinfo("قريباً", "ميزة التعديل قيد التطوير")
 
-    def confirm_appointment(self):
-        """تأكيد موعد"""
-        selection = self.appointments_tree.selection()
-        if not selection:
-            messagebox.showwarning("تحذير", "الرجاء اختيار موعد أولاً!")
-            return
-
-        try:
-            app_id = int(selection[0])
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("UPDATE appointments SET status='confirmed' WHERE id=?", (app_id,))
-            conn.commit()
-            conn.close()
+    def _selected_appointments(self):
+        """(المعرف، الحالة كما تظهر في الجدول) لكل موعد محدد"""
+        items = []
+        for item in self.appointments_tree.selection():
+            tags = self.appointments_tree.item(item, 'tags')
+            items.append((int(item), tags[0] if tags else None))
+        return items
+
+    def _change_status(self, action, done_message, error_message, selected=True,
+                       refresh_dashboard=True):
+        """تغيير حالة المواعيد المحددة دفعة واحدة في خيط الكتابة ثم تحديث الواجهة مرة واحدة
+
+        action: دالة دفعة من BookingService (confirm_many، ...)؛ الحالة المعروضة
+        تُمرَّر معها فيُتخطى ما غيّره جهاز آخر بعد العرض. selected=False: الدالة
+        تختار مواعيدها بنفسها (مثل no_show_past_due).
+        """
+        args = ()
+        if selected:
+            try:
+                args = (self._selected_appointments(),)
+            except Exception as e:
+                messagebox.showerror("خطأ", f"{error_message}:\n{e}")
+                return
 
-            messagebox.showinfo("نجح", "✅ تم تأكيد الموعد")
+        def on_done(result):
+            lines = []
+            if result.changed:
+                lines.append(f"{done_message}: {len(result.changed)} موعد")
+            if result.skipped:
+                states = {}
+                for current in result.skipped.values():
+                    name = STATUS_NAMES.get(current, current) if current else 'محذوف'
+                    states[name] = states.get(name, 0) + 1
+                lines.append(f"⚠️ تم تخطي {len(result.skipped)} موعد تغيّرت حالته أو لا تسمح:\n" +
+                             '\n'.join(f"   {name}: {count}" for name, count in states.items()))
+            if result.points_earned:
+                lines.append(f"⭐ نقاط الولاء المضافة: {result.points_earned}")
+            if result.skipped:
+                messagebox.showwarning("تحذير", '\n\n'.join(lines))
+            elif lines:
+                messagebox.showinfo("نجح", '\n'.join(lines))
+            else:
+                messagebox.showinfo("تنبيه", "لا توجد مواعيد مطابقة")
             self.load_appointments()
+            if refresh_dashboard:
+                self.update_dashboard()
 
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل التأكيد:\n{e}")
-
-    def complete_appointment(self):
-        """إنهاء موعد"""
-        selection = self.appointments_tree.selection()
-        if not selection:
-            messagebox.showwarning("تحذير", "الرجاء اختيار موعد أولاً!")
-            return
-
-        try:
-            app_id = int(selection[0])
-
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            # الحصول على بيانات الموعد
-            cursor.execute("""
-                SELECT customer_id, price, payment_status
-                FROM appointments WHERE id=?
-            """, (app_id,))
-            app_data = cursor.fetchone()
-
-            if not app_data:
-                raise Exception("الموعد غير موجود")
-
-            customer_id, price, payment_status = app_data
-
-            # تحديث حالة الموعد
-            cursor.execute("""
-                UPDATE appointments
-                SET status='completed', completed_at=?, payment_status='paid'
-                WHERE id=?
-            """, (datetime.now(), app_id))
-
-            # تحديث بيانات العميل
-            if customer_id:
-                points_earned = int(float(price) * 0.1)
-                cursor.execute("""
-                    UPDATE customers
-                    SET total_visits = total_visits + 1,
-                        total_spent = total_spent + ?,
-                        loyalty_points = loyalty_points + ?,
-                        last_visit = ?
-                    WHERE id = ?
-                """, (float(price), points_earned, datetime.now(), customer_id))
-
-            conn.commit()
-            conn.close()
-
-            messagebox.showinfo("نجح", "✅ تم إنهاء الموعد بنجاح!")
+        def on_error(e):
+            messagebox.showerror("خطأ", f"{error_message}:\n{e}")
             self.load_appointments()
             self.update_dashboard()
 
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل إنهاء الموعد:\n{e}")
+        self.worker.submit(
+            lambda job: action(*args),
+            on_done=on_done,
+            on_error=on_error,
+            write=True, description=action.__name__)
 
-    def cancel_appointment(self):
-        """إلغاء موعد"""
-        selection = self.appointments_tree.selection()
-        if not selection:
+    def _require_selection(self):
+        """عدد المواعيد المحددة، مع تنبيه إن لم يُحدد شيء"""
+        count = len(self.appointments_tree.selection())
+        if not count:
             messagebox.showwarning("تحذير", "الرجاء اختيار موعد أولاً!")
-            return
-
-        if messagebox.askyesno("تأكيد", "هل أنت متأكد من إلغاء الموعد؟"):
-            try:
-                app_id = int(selection[0])
+        return count
 
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE appointments SET status='cancelled' WHERE id=?", (app_id,))
-                conn.commit()
-                conn.close()
+    def confirm_appointment(self):
+        """تأكيد المواعيد المحددة"""
+        if self._require_selection():
+            self._change_status(self.booking.confirm_many, "✅ تم التأكيد", "فشل التأكيد",
+                                refresh_dashboard=False)
 
-                messagebox.showinfo("نجح", "✅ تم إلغاء الموعد")
-                self.load_appointments()
-                self.update_dashboard()
+    def complete_appointment(self):
+        """إنهاء المواعيد المحددة"""
+        if self._require_selection():
+            self._change_status(self.booking.complete_many, "✅ تم الإنهاء",
+                                "فشل إنهاء الموعد")
+
+    def no_show_appointment(self):
+        """تسجيل المواعيد المحددة غائبة"""
+        if self._require_selection():
+            self._change_status(self.booking.no_show_many, "🚫 تم التسجيل كغائب",
+                                "فشل التسجيل")
+
+    def no_show_past_due(self):
+        """كل مواعيد اليوم المعلقة التي انتهى وقتها -> غائب"""
+        if messagebox.askyesno("تأكيد", "تسجيل كل مواعيد اليوم المعلقة التي انتهى وقتها كغائب؟"):
+            self._change_status(self.booking.no_show_past_due, "🚫 تم التسجيل كغائب",
+                                "فشل التسجيل", selected=False)
 
-            except Exception as e:
-                messagebox.showerror("خطأ", f"فشل الإلغاء:\n{e}")
+    def cancel_appointment(self):
+        """إلغاء المواعيد المحددة"""
+        count = self._require_selection()
+        if count and messagebox.askyesno("تأكيد", f"هل أنت متأكد من إلغاء {count} موعد؟"):
+            self._change_status(self.booking.cancel_many, "✅ تم الإلغاء", "فشل الإلغاء")
 
     def delete_appointment(self):
-        """حذف موعد"""
-        selection = self.appointments_tree.selection()
-        if not selection:
-            messagebox.showwarning("تحذير", "الرجاء اختيار موعد أولاً!")
-            return
-
-        if messagebox.askyesno("تأكيد", "⚠️ هل أنت متأكد من حذف الموعد نهائياً؟"):
-            try:
-                app_id = int(selection[0])
-
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM appointments WHERE id=?", (app_id,))
-                conn.commit()
-                conn.close()
-
-                messagebox.showinfo("نجح", "✅ تم حذف الموعد")
-                self.load_appointments()
-                self.update_dashboard()
-
-            except Exception as e:
-                messagebox.showerror("خطأ", f"فشل الحذف:\n{e}")
+        """حذف المواعيد المحددة"""
+        count = self._require_selection()
+        if count and messagebox.askyesno("تأكيد",
+                                         f"⚠️ هل أنت متأكد من حذف {count} موعد نهائياً؟"):
+            self._change_status(self.booking.delete_many, "✅ تم الحذف", "فشل الحذف")
 
     def update_dashboard(self):
         """تحديث إحصائيات لوحة التحكم"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            today = datetime.now().strftime('%Y-%m-%d')
-
-            # عدد العملاء اليوم
-            cursor.execute("""
-                SELECT COUNT(DISTINCT customer_id)
-                FROM appointments
-                WHERE appointment_date = ? AND status != 'cancelled'
-            """, (today,))
-            customers_count = cursor.fetchone()[0]
-
-            # الإيرادات اليومية
-            cursor.execute("""
-                SELECT COALESCE(SUM(price), 0)
-                FROM appointments
-                WHERE appointment_date = ? AND status = 'completed'
-            """, (today,))
-            revenue = cursor.fetchone()[0]
-
-            # عدد المواعيد
-            cursor.execute("""
-                SELECT COUNT(*)
-                FROM appointments
-                WHERE appointment_date = ?
-            """, (today,))
-            appointments_count = cursor.fetchone()[0]
-
-            # صافي الربح (الإيرادات - التكاليف - العمولات)
-            cursor.execute("""
-                SELECT COALESCE(SUM(price - cost - commission), 0)
-                FROM appointments
-                WHERE appointment_date = ? AND status = 'completed'
-            """, (today,))
-            profit = cursor.fetchone()[0]
-
-            conn.close()
-
-            # تحديث الواجهة
-            self.stats_labels['customers_count'].config(text=str(customers_count))
-            self.stats_labels['revenue_today'].config(text=f"{revenue:,.0f} ر.س")
-            self.stats_labels['appointments_count'].config(text=str(appointments_count))
-            self.stats_labels['profit_today'].config(text=f"{profit:,.0f} ر.س")
-
-        except Exception as e:
-            print(f"خطأ في تحديث الإحصائيات: {e}")
+        # صف واحد من daily_stats (يشمل المواعيد المكتملة والجلسات الفورية)
+        self.worker.submit(
+            lambda job: self.stats.day(),
+            on_done=self._show_dashboard,
+            on_error=lambda e: print(f"خطأ في تحديث الإحصائيات: {e}"),
+            description='update_dashboard')
+
+    def _show_dashboard(self, stats):
+        """تحديث أرقام لوحة التحكم (في خيط الواجهة)"""
+        self.stats_labels['customers_count'].config(text=str(stats.customers_count))
+        self.stats_labels['revenue_today'].config(text=f"{stats.revenue:,.0f} ر.س")
+        self.stats_labels['appointments_count'].config(text=str(stats.appointments_count))
+        self.stats_labels['profit_today'].config(text=f"{stats.profit:,.0f} ر.س")
 
     # ==================== نوافذ الإدارة ====================
 
@@ -1323,101 +1219,517 @@ class BarbershopManagementSystem:
 
     def open_barbers_window(self):
         """نافذة إدارة الحلاقين"""
+        # بعد أي تعديل على الحلاقين: self.reference_data_changed('barbers')
         messagebox.showinfo("قريباً", "نافذة إدارة الحلاقين قيد التطوير")
 
     def open_services_window(self):
         """نافذة إدارة الخدمات"""
+        # بعد أي تعديل على الخدمات: self.reference_data_changed('services')
         messagebox.showinfo("قريباً", "نافذة إدارة الخدمات قيد التطوير")
 
     def open_reports_window(self):
-        """نافذة التقارير"""
-        messagebox.showinfo("قريباً", "نافذة التقارير قيد التطوير")
+        """نافذة التقارير: الإيرادات والأرباح والعمولات وشعبية الخدمات لفترة"""
+        window = tk.Toplevel(self.root)
+        window.title("📊 التقارير")
+        window.geometry("900x550")
+        window.configure(bg=COLORS['background'])
+
+        # الفترة (من أول الشهر حتى اليوم افتراضياً)
+        period_frame = tk.Frame(window, bg=COLORS['background'])
+        period_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        today = date.today()
+        entries = {}
+        for label, value in (("من:", today.replace(day=1)), ("إلى:", today)):
+            tk.Label(period_frame, text=label, bg=COLORS['background']).pack(side=tk.LEFT, padx=5)
+            entry = tk.Entry(period_frame, font=(FONTS['family'], FONTS['body']), width=12)
+            entry.insert(0, value.isoformat())
+            entry.pack(side=tk.LEFT, padx=5)
+            entries[label] = entry
+
+        summary_label = tk.Label(window, bg=COLORS['background'], anchor='w',
+                                 font=(FONTS['family'], FONTS['body'], 'bold'))
+        summary_label.pack(fill=tk.X, padx=10)
+
+        # تبويب لكل تقرير
+        notebook = ttk.Notebook(window)
+        notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        totals = ('الحجوزات', 'المكتمل', 'الملغي', 'الإيرادات', 'العمولة', 'الربح')
+        tabs = {
+            'days': ("📅 الأيام", ('اليوم',) + totals),
+            'barbers': ("👨‍💼 الحلاقون", ('الحلاق',) + totals),
+            'services': ("✂️ الخدمات", ('الخدمة',) + totals),
+            'payments': ("💳 طرق الدفع", ('طريقة الدفع', 'العدد', 'الإيرادات')),
+            # يُملأ عند الطلب: تحليل كل صفوف الفترة وليس التجميعات
+            'productivity': ("🔬 الإنتاجية", ('الحلاق', 'أيام العمل', 'خدمات/يوم', 'إيراد/يوم',
+                                              'إيراد/ساعة', 'الإلغاء', 'الغياب')),
+        }
+        trees = {}
+        for key, (title, columns) in tabs.items():
+            frame = tk.Frame(notebook, bg=COLORS['background'])
+            notebook.add(frame, text=title)
+            scrollbar = ttk.Scrollbar(frame)
+            scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+            tree = ttk.Treeview(frame, columns=columns, show='headings',
+                                yscrollcommand=scrollbar.set)
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=110, anchor='center')
+            tree.pack(fill=tk.BOTH, expand=True)
+            scrollbar.config(command=tree.yview)
+            trees[key] = tree
+
+        def report_values(row):
+            return (row.name, row.bookings, row.completed, row.cancelled,
+                    f"{row.revenue:,.0f}", f"{row.commission:,.0f}", f"{row.profit:,.0f}")
+
+        def load(job, start, end):
+            return {
+                'summary': self.reports.summary(start, end),
+                'days': [report_values(r) for r in self.reports.by_day(start, end)],
+                'barbers': [report_values(r) for r in self.reports.by_barber(start, end)],
+                'services': [report_values(r) for r in self.reports.by_service(start, end)],
+                'payments': [(r.payment_method, r.count, f"{r.revenue:,.0f}")
+                             for r in self.reports.by_payment(start, end)],
+            }
+
+        def fill(result):
+            for key, rows in result.items():
+                trees[key].delete(*trees[key].get_children())
+                for values in rows:
+                    trees[key].insert('', 'end', values=values)
+
+        def show(result):
+            if not window.winfo_exists():
+                return
+            summary = result.pop('summary')
+            summary_label.config(
+                text=f"الإيرادات: {summary.revenue:,.0f} ر.س   |   "
+                     f"العمولات: {summary.commission:,.0f} ر.س   |   "
+                     f"الربح: {summary.profit:,.0f} ر.س   |   "
+                     f"المكتمل: {summary.completed}   |   الملغي: {summary.cancelled}")
+            fill(result)
+
+        def period():
+            start, end = entries["من:"].get().strip(), entries["إلى:"].get().strip()
+            try:
+                if date.fromisoformat(start) > date.fromisoformat(end):
+                    raise ValueError("بداية الفترة بعد نهايتها")
+            except ValueError as e:
+                messagebox.showerror("خطأ", f"فترة غير صحيحة (YYYY-MM-DD):\n{e}", parent=window)
+                return None
+            return start, end
+
+        def refresh(event=None):
+            dates = period()
+            if dates:
+                self.worker.submit(
+                    load, *dates,
+                    on_done=show,
+                    on_error=lambda e: messagebox.showerror("خطأ", f"فشل تحميل التقارير:\n{e}",
+                                                            parent=window),
+                    description='reports')
+
+        def analyze(job, start, end):
+            # pandas يُحمَّل عند أول تحليل فقط
+            from analytics import HistoryAnalytics
+            productivity = HistoryAnalytics(self.db, self.reference).load(
+                start, end, job).barber_productivity().fillna(0)
+            return {'productivity': [
+                (name, row.working_days, f"{row.services_per_day:.1f}",
+                 f"{row.revenue_per_day:,.0f}", f"{row.revenue_per_hour:,.0f}",
+                 f"{row.cancellation_rate:.1%}", f"{row.no_show_rate:.1%}")
+                for name, row in productivity.iterrows()]}
+
+        def show_productivity(result):
+            if window.winfo_exists():
+                fill(result)
+                notebook.select(len(trees) - 1)
+
+        def run_analysis():
+            dates = period()
+            if dates:
+                self.worker.submit(
+                    analyze, *dates,
+                    on_done=show_productivity,
+                    on_error=lambda e: messagebox.showerror("خطأ", f"فشل التحليل:\n{e}",
+                                                            parent=window),
+                    description='analytics')
+
+        tk.Button(period_frame, text="🔄 عرض", command=refresh,
+                  bg=COLORS['secondary'], fg=COLORS['text_light'],
+                  font=(FONTS['family'], FONTS['button'])).pack(side=tk.LEFT, padx=10)
+        tk.Button(period_frame, text="🔬 تحليل الإنتاجية", command=run_analysis,
+                  bg=COLORS['secondary'], fg=COLORS['text_light'],
+                  font=(FONTS['family'], FONTS['button'])).pack(side=tk.LEFT, padx=5)
+        for entry in entries.values():
+            entry.bind('<Return>', refresh)
+
+        refresh()
+
+    def open_browse_window(self):
+        """تصفح المواعيد لأي فترة وحلاق وحالة (صفحات تُحمَّل مع التمرير)"""
+        window = tk.Toplevel(self.root)
+        window.title("📚 تصفح المواعيد")
+        window.geometry("1000x600")
+        window.configure(bg=COLORS['background'])
+
+        # الفلاتر (آخر سنة والشهر القادم افتراضياً)
+        filter_frame = tk.Frame(window, bg=COLORS['background'])
+        filter_frame.pack(fill=tk.X, padx=10, pady=10)
+
+        today = date.today()
+        entries = {}
+        for label, value in (("من:", today - timedelta(days=365)),
+                             ("إلى:", today + timedelta(days=30))):
+            tk.Label(filter_frame, text=label, bg=COLORS['background']).pack(side=tk.LEFT, padx=5)
+            entry = tk.Entry(filter_frame, font=(FONTS['family'], FONTS['body']), width=12)
+            entry.insert(0, value.isoformat())
+            entry.pack(side=tk.LEFT, padx=5)
+            entries[label] = entry
+
+        barbers = {'الكل': None}
+        barbers.update({b.name: b.id for b in self.reference.all_barbers()})
+        statuses = {'الكل': None}
+        statuses.update({name: status for status, name in STATUS_NAMES.items()})
+
+        combos = {}
+        for label, options in (("الحلاق:", barbers), ("الحالة:", statuses)):
+            tk.Label(filter_frame, text=label, bg=COLORS['background']).pack(side=tk.LEFT, padx=5)
+            combo = ttk.Combobox(filter_frame, values=list(options), state='readonly', width=14)
+            combo.current(0)
+            combo.pack(side=tk.LEFT, padx=5)
+            combos[label] = combo
+
+        info_label = tk.Label(window, bg=COLORS['background'], anchor='w',
+                              fg=COLORS['text_muted'], font=(FONTS['family'], FONTS['small']))
+        info_label.pack(fill=tk.X, padx=10)
+
+        # الجدول: يحتوي النافذة المنزلقة فقط وليس كل مواعيد الفترة
+        table_frame = tk.Frame(window, bg=COLORS['background'])
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        y_scrollbar = ttk.Scrollbar(table_frame)
+        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        columns = ('التاريخ', 'الوقت', 'العميل', 'الجوال', 'الحلاق', 'الخدمة', 'السعر',
+                   'الحالة', 'رقم الموعد')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        for col, width in zip(columns, (90, 60, 130, 100, 110, 130, 70, 70, 150)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor='center')
+        tree.pack(fill=tk.BOTH, expand=True)
+        y_scrollbar.config(command=tree.yview)
+        for status, color in (('pending', '#fff3cd'), ('confirmed', '#d1ecf1'),
+                              ('completed', '#d4edda'), ('cancelled', '#f8d7da')):
+            tree.tag_configure(status, background=color)
+
+        # job: تحميل الصفحة الجاري في الخلفية (لا يبدأ تحميل تمرير آخر قبل انتهائه)
+        state = {'pager': None, 'busy': False, 'job': None}
+
+        def insert_rows(rows, index):
+            for row in rows:
+                values = (row[1], row[2], row[3], row[4], row[5], row[6],
+                          f"{row[7]} ر.س", STATUS_NAMES.get(row[8], row[8]), row[9])
+                tree.insert('', index, iid=str(row[0]), values=values, tags=(row[8],))
+                if index != 'end':
+                    index += 1
+
+        def show_range():
+            rows = state['pager'].rows
+            if rows:
+                info_label.config(text=f"{state['total']:,} موعد في الفترة — "
+                                       f"المعروض من {rows[0][1]} {rows[0][2]} "
+                                       f"إلى {rows[-1][1]} {rows[-1][2]}")
+            else:
+                info_label.config(text="لا توجد مواعيد في الفترة")
+
+        def load(fetch, apply, on_error, description):
+            """fetch(job) في خيط قراءة ثم apply(result) في خيط الواجهة
+
+            التحميل الجديد يلغي السابق؛ الانتقال والعرض ينشئان AppointmentPager
+            جديداً فلا يمس التحميل الملغى النافذة المعروضة.
+            """
+            if state['job'] is not None:
+                state['job'].cancel()
+
+            def done(result):
+                state['job'] = None
+                if window.winfo_exists():
+                    apply(result)
+
+            def failed(error):
+                state['job'] = None
+                if window.winfo_exists():
+                    on_error(error)
+
+            state['job'] = self.worker.submit(fetch, on_done=done, on_error=failed,
+                                              description=description)
+
+        def load_failed(error):
+            messagebox.showerror("خطأ", f"فشل تحميل المواعيد:\n{error}", parent=window)
+
+        def extend(forward):
+            """إضافة صفحة في اتجاه التمرير وحذف الزائد من الجهة الأخرى مع تثبيت الموضع"""
+            pager = state['pager']
+
+            def fetch(job):
+                return pager.next_page() if forward else pager.previous_page()
+
+            def apply(result):
+                page, dropped = result
+                state['busy'] = True
+                try:
+                    count = len(tree.get_children())
+                    top = round(tree.yview()[0] * count)
+                    if forward:
+                        insert_rows(page, 'end')
+                        if dropped:
+                            tree.delete(*tree.get_children()[:dropped])
+                            top -= dropped
+                    else:
+                        if dropped:
+                            tree.delete(*tree.get_children()[-dropped:])
+                        insert_rows(page, 0)
+                        top += len(page)
+                    if page or dropped:
+                        tree.yview_moveto(max(0, top) / max(1, len(pager.rows)))
+                        show_range()
+                finally:
+                    state['busy'] = False
+
+            load(fetch, apply, lambda e: print(f"خطأ في تحميل صفحة المواعيد: {e}"),
+                 'browse_page')
+
+        def on_scroll(first, last):
+            y_scrollbar.set(first, last)
+            if state['busy'] or state['job'] is not None or state['pager'] is None:
+                return
+            if float(last) >= 0.9 and not state['pager'].at_end:
+                extend(forward=True)
+            elif float(first) <= 0.1 and not state['pager'].at_start:
+                extend(forward=False)
+
+        tree.configure(yscrollcommand=on_scroll)
+
+        def show_page(pager, rows):
+            state['pager'] = pager
+            state['busy'] = True
+            try:
+                tree.delete(*tree.get_children())
+                insert_rows(rows, 'end')
+                tree.yview_moveto(0)
+            finally:
+                state['busy'] = False
+            show_range()
+
+        def browse(event=None):
+            start, end = entries["من:"].get().strip(), entries["إلى:"].get().strip()
+            try:
+                if date.fromisoformat(start) > date.fromisoformat(end):
+                    raise ValueError("بداية الفترة بعد نهايتها")
+            except ValueError as e:
+                messagebox.showerror("خطأ", f"فترة غير صحيحة (YYYY-MM-DD):\n{e}", parent=window)
+                return
+            browse_filter = BrowseFilter(start, end, barbers[combos["الحلاق:"].get()],
+                                         statuses[combos["الحالة:"].get()])
+            pager = AppointmentPager(self.db, browse_filter)
+
+            def fetch(job):
+                return count_appointments(self.db, browse_filter), pager.first_page()
+
+            def apply(result):
+                state['total'] = result[0]
+                show_page(pager, result[1])
+
+            load(fetch, apply, load_failed, 'browse')
+
+        def go_to(where):
+            if state['pager'] is None:
+                return
+            if where not in ('start', 'end'):
+                try:
+                    date.fromisoformat(where)
+                except ValueError:
+                    messagebox.showerror("خطأ", "تاريخ غير صحيح (YYYY-MM-DD)", parent=window)
+                    return
+            pager = AppointmentPager(self.db, state['pager'].browse)
+
+            def fetch(job):
+                if where == 'start':
+                    return pager.first_page()
+                if where == 'end':
+                    return pager.last_page()
+                return pager.jump(where)
+
+            def apply(rows):
+                show_page(pager, rows)
+                if where == 'end':
+                    tree.yview_moveto(1)
+
+            load(fetch, apply, load_failed, 'browse_jump')
+
+        tk.Button(filter_frame, text="🔍 عرض", command=browse,
+                  bg=COLORS['info'], fg='white',
+                  font=(FONTS['family'], FONTS['button'])).pack(side=tk.LEFT, padx=10)
+
+        # الانتقال السريع: البداية والنهاية ويوم معيّن
+        jump_entry = tk.Entry(filter_frame, font=(FONTS['family'], FONTS['body']), width=12)
+        jump_entry.pack(side=tk.RIGHT, padx=5)
+        tk.Button(filter_frame, text="↪ اذهب إلى يوم", command=lambda: go_to(jump_entry.get().strip()),
+                  font=(FONTS['family'], FONTS['small'])).pack(side=tk.RIGHT, padx=5)
+        jump_entry.bind('<Return>', lambda e: go_to(jump_entry.get().strip()))
+        tree.bind('<Home>', lambda e: go_to('start'))
+        tree.bind('<End>', lambda e: go_to('end'))
+        for entry in entries.values():
+            entry.bind('<Return>', browse)
+        for combo in combos.values():
+            combo.bind('<<ComboboxSelected>>', browse)
+
+        browse()
+        tree.focus_set()
 
     def open_settings_window(self):
         """نافذة الإعدادات"""
+        # بعد حفظ الإعدادات: self.reference_data_changed('settings')
         messagebox.showinfo("قريباً", "نافذة الإعدادات قيد التطوير")
 
     # ==================== التصدير والنسخ الاحتياطي ====================
 
     def export_to_excel(self):
-        """تصدير إلى Excel"""
-        try:
+        """تصدير المواعيد إلى Excel (فترة مع فلترة اختيارية بالحلاق أو الحالة)"""
+        export_window = tk.Toplevel(self.root)
+        export_window.title("📊 تصدير إلى Excel")
+        export_window.geometry("420x280")
+        export_window.configure(bg=COLORS['background'])
+
+        form = tk.Frame(export_window, bg=COLORS['background'])
+        form.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        all_label = 'الكل'
+        barbers = {f"{b.name} (#{b.id})": b.id for b in self.reference.active_barbers()}
+        statuses = {name: status for status, name in STATUS_NAMES.items()}
+
+        fields = {}
+        for row, (key, label) in enumerate([('start', "📅 من تاريخ:"), ('end', "📅 إلى تاريخ:"),
+                                            ('barber', "✂️ الحلاق:"), ('status', "📌 الحالة:")]):
+            tk.Label(form, text=label, bg=COLORS['background'],
+                     font=(FONTS['family'], FONTS['body'])).grid(row=row, column=0, sticky='w', pady=5)
+            if key in ('start', 'end'):
+                fields[key] = tk.Entry(form, font=(FONTS['family'], FONTS['body']), width=25)
+                fields[key].insert(0, today)
+            else:
+                options = barbers if key == 'barber' else statuses
+                fields[key] = ttk.Combobox(form, font=(FONTS['family'], FONTS['body']),
+                                           state='readonly', width=23,
+                                           values=[all_label] + list(options))
+                fields[key].current(0)
+            fields[key].grid(row=row, column=1, sticky='ew', pady=5)
+
+        def start_export():
+            start, end = fields['start'].get().strip(), fields['end'].get().strip()
+            try:
+                for value in (start, end):
+                    datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                messagebox.showwarning("تحذير", "صيغة التاريخ: YYYY-MM-DD", parent=export_window)
+                return
+
+            barber_id = barbers.get(fields['barber'].get())
+            status = statuses.get(fields['status'].get())
+
             # اختيار مكان الحفظ
+            suffix = start.replace('-', '') if start == end else \
+                f"{start.replace('-', '')}_{end.replace('-', '')}"
             filename = filedialog.asksaveasfilename(
+                parent=export_window,
                 defaultextension='.xlsx',
                 filetypes=[("Excel files", "*.xlsx"), ("All files", "*.*")],
-                initialfile=f"appointments_{datetime.now().strftime('%Y%m%d')}.xlsx"
+                initialfile=f"appointments_{suffix}.xlsx"
             )
 
             if not filename:
                 return
 
-            # الحصول على البيانات
-            conn = sqlite3.connect(self.db_path)
-
-            # المواعيد
-            df_appointments = pd.read_sql_query("""
-                SELECT
-                    appointment_number as 'رقم الموعد',
-                    customer_name as 'العميل',
-                    phone as 'الجوال',
-                    barber_name as 'الحلاق',
-                    service_name as 'الخدمة',
-                    appointment_date as 'التاريخ',
-                    appointment_time as 'الوقت',
-                    price as 'السعر',
-                    status as 'الحالة',
-                    payment_method as 'طريقة الدفع'
-                FROM appointments
-                WHERE appointment_date = ?
-                ORDER BY appointment_time
-            """, conn, params=[datetime.now().strftime('%Y-%m-%d')])
-
-            conn.close()
-
-            # الكتابة إلى Excel
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                df_appointments.to_excel(writer, sheet_name='المواعيد', index=False)
-
-                # تنسيق
-                worksheet = writer.sheets['المواعيد']
-                for column in worksheet.columns:
-                    max_length = 0
-                    column = [cell for cell in column]
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(cell.value)
-                        except:
-                            pass
-                    adjusted_width = (max_length + 2)
-                    worksheet.column_dimensions[column[0].column_letter].width = adjusted_width
-
-            messagebox.showinfo("نجح", f"✅ تم التصدير بنجاح!\n{filename}")
+            export_window.destroy()
+            # xlsxwriter والتصدير يُحمَّلان عند أول تصدير فقط
+            from exporter import export_appointments
+            self.worker.submit(
+                lambda job: export_appointments(self.db, filename, start, end,
+                                                barber_id=barber_id, status=status, job=job),
+                on_done=lambda result: messagebox.showinfo(
+                    "نجح", f"✅ تم تصدير {result[1]:,} موعد بنجاح!\n{result[0]}"),
+                on_error=lambda e: messagebox.showerror("خطأ", f"فشل التصدير:\n{e}"),
+                description='export_to_excel')
 
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل التصدير:\n{e}")
-
-    def backup_database(self):
-        """نسخ احتياطي لقاعدة البيانات"""
-        try:
-            # إنشاء اسم ملف النسخة
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = f'backups/backup_{timestamp}.db'
-
-            # نسخ قاعدة البيانات
-            shutil.copy2(self.db_path, backup_file)
+        tk.Button(
+            export_window,
+            text="📊 تصدير",
+            command=start_export,
+            bg=COLORS['success'],
+            fg='white',
+            font=(FONTS['family'], FONTS['button']),
+            cursor='hand2'
+        ).pack(pady=10)
 
-            # حذف النسخ القديمة (الاحتفاظ بآخر 30 نسخة)
-            backups = sorted(Path('backups').glob('*.db'))
-            if len(backups) > 30:
-                for old_backup in backups[:-30]:
-                    old_backup.unlink()
+    def import_data(self):
+        """استيراد عملاء أو مواعيد سابقة من ملف CSV أو Excel"""
+        filename = filedialog.askopenfilename(
+            title="استيراد عملاء أو مواعيد",
+            filetypes=[("CSV / Excel", "*.csv *.xlsx"), ("CSV", "*.csv"), ("Excel", "*.xlsx")]
+        )
+        if not filename:
+            return
+        from importer import import_file
+
+        def on_done(result):
+            kind = "موعد" if result.kind == 'appointments' else "عميل"
+            message = (f"✅ تم استيراد {result.inserted:,} {kind}\n"
+                       f"موجود مسبقاً: {result.existing:,}\n"
+                       f"مرفوض: {result.rejected:,}\n"
+                       f"({result.rows_per_second:,.0f} صف/ث)")
+            if result.rejected_path:
+                message += f"\n\nالصفوف المرفوضة وأسبابها:\n{result.rejected_path}"
+            messagebox.showinfo("نجح", message)
+            self.refresh_view()
+            self.update_dashboard()
 
-            messagebox.showinfo("نجح", f"✅ تم إنشاء نسخة احتياطية:\n{backup_file}")
+        self.worker.submit(
+            lambda job: import_file(self.db, filename, job=job),
+            on_done=on_done,
+            on_error=lambda e: messagebox.showerror("خطأ", f"فشل الاستيراد:\n{e}"),
+            write=True, description='import_data')
 
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل النسخ الاحتياطي:\n{e}")
+    def backup_database(self):
+        """نسخ احتياطي: كاملة كل backup_full_every_days أيام، وتزايدية بينها"""
+        compression = self.reference.setting('backup_compression', 'gzip')
+        full_every_days = int(self.reference.setting('backup_full_every_days', 7))
+
+        def rotate(job):
+            result = rotate_backups(policy=RetentionPolicy.from_settings(self.reference), job=job)
+            remove_orphan_deltas()
+            return result
+
+        def on_done(result):
+            if result.path is None:
+                messagebox.showinfo("نسخ احتياطي", "لا توجد تغييرات منذ آخر نسخة")
+                return
+            kind = "تزايدية" if isinstance(result, DeltaResult) else "كاملة"
+            messagebox.showinfo("نجح", f"✅ تم إنشاء نسخة احتياطية {kind}:\n{result.path}\n"
+                                      f"({result.size / 1024:,.0f} KB)")
+            self.worker.submit(
+                rotate,
+                on_error=lambda e: print(f"خطأ في تدوير النسخ الاحتياطية: {e}"),
+                description='rotate_backups')
+
+        # يكتب في backup_chain ويحذف من change_log: في خيط الكتابة مع باقي الكتابات
+        self.worker.submit(
+            lambda job: incremental_backup(self.db, compression=compression,
+                                           full_every_days=full_every_days, job=job),
+            on_done=on_done,
+            on_error=lambda e: messagebox.showerror("خطأ", f"فشل النسخ الاحتياطي:\n{e}"),
+            write=True, description='backup_database')
 
     # ==================== اختصارات لوحة المفاتيح ====================
 
@@ -1431,15 +1743,24 @@ class BarbershopManagementSystem:
         self.root.bind('<Control-b>', lambda e: self.open_barbers_window())
         self.root.bind('<Control-m>', lambda e: self.open_services_window())
         self.root.bind('<Control-r>', lambda e: self.open_reports_window())
+        self.root.bind('<Control-l>', lambda e: self.open_browse_window())
         self.root.bind('<Control-e>', lambda e: self.export_to_excel())
         self.root.bind('<Control-d>', lambda e: self.backup_database())
-        self.root.bind('<F5>', lambda e: self.load_appointments())
+        self.root.bind('<F5>', lambda e: self.refresh_view())
         self.root.bind('<Delete>', lambda e: self.delete_appointment())
         self.root.bind('<Escape>', lambda e: self.clear_form())
 
     def exit_app(self):
         """الخروج من التطبيق"""
         if messagebox.askyesno("تأكيد الخروج", "هل أنت متأكد من الخروج؟"):
+            if self.api:
+                self.api.stop()
+            self.worker.cancel_all()
+            self.worker.shutdown()
+            self.db.print_latency_report()
+            if self.tracer:
+                self.tracer.close()
+            self.db.close()
             self.root.quit()
 
 
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+📈 قياس أداء نظام محل الحلاقة
+Benchmark suite
+
+يولّد قواعد بيانات اصطناعية بأحجام مختلفة ويقيس العمليات الأساسية
+(الحجز، الجلسة الفورية، تحميل المواعيد مع البحث وبدونه، لوحة التحكم،
+التصدير، النسخ الاحتياطي)، والنتيجة ملف JSON يمكن مقارنته بين الإصدارات.
+
+الاستخدام (من مجلد المشروع):
+    python -m benchmarks run --scale small --out results.json
+    python -m benchmarks run --appointments 1000000 --customers 200000
+    python -m benchmarks run --db bench.db          # إعادة استخدام قاعدة مولدة مسبقاً
+    python -m benchmarks generate bench.db --scale large
+    python -m benchmarks compare old.json new.json
+    python -m benchmarks startup --db bench.db      # زمن بدء التشغيل
+    python -m benchmarks terminals --processes 3   # عدة أجهزة على نفس القاعدة
+
+الأحجام الجاهزة (--scale): tiny, small (10k موعد), medium (1M), large (10M)
+"""
+
+from .generator import SCALES, fill, generate
+from .suite import compare, run, summarize
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""نقطة تشغيل: python -m benchmarks"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from . import __doc__ as package_doc
+from .generator import SCALES, generate
+from .startup import print_startup, run_startup
+from .suite import compare, run
+from .terminals import print_terminals, run_terminals
+
+
+def _scale(args):
+    appointments, customers = SCALES[args.scale]
+    return (args.appointments or appointments, args.customers or customers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=package_doc,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command')
+
+    for name in ('run', 'generate'):
+        command = commands.add_parser(name)
+        command.add_argument('--scale', choices=sorted(SCALES), default='small')
+        command.add_argument('--appointments', type=int)
+        command.add_argument('--customers', type=int)
+        command.add_argument('--days', type=int, default=365)
+        command.add_argument('--seed', type=int, default=1)
+        if name == 'generate':
+            command.add_argument('path')
+        else:
+            command.add_argument('--db', help='قاعدة بيانات موجودة (تُولَّد إن لم توجد)')
+            command.add_argument('--repeats', type=int, default=200)
+            command.add_argument('--only', nargs='*', help='أسماء العمليات المطلوبة فقط')
+            command.add_argument('--label', help='اسم للنتيجة (مثل رقم الإصدار)')
+            command.add_argument('--out', help='ملف JSON للنتيجة (افتراضياً الطباعة فقط)')
+
+    command = commands.add_parser('startup')
+    command.add_argument('--db', help='قاعدة بيانات للتشغيلات اللاحقة (افتراضياً قاعدة جديدة)')
+    command.add_argument('--repeats', type=int, default=7)
+    command.add_argument('--out', help='ملف JSON للنتيجة')
+
+    command = commands.add_parser('terminals')
+    command.add_argument('--processes', type=int, default=3)
+    command.add_argument('--operations', type=int, default=300, help='عمليات كل جهاز')
+    command.add_argument('--out', help='ملف JSON للنتيجة')
+
+    command = commands.add_parser('compare')
+    command.add_argument('old')
+    command.add_argument('new')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        appointments, customers = _scale(args)
+        generate(args.path, appointments, customers, days=args.days, seed=args.seed)
+
+    elif args.command == 'run':
+        appointments, customers = _scale(args)
+        path, generate_seconds = args.db, None
+        if not path or not os.path.exists(path):
+            path = path or os.path.join(tempfile.mkdtemp(prefix='barbershop_bench_'), 'bench.db')
+            generate_seconds = round(generate(path, appointments, customers,
+                                              days=args.days, seed=args.seed), 2)
+        scale = None if args.db and generate_seconds is None else \
+            {'name': args.scale, 'appointments': appointments, 'customers': customers,
+             'days': args.days, 'seed': args.seed}
+        report = run(path, repeats=args.repeats, only=args.only, label=args.label,
+                     scale=scale, generate_seconds=generate_seconds)
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"💾 تم حفظ النتيجة في {args.out}")
+        else:
+            print(text)
+
+    elif args.command == 'startup':
+        report = run_startup(args.db, repeats=args.repeats)
+        print_startup(report)
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"💾 تم حفظ النتيجة في {args.out}")
+
+    elif args.command == 'terminals':
+        report = run_terminals(args.processes, args.operations)
+        print_terminals(report)
+        if args.out:
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"💾 تم حفظ النتيجة في {args.out}")
+
+    elif args.command == 'compare':
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        compare(old, new)
+
+    else:
+        parser.print_help()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
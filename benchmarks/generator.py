@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+🏭 توليد قواعد بيانات اصطناعية واقعية للقياس
+Synthetic database generator
+
+يستخدم نفس تعريفات الجداول (schema.create_tables) والخدمات الافتراضية
+(schema.insert_default_data) ثم يضيف حلاقين وعملاء ومواعيد وجلسات موزعة
+على الأيام حتى اليوم (مع مواعيد قادمة)، بأرقام وأسعار وعمولات مثل التي
+يولّدها النظام. الترحيلات (الفهارس والإحصائيات وفهرس البحث) تُطبَّق بعد
+التعبئة لأن بناء الفهارس مرة واحدة أسرع من تحديثها مع كل صف.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+# الأحجام الجاهزة: (عدد المواعيد، عدد العملاء)
+SCALES = {
+    'tiny': (2000, 1000),
+    'small': (10000, 50000),
+    'medium': (1000000, 200000),
+    'large': (10000000, 1000000),
+}
+
+FIRST_NAMES = ['محمد', 'أحمد', 'خالد', 'عبدالله', 'فهد', 'سعد', 'ناصر', 'فيصل', 'عمر', 'يوسف',
+               'سلطان', 'تركي', 'بندر', 'ماجد', 'عبدالرحمن', 'سلمان', 'نايف', 'مشعل', 'راشد', 'زياد']
+LAST_NAMES = ['العتيبي', 'القحطاني', 'الشمري', 'الدوسري', 'الحربي', 'الغامدي', 'الزهراني',
+              'المطيري', 'السبيعي', 'العنزي', 'الشهري', 'المالكي', 'الرشيدي', 'البقمي']
+PAYMENT_METHODS = ['نقدي'] * 5 + ['بطاقة'] * 4 + ['تحويل']
+
+# حالات المواعيد السابقة (الأيام القادمة: معلق أو مؤكد فقط)
+PAST_STATUSES = ['completed'] * 16 + ['cancelled'] * 2 + ['no_show', 'confirmed']
+FUTURE_STATUSES = ['pending'] * 3 + ['confirmed']
+
+# أوقات العمل: كل نصف ساعة من 09:00 إلى 21:30
+TIME_SLOTS = [f'{h:02d}:{m:02d}' for h in range(9, 22) for m in (0, 30)]
+
+# عدد الصفوف في كل دفعة إدخال
+CHUNK = 50000
+
+
+def _phone(i):
+    """رقم جوال فريد لكل عميل (تبديل ثابت للأرقام حتى لا تكون متتالية)"""
+    return f'05{(i * 7919 + 12345) % 10 ** 8:08d}'
+
+
+def _person_name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def _daily_counts(rng, total, days):
+    """توزيع العدد الكلي على الأيام (أيام الخميس والجمعة أكثر ازدحاماً)"""
+    weights = []
+    for d in days:
+        weight = 1.6 if d.weekday() in (3, 4) else 1.0
+        weights.append(weight * rng.uniform(0.8, 1.2))
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % len(counts)] += 1
+    return counts
+
+
+def _chunks(rows, size=CHUNK):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def fill(conn, appointments, customers, days=365, future_days=14, barbers=8,
+         sessions_ratio=0.25, seed=1):
+    """تعبئة قاعدة بيانات (الجداول والبيانات الافتراضية موجودة مسبقاً)"""
+    rng = random.Random(seed)
+
+    conn.executemany('''
+        INSERT INTO barbers (name, phone, specialization, commission_rate, status,
+                             working_days, working_hours)
+        VALUES (?, ?, 'قص شعر', ?, 'active', 'السبت,الأحد,الاثنين,الثلاثاء,الأربعاء,الخميس',
+                '09:00-21:00')
+    ''', [(_person_name(rng), _phone(10 ** 7 + i),
+           rng.choice([30, 35, 40])) for i in range(barbers)])
+    barber_rows = conn.execute("SELECT id, name, commission_rate FROM barbers").fetchall()
+    services = conn.execute(
+        "SELECT id, name, price, cost, duration, commission_rate FROM services").fetchall()
+
+    names = []
+    for chunk in _chunks((_person_name(rng), _phone(i)) for i in range(customers)):
+        conn.executemany("INSERT INTO customers (name, phone) VALUES (?, ?)", chunk)
+        names.extend(chunk)
+    first_customer = conn.execute("SELECT MIN(id) FROM customers").fetchone()[0]
+
+    today = date.today()
+    day_list = [today - timedelta(days=days - 1 - i) for i in range(days + future_days)]
+
+    def appointment_rows():
+        for day, count in zip(day_list, _daily_counts(rng, appointments, day_list)):
+            iso = day.isoformat()
+            statuses = FUTURE_STATUSES if day > today else PAST_STATUSES
+            for n in range(1, count + 1):
+                c = rng.randrange(customers)
+                barber_id, barber_name, barber_rate = rng.choice(barber_rows)
+                service_id, service_name, price, cost, duration, service_rate = rng.choice(services)
+                status = rng.choice(statuses)
+                commission = price * ((service_rate or barber_rate) / 100)
+                completed_at = f'{iso} {rng.choice(TIME_SLOTS)}:00' if status == 'completed' else None
+                yield (f'APP-{iso.replace("-", "")}-{n:03d}', first_customer + c,
+                       names[c][0], names[c][1], barber_id, barber_name,
+                       service_id, service_name, iso, rng.choice(TIME_SLOTS), duration,
+                       status, price, cost, commission, rng.choice(PAYMENT_METHODS),
+                       'paid' if status == 'completed' else 'unpaid', completed_at)
+
+    for chunk in _chunks(appointment_rows()):
+        conn.executemany('''
+            INSERT INTO appointments (
+                appointment_number, customer_id, customer_name, phone,
+                barber_id, barber_name, service_id, service_name,
+                appointment_date, appointment_time, duration, status,
+                price, cost, commission, payment_method, payment_status, completed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', chunk)
+
+    past_days = [d for d in day_list if d <= today]
+
+    def session_rows():
+        total = int(appointments * sessions_ratio)
+        for day, count in zip(past_days, _daily_counts(rng, total, past_days)):
+            iso = day.isoformat()
+            for n in range(1, count + 1):
+                c = rng.randrange(customers)
+                barber_id, barber_name, barber_rate = rng.choice(barber_rows)
+                service_id, service_name, price, cost, _, service_rate = rng.choice(services)
+                commission = price * ((service_rate or barber_rate) / 100)
+                checkout = f'{iso} {rng.choice(TIME_SLOTS)}:{rng.randrange(60):02d}.000000'
+                yield (f'SES-{iso.replace("-", "")}-{n:03d}', first_customer + c, names[c][0],
+                       barber_id, barber_name,
+                       json.dumps([{'id': service_id, 'name': service_name, 'price': price}]),
+                       price, cost, commission, price, rng.choice(PAYMENT_METHODS),
+                       int(price * 0.1), checkout, checkout)
+
+    for chunk in _chunks(session_rows()):
+        conn.executemany('''
+            INSERT INTO sessions (
+                session_number, customer_id, customer_name, barber_id, barber_name,
+                services, total_price, total_cost, total_commission,
+                discount, final_price, payment_method, loyalty_points_earned,
+                check_in_time, check_out_time, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, 'completed')
+        ''', chunk)
+
+
+def generate(path, appointments=10000, customers=50000, migrate=True, verbose=True, **options):
+    """إنشاء قاعدة بيانات كاملة في path؛ يُرجع مدة التوليد بالثواني"""
+    from database import Database
+    from schema import create_tables, insert_default_data
+    from migrations import apply_migrations
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    start = time.perf_counter()
+
+    # التعبئة باتصال مستقل بدون سجل معاملات (الملف مؤقت، لا حاجة للأمان هنا)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    cursor = conn.cursor()
+    create_tables(cursor)
+    insert_default_data(cursor)
+    if verbose:
+        print(f"⏳ إنشاء {appointments:,} موعد و {customers:,} عميل...")
+    fill(conn, appointments, customers, **options)
+    conn.commit()
+    conn.close()
+
+    if migrate:
+        db = Database(path)
+        apply_migrations(db, verbose=verbose)
+        db.close()
+
+    elapsed = time.perf_counter() - start
+    if verbose:
+        print(f"✅ تم التوليد في {elapsed:.1f}s ({os.path.getsize(path) / 1e6:,.1f} MB)")
+    return elapsed
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+🚀 قياس زمن بدء التشغيل
+Startup time benchmark
+
+كل تشغيل في عملية بايثون جديدة (مثل فتح البرنامج فعلاً) داخل مجلد عمل
+مستقل فيه database/barbershop.db، ويُقاس:
+- import_ms: استيراد barbershop ووحداته
+- init_ms: إنشاء النافذة حتى نهاية __init__ (الإعداد + بناء الواجهة)
+- window_ms: حتى أول رسم للنافذة (نافذة قابلة للاستخدام)
+- comboboxes_ms: حتى امتلاء قائمة الحلاقين من الخلفية
+بدون شاشة (خادم أو CI) تُقاس مرحلة قاعدة البيانات فقط: فحص رقم المخطط
+مقابل الإعداد الكامل، وتحميل البيانات المرجعية.
+
+كما يتحقق أن المكتبات الثقيلة (pandas، xlsxwriter، ...) لا تُحمَّل عند
+التشغيل، بل عند أول استخدام لها فقط.
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# الهدف: نافذة قابلة للاستخدام خلال 300ms
+TARGET_MS = 300
+
+# مكتبات يجب ألا تُستورد عند التشغيل
+HEAVY_MODULES = ('pandas', 'numpy', 'xlsxwriter', 'openpyxl', 'matplotlib', 'reportlab')
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# يُشغَّل في عملية جديدة؛ يطبع النتيجة JSON في آخر سطر
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+
+def elapsed():
+    return round((time.perf_counter() - started) * 1000, 2)
+
+import barbershop
+result = {'import_ms': elapsed()}
+result['heavy'] = [m for m in %(heavy)r if m in sys.modules]
+
+import tkinter as tk
+try:
+    root = tk.Tk()
+except tk.TclError:
+    root = None
+
+if root is not None:
+    app = barbershop.BarbershopManagementSystem(root)
+    result['init_ms'] = elapsed()
+    root.update()
+    result['window_ms'] = elapsed()
+    while not app.form_entries['barber']['values'] and elapsed() < 5000:
+        root.update()
+        time.sleep(0.001)
+    result['comboboxes_ms'] = elapsed()
+    app.worker.shutdown()
+    root.destroy()
+else:
+    # نفس خطوات __init__ الخاصة بقاعدة البيانات، بدون نافذة
+    app = barbershop.BarbershopManagementSystem.__new__(barbershop.BarbershopManagementSystem)
+    app.create_folders()
+    app.db = barbershop.Database('database/barbershop.db')
+    # force: السلوك السابق (الإعداد الكامل في كل تشغيل) للمقارنة
+    current = not %(force)r and barbershop.schema_is_current(app.db)
+    result['schema_check_ms'] = elapsed()
+    if not current:
+        app.setup_database()
+        app.load_default_data()
+    result['bootstrap_ms'] = elapsed()
+    barbershop.ReferenceData(app.db).load()
+    result['reference_ms'] = elapsed()
+    app.db.close()
+print(json.dumps(result))
+"""
+
+
+def launch(workdir, force_bootstrap=False):
+    """تشغيل واحد في عملية جديدة وإرجاع أزمنة المراحل"""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    env.pop('BARBERSHOP_TRACE', None)
+    script = CHILD_SCRIPT % {'heavy': HEAVY_MODULES, 'force': force_bootstrap}
+    output = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _median(results):
+    keys = [k for k in results[0] if k.endswith('_ms')]
+    return {k: round(statistics.median(r[k] for r in results), 2) for k in keys}
+
+
+def run_startup(db_path=None, repeats=7):
+    """أول تشغيل (قاعدة جديدة) ثم تشغيلات لاحقة (قاعدة موجودة)، الوسيط لكل مرحلة"""
+    base = tempfile.mkdtemp(prefix='barbershop_startup_')
+    try:
+        first = []
+        for i in range(max(1, repeats // 2)):
+            workdir = os.path.join(base, f'first_{i}')
+            os.makedirs(workdir)
+            first.append(launch(workdir))
+
+        workdir = os.path.join(base, 'existing')
+        os.makedirs(os.path.join(workdir, 'database'))
+        if db_path:
+            shutil.copy(db_path, os.path.join(workdir, 'database', 'barbershop.db'))
+        else:
+            launch(workdir)
+        later = [launch(workdir) for _ in range(repeats)]
+        # بدون شاشة: مقارنة بالإعداد الكامل في كل تشغيل (السلوك السابق)
+        forced = [] if 'window_ms' in later[0] else \
+            [launch(workdir, force_bootstrap=True) for _ in range(repeats)]
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+    report = {
+        'first_launch': _median(first),
+        'later_launch': _median(later),
+        'heavy_modules_loaded': sorted({m for r in first + later for m in r['heavy']}),
+        'target_ms': TARGET_MS,
+    }
+    if forced:
+        report['always_bootstrap'] = _median(forced)
+    usable = report['later_launch'].get('window_ms')
+    report['gui_measured'] = usable is not None
+    if usable is not None:
+        report['within_target'] = usable <= TARGET_MS
+    return report
+
+
+def print_startup(report):
+    """طباعة ملخص القياس"""
+    for name in ('first_launch', 'later_launch', 'always_bootstrap'):
+        if name not in report:
+            continue
+        phases = '  '.join(f"{k}={v:.1f}" for k, v in report[name].items())
+        print(f"{name:<17} {phases}")
+    heavy = report['heavy_modules_loaded']
+    print(f"مكتبات ثقيلة عند التشغيل: {', '.join(heavy) if heavy else 'لا شيء ✅'}")
+    if report['gui_measured']:
+        mark = '✅' if report['within_target'] else '❌'
+        print(f"{mark} نافذة قابلة للاستخدام خلال {report['later_launch']['window_ms']:.0f}ms "
+              f"(الهدف {report['target_ms']}ms)")
+    else:
+        print("⚠️ لا توجد شاشة: قيست مرحلة قاعدة البيانات فقط (بدون Tk)")
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+⏱️ قياس العمليات الأساسية
+Core operations benchmark suite
+
+كل عملية تُشغَّل عدداً من المرات على قاعدة بيانات مولَّدة، ويُسجَّل
+p50/p95/p99 وأقصى زمن بالميلي ثانية، ثم تُشغَّل مرة إضافية تحت
+tracemalloc لقياس أقصى ذاكرة بايثون تحتاجها العملية.
+"""
+
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# عدد مرات التشغيل الافتراضي للعمليات البطيئة (ملفات)
+FILE_REPEATS = 5
+
+
+def percentile(sorted_values, fraction):
+    """النسبة المئوية بطريقة أقرب رتبة"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def summarize(timings, peak_bytes=None):
+    """ملخص أزمنة عملية واحدة (ميلي ثانية)"""
+    timings = sorted(timings)
+    result = {
+        'n': len(timings),
+        'mean_ms': round(sum(timings) / len(timings), 4) if timings else 0.0,
+        'p50_ms': round(percentile(timings, 0.50), 4),
+        'p95_ms': round(percentile(timings, 0.95), 4),
+        'p99_ms': round(percentile(timings, 0.99), 4),
+        'max_ms': round(timings[-1], 4) if timings else 0.0,
+    }
+    if peak_bytes is not None:
+        result['peak_kb'] = round(peak_bytes / 1024, 1)
+    return result
+
+
+def measure(fn, repeats, warmup=1):
+    """تشغيل fn(i) عدة مرات وإرجاع (الأزمنة، أقصى ذاكرة)"""
+    for i in range(warmup):
+        fn(-1 - i)
+
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        fn(repeats)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings, peak
+
+
+def max_rss_kb():
+    """أقصى ذاكرة للعملية (غير متوفر على ويندوز)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS بالبايت و Linux بالكيلوبايت
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def operations(db, workdir, seed=1):
+    """العمليات المقاسة: (الاسم، الدالة، مرات التشغيل الافتراضية أو None)"""
+    from engine import (BookingService, CheckoutService, StatsService,
+                        BookingRequest, CheckoutRequest, list_day_appointments)
+    from exporter import export_appointments
+    from backup import create_backup, rotate_backups, RetentionPolicy
+    from reference_data import ReferenceData
+
+    rng = random.Random(seed)
+    reference = ReferenceData(db).load()
+    booking, checkout = BookingService(db, reference), CheckoutService(db, reference)
+    stats = StatsService(db)
+    today = datetime.now().strftime('%Y-%m-%d')
+    month_start = (datetime.now() - timedelta(days=29)).strftime('%Y-%m-%d')
+    barbers = db.fetchall("SELECT id, name FROM barbers")
+    services = db.fetchall("SELECT id, name, price FROM services")
+    phones = [row[0] for row in db.fetchall(
+        "SELECT phone FROM customers ORDER BY random() LIMIT 1000")] or ['0500000000']
+    backups = os.path.join(workdir, 'backups')
+
+    def form(i):
+        barber_id, barber_name = rng.choice(barbers)
+        service_id, service_name, price = rng.choice(services)
+        # نصف العمليات لعملاء موجودين ونصفها لعملاء جدد
+        phone = rng.choice(phones) if i % 2 else f'059{rng.randrange(10 ** 7):07d}'
+        return dict(customer_name='عميل قياس', phone=phone, barber_id=barber_id,
+                    barber_name=barber_name, service_id=service_id,
+                    service_name=service_name, price=price)
+
+    def save_appointment(i):
+        booking.book(BookingRequest(date=today, time=f'{rng.randrange(9, 22):02d}:00', **form(i)))
+
+    def quick_session(i):
+        checkout.checkout(CheckoutRequest(**form(i)))
+
+    def load_appointments(i):
+        list_day_appointments(db, today)
+
+    def load_appointments_search(i):
+        list_day_appointments(db, today, phones[i % len(phones)][-4:])
+
+    def update_dashboard(i):
+        stats.day()
+
+    def export_to_excel(i):
+        export_appointments(db, os.path.join(workdir, 'export.xlsx'))
+
+    def export_to_excel_month(i):
+        export_appointments(db, os.path.join(workdir, 'export_month.xlsx'), month_start, today)
+
+    def backup_database(i):
+        create_backup(db, backups)
+        rotate_backups(backups, RetentionPolicy(keep_last=2, daily=0, weekly=0, monthly=0))
+
+    return [
+        ('save_appointment', save_appointment, None),
+        ('quick_session', quick_session, None),
+        ('load_appointments', load_appointments, None),
+        ('load_appointments_search', load_appointments_search, None),
+        ('update_dashboard', update_dashboard, None),
+        ('export_to_excel', export_to_excel, FILE_REPEATS),
+        ('export_to_excel_month', export_to_excel_month, FILE_REPEATS),
+        ('backup_database', backup_database, FILE_REPEATS),
+    ]
+
+
+def run(path, repeats=200, only=None, label=None, scale=None, generate_seconds=None,
+        verbose=True):
+    """قياس كل العمليات على قاعدة البيانات في path وإرجاع تقرير (dict)"""
+    from database import Database
+
+    db = Database(path)
+    workdir = tempfile.mkdtemp(prefix='barbershop_bench_')
+    counts = {table: db.fetchvalue(f"SELECT COUNT(*) FROM {table}")
+              for table in ('appointments', 'sessions', 'customers', 'barbers', 'services')}
+
+    report = {
+        'label': label,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'database': {'path': os.path.abspath(path), 'size_mb': round(os.path.getsize(path) / 1e6, 1),
+                     'scale': scale, 'generate_seconds': generate_seconds, 'rows': counts},
+        'operations': {},
+    }
+
+    for name, fn, default_repeats in operations(db, workdir):
+        if only and name not in only:
+            continue
+        try:
+            timings, peak = measure(fn, min(repeats, default_repeats or repeats))
+        except ImportError as e:
+            # مكتبة اختيارية غير منصبة (مثل pandas للتصدير)
+            report['operations'][name] = {'skipped': f'missing dependency: {e.name}'}
+            if verbose:
+                print(f"⏭️  {name:<26} تم التخطي (مكتبة غير منصبة: {e.name})")
+            continue
+        stats = summarize(timings, peak)
+        report['operations'][name] = stats
+        if verbose:
+            print(f"⏱️  {name:<26} n={stats['n']:<5} p50={stats['p50_ms']:>9.3f}ms "
+                  f"p95={stats['p95_ms']:>9.3f}ms p99={stats['p99_ms']:>9.3f}ms "
+                  f"peak={stats['peak_kb']:>9.1f}KB")
+
+    report['max_rss_kb'] = max_rss_kb()
+    db.close()
+    return report
+
+
+def compare(old, new):
+    """مقارنة تقريرين (p50/p95/p99) وطباعة نسبة التغير لكل عملية"""
+    print(f"{'operation':<26}{'metric':>8}{'old':>12}{'new':>12}{'change':>10}")
+    for name, new_stats in new['operations'].items():
+        old_stats = old['operations'].get(name, {})
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if metric not in new_stats or metric not in old_stats:
+                continue
+            before, after = old_stats[metric], new_stats[metric]
+            change = f"{(after - before) / before * 100:+.1f}%" if before else '-'
+            print(f"{name:<26}{metric[:3]:>8}{before:>12.3f}{after:>12.3f}{change:>10}")
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+🖥️ اختبار ضغط لعدة أجهزة استقبال على نفس القاعدة
+Multi-terminal stress test
+
+كل جهاز عملية بايثون مستقلة باتصالها الخاص (مثل عدة أجهزة على نفس الملف)،
+تبدأ كلها في نفس اللحظة على نفس مجموعة المواعيد والعملاء:
+- إنهاء وإلغاء وتأكيد مواعيد بالحالة التي يعرضها الجهاز (وقد تكون قديمة)
+- جلسات فورية لنفس العملاء (نقاط الولاء والزيارات تتزاحم على نفس الصفوف)
+- تحديث العرض كل بضع عمليات
+
+بعدها يُتحقق من القاعدة نفسها: لا موعد أُنهي مرتين، وحالة كل موعد هي آخر
+تغيير ناجح، وعدّادات كل عميل = نقاط المواعيد المكتملة + نقاط جلساته فقط
+(لا تحديث مفقود ولا نقاط مضاعفة).
+
+"قبل" يشغّل نفس الحمل بالطريقة السابقة (BEGIN مؤجل ثم UPDATE بلا شرط
+الحالة) للمقارنة.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+# المواعيد التي يتزاحم عليها الأجهزة، وعدد عملائها
+POOL_APPOINTMENTS = 60
+POOL_CUSTOMERS = 12
+
+# تحديث العرض (قراءة حالات المواعيد من القاعدة) كل كم عملية
+REFRESH_EVERY = 10
+
+ACTIONS = ('complete', 'cancel', 'confirm')
+
+# الحالة الناتجة عن كل إجراء
+RESULT_STATUS = {'complete': 'completed', 'cancel': 'cancelled', 'confirm': 'confirmed'}
+
+# الطريقة السابقة: لا شرط على الحالة السابقة
+LEGACY_SQL = {
+    'confirm': "UPDATE appointments SET status='confirmed' WHERE id=?",
+    'cancel': "UPDATE appointments SET status='cancelled' WHERE id=?",
+}
+
+
+def _legacy(db, action, appointment_id):
+    """نفس تغيير الحالة كما كان قبل BEGIN IMMEDIATE والتحقق من الحالة"""
+    from datetime import datetime
+    from engine import loyalty_points_for
+
+    conn = db.connection()
+    conn.execute("BEGIN")
+    try:
+        if action in LEGACY_SQL:
+            conn.execute(LEGACY_SQL[action], (appointment_id,))
+        else:
+            customer_id, price = conn.execute(
+                "SELECT customer_id, price FROM appointments WHERE id=?",
+                (appointment_id,)).fetchone()
+            now = datetime.now()
+            conn.execute("""UPDATE appointments SET status='completed', completed_at=?,
+                            payment_status='paid' WHERE id=?""", (now, appointment_id))
+            conn.execute("""UPDATE customers SET total_visits = total_visits + 1,
+                            total_spent = total_spent + ?, loyalty_points = loyalty_points + ?,
+                            last_visit = ? WHERE id = ?""",
+                         (float(price), loyalty_points_for(price), now, customer_id))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def terminal(path, number, pragmas, ids, customers, operations, start_at, legacy):
+    """جهاز واحد (في عملية مستقلة): يُرجع إحصائياته والتغييرات الناجحة"""
+    from database import Database, DatabaseBusyError
+    from engine import (BookingService, CheckoutService, CheckoutRequest,
+                        StaleStatusError)
+
+    db = Database(path, pragmas)
+    booking, checkout = BookingService(db), CheckoutService(db)
+    barber_id, barber_name = db.fetchone("SELECT id, name FROM barbers ORDER BY id LIMIT 1")
+    service_id, service_name, price = db.fetchone(
+        "SELECT id, name, price FROM services ORDER BY id LIMIT 1")
+    rng = random.Random(number)
+    placeholders = ', '.join('?' * len(ids))
+
+    def refresh():
+        return dict(db.fetchall(f"SELECT id, status FROM appointments WHERE id IN ({placeholders})",
+                                ids))
+
+    view = refresh()
+    stats = {'operations': 0, 'stale': 0, 'busy_errors': 0, 'locked': 0, 'sessions': 0}
+    changes = []
+
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.perf_counter()
+    for i in range(operations):
+        if i % REFRESH_EVERY == 0:
+            view = refresh()
+        try:
+            if rng.random() < 0.7:
+                appointment_id = rng.choice(ids)
+                action = rng.choice(ACTIONS)
+                if legacy:
+                    _legacy(db, action, appointment_id)
+                else:
+                    getattr(booking, action)(appointment_id, view[appointment_id])
+                view[appointment_id] = RESULT_STATUS[action]
+                changes.append((appointment_id, action))
+            else:
+                name, phone = rng.choice(customers)
+                checkout.checkout(CheckoutRequest(name, phone, barber_id, barber_name,
+                                                  service_id, service_name, price))
+                stats['sessions'] += 1
+        except StaleStatusError as e:
+            stats['stale'] += 1
+            view[e.appointment_id] = e.current
+        except DatabaseBusyError:
+            stats['busy_errors'] += 1
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            stats['locked'] += 1
+        stats['operations'] += 1
+    stats['seconds'] = time.perf_counter() - started
+    stats['busy_retries'] = db.busy_retries
+    db.close()
+    return stats, changes
+
+
+def _prepare(path, pragmas):
+    """قاعدة صغيرة + مواعيد معلقة لمجموعة عملاء يتزاحم عليها الأجهزة"""
+    from datetime import date
+    from database import Database
+    from engine import BookingRequest, BookingService
+    from .generator import generate
+
+    generate(path, 2000, 500, days=30, verbose=False)
+    db = Database(path, pragmas)
+    barber_id, barber_name = db.fetchone("SELECT id, name FROM barbers ORDER BY id LIMIT 1")
+    service_id, service_name, price = db.fetchone(
+        "SELECT id, name, price FROM services ORDER BY id LIMIT 1")
+    customers = [(f'عميل الاستقبال {i}', f'09{i:08d}') for i in range(POOL_CUSTOMERS)]
+    today = date.today().isoformat()
+    results = BookingService(db).book_many([
+        BookingRequest(*customers[i % POOL_CUSTOMERS], barber_id, barber_name, service_id,
+                       service_name, today, f'{9 + i % 12:02d}:{(i // 12) * 5:02d}', price)
+        for i in range(POOL_APPOINTMENTS)])
+    last_session = db.fetchvalue("SELECT COALESCE(MAX(id), 0) FROM sessions")
+    db.close()
+    return [r.appointment_id for r in results], customers, last_session
+
+
+def _verify(path, pragmas, ids, customers, changes, last_session):
+    """الحالات والعدّادات النهائية مقارنة بالتغييرات الناجحة المُبلَّغة"""
+    from collections import Counter
+    from database import Database
+    from engine import loyalty_points_for
+
+    db = Database(path, pragmas)
+    placeholders = ', '.join('?' * len(ids))
+    rows = db.fetchall(f"""SELECT id, status, customer_id, price FROM appointments
+                           WHERE id IN ({placeholders})""", ids)
+    completions = Counter(appointment_id for appointment_id, action in changes
+                          if action == 'complete')
+    finals = Counter(appointment_id for appointment_id, action in changes
+                     if action in ('complete', 'cancel'))
+
+    # العدّادات المتوقعة: مرة لكل موعد حالته مكتمل + جلسات الاختبار
+    expected = Counter()
+    for _, status, customer_id, price in rows:
+        if status == 'completed':
+            expected[customer_id, 'visits'] += 1
+            expected[customer_id, 'points'] += loyalty_points_for(price)
+    for customer_id, visits, points in db.fetchall("""
+            SELECT customer_id, COUNT(*), SUM(loyalty_points_earned) FROM sessions
+            WHERE id > ? GROUP BY customer_id""", (last_session,)):
+        expected[customer_id, 'visits'] += visits
+        expected[customer_id, 'points'] += points
+
+    mismatched = 0
+    for customer_id, visits, points in db.fetchall(f"""
+            SELECT id, total_visits, loyalty_points FROM customers
+            WHERE phone IN ({', '.join('?' * len(customers))})""", [p for _, p in customers]):
+        if (visits, points) != (expected[customer_id, 'visits'], expected[customer_id, 'points']):
+            mismatched += 1
+    db.close()
+    return {
+        'double_completed': sum(1 for n in completions.values() if n > 1),
+        'conflicting_finals': sum(1 for n in finals.values() if n > 1),
+        'customers_mismatched': mismatched,
+    }
+
+
+def run_terminals(processes=3, operations=300):
+    """قبل (BEGIN مؤجل بلا شرط الحالة) وبعد، على WAL وعلى ملف مشترك (سجل تراجع)"""
+    import multiprocessing
+    from database import SHARED_PRAGMAS
+
+    # spawn: نفس سلوك Windows، وكل جهاز يبدأ باتصالات جديدة تماماً
+    context = multiprocessing.get_context('spawn')
+    folder = tempfile.mkdtemp(prefix='barbershop_terminals_')
+    report = []
+    try:
+        for label, pragmas, legacy in (('قبل (WAL)', None, True),
+                                       ('بعد (WAL)', None, False),
+                                       ('بعد (ملف مشترك)', SHARED_PRAGMAS, False)):
+            path = os.path.join(folder, f'terminals_{len(report)}.db')
+            ids, customers, last_session = _prepare(path, pragmas)
+            start_at = time.time() + 2
+            with context.Pool(processes) as pool:
+                outcomes = pool.starmap(terminal, [
+                    (path, number, pragmas, ids, customers, operations, start_at, legacy)
+                    for number in range(processes)])
+
+            totals = {}
+            changes = []
+            for stats, terminal_changes in outcomes:
+                for key, value in stats.items():
+                    totals[key] = totals.get(key, 0) + value
+                changes.extend(terminal_changes)
+            seconds = max(stats['seconds'] for stats, _ in outcomes)
+            row = {'label': label, 'processes': processes,
+                   'ops_per_second': round(totals['operations'] / seconds),
+                   'status_changes': len(changes), 'sessions': totals['sessions'],
+                   'stale': totals['stale'], 'busy_retries': totals['busy_retries'],
+                   'busy_errors': totals['busy_errors'], 'locked': totals['locked']}
+            row.update(_verify(path, pragmas, ids, customers, changes, last_session))
+            report.append(row)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return report
+
+
+def print_terminals(report):
+    """طباعة النتيجة: كل الأعمدة الأخيرة يجب أن تكون 0 في "بعد\""""
+    print(f"{'':<16} {'عملية/ث':>8} {'تغييرات':>8} {'جلسات':>6} {'قديم':>5} {'انتظار':>7} "
+          f"{'مقفل':>5} {'إنهاء مكرر':>10} {'تعارض':>6} {'عدّادات خاطئة':>13}")
+    for row in report:
+        print(f"{row['label']:<16} {row['ops_per_second']:>8,} {row['status_changes']:>8,} "
+              f"{row['sessions']:>6,} {row['stale']:>5,} {row['busy_retries']:>7,} "
+              f"{row['locked'] + row['busy_errors']:>5,} {row['double_completed']:>10,} "
+              f"{row['conflicting_finals']:>6,} {row['customers_mismatched']:>13,}")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📝 سجل التغييرات (change_log)
+Trigger-maintained change log
+
+كل إدخال أو تعديل أو حذف في الجداول الأساسية يضيف صفاً إلى change_log
+(عبر triggers): اسم الجدول، نوع العملية، مفتاح الصف، وصورة الصف الجديد
+بصيغة JSON، بترقيم تصاعدي بترتيب الحفظ. يُستخدم للنسخ الاحتياطي التزايدي
+(تُحفظ التغييرات منذ آخر نسخة فقط) ولإعادة تطبيقها على نسخة أخرى.
+
+الجداول المشتقة (daily_stats و daily_customers وفهرس البحث) لا تُسجَّل
+لأن triggers الخاصة بها تعيد حسابها عند إعادة التطبيق. حالة النسخ المتماثل
+(replica_rows و replication_peers) تُسجَّل مع مصدر كل تغيير (origin) حتى
+تعود بعد الاستعادة متسقة مع البيانات.
+
+⚠️ الـ triggers تُولَّد من أعمدة الجداول وقت إنشائها: أي ترحيل يضيف عموداً
+لجدول مسجَّل يجب أن يضيف الخطوة changelog.create_triggers بعده.
+"""
+
+import json
+import sqlite3
+
+# الجداول المسجَّلة ومفاتيحها الأساسية
+TRACKED_TABLES = {
+    'customers': ('id',),
+    'barbers': ('id',),
+    'services': ('id',),
+    'appointments': ('id',),
+    'sessions': ('id',),
+    'settings': ('key',),
+    'sequences': ('prefix', 'day'),
+    'replica_rows': ('origin', 'table_name', 'remote_id'),
+    'replication_peers': ('peer',),
+}
+
+# وقت التغيير بالتوقيت المحلي (مثل datetime.now() في باقي النظام)
+CHANGED_AT = "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')"
+
+
+# ==================== تعريف الجدول والـ triggers ====================
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _trigger_statements(cursor, table, key_columns):
+    columns = _columns(cursor, table)
+    new_row = 'json_object(' + ', '.join(f"'{c}', NEW.{c}" for c in columns) + ')'
+
+    def key(row):
+        return 'json_array(' + ', '.join(f'{row}.{c}' for c in key_columns) + ')'
+
+    def log(op, row_key, data):
+        return f"""INSERT INTO change_log (table_name, op, row_key, data, changed_at)
+                   VALUES ('{table}', '{op}', {row_key}, {data}, {CHANGED_AT});"""
+
+    return [
+        f'''CREATE TRIGGER trg_change_log_{table}_insert
+            AFTER INSERT ON {table} BEGIN
+            {log('I', key('NEW'), new_row)}
+            END''',
+        f'''CREATE TRIGGER trg_change_log_{table}_update
+            AFTER UPDATE ON {table} BEGIN
+            {log('U', key('OLD'), new_row)}
+            END''',
+        f'''CREATE TRIGGER trg_change_log_{table}_delete
+            AFTER DELETE ON {table} BEGIN
+            {log('D', key('OLD'), 'NULL')}
+            END''',
+    ]
+
+
+def drop_triggers(cursor):
+    """حذف triggers السجل (عند إعادة تطبيق تغييرات مسجلة مسبقاً)"""
+    for table in TRACKED_TABLES:
+        for op in ('insert', 'update', 'delete'):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_change_log_{table}_{op}")
+
+
+def create_triggers(cursor):
+    """إنشاء (أو إعادة إنشاء) triggers السجل من أعمدة الجداول الحالية"""
+    drop_triggers(cursor)
+    for table, key_columns in TRACKED_TABLES.items():
+        if not _columns(cursor, table):
+            # جدول يُنشئه ترحيل لاحق (يعيد إنشاء الـ triggers بعده)
+            continue
+        for statement in _trigger_statements(cursor, table, key_columns):
+            cursor.execute(statement)
+
+
+def schema_statements():
+    """أوامر إنشاء الجدول والـ triggers (تُستخدم في الترحيلات)"""
+    return [
+        '''CREATE TABLE IF NOT EXISTS change_log (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               table_name TEXT NOT NULL,
+               op TEXT NOT NULL,
+               row_key TEXT NOT NULL,
+               data TEXT,
+               changed_at TEXT NOT NULL
+           )''',
+        create_triggers,
+    ]
+
+
+# ==================== القراءة والتطبيق ====================
+
+def last_change_id(cursor):
+    """رقم آخر تغيير مسجَّل (0 إن كان السجل فارغاً)"""
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM change_log")
+    return cursor.fetchone()[0]
+
+
+def sequence_position(conn):
+    """آخر رقم أُعطي في السجل، حتى بعد حذف صفوفه (0 إن لم يوجد السجل)"""
+    try:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+def iter_changes(cursor, after_id=0, upto_id=None, batch=5000):
+    """التغييرات بعد after_id بالترتيب: (id, table, op, row_key, data, changed_at, origin)"""
+    sql = """SELECT id, table_name, op, row_key, data, changed_at, origin
+             FROM change_log WHERE id > ?"""
+    params = [after_id]
+    if upto_id is not None:
+        sql += " AND id <= ?"
+        params.append(upto_id)
+    cursor.execute(sql + " ORDER BY id", params)
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            break
+        yield from rows
+
+
+def apply_change(cursor, table, op, row_key, data):
+    """تطبيق تغيير واحد (row_key و data نصوص JSON كما في السجل)
+
+    الإدخال والتعديل بـ upsert (وليس REPLACE) حتى تعمل triggers التعديل
+    في الجداول المشتقة مثل daily_stats.
+    """
+    key_columns = TRACKED_TABLES[table]
+    old_key = json.loads(row_key) if isinstance(row_key, str) else row_key
+    where = ' AND '.join(f'{c} = ?' for c in key_columns)
+
+    if op == 'D':
+        cursor.execute(f"DELETE FROM {table} WHERE {where}", old_key)
+        return
+
+    row = json.loads(data) if isinstance(data, str) else data
+    new_key = [row[c] for c in key_columns]
+    if op == 'U' and list(old_key) != new_key:
+        cursor.execute(f"DELETE FROM {table} WHERE {where}", old_key)
+
+    columns = list(row)
+    updates = ', '.join(f'{c} = excluded.{c}' for c in columns if c not in key_columns)
+    cursor.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}
+    """, [row[c] for c in columns])
+
+
+def prune(cursor, upto_id):
+    """حذف التغييرات حتى upto_id (بعد أن صارت ضمن نسخة كاملة)
+
+    لا يُحذف ما لم يستلمه بعد فرع يستلم تغييراتنا (replication.py).
+    """
+    try:
+        cursor.execute("SELECT MIN(acked_id) FROM replication_peers")
+        floor = cursor.fetchone()[0]
+    except sqlite3.OperationalError:
+        floor = None
+    if floor is not None:
+        upto_id = min(upto_id, floor)
+    cursor.execute("DELETE FROM change_log WHERE id <= ?", (upto_id,))
+    return cursor.rowcount
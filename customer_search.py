@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔍 البحث السريع عن العملاء
+Indexed customer search
+
+فهرس FTS5 (trigram) على اسم العميل وجواله، متزامن مع جدول customers
+عبر triggers. يدعم البحث بأي جزء من الاسم أو الرقم (3 أحرف فأكثر)،
+وللنصوص الأقصر يُستخدم بحث البادئة على فهارس الاسم والجوال.
+
+النتائج مرتبة ومحدودة (صفحة واحدة في كل مرة) حتى لا تتجمد الواجهة.
+
+قياس الأداء:
+    python customer_search.py bench [عدد_العملاء]
+"""
+
+import sqlite3
+import time
+
+PAGE_SIZE = 50
+
+# أقصى عدد نتائج لبحث واحد (يُحمَّل على صفحات)
+MAX_RESULTS = 1000
+
+# أقصر نص يمكن لفهرس trigram البحث به
+MIN_FTS_LENGTH = 3
+
+RESULT_COLUMNS = "c.id, c.name, c.phone, c.total_visits, c.loyalty_points"
+
+
+# ==================== إنشاء الفهرس ====================
+
+def fts5_available(cursor):
+    """هل تدعم نسخة SQLite الحالية FTS5 مع trigram؟"""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x, tokenize='trigram')")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_index(cursor):
+    """إنشاء فهرس البحث و triggers المزامنة وتعبئته (خطوة ترحيل)"""
+    if not fts5_available(cursor):
+        print("⚠️ FTS5 غير متوفر - سيُستخدم البحث العادي")
+        return
+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+            name, phone,
+            content='customers', content_rowid='id',
+            tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_fts_insert
+        AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts (rowid, name, phone)
+            VALUES (NEW.id, NEW.name, NEW.phone);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_fts_delete
+        AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, phone)
+            VALUES ('delete', OLD.id, OLD.name, OLD.phone);
+        END
+    ''')
+    # تحديث النقاط والزيارات لا يلمس الفهرس
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_customers_fts_update
+        AFTER UPDATE OF name, phone ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, phone)
+            VALUES ('delete', OLD.id, OLD.name, OLD.phone);
+            INSERT INTO customers_fts (rowid, name, phone)
+            VALUES (NEW.id, NEW.name, NEW.phone);
+        END
+    ''')
+    cursor.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+
+
+def has_index(db):
+    """هل فهرس FTS موجود في قاعدة البيانات؟"""
+    return db.fetchone("SELECT 1 FROM sqlite_master WHERE name='customers_fts'",
+                       op='search_customer') is not None
+
+
+# ==================== البحث ====================
+
+def _fts_phrase(text):
+    """تحويل نص المستخدم إلى عبارة FTS5 حرفية (بدون معاملات البحث)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def search(db, text, limit=PAGE_SIZE, offset=0, use_fts=True):
+    """البحث عن العملاء: (id, name, phone, total_visits, loyalty_points)"""
+    text = text.strip()
+
+    if not text:
+        return db.fetchall(f"""
+            SELECT {RESULT_COLUMNS} FROM customers c
+            ORDER BY c.name LIMIT ? OFFSET ?
+        """, (limit, offset), op='search_customer')
+
+    if use_fts and len(text) >= MIN_FTS_LENGTH:
+        # أفضل MAX_RESULTS تطابق بـ bm25 (والأحدث عند التساوي) داخل استعلام FTS نفسه،
+        # ثم المطابقة التامة للجوال أولاً؛ قصّ الأحدث قبل الترتيب كان يُسقط الأنسب
+        return db.fetchall(f"""
+            WITH hits AS (
+                SELECT rowid, rank FROM customers_fts
+                WHERE customers_fts MATCH :q
+                ORDER BY rank, rowid DESC LIMIT :pool
+            )
+            SELECT {RESULT_COLUMNS}
+            FROM hits JOIN customers c ON c.id = hits.rowid
+            ORDER BY (c.phone = :t) DESC, hits.rank, c.id DESC
+            LIMIT :limit OFFSET :offset
+        """, {'q': _fts_phrase(text), 't': text, 'pool': MAX_RESULTS,
+              'limit': limit, 'offset': offset}, op='search_customer')
+
+    # نص قصير (أو بدون FTS): بحث بالبادئة يستخدم فهرسي الجوال والاسم
+    if use_fts:
+        return db.fetchall(f"""
+            SELECT {RESULT_COLUMNS} FROM customers c
+            WHERE c.id IN (
+                SELECT id FROM customers WHERE phone >= :t AND phone < :t || x'ff'
+                UNION
+                SELECT id FROM customers WHERE name >= :t AND name < :t || x'ff'
+            )
+            ORDER BY c.name LIMIT :limit OFFSET :offset
+        """, {'t': text, 'limit': limit, 'offset': offset}, op='search_customer')
+
+    return db.fetchall(f"""
+        SELECT {RESULT_COLUMNS} FROM customers c
+        WHERE c.name LIKE :p OR c.phone LIKE :p
+        ORDER BY c.name LIMIT :limit OFFSET :offset
+    """, {'p': f'%{text}%', 'limit': limit, 'offset': offset}, op='search_customer')
+
+
+class CustomerSearch:
+    """بحث مع صفحات متتالية (لتحميل المزيد عند التمرير)"""
+
+    def __init__(self, db, page_size=PAGE_SIZE):
+        self.db = db
+        self.page_size = page_size
+        self.use_fts = has_index(db)
+        self.text = ''
+        self.loaded = 0
+        self.exhausted = True
+
+    def start(self, text):
+        """بدء بحث جديد وإرجاع الصفحة الأولى"""
+        self.text = text
+        self.loaded = 0
+        self.exhausted = False
+        return self.next_page()
+
+    def next_page(self):
+        """الصفحة التالية من النتائج (قائمة فارغة عند الانتهاء)"""
+        if self.exhausted:
+            return []
+        rows = search(self.db, self.text, self.page_size, self.loaded, self.use_fts)
+        self.loaded += len(rows)
+        self.exhausted = len(rows) < self.page_size or self.loaded >= MAX_RESULTS
+        return rows
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(customers=1000000, queries=('محمد', '0512', '05000123', 'عبد', 'خالد العتيبي', 'ز')):
+    """قياس زمن البحث بـ LIKE مقارنة بفهرس FTS على عدد كبير من العملاء"""
+    import os
+    import random
+    import tempfile
+    from database import Database
+    from schema import create_tables
+
+    path = os.path.join(tempfile.mkdtemp(), 'search_bench.db')
+    db = Database(path)
+    rng = random.Random(7)
+    first = ['محمد', 'أحمد', 'خالد', 'عبدالله', 'فهد', 'سعد', 'ناصر', 'فيصل', 'عمر', 'يوسف']
+    last = ['العتيبي', 'القحطاني', 'الشمري', 'الدوسري', 'الحربي', 'الغامدي', 'الزهراني']
+
+    with db.transaction() as cursor:
+        create_tables(cursor)
+        print(f"⏳ إنشاء {customers:,} عميل...")
+        cursor.executemany("INSERT INTO customers (name, phone) VALUES (?, ?)",
+                           ((f'{rng.choice(first)} {rng.choice(last)} {i}', f'05{i:08d}')
+                            for i in range(customers)))
+        cursor.execute("CREATE INDEX idx_customers_name ON customers (name)")
+        start = time.perf_counter()
+        create_index(cursor)
+        print(f"🧱 بناء الفهرس: {time.perf_counter() - start:.1f}s")
+
+    for text in queries:
+        timings = {}
+        for label, use_fts in (('LIKE', False), ('FTS', True)):
+            start = time.perf_counter()
+            rows = search(db, text, use_fts=use_fts)
+            timings[label] = (time.perf_counter() - start) * 1000
+        print(f"{text:<16} LIKE={timings['LIKE']:>9.2f}ms  FTS={timings['FTS']:>8.2f}ms  ({len(rows)} نتيجة)")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        print(__doc__)
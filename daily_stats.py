@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 إحصائيات يومية مُجمَّعة مسبقاً
+Materialized daily statistics
+
+جدول daily_stats يحتوي صفاً واحداً لكل يوم، تحدّثه triggers على جدولي
+appointments و sessions عند كل إدخال أو تعديل أو حذف، فتقرأ لوحة التحكم
+صفاً واحداً بالمفتاح الأساسي بدلاً من أربعة استعلامات تجميعية.
+
+جدول daily_customers يحفظ عدد مرات ظهور كل عميل في اليوم حتى يبقى
+"عملاء اليوم" (عدد العملاء المختلفين) صحيحاً عند الإلغاء والحذف.
+
+إعادة الحساب الكامل لفترة (للتحقق أو بعد تعديل يدوي):
+    python daily_stats.py rebuild [من YYYY-MM-DD] [إلى YYYY-MM-DD]
+"""
+
+from datetime import datetime
+
+FIRST_DAY = '0000-01-01'
+LAST_DAY = '9999-12-31'
+
+STATS_COLUMNS = (
+    'appointments_count', 'completed_count', 'sessions_count', 'customers_count',
+    'appointments_revenue', 'sessions_revenue', 'revenue', 'profit',
+)
+
+# يوم الجلسة من وقت الخروج (datetime.now() يُحفظ بالشكل YYYY-MM-DD HH:MM:SS)
+SESSION_DAY = "substr(COALESCE({row}.check_out_time, {row}.created_at), 1, 10)"
+
+
+# ==================== تعريف الجداول والـ triggers ====================
+
+def _appointment_delta(row, sign):
+    """أوامر إضافة (sign=+1) أو طرح (sign=-1) مساهمة موعد في إحصائيات يومه"""
+    completed = f"({row}.status = 'completed')"
+    day = f"{row}.appointment_date"
+    return f"""
+        INSERT INTO daily_stats (day) VALUES ({day}) ON CONFLICT (day) DO NOTHING;
+        UPDATE daily_stats SET
+            appointments_count = appointments_count + ({sign}),
+            completed_count = completed_count + ({sign}) * {completed},
+            appointments_revenue = appointments_revenue + ({sign}) * {completed} * {row}.price,
+            revenue = revenue + ({sign}) * {completed} * {row}.price,
+            profit = profit + ({sign}) * {completed}
+                * ({row}.price - COALESCE({row}.cost, 0) - COALESCE({row}.commission, 0))
+        WHERE day = {day};
+        {_customer_delta(day, row, f"{row}.status != 'cancelled'", sign)}
+    """
+
+
+def _session_delta(row, sign):
+    """أوامر إضافة أو طرح مساهمة جلسة مكتملة في إحصائيات يومها"""
+    completed = f"({row}.status = 'completed')"
+    day = SESSION_DAY.format(row=row)
+    return f"""
+        INSERT INTO daily_stats (day) VALUES ({day}) ON CONFLICT (day) DO NOTHING;
+        UPDATE daily_stats SET
+            sessions_count = sessions_count + ({sign}) * {completed},
+            sessions_revenue = sessions_revenue + ({sign}) * {completed} * {row}.final_price,
+            revenue = revenue + ({sign}) * {completed} * {row}.final_price,
+            profit = profit + ({sign}) * {completed}
+                * ({row}.final_price - COALESCE({row}.total_cost, 0)
+                   - COALESCE({row}.total_commission, 0))
+        WHERE day = {day};
+        {_customer_delta(day, row, completed, sign)}
+    """
+
+
+def _customer_delta(day, row, condition, sign):
+    """تحديث عدّاد ظهور العميل في اليوم ثم عدد العملاء المختلفين"""
+    return f"""
+        INSERT INTO daily_customers (day, customer_id, refs)
+        SELECT {day}, {row}.customer_id, {sign}
+        WHERE {row}.customer_id IS NOT NULL AND {condition}
+        ON CONFLICT (day, customer_id) DO UPDATE SET refs = refs + ({sign});
+        DELETE FROM daily_customers WHERE day = {day} AND refs <= 0;
+        UPDATE daily_stats
+        SET customers_count = (SELECT COUNT(*) FROM daily_customers WHERE day = {day})
+        WHERE day = {day};
+    """
+
+
+def schema_statements():
+    """أوامر إنشاء الجداول والـ triggers (تُستخدم في الترحيلات)"""
+    watched_appointments = 'appointment_date, status, price, cost, commission, customer_id'
+    watched_sessions = 'check_out_time, status, final_price, total_cost, total_commission, customer_id'
+    return [
+        '''CREATE TABLE IF NOT EXISTS daily_stats (
+               day TEXT PRIMARY KEY,
+               appointments_count INTEGER NOT NULL DEFAULT 0,
+               completed_count INTEGER NOT NULL DEFAULT 0,
+               sessions_count INTEGER NOT NULL DEFAULT 0,
+               customers_count INTEGER NOT NULL DEFAULT 0,
+               appointments_revenue REAL NOT NULL DEFAULT 0,
+               sessions_revenue REAL NOT NULL DEFAULT 0,
+               revenue REAL NOT NULL DEFAULT 0,
+               profit REAL NOT NULL DEFAULT 0
+           ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS daily_customers (
+               day TEXT NOT NULL,
+               customer_id INTEGER NOT NULL,
+               refs INTEGER NOT NULL,
+               PRIMARY KEY (day, customer_id)
+           ) WITHOUT ROWID''',
+
+        f'''CREATE TRIGGER IF NOT EXISTS trg_daily_stats_appointment_insert
+            AFTER INSERT ON appointments BEGIN
+            {_appointment_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_daily_stats_appointment_update
+            AFTER UPDATE OF {watched_appointments} ON appointments BEGIN
+            {_appointment_delta('OLD', -1)}
+            {_appointment_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_daily_stats_appointment_delete
+            AFTER DELETE ON appointments BEGIN
+            {_appointment_delta('OLD', -1)}
+            END''',
+
+        f'''CREATE TRIGGER IF NOT EXISTS trg_daily_stats_session_insert
+            AFTER INSERT ON sessions BEGIN
+            {_session_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_daily_stats_session_update
+            AFTER UPDATE OF {watched_sessions} ON sessions BEGIN
+            {_session_delta('OLD', -1)}
+            {_session_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_daily_stats_session_delete
+            AFTER DELETE ON sessions BEGIN
+            {_session_delta('OLD', -1)}
+            END''',
+
+        rebuild,
+    ]
+
+
+# ==================== إعادة الحساب ====================
+
+def rebuild(cursor, start=FIRST_DAY, end=LAST_DAY):
+    """إعادة حساب إحصائيات فترة كاملة من الجداول الأصلية (استعلامات مجمّعة)"""
+    session_day = SESSION_DAY.format(row='s')
+    # حدود الجلسات على check_out_time حتى يُستخدم الفهرس ('~' أكبر من أي وقت بعد التاريخ)
+    session_range = f"""((s.check_out_time >= :start AND s.check_out_time < :end || '~')
+        OR (s.check_out_time IS NULL AND {session_day} BETWEEN :start AND :end))"""
+    params = {'start': start, 'end': end}
+
+    cursor.execute("DELETE FROM daily_stats WHERE day BETWEEN :start AND :end", params)
+    cursor.execute("DELETE FROM daily_customers WHERE day BETWEEN :start AND :end", params)
+
+    cursor.execute(f"""
+        INSERT INTO daily_customers (day, customer_id, refs)
+        SELECT day, customer_id, COUNT(*) FROM (
+            SELECT a.appointment_date AS day, a.customer_id
+            FROM appointments a
+            WHERE a.appointment_date BETWEEN :start AND :end
+              AND a.status != 'cancelled' AND a.customer_id IS NOT NULL
+            UNION ALL
+            SELECT {session_day}, s.customer_id
+            FROM sessions s
+            WHERE {session_range}
+              AND s.status = 'completed' AND s.customer_id IS NOT NULL
+        )
+        GROUP BY day, customer_id
+    """, params)
+
+    cursor.execute(f"""
+        INSERT INTO daily_stats (
+            day, appointments_count, completed_count, sessions_count,
+            appointments_revenue, sessions_revenue, revenue, profit)
+        SELECT day, SUM(app_count), SUM(done_count), SUM(ses_count),
+               SUM(app_revenue), SUM(ses_revenue), SUM(app_revenue + ses_revenue), SUM(profit)
+        FROM (
+            SELECT a.appointment_date AS day,
+                   COUNT(*) AS app_count,
+                   SUM(a.status = 'completed') AS done_count,
+                   0 AS ses_count,
+                   SUM(CASE WHEN a.status = 'completed' THEN a.price ELSE 0 END) AS app_revenue,
+                   0 AS ses_revenue,
+                   SUM(CASE WHEN a.status = 'completed'
+                       THEN a.price - COALESCE(a.cost, 0) - COALESCE(a.commission, 0)
+                       ELSE 0 END) AS profit
+            FROM appointments a
+            WHERE a.appointment_date BETWEEN :start AND :end
+            GROUP BY a.appointment_date
+            UNION ALL
+            SELECT {session_day}, 0, 0, COUNT(*), 0, SUM(s.final_price),
+                   SUM(s.final_price - COALESCE(s.total_cost, 0) - COALESCE(s.total_commission, 0))
+            FROM sessions s
+            WHERE {session_range} AND s.status = 'completed'
+            GROUP BY {session_day}
+        ) t
+        GROUP BY day
+    """, params)
+
+    cursor.execute("""
+        UPDATE daily_stats
+        SET customers_count = (SELECT COUNT(*) FROM daily_customers dc
+                               WHERE dc.day = daily_stats.day)
+        WHERE day BETWEEN :start AND :end
+    """, params)
+
+
+def rebuild_range(db, start=FIRST_DAY, end=LAST_DAY):
+    """إعادة الحساب داخل معاملة واحدة"""
+    with db.transaction('rebuild_daily_stats') as cursor:
+        rebuild(cursor, start, end)
+
+
+# ==================== القراءة ====================
+
+def read_day(db, day=None):
+    """إحصائيات يوم واحد (قراءة واحدة بالمفتاح الأساسي)"""
+    day = day or datetime.now().strftime('%Y-%m-%d')
+    row = db.fetchone(f"SELECT {', '.join(STATS_COLUMNS)} FROM daily_stats WHERE day=?",
+                      (day,), op='read_daily_stats')
+    return dict(zip(STATS_COLUMNS, row or (0,) * len(STATS_COLUMNS)))
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        start = sys.argv[2] if len(sys.argv) > 2 else FIRST_DAY
+        end = sys.argv[3] if len(sys.argv) > 3 else start if len(sys.argv) > 2 else LAST_DAY
+        db = Database('database/barbershop.db')
+        rebuild_range(db, start, end)
+        db.print_latency_report()
+        db.close()
+        print(f"✅ تمت إعادة حساب الإحصائيات من {start} إلى {end}")
+    else:
+        print(__doc__)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗄️ طبقة الوصول لقاعدة البيانات
+Database access layer
+
+اتصال SQLite دائم لكل خيط (بدلاً من فتح وإغلاق اتصال في كل دالة)
+مع تفعيل WAL وضبط الأداء وقياس زمن كل عملية.
+
+معاملات الكتابة تبدأ بـ BEGIN IMMEDIATE (حجز قفل الكتابة من البداية) مع
+إعادة محاولة محدودة وتراجع تدريجي عشوائي إن كان جهاز آخر يكتب، فلا يظهر
+"database is locked" عند استخدام عدة أجهزة لنفس الملف. المعاملة المؤجلة
+(BEGIN) كانت تقرأ ثم تفشل فوراً عند أول كتابة إن سبقها جهاز آخر.
+
+عدة أجهزة على ملف مشترك عبر الشبكة: WAL لا يعمل على مجلدات الشبكة، فيجب
+تشغيل كل الأجهزة مع BARBERSHOP_SHARED_DB=1 (سجل تراجع بدل WAL).
+
+الاستخدام:
+    db = Database('database/barbershop.db')
+    rows = db.fetchall("SELECT ...", params, op='load_appointments')
+    with db.transaction('save_appointment') as cursor:
+        cursor.execute("INSERT ...")
+
+قياس الأداء (قبل/بعد):
+    python database.py bench [عدد_التكرارات]
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# ==================== إعدادات الأداء ====================
+PRAGMAS = {
+    'journal_mode': 'WAL',       # القراء لا يحجبون الكاتب
+    'synchronous': 'NORMAL',     # آمن مع WAL وأسرع بكثير من FULL
+    'busy_timeout': 5000,        # انتظار القفل (ميلي ثانية) بدل الفشل الفوري
+    'cache_size': -20000,        # ~20MB ذاكرة مؤقتة للصفحات (القيمة السالبة = KB)
+    'temp_store': 'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+# ملف مشترك بين عدة أجهزة عبر الشبكة (BARBERSHOP_SHARED_DB=1)
+ENV_SHARED = 'BARBERSHOP_SHARED_DB'
+SHARED_PRAGMAS = {
+    'journal_mode': 'DELETE',    # WAL يحتاج ذاكرة مشتركة على نفس الجهاز
+    'synchronous': 'FULL',
+    'busy_timeout': 1000,        # الانتظار الأطول عبر إعادة المحاولة أدناه
+}
+
+# إعادة محاولة بدء المعاملة أو حفظها إن كانت القاعدة مقفلة من اتصال آخر
+BUSY_RETRIES = 6
+BUSY_BACKOFF = 0.05             # ثوانٍ، تتضاعف مع كل محاولة
+BUSY_BACKOFF_MAX = 1.0
+# أقصى انتظار للقفل في المعاملة كلها (BEGIN و COMMIT معاً، مع busy_timeout)،
+# أقل من مهلة الكتابة في api.py حتى يصل DatabaseBusyError قبلها
+BUSY_WAIT_MAX = 10.0
+
+# عدد القياسات المحفوظة لكل عملية
+TIMINGS_WINDOW = 1000
+
+
+class DatabaseBusyError(sqlite3.OperationalError):
+    """القاعدة بقيت مقفلة من جهاز آخر بعد كل المحاولات"""
+
+
+def _is_busy(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class Database:
+    """اتصال دائم لكل خيط مع قياس زمن العمليات"""
+
+    def __init__(self, path, pragmas=None):
+        self.path = path
+        self.pragmas = dict(PRAGMAS)
+        if os.environ.get(ENV_SHARED, '').strip().lower() in ('1', 'true', 'yes', 'on'):
+            self.pragmas.update(SHARED_PRAGMAS)
+        if pragmas:
+            self.pragmas.update(pragmas)
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self.timings = defaultdict(lambda: deque(maxlen=TIMINGS_WINDOW))
+        # مرات انتظار القفل (إعادة المحاولة) وعدد المعاملات المحفوظة من هذا الكائن
+        self.busy_retries = 0
+        self.commits = 0
+        # متتبع SQL اختياري (instrumentation.Tracer)، None = بدون أي تكلفة
+        self.tracer = None
+
+    # ==================== الاتصالات ====================
+
+    def _connect(self):
+        """فتح اتصال جديد وتطبيق الإعدادات"""
+        # isolation_level=None: القراءة بدون معاملة مفتوحة، والكتابة عبر transaction()
+        conn = sqlite3.connect(self.path, isolation_level=None,
+                               check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        if self.tracer is not None:
+            conn.set_trace_callback(self.tracer.on_statement)
+        return conn
+
+    def connection(self):
+        """الاتصال الخاص بالخيط الحالي (يُنشأ مرة واحدة فقط)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """إغلاق جميع الاتصالات المفتوحة"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+    # ==================== الاستعلامات ====================
+
+    @contextmanager
+    def timed(self, op):
+        """قياس زمن عملية وتسجيله"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[op].append(time.perf_counter() - start)
+            if self.tracer is not None:
+                self.tracer.finish()
+
+    def execute(self, sql, params=(), op='query'):
+        """تنفيذ استعلام وإرجاع المؤشر"""
+        with self.timed(op):
+            return self.connection().execute(sql, params)
+
+    def fetchone(self, sql, params=(), op='query'):
+        """إرجاع صف واحد"""
+        with self.timed(op):
+            return self.connection().execute(sql, params).fetchone()
+
+    def fetchall(self, sql, params=(), op='query'):
+        """إرجاع جميع الصفوف"""
+        with self.timed(op):
+            return self.connection().execute(sql, params).fetchall()
+
+    def fetchvalue(self, sql, params=(), op='query', default=None):
+        """إرجاع أول عمود من أول صف"""
+        row = self.fetchone(sql, params, op)
+        return row[0] if row else default
+
+    def _retry_busy(self, conn, deadline, fn, *args):
+        """تنفيذ fn مع إعادة المحاولة إن كانت القاعدة مقفلة (تراجع تدريجي عشوائي)
+
+        كل الانتظار، داخل SQLite (busy_timeout) وبين المحاولات، ينتهي عند deadline:
+        busy_timeout يُقصَّر للوقت المتبقي ثم يُعاد بعد المحاولة.
+        """
+        busy_timeout = float(self.pragmas.get('busy_timeout', 0)) / 1000
+        shortened = False
+        try:
+            for attempt in range(BUSY_RETRIES + 1):
+                remaining = deadline - time.monotonic()
+                if busy_timeout > remaining:
+                    conn.execute(f"PRAGMA busy_timeout={max(0, int(remaining * 1000))}")
+                    shortened = True
+                try:
+                    return fn(*args)
+                except sqlite3.OperationalError as e:
+                    if not _is_busy(e):
+                        raise
+                    remaining = deadline - time.monotonic()
+                    if attempt == BUSY_RETRIES or remaining <= 0:
+                        raise DatabaseBusyError(
+                            "قاعدة البيانات مشغولة من جهاز آخر، حاول مرة أخرى") from e
+                    with self._lock:
+                        self.busy_retries += 1
+                    delay = min(BUSY_BACKOFF_MAX, BUSY_BACKOFF * 2 ** attempt)
+                    time.sleep(min(remaining, delay * random.uniform(0.5, 1.5)))
+        finally:
+            if shortened:
+                conn.execute(f"PRAGMA busy_timeout={self.pragmas['busy_timeout']}")
+
+    @contextmanager
+    def transaction(self, op='transaction'):
+        """معاملة كتابة: commit عند النجاح و rollback عند الخطأ
+
+        BEGIN IMMEDIATE: قفل الكتابة محجوز قبل أول قراءة، فلا يقرأ جهازان نفس
+        القيمة ثم يكتب كل منهما فوق الآخر.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            # معاملة متداخلة: تنضم للمعاملة الخارجية
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        with self.timed(op):
+            cursor = conn.cursor()
+            # مهلة انتظار واحدة للمعاملة: COMMIT ينتظر ما تبقى منها بعد BEGIN
+            # (زمن تنفيذ المعاملة نفسها لا يُحسب)
+            started = time.monotonic()
+            self._retry_busy(conn, started + BUSY_WAIT_MAX, cursor.execute, "BEGIN IMMEDIATE")
+            waited = time.monotonic() - started
+            try:
+                yield cursor
+                # COMMIT المقفل (سجل التراجع) يبقي المعاملة مفتوحة ويمكن إعادته
+                self._retry_busy(conn, time.monotonic() + BUSY_WAIT_MAX - waited, conn.commit)
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                with self._lock:
+                    self.commits += 1
+            finally:
+                cursor.close()
+
+    # ==================== التقارير ====================
+
+    def latency_report(self):
+        """ملخص زمن كل عملية بالميلي ثانية"""
+        report = {}
+        for op, samples in self.timings.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            report[op] = {
+                'count': len(ordered),
+                'avg_ms': sum(ordered) / len(ordered) * 1000,
+                'p50_ms': ordered[len(ordered) // 2] * 1000,
+                'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                'max_ms': ordered[-1] * 1000,
+            }
+        return report
+
+    def print_latency_report(self):
+        """طباعة ملخص الأزمنة"""
+        for op, stats in sorted(self.latency_report().items()):
+            print(f"{op:<28} n={stats['count']:<6} avg={stats['avg_ms']:.3f}ms "
+                  f"p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms")
+
+
+# ==================== قياس قبل/بعد ====================
+
+def benchmark_connections(path, iterations=500):
+    """مقارنة فتح اتصال لكل عملية (الطريقة القديمة) مع الاتصال الدائم"""
+    read_sql = "SELECT id, name FROM barbers WHERE status='active' ORDER BY name"
+    write_sql = "INSERT OR REPLACE INTO settings (key, value) VALUES ('bench_key', ?)"
+
+    # قبل: اتصال جديد لكل عملية
+    before = Database(path, pragmas={})
+    for i in range(iterations):
+        with before.timed('read (connect/close)'):
+            conn = sqlite3.connect(path)
+            conn.execute(read_sql).fetchall()
+            conn.close()
+        with before.timed('write (connect/close)'):
+            conn = sqlite3.connect(path)
+            conn.execute(write_sql, (str(i),))
+            conn.commit()
+            conn.close()
+
+    # بعد: اتصال دائم مع WAL
+    after = Database(path)
+    for i in range(iterations):
+        after.fetchall(read_sql, op='read (persistent)')
+        with after.transaction('write (persistent)') as cursor:
+            cursor.execute(write_sql, (str(i),))
+    after.connection().execute("DELETE FROM settings WHERE key='bench_key'")
+    after.close()
+
+    print("⏱️ قبل (اتصال لكل عملية):")
+    before.print_latency_report()
+    print("⏱️ بعد (اتصال دائم + WAL):")
+    after.print_latency_report()
+    return before.latency_report(), after.latency_report()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+        benchmark_connections('database/barbershop.db', count)
+    else:
+        print(__doc__)
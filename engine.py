@@ -0,0 +1,694 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⚙️ محرك الحجز والمحاسبة (بدون واجهة)
+Headless booking engine
+
+منطق الحجز والجلسات الفورية وحساب العمولة ونقاط الولاء وتغيير حالات
+المواعيد والإحصائيات، منفصلاً عن tkinter حتى يمكن تشغيله من السكربتات
+والاختبارات وأدوات القياس، وتكون الواجهة مجرد عميل له.
+
+مثال:
+    db = Database('database/barbershop.db')
+    booking = BookingService(db)
+    result = booking.book(BookingRequest(
+        customer_name='علي', phone='0550000000',
+        barber_id=1, barber_name='خالد محمد',
+        service_id=1, service_name='قص شعر عادي',
+        date='2025-01-15', time='10:00', price=40))
+    print(result.appointment_number)
+
+قياس الأداء (حجوزات وجلسات في الثانية):
+    python engine.py bench [العدد]
+"""
+
+import json
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+import daily_stats
+from sequences import next_number, APPOINTMENT_PREFIX, SESSION_PREFIX
+
+# كل 10 ريال = 1 نقطة
+LOYALTY_POINTS_PER_RIYAL = 0.1
+
+DEFAULT_PAYMENT_METHOD = 'نقدي'
+
+# الحالات التي يُسمح بالانتقال منها إلى كل حالة
+TRANSITIONS = {
+    'confirmed': ('pending',),
+    'completed': ('pending', 'confirmed'),
+    'cancelled': ('pending', 'confirmed'),
+    'no_show': ('pending', 'confirmed'),
+}
+
+# عدد المعرفات في كل IN (...) عند قراءة دفعة مواعيد (حد متغيرات SQLite)
+BATCH_CHUNK = 500
+
+
+class BookingError(Exception):
+    """خطأ في بيانات الحجز أو حالة الموعد"""
+
+
+class StaleStatusError(BookingError):
+    """حالة الموعد ليست كما يعرضها الجهاز (غيّرها جهاز آخر) أو لا تسمح بالتغيير"""
+
+    def __init__(self, appointment_id, current, status, expected=None):
+        self.appointment_id = appointment_id
+        self.current = current
+        self.status = status
+        self.expected = expected
+        if expected is not None and current != expected:
+            message = (f"الموعد تغيّر من جهاز آخر: حالته الآن {current} "
+                       f"(المعروض {expected})")
+        else:
+            message = f"لا يمكن تغيير موعد حالته {current} إلى {status}"
+        super().__init__(message)
+
+
+# ==================== المدخلات والمخرجات ====================
+
+@dataclass
+class BookingRequest:
+    """طلب حجز موعد"""
+    customer_name: str
+    phone: str
+    barber_id: int
+    barber_name: str
+    service_id: int
+    service_name: str
+    date: str
+    time: str
+    price: float
+    payment_method: str = DEFAULT_PAYMENT_METHOD
+    notes: str = ''
+
+
+@dataclass
+class BookingResult:
+    """نتيجة الحجز"""
+    appointment_id: int
+    appointment_number: str
+    customer_id: int
+    commission: float
+
+
+@dataclass
+class CheckoutRequest:
+    """جلسة فورية (بدون موعد مسبق)"""
+    customer_name: str
+    phone: str
+    barber_id: int
+    barber_name: str
+    service_id: int
+    service_name: str
+    price: float
+    payment_method: str = DEFAULT_PAYMENT_METHOD
+
+
+@dataclass
+class CheckoutResult:
+    """نتيجة الجلسة"""
+    session_id: int
+    session_number: str
+    customer_id: int
+    points_earned: int
+    total_points: int
+    commission: float
+
+
+@dataclass
+class DailyStats:
+    """إحصائيات يوم واحد"""
+    day: str
+    appointments_count: int = 0
+    completed_count: int = 0
+    sessions_count: int = 0
+    customers_count: int = 0
+    appointments_revenue: float = 0
+    sessions_revenue: float = 0
+    revenue: float = 0
+    profit: float = 0
+
+
+@dataclass
+class StatusChange:
+    """نتيجة تغيير حالة موعد"""
+    appointment_id: int
+    status: str
+    points_earned: int = 0
+    customer_id: Optional[int] = None
+
+
+@dataclass
+class BatchChange:
+    """نتيجة تغيير حالة عدة مواعيد في معاملة واحدة"""
+    status: str
+    changed: list = field(default_factory=list)
+    # المعرف -> الحالة الحالية التي منعت التغيير (None: الموعد غير موجود)
+    skipped: dict = field(default_factory=dict)
+    points_earned: int = 0
+
+
+# ==================== الحسابات ====================
+
+def commission_for(price, service_rate, barber_rate):
+    """العمولة: نسبة الخدمة إن وُجدت وإلا نسبة الحلاق"""
+    rate = service_rate if service_rate else barber_rate
+    return float(price) * ((rate or 0) / 100)
+
+
+def loyalty_points_for(price):
+    """نقاط الولاء المكتسبة لمبلغ معيّن"""
+    return int(float(price) * LOYALTY_POINTS_PER_RIYAL)
+
+
+def add_completion_counters(cursor, completions, sign=1):
+    """عدّادات العملاء والحلاقين لمواعيد مكتملة: UPDATE واحد لكل عميل وحلاق
+
+    completions: (customer_id, barber_id, price, visited_at). sign=-1 يعكسها
+    (حذف موعد مكتمل) ولا يغيّر last_visit. يُرجع مجموع النقاط (بالإشارة).
+    القاعدة نفسها في الإنهاء والحذف والدفعات والاستيراد، وتطابق reconcile.
+    """
+    customers = defaultdict(lambda: [0, 0.0, 0, None])
+    barbers = defaultdict(lambda: [0, 0.0])
+    for customer_id, barber_id, price, visited_at in completions:
+        if customer_id:
+            totals = customers[customer_id]
+            totals[0] += 1
+            totals[1] += float(price)
+            totals[2] += loyalty_points_for(price)
+            if sign > 0 and visited_at is not None:
+                visited_at = str(visited_at)
+                totals[3] = max(totals[3] or visited_at, visited_at)
+        totals = barbers[barber_id]
+        totals[0] += 1
+        totals[1] += float(price)
+
+    # MAX(..., NULL) = NULL فيبقى last_visit كما هو عند الحذف
+    cursor.executemany("""
+        UPDATE customers
+        SET total_visits = total_visits + ?,
+            total_spent = total_spent + ?,
+            loyalty_points = loyalty_points + ?,
+            last_visit = COALESCE(MAX(COALESCE(last_visit, ''), ?), last_visit)
+        WHERE id = ?
+    """, [(sign * visits, sign * spent, sign * points, last, customer_id)
+          for customer_id, (visits, spent, points, last) in customers.items()])
+    cursor.executemany("""
+        UPDATE barbers
+        SET total_services = total_services + ?,
+            total_revenue = total_revenue + ?
+        WHERE id = ?
+    """, [(sign * services, sign * revenue, barber_id)
+          for barber_id, (services, revenue) in barbers.items()])
+    return sign * sum(points for _, _, points, _ in customers.values())
+
+
+def find_or_create_customer(cursor, name, phone):
+    """(customer_id, loyalty_points) للعميل بالجوال، مع إضافته إن لم يوجد"""
+    cursor.execute("SELECT id, loyalty_points FROM customers WHERE phone=?", (phone,))
+    customer = cursor.fetchone()
+    if customer:
+        return customer[0], customer[1]
+
+    cursor.execute("INSERT INTO customers (name, phone) VALUES (?, ?)", (name, phone))
+    return cursor.lastrowid, 0
+
+
+def _service_and_barber(cursor, service_id, barber_id, reference=None):
+    """(duration, cost, service_rate, barber_rate) مع التحقق من وجودهما
+
+    مع reference (ReferenceData) تُقرأ من الذاكرة بدلاً من قاعدة البيانات.
+    """
+    if reference is not None:
+        service = reference.service(service_id)
+        barber = reference.barber(barber_id)
+        service = service and (service.duration, service.cost, service.commission_rate)
+        barber = barber and (barber.commission_rate,)
+    else:
+        cursor.execute("SELECT duration, cost, commission_rate FROM services WHERE id=?", (service_id,))
+        service = cursor.fetchone()
+        cursor.execute("SELECT commission_rate FROM barbers WHERE id=?", (barber_id,))
+        barber = cursor.fetchone()
+
+    if not service:
+        raise BookingError(f"الخدمة #{service_id} غير موجودة")
+    if not barber:
+        raise BookingError(f"الحلاق #{barber_id} غير موجود")
+
+    return service[0], service[1], service[2], barber[0]
+
+
+def _require(request, *names):
+    """التحقق من الحقول المطلوبة"""
+    missing = [name for name in names if getattr(request, name) in (None, '')]
+    if missing:
+        raise BookingError(f"حقول مطلوبة ناقصة: {', '.join(missing)}")
+
+
+# ==================== الخدمات ====================
+
+class BookingService:
+    """حجز المواعيد وتغيير حالاتها
+
+    مع availability (availability.Availability) يُرفض الحجز المتداخل مع موعد
+    آخر للحلاق داخل معاملة الحجز، ويُحدَّث فهرس الأوقات بعد كل تغيير.
+    """
+
+    def __init__(self, db, reference=None, availability=None):
+        self.db = db
+        self.reference = reference
+        self.availability = availability
+
+    def book(self, request):
+        """حجز موعد جديد في معاملة واحدة"""
+        booked = []
+        with self.db.transaction('save_appointment') as cursor:
+            result = self._book(cursor, request, booked)
+        self._index(booked)
+        return result
+
+    def book_many(self, requests):
+        """حجز عدة مواعيد في معاملة واحدة"""
+        booked = []
+        with self.db.transaction('book_many') as cursor:
+            results = [self._book(cursor, request, booked) for request in requests]
+        self._index(booked)
+        return results
+
+    def _index(self, booked):
+        # بعد نجاح المعاملة فقط
+        if self.availability is not None:
+            for args in booked:
+                self.availability.add(*args)
+
+    def _book(self, cursor, request, booked):
+        _require(request, 'customer_name', 'phone', 'barber_id', 'service_id',
+                 'date', 'time', 'price')
+
+        # توليد رقم الموعد (أول كتابة في المعاملة)
+        app_number = next_number(cursor, APPOINTMENT_PREFIX)
+
+        customer_id, _ = find_or_create_customer(cursor, request.customer_name, request.phone)
+        duration, cost, service_rate, barber_rate = _service_and_barber(
+            cursor, request.service_id, request.barber_id, self.reference)
+        commission = commission_for(request.price, service_rate, barber_rate)
+
+        if self.availability is not None:
+            # قفل الكتابة محجوز منذ next_number: لا حجز آخر بين التحقق والإدخال
+            self.availability.check_free(cursor, request.barber_id, request.date,
+                                         request.time, duration)
+
+        cursor.execute("""
+            INSERT INTO appointments (
+                appointment_number, customer_id, customer_name, phone,
+                barber_id, barber_name, service_id, service_name,
+                appointment_date, appointment_time, duration,
+                status, price, cost, commission, payment_method, notes
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?, ?, ?)
+        """, (app_number, customer_id, request.customer_name, request.phone,
+              request.barber_id, request.barber_name, request.service_id, request.service_name,
+              request.date, request.time, duration, float(request.price), cost, commission,
+              request.payment_method, request.notes))
+
+        booked.append((cursor.lastrowid, request.barber_id, request.date, request.time, duration))
+        return BookingResult(cursor.lastrowid, app_number, customer_id, commission)
+
+    def _transition(self, cursor, appointment_id, status, expected=None,
+                    assignments='', params=()):
+        """تغيير الحالة بشرط الحالة السابقة (UPDATE ... WHERE status IN ...)
+
+        expected: الحالة التي يعرضها الجهاز؛ إن تغيّرت منذ ذلك (من جهاز آخر)
+        يُرفض التغيير بـ StaleStatusError بدل الكتابة فوقها.
+        """
+        allowed = TRANSITIONS[status]
+        if expected is not None:
+            allowed = (expected,) if expected in allowed else ()
+        if allowed:
+            cursor.execute(f"""
+                UPDATE appointments SET status=?{assignments}
+                WHERE id=? AND status IN ({', '.join('?' * len(allowed))})
+            """, (status, *params, appointment_id, *allowed))
+            if cursor.rowcount == 1:
+                return
+
+        cursor.execute("SELECT status FROM appointments WHERE id=?", (appointment_id,))
+        row = cursor.fetchone()
+        if row is None:
+            raise BookingError("الموعد غير موجود")
+        raise StaleStatusError(appointment_id, row[0], status, expected)
+
+    def confirm(self, appointment_id, expected=None):
+        """تأكيد موعد معلق"""
+        with self.db.transaction('confirm_appointment') as cursor:
+            self._transition(cursor, appointment_id, 'confirmed', expected)
+        return StatusChange(appointment_id, 'confirmed')
+
+    def complete(self, appointment_id, expected=None):
+        """إنهاء موعد: الدفع وتحديث زيارات العميل ونقاطه
+
+        النقاط تُضاف فقط إن نجح تغيير الحالة نفسه، فإنهاء الموعد من جهازين
+        لا يضيفها مرتين.
+        """
+        now = datetime.now()
+        with self.db.transaction('complete_appointment') as cursor:
+            self._transition(cursor, appointment_id, 'completed', expected,
+                             ", completed_at=?, payment_status='paid'", (now,))
+            cursor.execute("SELECT customer_id, barber_id, price FROM appointments WHERE id=?",
+                           (appointment_id,))
+            customer_id, barber_id, price = cursor.fetchone()
+            points_earned = add_completion_counters(cursor,
+                                                    [(customer_id, barber_id, price, now)])
+
+        if self.availability is not None:
+            self.availability.release(appointment_id, now)
+        return StatusChange(appointment_id, 'completed', points_earned, customer_id)
+
+    def cancel(self, appointment_id, expected=None):
+        """إلغاء موعد معلق أو مؤكد"""
+        with self.db.transaction('cancel_appointment') as cursor:
+            self._transition(cursor, appointment_id, 'cancelled', expected)
+        if self.availability is not None:
+            self.availability.remove(appointment_id)
+        return StatusChange(appointment_id, 'cancelled')
+
+    def delete(self, appointment_id, expected=None):
+        """حذف موعد نهائياً (بحالته المعروضة expected إن مُرِّرت)
+
+        حذف موعد مكتمل يطرح ما أضافه إنهاؤه من عدّادات العميل والحلاق.
+        """
+        with self.db.transaction('delete_appointment') as cursor:
+            cursor.execute("SELECT status, customer_id, barber_id, price FROM appointments "
+                           "WHERE id=?", (appointment_id,))
+            row = cursor.fetchone()
+            if expected is None:
+                cursor.execute("DELETE FROM appointments WHERE id=?", (appointment_id,))
+            else:
+                cursor.execute("DELETE FROM appointments WHERE id=? AND status=?",
+                               (appointment_id, expected))
+            if cursor.rowcount != 1:
+                cursor.execute("SELECT status FROM appointments WHERE id=?", (appointment_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    raise BookingError("الموعد غير موجود")
+                raise StaleStatusError(appointment_id, row[0], 'deleted', expected)
+
+            status, customer_id, barber_id, price = row
+            if status == 'completed':
+                # حذف المكتمل يطرح ما أضافه إنهاؤه
+                add_completion_counters(cursor, [(customer_id, barber_id, price, None)], -1)
+        if self.availability is not None:
+            self.availability.remove(appointment_id)
+        return StatusChange(appointment_id, 'deleted')
+
+    # ==================== الدفعات ====================
+
+    def confirm_many(self, items):
+        """تأكيد عدة مواعيد في معاملة واحدة (انظر _change_many)"""
+        return self._change_many('confirmed', items)
+
+    def complete_many(self, items):
+        """إنهاء عدة مواعيد مع تحديث عدّادات العملاء والحلاقين دفعة واحدة"""
+        return self._change_many('completed', items)
+
+    def cancel_many(self, items):
+        """إلغاء عدة مواعيد في معاملة واحدة"""
+        return self._change_many('cancelled', items)
+
+    def no_show_many(self, items):
+        """تسجيل عدة مواعيد غائبة في معاملة واحدة"""
+        return self._change_many('no_show', items)
+
+    def delete_many(self, items):
+        """حذف عدة مواعيد نهائياً (مع عكس عدّادات المكتمل منها)"""
+        return self._change_many('deleted', items)
+
+    def no_show_past_due(self, day=None, now=None, statuses=('pending',)):
+        """كل مواعيد اليوم التي انتهى وقتها ولم تُنهَ -> غائب، في معاملة واحدة"""
+        now = now or datetime.now()
+        day = day or now.strftime('%Y-%m-%d')
+        with self.db.transaction('no_show_past_due') as cursor:
+            cursor.execute(f"""
+                SELECT id, status FROM appointments
+                WHERE appointment_date = ? AND status IN ({', '.join('?' * len(statuses))})
+                  AND datetime(appointment_date || ' ' || appointment_time,
+                               '+' || COALESCE(duration, 0) || ' minutes') <= ?
+            """, (day, *statuses, now.strftime('%Y-%m-%d %H:%M:%S')))
+            result = self._apply_many(cursor, 'no_show', cursor.fetchall(), now)
+        self._release_many(result, now)
+        return result
+
+    def _change_many(self, status, items):
+        """تغيير حالة عدة مواعيد في معاملة واحدة
+
+        items: معرفات، أو أزواج (المعرف، الحالة المعروضة) ليُتخطى ما غيّره جهاز
+        آخر. ما لا يسمح بالتغيير يُتخطى ويُذكر في skipped بدل إلغاء الدفعة كلها.
+        """
+        # معرفات الجدول في Tk نصوص، وقد تأتي أرقام numpy من التقارير
+        items = [(int(item[0]), item[1]) if isinstance(item, (tuple, list)) else (int(item), None)
+                 for item in items]
+        now = datetime.now()
+        with self.db.transaction(f'{status}_many') as cursor:
+            result = self._apply_many(cursor, status, items, now)
+        self._release_many(result, now)
+        return result
+
+    def _apply_many(self, cursor, status, items, now):
+        result = BatchChange(status)
+        items = dict(items)
+        ids = list(items)
+        rows = {}
+        for i in range(0, len(ids), BATCH_CHUNK):
+            chunk = ids[i:i + BATCH_CHUNK]
+            cursor.execute(f"""
+                SELECT id, status, customer_id, barber_id, price FROM appointments
+                WHERE id IN ({', '.join('?' * len(chunk))})
+            """, chunk)
+            rows.update((row[0], row) for row in cursor.fetchall())
+
+        # الحذف مسموح من أي حالة؛ قفل الكتابة محجوز فلا تتغير الصفوف بعد قراءتها
+        allowed = TRANSITIONS.get(status)
+        eligible = []
+        for appointment_id, expected in items.items():
+            row = rows.get(appointment_id)
+            current = row[1] if row else None
+            if row is None or (expected is not None and current != expected) \
+                    or (allowed is not None and current not in allowed):
+                result.skipped[appointment_id] = current
+            else:
+                eligible.append(row)
+
+        if status == 'deleted':
+            cursor.executemany("DELETE FROM appointments WHERE id=? AND status=?",
+                               [(row[0], row[1]) for row in eligible])
+            # حذف المكتمل يطرح ما أضافه إنهاؤه
+            add_completion_counters(cursor, [(*row[2:], None) for row in eligible
+                                             if row[1] == 'completed'], -1)
+        else:
+            assignments, params = '', ()
+            if status == 'completed':
+                assignments, params = ", completed_at=?, payment_status='paid'", (now,)
+            cursor.executemany(f"""
+                UPDATE appointments SET status=?{assignments} WHERE id=? AND status=?
+            """, [(status, *params, row[0], row[1]) for row in eligible])
+            if status == 'completed':
+                result.points_earned = add_completion_counters(
+                    cursor, [(*row[2:], now) for row in eligible])
+
+        result.changed = [row[0] for row in eligible]
+        return result
+
+    def _release_many(self, result, now):
+        # بعد نجاح المعاملة فقط
+        if self.availability is None:
+            return
+        for appointment_id in result.changed:
+            if result.status == 'completed':
+                self.availability.release(appointment_id, now)
+            elif result.status != 'confirmed':
+                self.availability.remove(appointment_id)
+
+
+class CheckoutService:
+    """الجلسات الفورية والدفع"""
+
+    def __init__(self, db, reference=None):
+        self.db = db
+        self.reference = reference
+
+    def checkout(self, request):
+        """تسجيل جلسة مكتملة وتحديث العميل والحلاق في معاملة واحدة"""
+        _require(request, 'customer_name', 'phone', 'barber_id', 'service_id', 'price')
+        price = float(request.price)
+
+        with self.db.transaction('quick_session') as cursor:
+            # توليد رقم الجلسة
+            session_number = next_number(cursor, SESSION_PREFIX)
+
+            customer_id, loyalty_points = find_or_create_customer(
+                cursor, request.customer_name, request.phone)
+            points_earned = loyalty_points_for(price)
+
+            _, cost, service_rate, barber_rate = _service_and_barber(
+                cursor, request.service_id, request.barber_id, self.reference)
+            commission = commission_for(price, service_rate, barber_rate)
+
+            services_json = json.dumps([{
+                'id': request.service_id,
+                'name': request.service_name,
+                'price': price
+            }])
+            now = datetime.now()
+
+            cursor.execute("""
+                INSERT INTO sessions (
+                    session_number, customer_id, customer_name, barber_id, barber_name,
+                    services, total_price, total_cost, total_commission,
+                    discount, final_price, payment_method, loyalty_points_earned,
+                    check_in_time, check_out_time, status
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, 'completed')
+            """, (session_number, customer_id, request.customer_name, request.barber_id,
+                  request.barber_name, services_json, price, cost, commission, price,
+                  request.payment_method, points_earned, now, now))
+            session_id = cursor.lastrowid
+
+            # تحديث بيانات العميل
+            cursor.execute("""
+                UPDATE customers
+                SET loyalty_points = loyalty_points + ?,
+                    total_visits = total_visits + 1,
+                    total_spent = total_spent + ?,
+                    last_visit = ?
+                WHERE id = ?
+            """, (points_earned, price, now, customer_id))
+
+            # تحديث بيانات الحلاق
+            cursor.execute("""
+                UPDATE barbers
+                SET total_services = total_services + 1,
+                    total_revenue = total_revenue + ?
+                WHERE id = ?
+            """, (price, request.barber_id))
+
+        return CheckoutResult(session_id, session_number, customer_id, points_earned,
+                              loyalty_points + points_earned, commission)
+
+
+class StatsService:
+    """إحصائيات لوحة التحكم"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def day(self, day=None):
+        """إحصائيات يوم (اليوم افتراضياً) من جدول daily_stats"""
+        day = day or datetime.now().strftime('%Y-%m-%d')
+        return DailyStats(day, **daily_stats.read_day(self.db, day))
+
+    def rebuild(self, start=daily_stats.FIRST_DAY, end=daily_stats.LAST_DAY):
+        """إعادة حساب الإحصائيات لفترة"""
+        daily_stats.rebuild_range(self.db, start, end)
+
+
+def list_day_appointments(db, day, search_text=''):
+    """مواعيد يوم مع فلترة اختيارية بالاسم أو الجوال أو رقم الموعد"""
+    query = """
+        SELECT id, appointment_time, customer_name, phone, barber_name,
+               service_name, price, status, appointment_number
+        FROM appointments
+        WHERE appointment_date = ?
+    """
+    params = [day]
+
+    if search_text:
+        query += """ AND (customer_name LIKE ? OR phone LIKE ?
+                    OR appointment_number LIKE ?)"""
+        params.extend([f'%{search_text}%', f'%{search_text}%', f'%{search_text}%'])
+
+    query += " ORDER BY appointment_time, id"
+
+    return db.fetchall(query, params, op='load_appointments')
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(count=5000, batch=100):
+    """عدد الحجوزات والجلسات في الثانية على قاعدة بيانات مؤقتة"""
+    import os
+    import tempfile
+    import time
+    from database import Database
+    from schema import create_tables, insert_default_data
+    from migrations import apply_migrations
+    from reference_data import ReferenceData
+
+    path = os.path.join(tempfile.mkdtemp(), 'engine_bench.db')
+    db = Database(path)
+    with db.transaction() as cursor:
+        create_tables(cursor)
+        insert_default_data(cursor)
+    apply_migrations(db, verbose=False)
+
+    reference = ReferenceData(db).load()
+    booking, checkout = BookingService(db, reference), CheckoutService(db, reference)
+    stats = StatsService(db)
+    day = datetime.now().strftime('%Y-%m-%d')
+
+    def request(i):
+        return BookingRequest(f'عميل {i}', f'05{i % 2000:08d}', 1, 'خالد محمد', 1 + i % 22,
+                              'خدمة', day, f'{9 + i % 12:02d}:{(i % 2) * 30:02d}', 40)
+
+    start = time.perf_counter()
+    for i in range(count):
+        booking.book(request(i))
+    elapsed = time.perf_counter() - start
+    print(f"📅 book        {count / elapsed:>10,.0f} حجز/ث")
+
+    start = time.perf_counter()
+    for i in range(0, count, batch):
+        booking.book_many([request(j) for j in range(i, min(i + batch, count))])
+    elapsed = time.perf_counter() - start
+    print(f"📦 book_many   {count / elapsed:>10,.0f} حجز/ث (دفعات {batch})")
+
+    start = time.perf_counter()
+    for i in range(count):
+        checkout.checkout(CheckoutRequest(f'عميل {i}', f'05{i % 2000:08d}', 1, 'خالد محمد',
+                                          1 + i % 22, 'خدمة', 40))
+    elapsed = time.perf_counter() - start
+    print(f"⚡ checkout    {count / elapsed:>10,.0f} جلسة/ث")
+
+    start = time.perf_counter()
+    for app_id in range(1, count + 1):
+        booking.complete(app_id)
+    elapsed = time.perf_counter() - start
+    print(f"✅ complete    {count / elapsed:>10,.0f} موعد/ث")
+
+    start = time.perf_counter()
+    for first in range(count + 1, 2 * count + 1, batch):
+        booking.complete_many(range(first, min(first + batch, 2 * count + 1)))
+    elapsed = time.perf_counter() - start
+    print(f"✅ complete_many {count / elapsed:>8,.0f} موعد/ث (دفعات {batch})")
+
+    from reconcile import reconcile
+    check = reconcile(db)
+    print(f"🧾 عدّادات مختلفة عن السجل: {check.customers_changed} عميل، "
+          f"{check.barbers_changed} حلاق")
+
+    print(f"📊 {stats.day(day)}")
+    print(f"🗂️ {reference.stats()}")
+    db.print_latency_report()
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 5000)
+    else:
+        print(__doc__)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📤 تصدير المواعيد إلى Excel
+Streaming appointments export
+
+الصفوف تُقرأ على دفعات (cursor.fetchmany) وتُكتب مباشرة بـ xlsxwriter في
+وضع constant_memory (كل صف يُكتب للملف المؤقت فور اكتماله)، وعرض الأعمدة
+يُحسب أثناء نفس المرور. لذلك تبقى الذاكرة ثابتة مهما كان عدد الصفوف
+(تصدير شهر أو سنة كاملة).
+
+يعمل بدون واجهة (من البرنامج أو السكربتات أو أدوات القياس). يحتاج xlsxwriter.
+
+الاستخدام:
+    python exporter.py FILE.xlsx [من YYYY-MM-DD] [إلى YYYY-MM-DD]
+    python exporter.py bench [عدد_المواعيد]
+"""
+
+import os
+from contextlib import suppress
+from datetime import datetime
+
+# (العمود، العنوان)
+EXPORT_COLUMNS = [
+    ('appointment_number', 'رقم الموعد'),
+    ('customer_name', 'العميل'),
+    ('phone', 'الجوال'),
+    ('barber_name', 'الحلاق'),
+    ('service_name', 'الخدمة'),
+    ('appointment_date', 'التاريخ'),
+    ('appointment_time', 'الوقت'),
+    ('price', 'السعر'),
+    ('status', 'الحالة'),
+    ('payment_method', 'طريقة الدفع'),
+]
+
+# عدد الصفوف في كل قراءة من قاعدة البيانات
+FETCH_SIZE = 5000
+
+# حد Excel للصفوف في الورقة الواحدة (مع صف العناوين)؛ الباقي في ورقة جديدة
+MAX_SHEET_ROWS = 1048576
+
+MAX_COLUMN_WIDTH = 60
+
+SHEET_NAME = 'المواعيد'
+
+
+def _filters(start, end, barber_id=None, status=None):
+    """شرط WHERE ومعاملاته للفترة والفلاتر الاختيارية"""
+    where = ["appointment_date BETWEEN ? AND ?"]
+    params = [start, end]
+    if barber_id:
+        where.append("barber_id = ?")
+        params.append(int(barber_id))
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    return ' AND '.join(where), params
+
+
+def _new_sheet(workbook, number, header_format):
+    name = SHEET_NAME if number == 1 else f'{SHEET_NAME} {number}'
+    worksheet = workbook.add_worksheet(name)
+    worksheet.right_to_left()
+    worksheet.write_row(0, 0, [title for _, title in EXPORT_COLUMNS], header_format)
+    worksheet.freeze_panes(1, 0)
+    return worksheet
+
+
+def _set_widths(worksheet, widths):
+    # في وضع constant_memory تُكتب الأعمدة عند إغلاق الملف، فيمكن ضبطها بعد الصفوف
+    for col, width in enumerate(widths):
+        worksheet.set_column(col, col, min(width + 2, MAX_COLUMN_WIDTH))
+
+
+def export_appointments(db, filename, start=None, end=None, barber_id=None, status=None,
+                        job=None):
+    """كتابة مواعيد فترة (اليوم افتراضياً) في ملف Excel؛ يُرجع (المسار، عدد الصفوف)
+
+    barber_id و status فلاتر اختيارية.
+    job (اختياري): كائن Job من worker لدعم الإلغاء ومؤشر التقدم.
+    """
+    import xlsxwriter
+
+    start = start or datetime.now().strftime('%Y-%m-%d')
+    end = end or start
+    where, params = _filters(start, end, barber_id, status)
+    columns = ', '.join(column for column, _ in EXPORT_COLUMNS)
+
+    with db.timed('export_to_excel'):
+        conn = db.connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM appointments WHERE {where}",
+                             params).fetchone()[0] if job else 0
+
+        workbook = xlsxwriter.Workbook(filename, {'constant_memory': True})
+        try:
+            header_format = workbook.add_format({'bold': True, 'bg_color': '#1a3a52',
+                                                 'font_color': 'white'})
+            sheets = 1
+            worksheet = _new_sheet(workbook, sheets, header_format)
+            widths = [len(title) for _, title in EXPORT_COLUMNS]
+            row_number = 0
+            written = 0
+
+            cursor = conn.execute(f"""
+                SELECT {columns} FROM appointments
+                WHERE {where}
+                ORDER BY appointment_date, appointment_time, id
+            """, params)
+
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                if job:
+                    job.check()
+
+                for row in rows:
+                    row_number += 1
+                    if row_number >= MAX_SHEET_ROWS:
+                        _set_widths(worksheet, widths)
+                        sheets += 1
+                        worksheet = _new_sheet(workbook, sheets, header_format)
+                        widths = [len(title) for _, title in EXPORT_COLUMNS]
+                        row_number = 1
+
+                    worksheet.write_row(row_number, 0, row)
+                    for col, value in enumerate(row):
+                        length = len(str(value)) if value is not None else 0
+                        if length > widths[col]:
+                            widths[col] = length
+
+                written += len(rows)
+                if job and total:
+                    job.set_progress(written / total)
+
+            _set_widths(worksheet, widths)
+        except BaseException:
+            # خطأ التنظيف (ملف ناقص أو محذوف) لا يخفي الخطأ الأصلي
+            with suppress(Exception):
+                workbook.close()
+            with suppress(OSError):
+                os.remove(filename)
+            raise
+        workbook.close()
+
+    return filename, written
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(appointments=300000):
+    """زمن التصدير وأقصى ذاكرة بايثون لفترات بأحجام مختلفة"""
+    import tempfile
+    import time
+    import tracemalloc
+    from datetime import date, timedelta
+    from database import Database
+    from benchmarks.generator import generate
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'export_bench.db')
+    generate(path, appointments, max(1000, appointments // 10), days=365, verbose=False)
+    db = Database(path)
+
+    today = date.today()
+    for label, days in (('day', 1), ('month', 30), ('year', 365)):
+        start = (today - timedelta(days=days - 1)).isoformat()
+        tracemalloc.start()
+        began = time.perf_counter()
+        _, rows = export_appointments(db, os.path.join(folder, f'{label}.xlsx'), start,
+                                      today.isoformat())
+        elapsed = time.perf_counter() - began
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<6} rows={rows:>8,} time={elapsed:>7.2f}s peak={peak / 1024 / 1024:>6.2f}MB")
+
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 300000)
+    elif len(sys.argv) > 1:
+        db = Database('database/barbershop.db')
+        path, rows = export_appointments(db, sys.argv[1], *sys.argv[2:4])
+        db.close()
+        print(f"✅ تم تصدير {rows:,} موعد إلى {path}")
+    else:
+        print(__doc__)
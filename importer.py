@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📥 استيراد العملاء والمواعيد السابقة من CSV أو Excel
+Bulk importer
+
+- قراءة متدفقة (csv أو openpyxl في وضع القراءة فقط) دون تحميل الملف كاملاً.
+- أسماء الأعمدة بالعربية أو الإنجليزية (ملفات التصدير من النظام تُستورد كما هي).
+- توحيد أرقام الجوال (+966 / 00966 / 5XXXXXXXX / أرقام عربية) إلى 05XXXXXXXX،
+  ومنع التكرار داخل الملف ومع العملاء الموجودين (customers.phone فريد).
+- أسماء الحلاقين والخدمات تُحوَّل إلى معرفاتها من البيانات المرجعية.
+- الإدخال بـ executemany على دفعات كبيرة، كل دفعة في معاملة واحدة.
+- الصفوف المرفوضة تُكتب مع سبب الرفض في ملف CSV بجانب الملف الأصلي.
+
+نوع الملف يُحدَّد من أعمدته: وجود الحلاق والخدمة = مواعيد، وإلا عملاء.
+أرقام المواعيد تُولَّد من عدّاد النظام ليوم كل موعد (الرقم القديم يُحفظ في الملاحظات).
+
+الاستخدام:
+    python importer.py FILE.csv|FILE.xlsx [قاعدة_البيانات]
+    python importer.py bench [عدد_الصفوف]
+"""
+
+import csv
+import os
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import date, datetime, time as time_of_day
+from typing import Optional
+
+from engine import add_completion_counters, commission_for
+from reference_data import ReferenceData
+from sequences import reserve_values, APPOINTMENT_PREFIX
+
+# عدد الصفوف في كل معاملة
+BATCH_SIZE = 5000
+
+# عدد المعاملات في استعلام IN (...)
+LOOKUP_CHUNK = 900
+
+# اسم العمود الداخلي: الأسماء المقبولة في ملف الاستيراد
+COLUMN_ALIASES = {
+    'name': ('name', 'customer_name', 'customer', 'الاسم', 'اسم العميل', 'العميل'),
+    'phone': ('phone', 'mobile', 'الجوال', 'رقم الجوال', 'الهاتف'),
+    'email': ('email', 'البريد', 'البريد الإلكتروني'),
+    'birth_date': ('birth_date', 'تاريخ الميلاد'),
+    'address': ('address', 'العنوان'),
+    'notes': ('notes', 'ملاحظات'),
+    'loyalty_points': ('loyalty_points', 'points', 'النقاط'),
+    'number': ('appointment_number', 'number', 'رقم الموعد'),
+    'barber': ('barber', 'barber_name', 'الحلاق'),
+    'service': ('service', 'service_name', 'الخدمة'),
+    'date': ('date', 'appointment_date', 'التاريخ'),
+    'time': ('time', 'appointment_time', 'الوقت'),
+    'price': ('price', 'السعر'),
+    'status': ('status', 'الحالة'),
+    'payment_method': ('payment_method', 'payment', 'طريقة الدفع'),
+}
+
+STATUSES = {
+    'pending': 'pending', 'معلق': 'pending',
+    'confirmed': 'confirmed', 'مؤكد': 'confirmed',
+    'completed': 'completed', 'مكتمل': 'completed',
+    'cancelled': 'cancelled', 'canceled': 'cancelled', 'ملغي': 'cancelled',
+    'no_show': 'no_show', 'لم يحضر': 'no_show',
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y')
+
+ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+
+REJECTED_COLUMN = 'سبب الرفض'
+
+
+class RowError(ValueError):
+    """صف غير صالح (السبب في الرسالة)"""
+
+
+@dataclass
+class ImportResult:
+    """نتيجة الاستيراد"""
+    kind: str
+    total: int = 0
+    inserted: int = 0
+    existing: int = 0
+    rejected: int = 0
+    seconds: float = 0
+    rejected_path: Optional[str] = None
+
+    @property
+    def rows_per_second(self):
+        return self.total / self.seconds if self.seconds else 0
+
+
+# ==================== توحيد القيم ====================
+
+def normalize_phone(value):
+    """رقم جوال سعودي بالشكل 05XXXXXXXX (يرفع RowError إن لم يكن صالحاً)"""
+    if isinstance(value, float) and value.is_integer():
+        # Excel يحفظ الأرقام الطويلة كأعداد فتضيع الصفر البادئ
+        value = int(value)
+    digits = re.sub(r'\D', '', str(value or '').translate(ARABIC_DIGITS))
+    if digits.startswith('00966'):
+        digits = digits[5:]
+    elif digits.startswith('966'):
+        digits = digits[3:]
+    if len(digits) == 9 and digits.startswith('5'):
+        digits = '0' + digits
+    if not re.fullmatch(r'05\d{8}', digits):
+        raise RowError(f"رقم جوال غير صالح: {value}")
+    return digits
+
+
+def normalize_name(value):
+    """اسم للمطابقة: بدون مسافات زائدة وبدون فرق الأحرف الكبيرة والصغيرة"""
+    return ' '.join(str(value or '').split()).casefold()
+
+
+def parse_date(value):
+    """'YYYY-MM-DD' من نص بعدة صيغ أو من تاريخ Excel"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+    return _parse_date_text(str(value or '').strip())
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(value):
+    # التواريخ تتكرر كثيراً في الملف (مئات المواعيد لكل يوم)
+    text = value.translate(ARABIC_DIGITS)[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise RowError(f"تاريخ غير صالح: {value}")
+
+
+def parse_time(value):
+    """'HH:MM' من نص أو من وقت Excel"""
+    if isinstance(value, (datetime, time_of_day)):
+        return value.strftime('%H:%M')
+    match = re.fullmatch(r'(\d{1,2}):(\d{2})(?::\d{2})?', str(value or '').strip().translate(ARABIC_DIGITS))
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        raise RowError(f"وقت غير صالح: {value}")
+    return f'{int(match.group(1)):02d}:{match.group(2)}'
+
+
+def _number(value, label, default=None):
+    if value in (None, ''):
+        if default is None:
+            raise RowError(f"{label} مطلوب")
+        return default
+    try:
+        return float(str(value).translate(ARABIC_DIGITS).replace(',', ''))
+    except ValueError:
+        raise RowError(f"{label} غير صالح: {value}")
+
+
+def _text(value):
+    return str(value).strip() if value not in (None, '') else None
+
+
+# ==================== قراءة الملفات ====================
+
+def _iter_csv(path):
+    with open(path, newline='', encoding='utf-8-sig') as source:
+        yield from csv.reader(source)
+
+
+def _iter_xlsx(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for index, worksheet in enumerate(workbook.worksheets):
+            rows = worksheet.iter_rows(values_only=True)
+            if index > 0:
+                # الأوراق التالية (التصدير يقسّم الملفات الكبيرة) تبدأ بنفس العناوين
+                next(rows, None)
+            for row in rows:
+                yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """(العناوين الأصلية، مولّد (رقم السطر، الصف الأصلي، قاموس بالأسماء الداخلية))"""
+    rows = _iter_xlsx(path) if path.lower().endswith(('.xlsx', '.xlsm')) else _iter_csv(path)
+    headers = [str(h).strip() for h in next(rows, [])]
+
+    lookup = {alias.casefold(): key for key, aliases in COLUMN_ALIASES.items() for alias in aliases}
+    columns = [(i, lookup[h.casefold()]) for i, h in enumerate(headers) if h.casefold() in lookup]
+
+    def records():
+        for line, row in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in row):
+                continue
+            yield line, row, {key: row[i] if i < len(row) else None for i, key in columns}
+
+    return headers, {key for _, key in columns}, records()
+
+
+def _batches(records, size=BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Rejected:
+    """ملف الصفوف المرفوضة (يُنشأ عند أول صف مرفوض)"""
+
+    def __init__(self, path, headers):
+        self.path = path
+        self.headers = headers
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, line, row, reason):
+        if self._file is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(['السطر'] + self.headers + [REJECTED_COLUMN])
+        self._writer.writerow([line] + list(row) + [reason])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        return self.path if self.count else None
+
+
+# ==================== العملاء ====================
+
+def _customer_ids(cursor, phones, cache):
+    """إكمال cache (phone -> id) للأرقام المطلوبة"""
+    missing = [p for p in phones if p not in cache]
+    for i in range(0, len(missing), LOOKUP_CHUNK):
+        chunk = missing[i:i + LOOKUP_CHUNK]
+        cursor.execute(f"SELECT phone, id FROM customers WHERE phone IN ({', '.join('?' * len(chunk))})",
+                       chunk)
+        cache.update(cursor.fetchall())
+
+
+def _import_customers(db, records, rejected, result, job):
+    seen = set()
+    for batch in _batches(records):
+        if job:
+            job.check()
+        rows = []
+        for line, raw, record in batch:
+            result.total += 1
+            try:
+                name = _text(record.get('name'))
+                if not name:
+                    raise RowError("الاسم مطلوب")
+                phone = normalize_phone(record.get('phone'))
+                if phone in seen:
+                    raise RowError(f"الجوال {phone} مكرر في الملف")
+                # النقاط المستوردة رصيد افتتاحي (لا مواعيد مقابلها تُحسب منها)
+                points = int(_number(record.get('loyalty_points'), 'النقاط', 0))
+                rows.append((name, phone, _text(record.get('email')),
+                             parse_date(record['birth_date']) if record.get('birth_date') else None,
+                             _text(record.get('address')), _text(record.get('notes')),
+                             points, points))
+                seen.add(phone)
+            except RowError as e:
+                rejected.add(line, raw, str(e))
+
+        with db.transaction('import_customers') as cursor:
+            cursor.executemany('''
+                INSERT INTO customers (name, phone, email, birth_date, address, notes,
+                                       loyalty_points, opening_points)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (phone) DO NOTHING
+            ''', rows)
+            result.inserted += cursor.rowcount
+            result.existing += len(rows) - cursor.rowcount
+
+
+# ==================== المواعيد ====================
+
+def _resolver(items):
+    by_name = {}
+    for item in items:
+        by_name.setdefault(normalize_name(item.name), item)
+    return by_name
+
+
+def _import_appointments(db, records, rejected, result, job):
+    reference = ReferenceData(db).load()
+    barbers = _resolver(reference.all_barbers())
+    services = _resolver(reference.all_services())
+    today = date.today().isoformat()
+    phone_ids = {}
+
+    for batch in _batches(records):
+        if job:
+            job.check()
+        parsed = []
+        for line, raw, record in batch:
+            result.total += 1
+            try:
+                name = _text(record.get('name'))
+                if not name:
+                    raise RowError("اسم العميل مطلوب")
+                phone = normalize_phone(record.get('phone'))
+                barber = barbers.get(normalize_name(record.get('barber')))
+                if barber is None:
+                    raise RowError(f"حلاق غير معروف: {record.get('barber')}")
+                service = services.get(normalize_name(record.get('service')))
+                if service is None:
+                    raise RowError(f"خدمة غير معروفة: {record.get('service')}")
+                day = parse_date(record.get('date'))
+                at = parse_time(record.get('time'))
+                price = _number(record.get('price'), 'السعر', service.price)
+                status_text = normalize_name(record.get('status'))
+                if status_text:
+                    status = STATUSES.get(status_text)
+                    if status is None:
+                        raise RowError(f"حالة غير معروفة: {record.get('status')}")
+                else:
+                    status = 'completed' if day < today else 'pending'
+                previous = _text(record.get('number'))
+                notes = '; '.join(filter(None, [_text(record.get('notes')),
+                                                f'رقم سابق: {previous}' if previous else None]))
+                parsed.append((name, phone, barber, service, day, at, price, status,
+                               _text(record.get('payment_method')), notes or None))
+            except RowError as e:
+                rejected.add(line, raw, str(e))
+
+        if not parsed:
+            continue
+
+        with db.transaction('import_appointments') as cursor:
+            # العملاء الجدد أولاً (الموجودون يبقون كما هم)
+            names = {}
+            for name, phone, *_ in parsed:
+                names.setdefault(phone, name)
+            _customer_ids(cursor, list(names), phone_ids)
+            new_customers = [(name, phone) for phone, name in names.items() if phone not in phone_ids]
+            cursor.executemany('''
+                INSERT INTO customers (name, phone) VALUES (?, ?)
+                ON CONFLICT (phone) DO NOTHING
+            ''', new_customers)
+            _customer_ids(cursor, [phone for _, phone in new_customers], phone_ids)
+
+            # أرقام المواعيد: حجز مجال لكل يوم دفعة واحدة
+            per_day = {}
+            for row in parsed:
+                per_day[row[4]] = per_day.get(row[4], 0) + 1
+            next_value = {day: reserve_values(cursor, APPOINTMENT_PREFIX, day.replace('-', ''), count)
+                          for day, count in per_day.items()}
+
+            rows = []
+            completions = []
+            for name, phone, barber, service, day, at, price, status, payment, notes in parsed:
+                number = f'{APPOINTMENT_PREFIX}-{day.replace("-", "")}-{next_value[day]:03d}'
+                next_value[day] += 1
+                customer_id = phone_ids[phone]
+                completed = status == 'completed'
+                rows.append((number, customer_id, name, phone, barber.id, barber.name,
+                             service.id, service.name, day, at, service.duration, status,
+                             price, service.cost,
+                             commission_for(price, service.commission_rate, barber.commission_rate),
+                             payment, 'paid' if completed else 'unpaid',
+                             f'{day} {at}:00' if completed else None, notes))
+                if completed:
+                    completions.append((customer_id, barber.id, price, f'{day} {at}:00'))
+
+            cursor.executemany('''
+                INSERT INTO appointments (
+                    appointment_number, customer_id, customer_name, phone,
+                    barber_id, barber_name, service_id, service_name,
+                    appointment_date, appointment_time, duration, status,
+                    price, cost, commission, payment_method, payment_status, completed_at, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            result.inserted += len(rows)
+
+            # المواعيد المكتملة: نفس عدّادات الإنهاء (زيارات ونقاط العميل وخدمات الحلاق)
+            add_completion_counters(cursor, completions)
+
+
+# ==================== الواجهة العامة ====================
+
+def import_file(db, path, rejected_path=None, job=None):
+    """استيراد ملف عملاء أو مواعيد؛ يُرجع ImportResult
+
+    job (اختياري): كائن Job من worker لدعم الإلغاء (الدفعات المحفوظة تبقى).
+    """
+    started = time.perf_counter()
+    headers, columns, records = read_rows(path)
+    kind = 'appointments' if {'barber', 'service'} <= columns else 'customers'
+    required = {'name', 'phone', 'date', 'time'} if kind == 'appointments' else {'name', 'phone'}
+    if not required <= columns:
+        raise ValueError("أعمدة ناقصة في الملف: "
+                         + ', '.join(COLUMN_ALIASES[c][-1] for c in sorted(required - columns)))
+
+    rejected = _Rejected(rejected_path or os.path.splitext(path)[0] + '.rejected.csv', headers)
+    result = ImportResult(kind)
+    try:
+        with db.timed(f'import_{kind}'):
+            if kind == 'appointments':
+                _import_appointments(db, records, rejected, result, job)
+            else:
+                _import_customers(db, records, rejected, result, job)
+    finally:
+        result.rejected = rejected.count
+        result.rejected_path = rejected.close()
+        result.seconds = time.perf_counter() - started
+    return result
+
+
+# ==================== قياس الأداء ====================
+
+def _sample_files(folder, count):
+    """ملف عملاء وملف مواعيد بصيغ جوال متنوعة وبعض الصفوف الخاطئة والمكررة"""
+    import random
+    from benchmarks.generator import FIRST_NAMES, LAST_NAMES, TIME_SLOTS
+
+    rng = random.Random(7)
+    phones = [f'5{(i * 7919 + 4321) % 10 ** 8:08d}' for i in range(count)]
+    styles = (lambda p: '0' + p, lambda p: '+966' + p, lambda p: '00966 ' + p,
+              lambda p: p, lambda p: ('0' + p).translate(str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')))
+
+    customers = os.path.join(folder, 'customers.csv')
+    with open(customers, 'w', newline='', encoding='utf-8-sig') as out:
+        writer = csv.writer(out)
+        writer.writerow(['الاسم', 'الجوال', 'البريد الإلكتروني'])
+        for i, phone in enumerate(phones):
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+            writer.writerow([name, rng.choice(styles)(phone) if i % 100 else '12345', ''])
+            if i % 50 == 0:
+                writer.writerow([name, '0' + phone, ''])
+
+    appointments = os.path.join(folder, 'appointments.csv')
+    with open(appointments, 'w', newline='', encoding='utf-8-sig') as out:
+        writer = csv.writer(out)
+        writer.writerow(['customer_name', 'phone', 'barber', 'service', 'date', 'time',
+                         'price', 'status'])
+        for i in range(count * 2):
+            day = date.fromordinal(date.today().toordinal() - rng.randrange(3 * 365))
+            writer.writerow([f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                             '+966' + rng.choice(phones),
+                             'خالد محمد' if i % 200 else 'حلاق غير موجود',
+                             'قص شعر عادي', day.strftime('%d/%m/%Y'), rng.choice(TIME_SLOTS),
+                             '', rng.choice(['مكتمل', 'completed', 'ملغي'])])
+    return customers, appointments
+
+
+def benchmark(count=50000):
+    """استيراد count عميل و 2×count موعد إلى قاعدة بيانات جديدة"""
+    import tempfile
+    from database import Database
+    from schema import create_tables, insert_default_data
+    from migrations import apply_migrations
+
+    folder = tempfile.mkdtemp()
+    db = Database(os.path.join(folder, 'import_bench.db'))
+    with db.transaction() as cursor:
+        create_tables(cursor)
+        insert_default_data(cursor)
+    apply_migrations(db, verbose=False)
+
+    for path in _sample_files(folder, count):
+        result = import_file(db, path)
+        print(f"{result.kind:<13} rows={result.total:>9,} inserted={result.inserted:>9,} "
+              f"existing={result.existing:>6,} rejected={result.rejected:>6,} "
+              f"{result.rows_per_second:>9,.0f} صف/ث")
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 50000)
+    elif len(sys.argv) > 1:
+        db = Database(sys.argv[2] if len(sys.argv) > 2 else 'database/barbershop.db')
+        result = import_file(db, sys.argv[1])
+        db.close()
+        print(f"✅ {result.inserted:,} صف جديد، {result.existing:,} موجود مسبقاً، "
+              f"{result.rejected:,} مرفوض ({result.rows_per_second:,.0f} صف/ث)")
+        if result.rejected_path:
+            print(f"📄 الصفوف المرفوضة: {result.rejected_path}")
+    else:
+        print(__doc__)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧩 النسخ الاحتياطي التزايدي
+Incremental backups (full snapshot + change-log deltas)
+
+- نسخة كاملة دورية (backup.create_backup) تحفظ معها رقم آخر تغيير في
+  سجل التغييرات (change_log) داخل اللقطة.
+- بينها نسخ تزايدية صغيرة: ملف delta_*.jsonl.gz فيه التغييرات المسجلة منذ
+  آخر نسخة فقط (مع مصدر كل تغيير: هذا الفرع أو فرع آخر)، وفي أوله ترويسة باسم النسخة الكاملة التي يُبنى عليها
+  ونطاق أرقام التغييرات (from_id, to_id]. كل ملف يبدأ حيث انتهى الذي قبله.
+- الاستعادة: فك النسخة الكاملة ثم إعادة تطبيق ملفات التغييرات بالترتيب
+  حتى أي لحظة مختارة (--until). triggers الإحصائيات وفهرس البحث تعيد
+  حساب الجداول المشتقة أثناء التطبيق.
+
+جدول backup_chain (غير مسجَّل في change_log) يحفظ النسخ المنشأة ونطاقاتها.
+
+الاستخدام:
+    python incremental_backup.py [مجلد_النسخ]          (كاملة أو تزايدية حسب الإعداد)
+    python incremental_backup.py full|delta [مجلد_النسخ]
+    python incremental_backup.py list [مجلد_النسخ]
+    python incremental_backup.py restore DEST.db [مجلد_النسخ] [--until "YYYY-MM-DD HH:MM:SS"]
+    python incremental_backup.py bench [عدد_الحجوزات]
+"""
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+import changelog
+from backup import BACKUP_FOLDER, BackupError, create_backup, list_backups, restore_backup
+
+DELTA_NAME = re.compile(r'^delta_(\d{8}_\d{6})_\d+\.jsonl\.gz$')
+
+# عدد الأيام بين النسخ الكاملة إن لم يوجد الإعداد backup_full_every_days
+FULL_EVERY_DAYS = 7
+
+
+@dataclass
+class DeltaResult:
+    """نتيجة نسخة تزايدية (path = None إن لم توجد تغييرات)"""
+    path: Optional[str]
+    base: str
+    from_id: int
+    to_id: int
+    changes: int
+    size: int
+    seconds: float
+
+
+def schema_statements():
+    """أوامر إنشاء جدول سلسلة النسخ (تُستخدم في الترحيلات)"""
+    return [
+        '''CREATE TABLE IF NOT EXISTS backup_chain (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               kind TEXT NOT NULL,
+               file TEXT NOT NULL,
+               base TEXT NOT NULL,
+               from_id INTEGER NOT NULL,
+               to_id INTEGER NOT NULL,
+               created_at TEXT NOT NULL
+           )''',
+    ]
+
+
+# ==================== إنشاء النسخ ====================
+
+def _record(db, kind, file, base, from_id, to_id):
+    with db.transaction('backup_chain') as cursor:
+        cursor.execute('''
+            INSERT INTO backup_chain (kind, file, base, from_id, to_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (kind, os.path.basename(file), os.path.basename(base), from_id, to_id,
+              datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def last_full_backup(db, folder=BACKUP_FOLDER):
+    """آخر نسخة كاملة ما زال ملفها موجوداً: (الملف، تاريخ الإنشاء، آخر رقم مغطّى) أو None"""
+    rows = db.fetchall('''
+        SELECT file, created_at FROM backup_chain
+        WHERE kind = 'full' ORDER BY id DESC
+    ''', op='last_full_backup')
+    for file, created_at in rows:
+        if os.path.exists(os.path.join(folder, file)):
+            covered = db.fetchvalue('''
+                SELECT MAX(to_id) FROM backup_chain WHERE base = ?
+            ''', (file,), op='last_full_backup')
+            return file, datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S'), covered
+    return None
+
+
+def create_full_backup(db, folder=BACKUP_FOLDER, compression='gzip', job=None):
+    """نسخة كاملة تبدأ سلسلة جديدة؛ التغييرات المشمولة فيها تُحذف من السجل"""
+    result = create_backup(db, folder, compression, job=job)
+    _record(db, 'full', result.path, result.path, 0, result.change_id)
+    with db.transaction('prune_change_log') as cursor:
+        changelog.prune(cursor, result.change_id)
+    return result
+
+
+def create_delta(db, folder=BACKUP_FOLDER, job=None):
+    """ملف بالتغييرات منذ آخر نسخة (كاملة أو تزايدية) في السلسلة الحالية"""
+    last = last_full_backup(db, folder)
+    if last is None:
+        raise BackupError("لا توجد نسخة كاملة يُبنى عليها؛ أنشئ نسخة كاملة أولاً")
+    base, _, from_id = last
+    started = time.perf_counter()
+
+    cursor = db.connection().cursor()
+    to_id = changelog.last_change_id(cursor)
+    if to_id <= from_id:
+        return DeltaResult(None, base, from_id, from_id, 0, 0, time.perf_counter() - started)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    path = os.path.join(folder, f'delta_{timestamp}.jsonl.gz')
+    partial = path + '.part'
+    header = {'base': base, 'from_id': from_id, 'to_id': to_id,
+              'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+    changes = 0
+    try:
+        with db.timed('backup_delta'), gzip.open(partial, 'wt', encoding='utf-8') as out:
+            out.write(json.dumps(header, ensure_ascii=False) + '\n')
+            # row_key و data نصوص JSON جاهزة في السجل: تُكتب كما هي دون إعادة تحليل
+            for change_id, table, op, row_key, data, changed_at, origin in \
+                    changelog.iter_changes(cursor, from_id, to_id):
+                out.write(f'[{change_id},"{table}","{op}",{row_key},{data or "null"},'
+                          f'"{changed_at}",{json.dumps(origin)}]\n')
+                changes += 1
+                if job and changes % 5000 == 0:
+                    job.check()
+                    job.set_progress(changes / (to_id - from_id))
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    _record(db, 'delta', path, base, from_id, to_id)
+    return DeltaResult(path, base, from_id, to_id, changes, os.path.getsize(path),
+                       time.perf_counter() - started)
+
+
+def incremental_backup(db, folder=BACKUP_FOLDER, compression='gzip',
+                       full_every_days=FULL_EVERY_DAYS, job=None):
+    """نسخة كاملة إن مرّ full_every_days على آخر واحدة (أو لا توجد)، وإلا تزايدية"""
+    last = last_full_backup(db, folder)
+    if last is None or datetime.now() - last[1] >= timedelta(days=full_every_days):
+        return create_full_backup(db, folder, compression, job)
+    return create_delta(db, folder, job)
+
+
+# ==================== قراءة الملفات ====================
+
+def read_delta_header(path):
+    """ترويسة ملف تغييرات (السطر الأول)"""
+    with gzip.open(path, 'rt', encoding='utf-8') as source:
+        return json.loads(source.readline())
+
+
+def list_deltas(folder=BACKUP_FOLDER):
+    """ملفات التغييرات [(الترويسة، المسار)] مرتبة بأرقام التغييرات"""
+    deltas = []
+    if not os.path.isdir(folder):
+        return deltas
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if DELTA_NAME.match(entry.name) and entry.is_file():
+                deltas.append((read_delta_header(entry.path), entry.path))
+    deltas.sort(key=lambda item: (item[0]['from_id'], item[0]['to_id']))
+    return deltas
+
+
+def remove_orphan_deltas(folder=BACKUP_FOLDER):
+    """حذف ملفات التغييرات التي حُذفت نسختها الكاملة (بعد التدوير)"""
+    removed = []
+    for header, path in list_deltas(folder):
+        if not os.path.exists(os.path.join(folder, header['base'])):
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def _iter_delta(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as source:
+        source.readline()
+        for line in source:
+            yield json.loads(line)
+
+
+# ==================== الاستعادة ====================
+
+def restore_point_in_time(dest, folder=BACKUP_FOLDER, until=None, overwrite=False, job=None):
+    """استعادة آخر نسخة كاملة قبل until ثم تطبيق تغييراتها حتى until
+
+    until نص 'YYYY-MM-DD HH:MM:SS' (أو None لآخر تغيير متاح).
+    يُرجع (المسار، عدد التغييرات المطبقة، وقت آخر تغيير مطبق).
+    """
+    limit = datetime.strptime(until, '%Y-%m-%d %H:%M:%S') if until else None
+    fulls = [(when, path) for when, path in list_backups(folder)
+             if limit is None or when <= limit]
+    if not fulls:
+        raise BackupError("لا توجد نسخة كاملة قبل الوقت المطلوب")
+    base_path = fulls[0][1]
+    base = os.path.basename(base_path)
+
+    restore_backup(base_path, dest, overwrite)
+    conn = sqlite3.connect(dest, isolation_level=None)
+    applied = 0
+    last_at = None
+    try:
+        position = changelog.sequence_position(conn)
+        deltas = [(header, path) for header, path in list_deltas(folder)
+                  if header['base'] == base]
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        # التغييرات مسجلة مسبقاً: تُنسخ إلى السجل كما هي بدل إعادة تسجيلها
+        changelog.drop_triggers(cursor)
+        stop = False
+        for header, path in deltas:
+            if header['to_id'] <= position:
+                continue
+            if header['from_id'] != position:
+                raise BackupError(f"سلسلة النسخ ناقصة: متوقع بداية {position} "
+                                  f"ووُجد {header['from_id']} في {os.path.basename(path)}")
+            # ملفات أقدم بدون عمود المصدر: تغييرات هذا الفرع
+            for change_id, table, op, row_key, data, changed_at, *origin in _iter_delta(path):
+                if until and changed_at[:19] > until:
+                    stop = True
+                    break
+                changelog.apply_change(cursor, table, op, row_key, data)
+                cursor.execute('''
+                    INSERT INTO change_log (id, table_name, op, row_key, data, changed_at, origin)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (change_id, table, op, json.dumps(row_key, ensure_ascii=False),
+                      None if data is None else json.dumps(data, ensure_ascii=False),
+                      changed_at, origin[0] if origin else None))
+                applied += 1
+                last_at = changed_at
+                if job and applied % 5000 == 0:
+                    job.check()
+            if stop:
+                break
+            position = header['to_id']
+        changelog.create_triggers(cursor)
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        conn.close()
+        os.remove(dest)
+        raise
+    conn.close()
+    return dest, applied, last_at
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(bookings=20000, rounds=5):
+    """حجم النسخة الكاملة مقابل ملفات التغييرات، وزمن الاستعادة لنقطة وسطى"""
+    import tempfile
+    from database import Database
+    from benchmarks.generator import generate
+    from engine import BookingService, BookingRequest
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'incremental_bench.db')
+    generate(path, 200000, 20000, days=365, verbose=False)
+    db = Database(path)
+    backups = os.path.join(folder, 'backups')
+
+    full = create_full_backup(db, backups)
+    print(f"full   {full.size / 1e6:>8.2f} MB  {full.seconds:>6.2f}s")
+
+    booking = BookingService(db)
+    barber_id, barber_name = db.fetchone("SELECT id, name FROM barbers LIMIT 1")
+    service_id, service_name, price = db.fetchone("SELECT id, name, price FROM services LIMIT 1")
+    # الحجوزات موزعة على الشهر القادم مثل الاستخدام الفعلي
+    days = [(datetime.now() + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(30)]
+    per_round = bookings // rounds
+    checkpoints = []
+    for r in range(rounds):
+        requests = [BookingRequest(f'عميل {r}-{i}', f'07{r:02d}{i:06d}', barber_id, barber_name,
+                                   service_id, service_name, days[i % 30], '10:00', price)
+                    for i in range(per_round)]
+        booking.book_many(requests)
+        delta = create_delta(db, backups)
+        checkpoints.append(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        print(f"delta  {delta.size / 1e6:>8.2f} MB  {delta.seconds:>6.2f}s  "
+              f"changes={delta.changes:,}")
+        time.sleep(1.1)
+
+    expected = db.fetchvalue("SELECT COUNT(*) FROM appointments")
+    db.close()
+
+    for label, until in (('middle', checkpoints[rounds // 2]), ('latest', None)):
+        started = time.perf_counter()
+        dest, applied, _ = restore_point_in_time(os.path.join(folder, f'{label}.db'),
+                                                 backups, until)
+        elapsed = time.perf_counter() - started
+        conn = sqlite3.connect(dest)
+        count = conn.execute("SELECT COUNT(*) FROM appointments").fetchone()[0]
+        conn.close()
+        print(f"restore {label:<7} changes={applied:>8,} appointments={count:,} "
+              f"time={elapsed:.2f}s")
+    print(f"appointments في القاعدة الأصلية: {expected:,}")
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    args = sys.argv[1:]
+    if args and args[0] == 'bench':
+        benchmark(int(args[1]) if len(args) > 1 else 20000)
+    elif args and args[0] == 'restore' and len(args) >= 2:
+        until = None
+        if '--until' in args:
+            index = args.index('--until')
+            until = args[index + 1]
+            args = args[:index] + args[index + 2:]
+        dest, applied, last_at = restore_point_in_time(
+            args[1], args[2] if len(args) > 2 else BACKUP_FOLDER, until)
+        print(f"✅ تمت الاستعادة إلى {dest} ({applied:,} تغيير، آخرها {last_at or '-'})")
+    elif args and args[0] == 'list':
+        folder = args[1] if len(args) > 1 else BACKUP_FOLDER
+        for when, path in reversed(list_backups(folder)):
+            print(f"💾 {when}  {os.path.basename(path)}")
+        for header, path in list_deltas(folder):
+            print(f"🧩 {header['created_at']}  {os.path.basename(path)}  "
+                  f"({header['from_id']}, {header['to_id']}] ← {header['base']}")
+    elif args and args[0] in ('-h', '--help'):
+        print(__doc__)
+    else:
+        mode = args[0] if args and args[0] in ('full', 'delta') else None
+        rest = args[1:] if mode else args
+        folder = rest[0] if rest else BACKUP_FOLDER
+        db = Database('database/barbershop.db')
+        if mode == 'full':
+            result = create_full_backup(db, folder)
+        elif mode == 'delta':
+            result = create_delta(db, folder)
+        else:
+            result = incremental_backup(db, folder)
+        db.close()
+        print(f"✅ {result.path or 'لا توجد تغييرات منذ آخر نسخة'} "
+              f"({result.size / 1024:,.0f} KB، {result.seconds:.2f}s)")
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🩺 قياس الأداء أثناء العمل: تتبع SQL وسجل الاستعلامات البطيئة
+SQL tracing, slow-query log and per-handler latency
+
+عند شكوى البطء: أي زر وأي استعلام هو السبب؟
+- كل جملة SQL تُلتقط عبر set_trace_callback (بما فيها جمل المعاملات
+  والـ triggers)، وتُجمع بعد توحيد القيم الحرفية في مدرج تكراري متحرك
+  (آخر 15 دقيقة) لكل استعلام.
+- زمن الجملة = من بدايتها حتى بداية الجملة التالية في نفس الخيط أو نهاية
+  العملية (db.timed)، لأن sqlite3 لا يبلغ عن نهاية الجملة.
+- كل إجراء في الواجهة (حفظ موعد، جلسة فورية، تحميل المواعيد، لوحة التحكم،
+  التصدير) يُقاس على مراحل: زمن خيط الواجهة، الانتظار في الطابور، التنفيذ
+  في الخلفية، والزمن الكلي حتى عرض النتيجة.
+- الجمل الأبطأ من الحد تُكتب في سجل مع EXPLAIN QUERY PLAN (في خيط مستقل
+  باتصال قراءة فقط، فلا تتأخر العملية الأصلية).
+
+التفعيل بمتغيرات البيئة (بدونها لا يُركَّب شيء: فحص None واحد لكل عملية):
+    BARBERSHOP_TRACE=1
+    BARBERSHOP_SLOW_MS=50                        (حد الاستعلام البطيء)
+    BARBERSHOP_TRACE_LOG=logs/slow_queries.log
+
+التقرير يُطبع ويُضاف للسجل عند الخروج من البرنامج.
+
+قياس التكلفة (بدون تتبع / مع التتبع):
+    python instrumentation.py bench [عدد_العمليات]
+"""
+
+import bisect
+import functools
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+ENV_TRACE = 'BARBERSHOP_TRACE'
+ENV_SLOW_MS = 'BARBERSHOP_SLOW_MS'
+ENV_LOG = 'BARBERSHOP_TRACE_LOG'
+
+DEFAULT_SLOW_MS = 50
+DEFAULT_LOG = os.path.join('logs', 'slow_queries.log')
+
+# إجراءات الواجهة المقاسة (نفس أسماء أعمال BackgroundWorker)
+HANDLERS = ('save_appointment', 'quick_session', 'load_appointments',
+            'update_dashboard', 'export_to_excel')
+
+# المدرج المتحرك: شرائح زمنية، وحدود الخانات تتضاعف من 0.05ms حتى ~100s
+SLICE_SECONDS = 60
+SLICES = 15
+BUCKET_BOUNDS_MS = tuple(0.05 * 2 ** i for i in range(22))
+
+# الجمل التي يمكن طلب خطتها
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+# أقصى طول لنص الجملة في السجل
+MAX_SQL_LENGTH = 2000
+
+_LITERALS = re.compile(r"'[^']*(?:''[^']*)*'|(?<![\w.])\d+(?:\.\d+)?")
+_LISTS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def normalize_sql(sql):
+    """توحيد الجملة للتجميع: القيم الحرفية ← ? والقوائم ← (?, …) والمسافات ← مسافة واحدة"""
+    return ' '.join(_LISTS.sub('?, …', _LITERALS.sub('?', sql)).split())
+
+
+# ==================== المدرج المتحرك ====================
+
+class RollingHistogram:
+    """أعداد في خانات لوغاريتمية لآخر SLICES × SLICE_SECONDS ثانية"""
+
+    def __init__(self, slices=SLICES, slice_seconds=SLICE_SECONDS):
+        self.slice_seconds = slice_seconds
+        self.slices = [[0] * (len(BUCKET_BOUNDS_MS) + 1) for _ in range(slices)]
+        self.totals = [0.0] * slices
+        self.maxima = [0.0] * slices
+        self.stamps = [0] * slices
+
+    def _slice(self, now):
+        stamp = int(now // self.slice_seconds)
+        index = stamp % len(self.slices)
+        if self.stamps[index] != stamp:
+            # شريحة قديمة (من دورة سابقة): تُصفَّر قبل استخدامها
+            self.slices[index] = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+            self.totals[index] = 0.0
+            self.maxima[index] = 0.0
+            self.stamps[index] = stamp
+        return index
+
+    def record(self, ms, now=None):
+        index = self._slice(time.monotonic() if now is None else now)
+        self.slices[index][bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.totals[index] += ms
+        self.maxima[index] = max(self.maxima[index], ms)
+
+    def _live(self, now=None):
+        oldest = int((time.monotonic() if now is None else now) // self.slice_seconds) \
+            - len(self.slices) + 1
+        return [i for i, stamp in enumerate(self.stamps) if stamp >= oldest]
+
+    def summary(self, now=None):
+        """{'count', 'total_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'} للنافذة الحالية
+
+        المئينات هي الحد الأعلى لخانتها (دقة ضعفين، تكفي لمعرفة مكان البطء).
+        """
+        live = self._live(now)
+        counts = [sum(self.slices[i][b] for i in live) for b in range(len(BUCKET_BOUNDS_MS) + 1)]
+        count = sum(counts)
+        result = {'count': count, 'total_ms': sum(self.totals[i] for i in live),
+                  'max_ms': max((self.maxima[i] for i in live), default=0.0)}
+        for name, fraction in (('p50_ms', 0.5), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+            target, seen = fraction * count, 0
+            value = 0.0
+            for bucket, bucket_count in enumerate(counts):
+                seen += bucket_count
+                if bucket_count and seen >= target:
+                    value = (BUCKET_BOUNDS_MS[bucket] if bucket < len(BUCKET_BOUNDS_MS)
+                             else result['max_ms'])
+                    break
+            result[name] = min(value, result['max_ms'])
+        return result
+
+
+# ==================== المتتبع ====================
+
+class Tracer:
+    """التقاط جمل SQL وأزمنة الإجراءات وكتابة سجل الاستعلامات البطيئة
+
+    الخيط المُقاس يضع (الجملة، الزمن) في طابور فقط؛ التوحيد والتجميع في
+    المدرجات وطلب الخطة والكتابة للسجل كلها في خيط التجميع.
+    """
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS, log_path=DEFAULT_LOG, db_path=None):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.db_path = db_path
+        self.queries = defaultdict(RollingHistogram)
+        self.handlers = defaultdict(RollingHistogram)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._events = queue.SimpleQueue()
+        self._collector = threading.Thread(target=self._collector_loop,
+                                           name='trace-collector', daemon=True)
+        self._collector.start()
+
+    # ==================== الربط ====================
+
+    def attach(self, db, worker=None):
+        """تفعيل التتبع على قاعدة البيانات (واتصالاتها المفتوحة) والعامل الخلفي"""
+        self.db_path = self.db_path or db.path
+        db.tracer = self
+        with db._lock:
+            for conn in db._connections:
+                conn.set_trace_callback(self.on_statement)
+        if worker is not None:
+            worker.tracer = self
+        return self
+
+    def wrap(self, owner, names=HANDLERS):
+        """قياس زمن خيط الواجهة لإجراءات owner (قبل ربطها بالأزرار)"""
+        for name in names:
+            method = getattr(owner, name, None)
+            if method is not None:
+                setattr(owner, name, self._timed_handler(name, method))
+
+    def _timed_handler(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.context(name):
+                started = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.record_handler(name, 'ui', time.perf_counter() - started)
+        return wrapper
+
+    @contextmanager
+    def context(self, name):
+        """اسم الإجراء أو العمل الجاري في هذا الخيط (يظهر في سجل البطء)"""
+        previous = getattr(self._local, 'context', None)
+        self._local.context = name
+        try:
+            yield
+        finally:
+            self.finish()
+            self._local.context = previous
+
+    # ==================== الجمل ====================
+
+    def on_statement(self, sql):
+        """set_trace_callback: بداية جملة جديدة تُنهي الجملة السابقة في نفس الخيط"""
+        now = time.perf_counter()
+        current = getattr(self._local, 'statement', None)
+        if current is not None:
+            if current[0] == sql:
+                # نفس الجملة تُبلَّغ مرة أخرى لكل جملة trigger تنفذها: ما زالت جارية
+                return
+            self._events.put(('sql', current[0], now - current[1],
+                              getattr(self._local, 'context', None)))
+        self._local.statement = (sql, now)
+
+    def finish(self):
+        """نهاية العملية الجارية في هذا الخيط (من db.timed ونهاية الأعمال)"""
+        current = getattr(self._local, 'statement', None)
+        if current is not None:
+            self._local.statement = None
+            self._events.put(('sql', current[0], time.perf_counter() - current[1],
+                              getattr(self._local, 'context', None)))
+
+    def record_handler(self, name, phase, seconds):
+        """زمن مرحلة من إجراء: ui / wait / job / total"""
+        self._events.put(('handler', (name, phase), seconds, None))
+
+    # ==================== خيط التجميع ====================
+
+    def _collector_loop(self):
+        """تجميع الأزمنة وكتابة الجمل البطيئة مع خطتها (اتصال قراءة فقط)"""
+        plans = {}
+        conn = None
+        while True:
+            kind, key, seconds, context = self._events.get()
+            if kind == 'stop':
+                break
+            if kind == 'flush':
+                key.set()
+                continue
+            ms = seconds * 1000
+            if kind == 'handler':
+                with self._lock:
+                    self.handlers[key].record(ms)
+                continue
+
+            sql, key = key, normalize_sql(key)
+            with self._lock:
+                self.queries[key].record(ms)
+            if ms < self.slow_ms:
+                continue
+            if key not in plans:
+                if conn is None and self.db_path:
+                    try:
+                        conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True)
+                    except sqlite3.Error:
+                        pass
+                plans[key] = self._explain(conn, sql)
+            self._write(f"{datetime.now():%Y-%m-%d %H:%M:%S} | {ms:9.1f}ms | "
+                        f"{context or '-'} | {' '.join(sql.split())[:MAX_SQL_LENGTH]}\n" + plans[key])
+        if conn is not None:
+            conn.close()
+
+    @staticmethod
+    def _explain(conn, sql):
+        if conn is None or not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return ''
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        except sqlite3.Error as e:
+            return f"    (تعذر الحصول على الخطة: {e})\n"
+        return ''.join(f"    {'  ' * (row[1] > 0)}└ {row[3]}\n" for row in rows)
+
+    def _write(self, text):
+        try:
+            folder = os.path.dirname(self.log_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(text)
+        except OSError as e:
+            print(f"خطأ في كتابة سجل الأداء: {e}")
+
+    def flush(self):
+        """انتظار تجميع كل الأزمنة المرسلة حتى الآن وكتابة الجمل البطيئة"""
+        if self._collector.is_alive():
+            done = threading.Event()
+            self._events.put(('flush', done, 0, None))
+            done.wait()
+
+    # ==================== التقرير ====================
+
+    def report(self, top=15):
+        """نص التقرير: الإجراءات بمراحلها ثم الاستعلامات الأعلى زمناً كلياً"""
+        self.flush()
+        with self._lock:
+            handlers = {key: h.summary() for key, h in self.handlers.items()}
+            queries = {key: h.summary() for key, h in self.queries.items()}
+
+        def line(label, stats):
+            return (f"{label:<40} n={stats['count']:<6} p50={stats['p50_ms']:>8.2f}ms "
+                    f"p95={stats['p95_ms']:>8.2f}ms p99={stats['p99_ms']:>8.2f}ms "
+                    f"max={stats['max_ms']:>8.2f}ms total={stats['total_ms']:>9.1f}ms")
+
+        lines = [f"⏱️ الإجراءات (آخر {SLICES * SLICE_SECONDS // 60} دقيقة)"]
+        for (name, phase), stats in sorted(handlers.items()):
+            if stats['count']:
+                lines.append(line(f"{name} [{phase}]", stats))
+        lines.append(f"🐢 أعلى {top} استعلام بالزمن الكلي")
+        ranked = sorted(((s, k) for k, s in queries.items() if s['count']),
+                        key=lambda item: -item[0]['total_ms'])
+        for stats, key in ranked[:top]:
+            lines.append(line('', stats).strip())
+            lines.append(f"    {key[:300]}")
+        return '\n'.join(lines)
+
+    def close(self):
+        """عند الخروج: طباعة التقرير وإضافته للسجل ثم إيقاف خيط التجميع"""
+        text = self.report()
+        print(text)
+        self._events.put(('stop', None, 0, None))
+        self._collector.join()
+        self._write(f"\n===== {datetime.now():%Y-%m-%d %H:%M:%S} =====\n{text}\n")
+
+
+def from_environment(db=None, worker=None, owner=None):
+    """Tracer مربوط إن كان BARBERSHOP_TRACE مفعلاً، وإلا None (بدون أي تكلفة)"""
+    if os.environ.get(ENV_TRACE, '').strip().lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    try:
+        slow_ms = float(os.environ.get(ENV_SLOW_MS, DEFAULT_SLOW_MS))
+    except ValueError:
+        slow_ms = DEFAULT_SLOW_MS
+    tracer = Tracer(slow_ms, os.environ.get(ENV_LOG) or DEFAULT_LOG)
+    if db is not None:
+        tracer.attach(db, worker)
+    if owner is not None:
+        tracer.wrap(owner)
+    print(f"🩺 تتبع الأداء مفعل: الاستعلامات الأبطأ من {slow_ms:g}ms في {tracer.log_path}")
+    return tracer
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(operations=3000):
+    """تكلفة التتبع: نفس الحجوزات والقراءات بدونه ومعه"""
+    import tempfile
+    from datetime import date
+    from database import Database
+    from benchmarks.generator import generate
+    from engine import BookingService, BookingRequest, list_day_appointments
+    from reference_data import ReferenceData
+
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, 'trace_bench.db')
+    generate(path, 100000, 20000, verbose=False)
+    today = date.today().isoformat()
+
+    def run(label, tracer=None, slow=False):
+        db = Database(path)
+        if tracer:
+            tracer.attach(db)
+        if slow:
+            # استعلام بطيء عمداً (بحث بجزء من الاسم = مسح الجدول) لعرض السجل والخطة
+            db.fetchvalue("SELECT COUNT(*) FROM appointments WHERE customer_name LIKE '%5%'",
+                          op='bench_scan')
+        booking = BookingService(db, ReferenceData(db).load())
+        started = time.perf_counter()
+        for i in range(operations):
+            booking.book(BookingRequest(f'عميل {i}', f'07{i:08d}', 1 + i % 8, 'حلاق',
+                                        1 + i % 22, 'خدمة', '2030-01-01', '10:00', 50))
+            list_day_appointments(db, today)
+        elapsed = time.perf_counter() - started
+        db.execute("DELETE FROM appointments WHERE appointment_date = '2030-01-01'", op='bench')
+        db.close()
+        print(f"{label:<12} {elapsed / operations * 1000:.3f}ms لكل (حجز + قراءة)")
+        return elapsed
+
+    run('تمهيد')
+    tracer = Tracer(slow_ms=5, log_path=os.path.join(folder, 'slow.log'))
+    run('مع التتبع', tracer, slow=True)
+    # تبادل الترتيب يقلل أثر التمهيد وتذبذب القرص
+    off = min(run('بدون تتبع'), run('بدون تتبع'))
+    on = min(run('مع التتبع', tracer), run('مع التتبع', tracer))
+    print(f"تكلفة التتبع: {(on - off) / operations * 1000:+.3f}ms لكل عملية")
+    tracer.close()
+    with open(tracer.log_path, encoding='utf-8') as f:
+        print(f"📝 سجل البطء:\n{f.read().split(chr(10) + '=====')[0][:800]}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 3000)
+    else:
+        print(__doc__)
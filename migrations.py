@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧱 ترحيلات مخطط قاعدة البيانات
+Schema migrations
+
+كل ترحيل له رقم ووصف وقائمة خطوات، ويُطبَّق داخل معاملة واحدة.
+الخطوة إما أمر SQL أو دالة تستقبل المؤشر (لتعبئة البيانات).
+رقم آخر ترحيل مطبَّق يُحفظ في جدول settings تحت المفتاح schema_version.
+
+لإضافة ترحيل جديد: أضف عنصراً في نهاية MIGRATIONS برقم أكبر من السابق
+(لا تعدّل ترحيلاً سبق تطبيقه).
+
+قياس أثر كل ترحيل على قاعدة بيانات كبيرة:
+    python migrations.py bench [عدد_المواعيد]
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+import changelog
+import customer_search
+import daily_stats
+import incremental_backup
+import reconcile
+import replication
+import rollups
+
+SCHEMA_VERSION_KEY = 'schema_version'
+
+# ==================== الترحيلات ====================
+MIGRATIONS = [
+    (1, 'فهارس جدول المواعيد', [
+        # مواعيد اليوم مرتبة بالوقت (load_appointments)
+        '''CREATE INDEX IF NOT EXISTS idx_appointments_date_time
+           ON appointments (appointment_date, appointment_time)''',
+        # جدول الحلاق ليوم معيّن
+        '''CREATE INDEX IF NOT EXISTS idx_appointments_barber_date
+           ON appointments (barber_id, appointment_date)''',
+        # إحصائيات اليوم حسب الحالة (update_dashboard)
+        '''CREATE INDEX IF NOT EXISTS idx_appointments_date_status
+           ON appointments (appointment_date, status)''',
+        # سجل العميل
+        '''CREATE INDEX IF NOT EXISTS idx_appointments_customer
+           ON appointments (customer_id)''',
+    ]),
+    (2, 'فهارس الجلسات والعملاء', [
+        '''CREATE INDEX IF NOT EXISTS idx_sessions_customer
+           ON sessions (customer_id)''',
+        '''CREATE INDEX IF NOT EXISTS idx_sessions_barber_checkout
+           ON sessions (barber_id, check_out_time)''',
+        '''CREATE INDEX IF NOT EXISTS idx_sessions_checkout
+           ON sessions (check_out_time)''',
+        # الجوال له فهرس UNIQUE أصلاً، والاسم يُستخدم للترتيب في البحث
+        '''CREATE INDEX IF NOT EXISTS idx_customers_name
+           ON customers (name)''',
+    ]),
+    (3, 'عدّادات أرقام المواعيد والجلسات', [
+        '''CREATE TABLE IF NOT EXISTS sequences (
+               prefix TEXT NOT NULL,
+               day TEXT NOT NULL,
+               value INTEGER NOT NULL,
+               PRIMARY KEY (prefix, day)
+           ) WITHOUT ROWID''',
+        # الرقم بالشكل PREFIX-YYYYMMDD-NNN: اليوم من الحرف 5 والتسلسل من الحرف 14
+        '''INSERT OR REPLACE INTO sequences (prefix, day, value)
+           SELECT 'APP', substr(appointment_number, 5, 8),
+                  MAX(CAST(substr(appointment_number, 14) AS INTEGER))
+           FROM appointments
+           WHERE appointment_number LIKE 'APP-________-%'
+           GROUP BY substr(appointment_number, 5, 8)''',
+        '''INSERT OR REPLACE INTO sequences (prefix, day, value)
+           SELECT 'SES', substr(session_number, 5, 8),
+                  MAX(CAST(substr(session_number, 14) AS INTEGER))
+           FROM sessions
+           WHERE session_number LIKE 'SES-________-%'
+           GROUP BY substr(session_number, 5, 8)''',
+    ]),
+    (4, 'إحصائيات يومية مجمّعة (daily_stats)', daily_stats.schema_statements()),
+    (5, 'فهرس البحث النصي للعملاء (FTS5)', [customer_search.create_index]),
+    (6, 'سجل التغييرات للنسخ التزايدية', changelog.schema_statements()
+        + incremental_backup.schema_statements()),
+    (7, 'تجميعات التقارير (حلاق × خدمة، طريقة الدفع)', rollups.schema_statements()),
+    (8, 'النسخ المتماثل بين الفروع', replication.schema_statements()),
+    (9, 'رصيد النقاط الافتتاحي لمطابقة العدّادات', reconcile.schema_statements()),
+    (10, 'تسجيل حالة النسخ المتماثل في سجل التغييرات', [changelog.create_triggers]),
+]
+
+
+def get_schema_version(cursor):
+    """رقم آخر ترحيل مطبَّق (0 لقاعدة بيانات جديدة)"""
+    cursor.execute("SELECT value FROM settings WHERE key=?", (SCHEMA_VERSION_KEY,))
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def set_schema_version(cursor, version):
+    """حفظ رقم الترحيل الحالي"""
+    cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                   (SCHEMA_VERSION_KEY, str(version)))
+
+
+def latest_version():
+    """رقم آخر ترحيل معرَّف"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def schema_is_current(db):
+    """قاعدة بيانات جاهزة: آخر ترحيل مطبَّق والخدمات والحلاقون موجودون
+
+    استعلام واحد عند التشغيل بدلاً من إعادة كل CREATE TABLE والتحقق من
+    البيانات الافتراضية؛ قاعدة جديدة (بدون جداول) أو قديمة ترجع False.
+    """
+    try:
+        version, has_services, has_barbers = db.fetchone("""
+            SELECT (SELECT value FROM settings WHERE key = ?),
+                   EXISTS (SELECT 1 FROM services), EXISTS (SELECT 1 FROM barbers)
+        """, (SCHEMA_VERSION_KEY,), op='schema_check')
+    except sqlite3.OperationalError:
+        return False
+    return version == str(latest_version()) and bool(has_services and has_barbers)
+
+
+def pending_migrations(db):
+    """الترحيلات التي لم تُطبَّق بعد"""
+    current = get_schema_version(db.connection().cursor())
+    return [m for m in MIGRATIONS if m[0] > current]
+
+
+def apply_migrations(db, target=None, verbose=True, on_applied=None):
+    """تطبيق الترحيلات المعلّقة بالترتيب، كل ترحيل في معاملة مستقلة"""
+    applied = []
+    for version, description, statements in pending_migrations(db):
+        if target is not None and version > target:
+            break
+
+        with db.transaction(f'migration_{version}') as cursor:
+            for step in statements:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            set_schema_version(cursor, version)
+
+        applied.append(version)
+        if verbose:
+            print(f"✅ ترحيل #{version}: {description}")
+        if on_applied:
+            on_applied(version, description)
+
+    if applied:
+        # تحديث إحصائيات المخطِّط لتستفيد الاستعلامات من الفهارس الجديدة
+        with db.timed('analyze'):
+            db.connection().execute("ANALYZE")
+
+    return applied
+
+
+# ==================== قياس الأداء ====================
+
+BENCH_QUERIES = [
+    ('load_appointments', """
+        SELECT id, appointment_time, customer_name, phone, barber_name,
+               service_name, price, status
+        FROM appointments WHERE appointment_date = ? ORDER BY appointment_time
+    """, lambda day: (day,)),
+    ('update_dashboard', """
+        SELECT COALESCE(SUM(price - cost - commission), 0)
+        FROM appointments WHERE appointment_date = ? AND status = 'completed'
+    """, lambda day: (day,)),
+    ('barber_day', """
+        SELECT appointment_time, duration FROM appointments
+        WHERE barber_id = 1 AND appointment_date = ?
+    """, lambda day: (day,)),
+    ('customer_history', """
+        SELECT COUNT(*) FROM appointments WHERE customer_id = 42
+    """, lambda day: ()),
+    ('sessions_day', """
+        SELECT COALESCE(SUM(final_price), 0) FROM sessions
+        WHERE check_out_time >= ? AND check_out_time < date(?, '+1 day')
+    """, lambda day: (day, day)),
+]
+
+
+def _time_queries(db, day, repeats=20):
+    """متوسط زمن كل استعلام قياسي بالميلي ثانية"""
+    results = {}
+    for name, sql, params in BENCH_QUERIES:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            db.fetchall(sql, params(day), op=f'bench_{name}')
+        results[name] = (time.perf_counter() - start) / repeats * 1000
+    return results
+
+
+def benchmark_migrations(appointments=200000, customers=20000, days=3 * 365):
+    """قياس الاستعلامات قبل وبعد كل ترحيل على قاعدة بيانات اصطناعية"""
+    from database import Database
+    from benchmarks.generator import generate
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    # الجداول والبيانات فقط (بدون ترحيلات) باستخدام نفس تعريفات النظام
+    generate(path, appointments, customers, migrate=False, days=days)
+    db = Database(path)
+    day = (date.today() - timedelta(days=days // 2)).isoformat()
+
+    report = {0: _time_queries(db, day)}
+    for version, description, _ in MIGRATIONS:
+        start = time.perf_counter()
+        apply_migrations(db, target=version, verbose=False)
+        elapsed = time.perf_counter() - start
+        report[version] = _time_queries(db, day)
+        print(f"🧱 ترحيل #{version} ({description}): {elapsed:.2f}s")
+
+    names = [q[0] for q in BENCH_QUERIES]
+    print(f"{'version':<8}" + ''.join(f"{n:>20}" for n in names))
+    for version, timings in report.items():
+        print(f"{version:<8}" + ''.join(f"{timings[n]:>18.3f}ms" for n in names))
+
+    db.close()
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+        benchmark_migrations(appointments=count, customers=max(1000, count // 10))
+    else:
+        print(__doc__)
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧾 مطابقة عدّادات العملاء والحلاقين مع السجل
+Set-based counter reconciliation
+
+customers.total_visits و total_spent و loyalty_points و barbers.total_services
+و total_revenue عدّادات تُزاد مع كل جلسة وموعد مكتمل، وأي خطأ سابق (حذف
+موعد مكتمل، إنهاء من جهازين، استيراد) يبقى فيها. هنا يُعاد حسابها كلها من
+المواعيد المكتملة والجلسات ببضع جمل SQL على مستوى المجموعة (بدون حلقة
+بايثون لكل صف):
+1. المجاميع الصحيحة لكل عميل وحلاق في جداول مؤقتة (GROUP BY واحد لكل جدول)
+2. الفروقات فقط (LEFT JOIN مع العدّادات الحالية) في جدول مؤقت للتقرير
+3. عند التطبيق: UPDATE للصفوف المختلفة فقط، في نفس المعاملة
+
+النقاط = نقاط المواعيد المكتملة (بنفس نسبة engine) + نقاط الجلسات ناقص
+المستخدم منها + opening_points (رصيد افتتاحي، مثل النقاط المستوردة من Excel).
+
+التشغيل التزايدي يطابق فقط العملاء والحلاقين الذين تغيّرت مواعيدهم أو
+جلساتهم أو صفوفهم منذ آخر تطبيق (من change_log، والموعد المحذوف يُعرف
+عميله من صوره السابقة في السجل)؛ إن حُذف جزء من السجل منذ آخر تطبيق أو
+حُذف صف لا صورة له يُعاد الحساب الكامل.
+
+⚠️ العملاء المستوردون قبل إضافة opening_points رصيدهم الافتتاحي صفر، فتظهر
+نقاطهم المستوردة فرقاً: راجع التقرير قبل apply. (الاستيراد الحالي يضع
+الرصيد الافتتاحي ويحدّث العدّادات بنفس قواعد engine، فلا يترك فروقاً.)
+
+الاستخدام:
+    python reconcile.py                  (تقرير الفروقات فقط)
+    python reconcile.py apply            (تقرير ثم تصحيح)
+    python reconcile.py incremental      (المتغيّر منذ آخر تطبيق، مع التصحيح)
+
+قياس الأداء:
+    python reconcile.py bench [عدد_العملاء]
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+import changelog
+from engine import LOYALTY_POINTS_PER_RIYAL
+
+# آخر تغيير في change_log شمله آخر تطبيق (للتشغيل التزايدي)
+SETTING_KEY = 'reconcile_change_id'
+
+# فرق المبالغ المقبول (تقريب الأعداد العشرية)
+MONEY_TOLERANCE = 0.005
+
+# أمثلة الفروقات في التقرير (لكل جدول)
+SAMPLE_ROWS = 5
+
+# عمود العدّاد -> عمود القيمة الصحيحة في الجداول المؤقتة
+CUSTOMER_COUNTERS = {'total_visits': 'visits', 'total_spent': 'spent',
+                     'loyalty_points': 'points'}
+BARBER_COUNTERS = {'total_services': 'services', 'total_revenue': 'revenue'}
+
+MONEY_COUNTERS = ('total_spent', 'total_revenue')
+
+# نفس loyalty_points_for في engine (int يقطع الكسر مثل CAST)
+APPOINTMENT_POINTS = f"CAST(price * {LOYALTY_POINTS_PER_RIYAL} AS INTEGER)"
+
+
+@dataclass
+class ReconcileResult:
+    """فروقات المطابقة (وهل طُبقت)"""
+    mode: str
+    customers_checked: int = 0
+    barbers_checked: int = 0
+    customers_changed: int = 0
+    barbers_changed: int = 0
+    # العدّاد -> (عدد الصفوف المختلفة، مجموع الفرق الصحيح - الحالي)
+    differences: dict = field(default_factory=dict)
+    # (الجدول، المعرف، الاسم، {العدّاد: (الحالي، الصحيح)})
+    samples: list = field(default_factory=list)
+    applied: bool = False
+    change_id: Optional[int] = None
+    # سبب الحساب الكامل بدل التزايدي المطلوب
+    fallback: Optional[str] = None
+    seconds: float = 0.0
+
+
+def schema_statements():
+    """الرصيد الافتتاحي وفهارس مغطية جزئية للمكتمل فقط (تُستخدم في الترحيلات)
+
+    الفهارس تجعل المجاميع قراءة مرتبة للفهرس بدون الرجوع للجدول (نحو 4s
+    لمليون عميل ومليوني موعد بدل 14s)، وتبقى صغيرة لأنها لا تشمل إلا المكتمل.
+    """
+    return [
+        "ALTER TABLE customers ADD COLUMN opening_points INTEGER DEFAULT 0",
+        # عمود جديد في جدول مسجَّل
+        changelog.create_triggers,
+        """CREATE INDEX IF NOT EXISTS idx_appointments_completed_customer
+           ON appointments(customer_id, price) WHERE status = 'completed'""",
+        """CREATE INDEX IF NOT EXISTS idx_appointments_completed_barber
+           ON appointments(barber_id, price) WHERE status = 'completed'""",
+        """CREATE INDEX IF NOT EXISTS idx_sessions_completed_customer
+           ON sessions(customer_id, final_price, loyalty_points_earned, loyalty_points_used)
+           WHERE status = 'completed'""",
+        """CREATE INDEX IF NOT EXISTS idx_sessions_completed_barber
+           ON sessions(barber_id, final_price) WHERE status = 'completed'""",
+    ]
+
+
+def last_reconciled(cursor):
+    """آخر تغيير شمله تطبيق سابق (None: لم تُطبق مطابقة بعد)"""
+    cursor.execute("SELECT value FROM settings WHERE key = ?", (SETTING_KEY,))
+    row = cursor.fetchone()
+    return int(row[0]) if row else None
+
+
+# ==================== النطاق التزايدي ====================
+
+def _scope(cursor, after_id):
+    """العملاء والحلاقون المتأثرون بالتغييرات بعد after_id في temp.reconcile_scope
+
+    يُرجع None، أو سبب تعذّر التشغيل التزايدي: حذف changelog.prune (بعد نسخة
+    كاملة) تغييرات بعد after_id، أو حُذف صف لا صورة له في السجل (صاحبه غير
+    معروف). لا يُقيَّد prune بمؤشر المطابقة حتى لا يمنع مؤشر متروك تنظيف السجل.
+    """
+    # أرقام السجل متتالية (AUTOINCREMENT)، فأي فجوة بعد after_id سببها الحذف
+    cursor.execute("SELECT MIN(id) FROM change_log")
+    first = cursor.fetchone()[0]
+    if first is None:
+        first = changelog.sequence_position(cursor.connection) + 1
+    if first > after_id + 1:
+        return f"حُذفت من السجل تغييرات بعد آخر مطابقة (#{after_id})"
+
+    cursor.execute("""CREATE TEMP TABLE reconcile_scope (
+                          kind TEXT NOT NULL, id INTEGER NOT NULL,
+                          PRIMARY KEY (kind, id)) WITHOUT ROWID""")
+    # الصورة الجديدة للمواعيد والجلسات، ومعرفات العملاء والحلاقين المعدّلين مباشرة
+    cursor.execute("""
+        INSERT OR IGNORE INTO temp.reconcile_scope (kind, id)
+        SELECT 'customer', json_extract(data, '$.customer_id') FROM change_log
+        WHERE id > :after AND table_name IN ('appointments', 'sessions') AND data IS NOT NULL
+          AND json_extract(data, '$.customer_id') IS NOT NULL
+        UNION ALL
+        SELECT 'barber', json_extract(data, '$.barber_id') FROM change_log
+        WHERE id > :after AND table_name IN ('appointments', 'sessions') AND data IS NOT NULL
+        UNION ALL
+        SELECT CASE table_name WHEN 'customers' THEN 'customer' ELSE 'barber' END,
+               json_extract(row_key, '$[0]') FROM change_log
+        WHERE id > :after AND table_name IN ('customers', 'barbers')
+    """, {'after': after_id})
+
+    # المحذوف (أو المنقول لعميل آخر) يُعرف صاحبه السابق من آخر صورة قبل التغيير
+    cursor.execute("""CREATE TEMP TABLE reconcile_previous (
+                          table_name TEXT NOT NULL, row_key TEXT NOT NULL,
+                          PRIMARY KEY (table_name, row_key)) WITHOUT ROWID""")
+    cursor.execute("""
+        INSERT OR IGNORE INTO temp.reconcile_previous
+        SELECT table_name, row_key FROM change_log
+        WHERE id > ? AND op IN ('U', 'D') AND table_name IN ('appointments', 'sessions')
+    """, (after_id,))
+    cursor.execute("SELECT COUNT(*) FROM temp.reconcile_previous")
+    previous = cursor.fetchone()[0]
+    if previous:
+        cursor.execute("""
+            CREATE TEMP TABLE reconcile_images AS
+            SELECT table_name, row_key, json_extract(data, '$.customer_id') AS customer_id,
+                   json_extract(data, '$.barber_id') AS barber_id
+            FROM change_log
+            WHERE data IS NOT NULL
+              AND (table_name, row_key) IN (SELECT table_name, row_key
+                                            FROM temp.reconcile_previous)
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO temp.reconcile_scope (kind, id)
+            SELECT 'customer', customer_id FROM temp.reconcile_images
+            WHERE customer_id IS NOT NULL
+            UNION ALL
+            SELECT 'barber', barber_id FROM temp.reconcile_images
+        """)
+        # حذف بدون أي صورة سابقة في السجل: صاحبه غير معروف
+        cursor.execute("""
+            SELECT COUNT(*) FROM temp.reconcile_previous p
+            WHERE NOT EXISTS (SELECT 1 FROM temp.reconcile_images i
+                              WHERE i.table_name = p.table_name AND i.row_key = p.row_key)
+        """)
+        missing = cursor.fetchone()[0]
+        if missing:
+            return f"{missing} صف محذوف أو معدّل بلا صورة سابقة في السجل"
+    return None
+
+
+# ==================== الحساب ====================
+
+def _drop_temp(cursor):
+    for table in ('reconcile_scope', 'reconcile_previous', 'reconcile_images',
+                  'reconcile_customers', 'reconcile_barbers',
+                  'reconcile_customer_diff', 'reconcile_barber_diff'):
+        cursor.execute(f"DROP TABLE IF EXISTS temp.{table}")
+
+
+def _aggregate(cursor, table, columns, selects):
+    """مجموع كل مصدر في جدول مؤقت: الأول INSERT والباقي تُجمع عليه (upsert)
+
+    أسرع من UNION ALL ثم GROUP BY: كل مصدر يُقرأ مرتباً من فهرسه المغطي
+    ويُكتب بترتيب المفتاح بدون فرز مؤقت.
+    """
+    cursor.execute(f"""CREATE TEMP TABLE {table} (id INTEGER PRIMARY KEY,
+                       {', '.join(f'{name} {kind}' for name, kind in columns)})""")
+    names = [name for name, _ in columns]
+    for i, select in enumerate(selects):
+        conflict = '' if i == 0 else f"""
+            ON CONFLICT (id) DO UPDATE
+            SET {', '.join(f'{n} = {n} + excluded.{n}' for n in names)}"""
+        cursor.execute(f"INSERT INTO temp.{table} (id, {', '.join(names)}) {select}{conflict}")
+
+
+def _expected(cursor, scoped):
+    """المجاميع الصحيحة من المواعيد المكتملة والجلسات"""
+    customer_scope = barber_scope = ''
+    if scoped:
+        customer_scope = ("AND customer_id IN (SELECT id FROM temp.reconcile_scope "
+                          "WHERE kind = 'customer')")
+        barber_scope = ("AND barber_id IN (SELECT id FROM temp.reconcile_scope "
+                        "WHERE kind = 'barber')")
+
+    # WHERE في كل SELECT ضرورية قبل ON CONFLICT (غموض صيغة upsert في SQLite)
+    _aggregate(cursor, 'reconcile_customers',
+               (('visits', 'INTEGER'), ('spent', 'REAL'), ('points', 'INTEGER')), [
+        f"""SELECT customer_id, COUNT(*), SUM(price), SUM({APPOINTMENT_POINTS})
+            FROM appointments
+            WHERE status = 'completed' AND customer_id IS NOT NULL {customer_scope}
+            GROUP BY customer_id""",
+        f"""SELECT customer_id, COUNT(*), SUM(final_price),
+                   SUM(COALESCE(loyalty_points_earned, 0) - COALESCE(loyalty_points_used, 0))
+            FROM sessions
+            WHERE status = 'completed' AND customer_id IS NOT NULL {customer_scope}
+            GROUP BY customer_id""",
+    ])
+    _aggregate(cursor, 'reconcile_barbers', (('services', 'INTEGER'), ('revenue', 'REAL')), [
+        f"""SELECT barber_id, COUNT(*), SUM(price) FROM appointments
+            WHERE status = 'completed' {barber_scope} GROUP BY barber_id""",
+        f"""SELECT barber_id, COUNT(*), SUM(final_price) FROM sessions
+            WHERE status = 'completed' {barber_scope} GROUP BY barber_id""",
+    ])
+
+
+def _differences(cursor, table, kind, counters, expected_sql, scoped):
+    """الصفوف المختلفة فقط: (id، الحالي، الصحيح) لكل عدّاد"""
+    scope = f"AND t.id IN (SELECT id FROM temp.reconcile_scope WHERE kind = '{kind}')" \
+        if scoped else ''
+    columns = []
+    conditions = []
+    for counter, value in counters.items():
+        correct = expected_sql.get(counter, f"COALESCE(r.{value}, 0)")
+        columns.append(f"COALESCE(t.{counter}, 0) AS old_{value}, {correct} AS new_{value}")
+        if counter in MONEY_COUNTERS:
+            conditions.append(f"ABS(COALESCE(t.{counter}, 0) - {correct}) > {MONEY_TOLERANCE}")
+        else:
+            conditions.append(f"t.{counter} IS NOT {correct}")
+
+    diff = f'reconcile_{kind}_diff'
+    cursor.execute(f"""CREATE TEMP TABLE {diff} (id INTEGER PRIMARY KEY, name TEXT,
+                       {', '.join(f'old_{v}, new_{v}' for v in counters.values())})""")
+    cursor.execute(f"""
+        INSERT INTO temp.{diff}
+        SELECT t.id, t.name, {', '.join(columns)}
+        FROM {table} t LEFT JOIN temp.reconcile_{table} r ON r.id = t.id
+        WHERE ({' OR '.join(conditions)}) {scope}
+    """)
+    cursor.execute(f"SELECT COUNT(*) FROM {table} t WHERE 1 {scope}")
+    return cursor.fetchone()[0]
+
+
+def _report(cursor, result, table, kind, counters):
+    diff = f'temp.reconcile_{kind}_diff'
+    columns = []
+    for counter, value in counters.items():
+        changed = (f'ABS(new_{value} - old_{value}) > {MONEY_TOLERANCE}'
+                   if counter in MONEY_COUNTERS else f'new_{value} IS NOT old_{value}')
+        columns.append(f"SUM({changed}), COALESCE(SUM(new_{value} - old_{value}), 0)")
+    cursor.execute(f"SELECT COUNT(*), {', '.join(columns)} FROM {diff}")
+    totals = cursor.fetchone()
+    for i, counter in enumerate(counters):
+        rows, delta = totals[1 + 2 * i], totals[2 + 2 * i]
+        if rows:
+            result.differences[f'{table}.{counter}'] = (rows, round(delta, 2))
+    # أكبر الفروقات أولاً
+    order = ' + '.join(f'ABS(new_{v} - old_{v})' for v in counters.values())
+    cursor.execute(f"SELECT * FROM {diff} ORDER BY {order} DESC LIMIT {SAMPLE_ROWS}")
+    for row in cursor.fetchall():
+        row_id, name, values = row[0], row[1], row[2:]
+        changes = {counter: (values[2 * i], values[2 * i + 1])
+                   for i, counter in enumerate(counters) if values[2 * i] != values[2 * i + 1]}
+        result.samples.append((table, row_id, name, changes))
+    return totals[0]
+
+
+def _apply(cursor, table, kind, counters):
+    diff = f'temp.reconcile_{kind}_diff'
+    cursor.execute(f"""
+        UPDATE {table}
+        SET ({', '.join(counters)}) =
+            (SELECT {', '.join(f'new_{v}' for v in counters.values())}
+             FROM {diff} d WHERE d.id = {table}.id)
+        WHERE id IN (SELECT id FROM {diff})
+    """)
+
+
+def _reconcile(cursor, result, scoped):
+    _expected(cursor, scoped)
+    result.customers_checked = _differences(
+        cursor, 'customers', 'customer', CUSTOMER_COUNTERS,
+        {'loyalty_points': "COALESCE(r.points, 0) + COALESCE(t.opening_points, 0)"}, scoped)
+    result.barbers_checked = _differences(cursor, 'barbers', 'barber', BARBER_COUNTERS,
+                                          {}, scoped)
+    result.customers_changed = _report(cursor, result, 'customers', 'customer',
+                                       CUSTOMER_COUNTERS)
+    result.barbers_changed = _report(cursor, result, 'barbers', 'barber', BARBER_COUNTERS)
+
+
+@contextmanager
+def _snapshot(db):
+    """معاملة قراءة (لقطة ثابتة) بدون حجز قفل الكتابة"""
+    cursor = db.connection().cursor()
+    cursor.execute("BEGIN")
+    try:
+        yield cursor
+    finally:
+        cursor.execute("COMMIT")
+        cursor.close()
+
+
+def reconcile(db, apply=False, incremental=False):
+    """مطابقة العدّادات مع السجل؛ مع apply تُصحح الفروقات في نفس المعاملة
+
+    incremental: فقط ما تغيّر منذ آخر تطبيق (يُحسب كاملاً في أول تشغيل أو
+    إن حُذف جزء من السجل، والسبب في result.fallback). بدون apply تُقرأ لقطة
+    ثابتة بدون قفل الكتابة.
+    """
+    started = time.perf_counter()
+    result = ReconcileResult('incremental' if incremental else 'full')
+
+    context = db.transaction('reconcile') if apply else _snapshot(db)
+    with context as cursor:
+        _drop_temp(cursor)
+        try:
+            scoped = False
+            if incremental:
+                after_id = last_reconciled(cursor)
+                if after_id is None:
+                    result.fallback = "لم تُطبق مطابقة من قبل"
+                else:
+                    result.fallback = _scope(cursor, after_id)
+                scoped = result.fallback is None
+                if not scoped:
+                    result.mode = 'full'
+            _reconcile(cursor, result, scoped)
+            if apply:
+                _apply(cursor, 'customers', 'customer', CUSTOMER_COUNTERS)
+                _apply(cursor, 'barbers', 'barber', BARBER_COUNTERS)
+                # بعد تصحيحاتنا (المسجلة في change_log) حتى لا تُعد تغييرات جديدة
+                result.change_id = changelog.last_change_id(cursor)
+                cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                               (SETTING_KEY, str(result.change_id)))
+                result.applied = True
+        finally:
+            _drop_temp(cursor)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def print_result(result):
+    """طباعة التقرير"""
+    state = '✅ تم التصحيح' if result.applied else '🔍 تقرير فقط'
+    print(f"🧾 مطابقة ({result.mode}) في {result.seconds:.2f}s — {state}")
+    if result.fallback:
+        print(f"   ⚠️ حساب كامل بدل التزايدي: {result.fallback}")
+    print(f"   العملاء: {result.customers_checked:,} فُحص، {result.customers_changed:,} مختلف؛ "
+          f"الحلاقون: {result.barbers_checked:,} فُحص، {result.barbers_changed:,} مختلف")
+    for counter, (rows, delta) in result.differences.items():
+        print(f"   {counter:<24} {rows:>9,} صف  الفرق {delta:>+14,.2f}")
+    for table, row_id, name, changes in result.samples:
+        values = '، '.join(f"{counter} {old} ← {new}" for counter, (old, new) in changes.items())
+        print(f"   {table} #{row_id} {name}: {values}")
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(customers=1000000):
+    """مطابقة كاملة ثم تزايدية على قاعدة مولدة (عدّاداتها كلها صفر في البداية)"""
+    import os
+    import shutil
+    import tempfile
+    from database import Database
+    from benchmarks.generator import generate
+    from engine import BookingService, CheckoutService, CheckoutRequest
+
+    folder = tempfile.mkdtemp(prefix='barbershop_reconcile_')
+    path = os.path.join(folder, 'reconcile_bench.db')
+    started = time.perf_counter()
+    generate(path, customers * 2, customers, days=365, verbose=False)
+    print(f"⏳ توليد {customers:,} عميل و {customers * 2:,} موعد: "
+          f"{time.perf_counter() - started:.1f}s")
+    db = Database(path)
+    try:
+        for label, options in (('تقرير كامل', {}), ('تطبيق كامل', {'apply': True}),
+                               ('تقرير بعد التطبيق', {})):
+            print(f"\n{label}:")
+            print_result(reconcile(db, **options))
+
+        # عمليات عادية (تحافظ على العدّادات) ثم انحراف مصطنع خارج الخدمات
+        booking, checkout = BookingService(db), CheckoutService(db)
+        barber_id, barber_name = db.fetchone("SELECT id, name FROM barbers ORDER BY id LIMIT 1")
+        service_id, service_name, price = db.fetchone(
+            "SELECT id, name, price FROM services ORDER BY id LIMIT 1")
+        completed = [row[0] for row in db.fetchall("""SELECT id FROM appointments
+                                                      WHERE status = 'pending' LIMIT 200""")]
+        for appointment_id in completed:
+            booking.complete(appointment_id)
+        for appointment_id in completed[:50]:
+            booking.delete(appointment_id)
+        for i in range(200):
+            checkout.checkout(CheckoutRequest(f'عميل {i}', f'05{i:08d}', barber_id, barber_name,
+                                              service_id, service_name, price))
+        with db.transaction() as cursor:
+            # حذف مباشر بدون عكس العدّادات (صورته قبل الحذف في change_log)
+            cursor.execute(f"DELETE FROM appointments WHERE id IN ({', '.join('?' * 25)})",
+                           completed[-25:])
+            cursor.execute("UPDATE customers SET loyalty_points = loyalty_points + 7 "
+                           "WHERE id = 1")
+
+        print("\nتزايدي بعد 450 عملية و 25 حذفاً مباشراً وتعديل يدوي:")
+        print_result(reconcile(db, apply=True, incremental=True))
+        print("\nتقرير كامل للتأكد (يجب ألا يوجد فرق):")
+        print_result(reconcile(db))
+    finally:
+        db.close()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    elif command in (None, 'apply', 'incremental'):
+        database = Database('database/barbershop.db')
+        print_result(reconcile(database, apply=command is not None,
+                               incremental=command == 'incremental'))
+        database.close()
+    else:
+        print(__doc__)
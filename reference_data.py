@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗂️ ذاكرة مؤقتة للبيانات المرجعية (الخدمات والحلاقين والإعدادات)
+Reference data cache
+
+هذه البيانات تتغير نادراً (مرة في الشهر تقريباً) لكنها تُقرأ مع كل حجز
+وكل اختيار خدمة. تُحمَّل مرة واحدة عند التشغيل وتُشارك بين قوائم الاختيار
+وتحديث السعر وحساب العمولة.
+
+عند تعديل الخدمات أو الحلاقين أو الإعدادات يجب استدعاء invalidate()
+(يزيد رقم النسخة فيعرف من يعرض البيانات أن عليه التحديث).
+عنصر غير موجود في الذاكرة (أُضيف من جهاز آخر مثلاً) يعيد تحميل نوعه مرة واحدة،
+وإن لم يوجد بعدها يُحفظ غيابه حتى تتغير النسخة فلا يعيد كل طلب التحميل.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+KINDS = ('services', 'barbers', 'settings')
+
+# أقصى عدد معرفات غير موجودة محفوظة لكل نوع (معرفات عشوائية من الواجهة الخارجية)
+MAX_MISSING = 1000
+
+
+@dataclass(frozen=True)
+class Service:
+    id: int
+    name: str
+    category: Optional[str]
+    price: float
+    cost: float
+    duration: int
+    commission_rate: Optional[float]
+    status: str
+
+
+@dataclass(frozen=True)
+class Barber:
+    id: int
+    name: str
+    commission_rate: float
+    status: str
+    working_days: Optional[str] = None
+    working_hours: Optional[str] = None
+
+
+class ReferenceData:
+    """البيانات المرجعية في الذاكرة مع رقم نسخة وعدّادات إصابة/إخفاق"""
+
+    def __init__(self, db):
+        self.db = db
+        self.version = 0
+        self.hits = dict.fromkeys(KINDS, 0)
+        self.misses = dict.fromkeys(KINDS, 0)
+        self._data = {}
+        # النوع -> {المعرف: رقم النسخة حين تبيّن غيابه}
+        self._missing = {kind: {} for kind in KINDS}
+        self._lock = threading.Lock()
+
+    # ==================== التحميل ====================
+
+    def _load_services(self):
+        rows = self.db.fetchall("""
+            SELECT id, name, category, price, COALESCE(cost, 0), COALESCE(duration, 30),
+                   commission_rate, status
+            FROM services ORDER BY category, name
+        """, op='load_services')
+        return {row[0]: Service(*row) for row in rows}
+
+    def _load_barbers(self):
+        rows = self.db.fetchall("""
+            SELECT id, name, COALESCE(commission_rate, 0), status, working_days, working_hours
+            FROM barbers ORDER BY name
+        """, op='load_barbers')
+        return {row[0]: Barber(*row) for row in rows}
+
+    def _load_settings(self):
+        return dict(self.db.fetchall("SELECT key, value FROM settings", op='load_settings'))
+
+    def _get(self, kind, reload=False):
+        """بيانات نوع واحد (تحميلها عند أول طلب أو عند reload)"""
+        with self._lock:
+            data = self._data.get(kind)
+            if data is not None and not reload:
+                self.hits[kind] += 1
+                return data
+            data = getattr(self, f'_load_{kind}')()
+            self._data[kind] = data
+            self.misses[kind] += 1
+        return data
+
+    def load(self):
+        """تحميل كل البيانات المرجعية (عند التشغيل)"""
+        for kind in KINDS:
+            self._get(kind, reload=True)
+        return self
+
+    def invalidate(self, *kinds):
+        """إسقاط نوع أو أكثر (أو الكل) من الذاكرة بعد تعديله"""
+        with self._lock:
+            for kind in kinds or KINDS:
+                if kind not in KINDS:
+                    raise ValueError(f"نوع غير معروف: {kind}")
+                self._data.pop(kind, None)
+                self._missing[kind].clear()
+            self.version += 1
+
+    # ==================== القراءة ====================
+
+    def _lookup(self, kind, key):
+        item = self._get(kind).get(key)
+        if item is not None:
+            return item
+
+        missing = self._missing[kind]
+        with self._lock:
+            version = self.version
+            if missing.get(key) == version:
+                self.hits[kind] += 1
+                return None
+
+        # ربما أُضيف بعد التحميل: إعادة تحميل النوع مرة واحدة لكل معرف في كل نسخة
+        item = self._get(kind, reload=True).get(key)
+        if item is None:
+            with self._lock:
+                if len(missing) >= MAX_MISSING:
+                    missing.clear()
+                missing[key] = version
+        return item
+
+    def service(self, service_id):
+        """خدمة بالمعرف (أو None)"""
+        return self._lookup('services', int(service_id))
+
+    def barber(self, barber_id):
+        """حلاق بالمعرف (أو None)"""
+        return self._lookup('barbers', int(barber_id))
+
+    def setting(self, key, default=None):
+        """قيمة إعداد (نص) أو القيمة الافتراضية"""
+        value = self._get('settings').get(key)
+        return default if value is None else value
+
+    def active_services(self):
+        """الخدمات الفعالة مرتبة بالتصنيف ثم الاسم"""
+        return [s for s in self._get('services').values() if s.status == 'active']
+
+    def active_barbers(self):
+        """الحلاقون الفعالون مرتبون بالاسم"""
+        return [b for b in self._get('barbers').values() if b.status == 'active']
+
+    def all_services(self):
+        """كل الخدمات (بما فيها غير الفعالة)"""
+        return list(self._get('services').values())
+
+    def all_barbers(self):
+        """كل الحلاقين (بما فيهم غير الفعالين)"""
+        return list(self._get('barbers').values())
+
+    def stats(self):
+        """رقم النسخة وعدّادات الإصابة والإخفاق لكل نوع"""
+        with self._lock:
+            return {'version': self.version, 'hits': dict(self.hits),
+                    'misses': dict(self.misses)}
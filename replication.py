@@ -0,0 +1,773 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔁 النسخ المتماثل بين الفروع
+Multi-branch replication through the change log
+
+كل فرع له قاعدة بياناته ومعرّف فرع (الإعداد branch_id). تغييرات العملاء
+والمواعيد والجلسات تُسجَّل أصلاً في change_log عبر triggers (changelog.py)،
+وهذه الوحدة تنقلها بين الفروع على دفعات:
+- ملفات sync_<الفرع>_<من>_<إلى>.jsonl.gz (نفس صيغة سطور النسخ التزايدية)
+- أو مباشرة عبر socket محلي: الفرع يشغّل serve والمكتب الرئيسي يسحب بـ pull.
+
+الدمج حتمي (نفس النتيجة مهما كان ترتيب وصول الدفعات من الفروع):
+- العميل يُطابَق بالجوال (customers.phone فريد): نفس الجوال في فرعين = عميل
+  واحد. بياناته (الاسم، البريد، ...) من أحدث تغيير بالترتيب (وقت التغيير،
+  الفرع)، والعدّادات (النقاط، الزيارات، المصروف) تُجمع: كل فرع يضيف الفرق
+  بين قيمته الجديدة وآخر قيمة وصلت منه. الفرع يصدّر حصته هو فقط (العدّاد
+  ناقص ما دمجه من الفروع الأخرى) حتى لا تُحسب حصة فرع مرتين عند تبادل
+  الفروع فيما بينها قبل المكتب الرئيسي.
+- المواعيد والجلسات تُطابَق برقمها مسبوقاً بالفرع (B1/APP-20250101-001)
+  فلا تتعارض الأرقام بين الفروع.
+- الحلاقون والخدمات تُطابَق بالاسم (ويُنشأ غير الموجود غير فعّال).
+
+التغييرات الواصلة من فرع آخر تبقى في change_log (للنسخ الاحتياطي) موسومة
+بمصدرها في عمود origin، ولا تُصدَّر مرة أخرى، فلا تدور بين الفروع.
+جدول replication_peers يحفظ لكل فرع: آخر ما استلمه منا (acked_id، ولا
+يُحذف من السجل قبله) وآخر ما طبقناه منه (applied_id)؛ كل دفعة تُطبَّق مع
+تحديث applied_id في نفس المعاملة، فإعادة تطبيقها لا تكرر شيئاً.
+أول تبادل مع فرع جديد يرسل لقطة كاملة من الجداول الثلاثة ثم التغييرات بعدها.
+
+الاستخدام:
+    python replication.py export PEER [مجلد]          (دفعة إلى ملف لفرع PEER)
+    python replication.py import FILE...
+    python replication.py serve [المنفذ]
+    python replication.py pull HOST [المنفذ]
+    python replication.py status
+    python replication.py bench [عدد_التغييرات]
+"""
+
+import gzip
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+import changelog
+
+# الجداول المنقولة بين الفروع
+REPLICATED_TABLES = ('customers', 'appointments', 'sessions')
+
+# عدّادات العميل التي تُجمع من الفروع بدل أن تُستبدل
+COUNTERS = ('loyalty_points', 'total_visits', 'total_spent', 'opening_points')
+
+# أعمدة العميل الوصفية (تؤخذ من أحدث تغيير)
+CUSTOMER_FIELDS = ('name', 'email', 'birth_date', 'address', 'preferences', 'notes')
+
+# عمود الرقم المميز لكل جدول
+NUMBER_COLUMNS = {'appointments': 'appointment_number', 'sessions': 'session_number'}
+
+# وقت تغييرات اللقطة الأولى: أقدم من أي تغيير حقيقي
+SNAPSHOT_AT = '0000-00-00 00:00:00.000'
+
+# عدد التغييرات في كل معاملة عند التطبيق
+BATCH_CHANGES = 5000
+
+SYNC_FOLDER = 'sync'
+DEFAULT_PORT = 8765
+
+# تصنيف الخدمات التي تُنشأ من بيانات فرع آخر
+BRANCH_CATEGORY = 'من الفروع'
+
+
+class ReplicationError(Exception):
+    """خطأ في النسخ المتماثل (دفعة ناقصة أو من نفس الفرع)"""
+
+
+@dataclass
+class SyncResult:
+    """نتيجة تصدير أو تطبيق دفعة (path = None عند التطبيق أو عدم وجود تغييرات)"""
+    origin: str
+    from_id: int
+    to_id: int
+    changes: int
+    seconds: float
+    path: Optional[str] = None
+    size: int = 0
+
+    @property
+    def changes_per_second(self):
+        return self.changes / self.seconds if self.seconds else 0.0
+
+
+# ==================== المخطط ====================
+
+def _create_branch_id(cursor):
+    cursor.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('branch_id', ?)",
+                   (uuid.uuid4().hex[:8],))
+
+
+def schema_statements():
+    """أوامر الجداول والأعمدة اللازمة (تُستخدم في الترحيلات)"""
+    return [
+        # NULL = تغيير من هذا الفرع، وإلا معرّف الفرع الذي وصل منه
+        "ALTER TABLE change_log ADD COLUMN origin TEXT",
+        '''CREATE TABLE IF NOT EXISTS replication_peers (
+               peer TEXT PRIMARY KEY,
+               acked_id INTEGER,
+               applied_id INTEGER NOT NULL DEFAULT 0,
+               updated_at TEXT
+           )''',
+        # صفوف الفروع الأخرى: المعرف عندهم ← المعرف هنا، ووقت آخر تغيير وعدّاداته
+        '''CREATE TABLE IF NOT EXISTS replica_rows (
+               origin TEXT NOT NULL,
+               table_name TEXT NOT NULL,
+               remote_id INTEGER NOT NULL,
+               local_id INTEGER NOT NULL,
+               changed_at TEXT NOT NULL,
+               counters TEXT,
+               created INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (origin, table_name, remote_id)
+           ) WITHOUT ROWID''',
+        '''CREATE INDEX IF NOT EXISTS idx_replica_rows_local
+           ON replica_rows (table_name, local_id)''',
+        _create_branch_id,
+    ]
+
+
+def branch_id(db):
+    """معرّف هذا الفرع"""
+    return db.fetchvalue("SELECT value FROM settings WHERE key = 'branch_id'", op='branch_id')
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _peer(cursor, peer):
+    cursor.execute("SELECT acked_id, applied_id FROM replication_peers WHERE peer = ?", (peer,))
+    return cursor.fetchone() or (None, 0)
+
+
+def _set_peer(cursor, peer, **values):
+    cursor.execute("INSERT OR IGNORE INTO replication_peers (peer) VALUES (?)", (peer,))
+    assignments = ', '.join(f'{column} = ?' for column in values)
+    cursor.execute(f"UPDATE replication_peers SET {assignments}, updated_at = ? WHERE peer = ?",
+                   (*values.values(), _now(), peer))
+
+
+def peers(db):
+    """حالة الفروع: [(الفرع، آخر ما استلمه منا، آخر ما طبقناه منه، وقت آخر تبادل)]"""
+    return db.fetchall("""
+        SELECT peer, acked_id, applied_id, updated_at FROM replication_peers ORDER BY peer
+    """, op='replication_peers')
+
+
+# ==================== التصدير ====================
+
+@contextmanager
+def _read_snapshot(db):
+    """قراءة متسقة: اللقطة والتغييرات وآخر رقم كلها من نفس لحظة WAL"""
+    conn = db.connection()
+    conn.execute("BEGIN")
+    try:
+        yield conn.cursor()
+    finally:
+        conn.execute("COMMIT")
+
+
+# مجموع ما دمجناه في كل عميل من الفروع الأخرى (آخر عدّادات وصلت من كل فرع)
+MERGED_COUNTERS = f"""
+    SELECT local_id, {', '.join(f"SUM(json_extract(counters, '$.{c}')) AS {c}"
+                                for c in COUNTERS)}
+    FROM replica_rows WHERE table_name = 'customers' GROUP BY local_id
+"""
+
+
+def _json_row(values):
+    return 'json_object(' + ', '.join(f"'{c}', {v}" for c, v in values.items()) + ')'
+
+
+def _snapshot_changes(cursor):
+    """صفوف هذا الفرع في الجداول المنقولة كتغييرات إدخال (لأول تبادل مع فرع)"""
+    for table in REPLICATED_TABLES:
+        columns = changelog._columns(cursor, table)
+        if table == 'customers':
+            # حصة هذا الفرع من العدّادات؛ عميل أنشأه الدمج يُرسل فقط إن كانت له حصة هنا
+            values = {c: f'(t.{c} - COALESCE(m.{c}, 0))' if c in COUNTERS else f't.{c}'
+                      for c in columns}
+            own = ' OR '.join(f'{values[c]} != 0' for c in COUNTERS if c in columns)
+            sql = f"""
+                SELECT json_array(t.id), {_json_row(values)} FROM customers t
+                LEFT JOIN ({MERGED_COUNTERS}) m ON m.local_id = t.id
+                WHERE t.id NOT IN (SELECT local_id FROM replica_rows
+                                   WHERE table_name = ? AND created = 1) OR {own}
+                ORDER BY t.id
+            """
+        else:
+            sql = f"""
+                SELECT json_array(id), {_json_row({c: c for c in columns})} FROM {table}
+                WHERE id NOT IN (SELECT local_id FROM replica_rows
+                                 WHERE table_name = ? AND created = 1)
+                ORDER BY id
+            """
+        for row_key, data in cursor.connection.execute(sql, (table,)):
+            yield 0, table, 'I', row_key, data, SNAPSHOT_AT
+
+
+def _local_changes(cursor, after_id, upto_id):
+    """تغييرات هذا الفرع فقط في الجداول المنقولة، بالترتيب"""
+    tables = ', '.join(f"'{t}'" for t in REPLICATED_TABLES)
+    cursor.execute(f"""
+        SELECT id, table_name, op, row_key, data, changed_at FROM change_log
+        WHERE id > ? AND id <= ? AND origin IS NULL AND table_name IN ({tables})
+        ORDER BY id
+    """, (after_id, upto_id))
+    while True:
+        rows = cursor.fetchmany(BATCH_CHANGES)
+        if not rows:
+            break
+        yield from rows
+
+
+def _own_counters(connection, changes):
+    """عدّادات العملاء في التغييرات: حصة هذا الفرع الآن بدل القيمة الكاملة المسجلة
+
+    المستقبِل يضيف الفرق عن آخر قيمة وصلت منا، فتكفي القيمة الحالية (من نفس
+    لحظة القراءة) مهما كان عدد التغييرات بينهما.
+    """
+    own = {}
+    for change_id, table, op, row_key, data, changed_at in changes:
+        if table == 'customers' and op != 'D':
+            customer_id = json.loads(row_key)[0]
+            if customer_id not in own:
+                merged = "COALESCE(SUM(json_extract(m.counters, '$.{}')), 0)"
+                own[customer_id] = connection.execute(f"""
+                    SELECT {', '.join(f't.{c} - {merged.format(c)}' for c in COUNTERS)}
+                    FROM customers t
+                    LEFT JOIN replica_rows m ON m.table_name = 'customers' AND m.local_id = t.id
+                    WHERE t.id = ? GROUP BY t.id
+                """, (customer_id,)).fetchone()
+            # عميل حُذف بعد التغيير: يليه تغيير الحذف
+            if own[customer_id] is not None:
+                row = json.loads(data)
+                row.update(zip(COUNTERS, own[customer_id]))
+                data = json.dumps(row, ensure_ascii=False)
+        yield change_id, table, op, row_key, data, changed_at
+
+
+def _last_local_change(cursor):
+    """رقم آخر تغيير يُصدَّر (تحديث replication_peers نفسه يُسجَّل ولا يُصدَّر)"""
+    tables = ', '.join(f"'{t}'" for t in REPLICATED_TABLES)
+    cursor.execute(f"""
+        SELECT id FROM change_log WHERE origin IS NULL AND table_name IN ({tables})
+        ORDER BY id DESC LIMIT 1
+    """)
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def batch_lines(db, after_id):
+    """سطور دفعة (الترويسة ثم تغيير في كل سطر) لفرع طبق منا حتى after_id
+
+    after_id = None: فرع لم يستلم شيئاً بعد، فتبدأ الدفعة بلقطة كاملة.
+    """
+    with _read_snapshot(db) as cursor:
+        to_id = changelog.sequence_position(cursor.connection)
+        snapshot = after_id is None
+        header = {'origin': branch_id(db), 'from_id': after_id or 0, 'to_id': to_id,
+                  'snapshot': snapshot, 'created_at': _now()}
+        yield json.dumps(header, ensure_ascii=False) + '\n'
+        # اللقطة تمثل الحالة عند to_id، فلا حاجة لتغييرات السجل قبلها
+        changes = _snapshot_changes(cursor) if snapshot else \
+            _own_counters(cursor.connection, _local_changes(cursor, after_id, to_id))
+        # row_key و data نصوص JSON جاهزة: تُكتب كما هي دون إعادة تحليل
+        for change_id, table, op, row_key, data, changed_at in changes:
+            yield f'[{change_id},"{table}","{op}",{row_key},{data or "null"},"{changed_at}"]\n'
+
+
+def export_batch(db, peer, folder=SYNC_FOLDER, job=None):
+    """ملف بتغييرات هذا الفرع التي لم تُرسل إلى peer بعد (path = None إن لم توجد)"""
+    started = time.perf_counter()
+    cursor = db.connection().cursor()
+    acked_id = _peer(cursor, peer)[0]
+    if acked_id is not None and acked_id >= _last_local_change(cursor):
+        return SyncResult(branch_id(db), acked_id, acked_id, 0, time.perf_counter() - started)
+
+    os.makedirs(folder, exist_ok=True)
+    lines = batch_lines(db, acked_id)
+    header = json.loads(next(lines))
+    path = os.path.join(folder, f"sync_{header['origin']}_{header['from_id']}_{header['to_id']}"
+                                f".jsonl.gz")
+    partial = path + '.part'
+    changes = 0
+    try:
+        with db.timed('replication_export'), gzip.open(partial, 'wt', encoding='utf-8') as out:
+            out.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for line in lines:
+                out.write(line)
+                changes += 1
+                if job and changes % BATCH_CHANGES == 0:
+                    job.check()
+        os.replace(partial, path)
+    except BaseException:
+        lines.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    # الملف مكتوب: يُعتبر مستلَماً (لا يُحذف من السجل قبل ذلك)
+    with db.transaction('replication_ack') as cursor:
+        _set_peer(cursor, peer, acked_id=header['to_id'])
+    return SyncResult(header['origin'], header['from_id'], header['to_id'], changes,
+                      time.perf_counter() - started, path, os.path.getsize(path))
+
+
+# ==================== الدمج ====================
+
+class Merger:
+    """تطبيق تغييرات فرع واحد على قاعدة البيانات الحالية (داخل معاملة)"""
+
+    def __init__(self, cursor, origin):
+        self.cursor = cursor
+        self.origin = origin
+        self._names = {'barbers': {}, 'services': {}}
+
+    # ==================== جدول الربط ====================
+
+    def _mapped(self, table, remote_id):
+        self.cursor.execute("""
+            SELECT local_id, changed_at, counters, created FROM replica_rows
+            WHERE origin = ? AND table_name = ? AND remote_id = ?
+        """, (self.origin, table, remote_id))
+        return self.cursor.fetchone()
+
+    def _map(self, table, remote_id, local_id, changed_at, counters=None, created=0):
+        self.cursor.execute("""
+            INSERT OR REPLACE INTO replica_rows
+                (origin, table_name, remote_id, local_id, changed_at, counters, created)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (self.origin, table, remote_id, local_id, changed_at,
+              None if counters is None else json.dumps(counters), created))
+
+    def _unmap(self, table, remote_id):
+        self.cursor.execute("""
+            DELETE FROM replica_rows WHERE origin = ? AND table_name = ? AND remote_id = ?
+        """, (self.origin, table, remote_id))
+
+    # ==================== العملاء ====================
+
+    def _customer_version(self, local_id):
+        """أحدث (وقت، فرع) طُبق على هذا العميل من أي فرع"""
+        self.cursor.execute("""
+            SELECT MAX(changed_at || '|' || origin) FROM replica_rows
+            WHERE table_name = 'customers' AND local_id = ?
+        """, (local_id,))
+        return self.cursor.fetchone()[0] or ''
+
+    def _phone_owner(self, phone):
+        self.cursor.execute("SELECT id FROM customers WHERE phone = ?", (phone,))
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def _customer(self, remote_id, row, changed_at):
+        mapped = self._mapped('customers', remote_id)
+        counters = {c: row.get(c) or 0 for c in COUNTERS}
+        if mapped:
+            local_id, last_at, previous, created = mapped
+            # ربط سُجل قبل إضافة عدّاد جديد: قيمته السابقة صفر
+            previous = {**dict.fromkeys(COUNTERS, 0), **json.loads(previous)}
+        else:
+            previous = dict.fromkeys(COUNTERS, 0)
+            local_id = self._phone_owner(row['phone'])
+            created = local_id is None
+            if created:
+                self.cursor.execute("INSERT INTO customers (name, phone) VALUES (?, ?)",
+                                    (row['name'], row['phone']))
+                local_id = self.cursor.lastrowid
+            last_at = changed_at
+
+        # البيانات الوصفية من أحدث تغيير؛ جوال يخص عميلاً آخر هنا لا يُنقل
+        if f'{changed_at}|{self.origin}' >= self._customer_version(local_id):
+            fields = [c for c in CUSTOMER_FIELDS if c in row]
+            values = [row[c] for c in fields]
+            owner = self._phone_owner(row['phone'])
+            if owner is None or owner == local_id:
+                fields.append('phone')
+                values.append(row['phone'])
+            self.cursor.execute(f"""
+                UPDATE customers SET {', '.join(f'{c} = ?' for c in fields)} WHERE id = ?
+            """, (*values, local_id))
+
+        # العدّادات: الفرق عن آخر قيمة وصلت من هذا الفرع (الجمع لا يتأثر بالترتيب)
+        self.cursor.execute(f"""
+            UPDATE customers
+            SET {', '.join(f'{c} = {c} + ?' for c in COUNTERS)},
+                last_visit = MAX(COALESCE(last_visit, ?), COALESCE(?, last_visit))
+            WHERE id = ?
+        """, (*(counters[c] - previous[c] for c in COUNTERS), row.get('last_visit'),
+              row.get('last_visit'), local_id))
+        self._map('customers', remote_id, local_id, max(last_at, changed_at), counters, created)
+
+    def _delete_customer(self, remote_id):
+        mapped = self._mapped('customers', remote_id)
+        if not mapped:
+            return
+        local_id, _, previous, created = mapped
+        previous = {**dict.fromkeys(COUNTERS, 0), **json.loads(previous)}
+        self._unmap('customers', remote_id)
+        self.cursor.execute(f"""
+            UPDATE customers SET {', '.join(f'{c} = {c} - ?' for c in COUNTERS)}
+            WHERE id = ?
+        """, (*(previous[c] for c in COUNTERS), local_id))
+        if created:
+            # عميل أنشأه هذا الفرع فقط ولا يشير إليه شيء هنا
+            self.cursor.execute("""
+                DELETE FROM customers WHERE id = ?
+                  AND NOT EXISTS (SELECT 1 FROM replica_rows
+                                  WHERE table_name = 'customers' AND local_id = ?)
+                  AND NOT EXISTS (SELECT 1 FROM appointments WHERE customer_id = ?)
+                  AND NOT EXISTS (SELECT 1 FROM sessions WHERE customer_id = ?)
+            """, (local_id,) * 4)
+
+    def _local_customer(self, remote_id, phone):
+        if remote_id is not None:
+            mapped = self._mapped('customers', remote_id)
+            if mapped:
+                return mapped[0]
+        return self._phone_owner(phone) if phone else None
+
+    # ==================== الحلاقون والخدمات ====================
+
+    def _by_name(self, table, name, create):
+        cache = self._names[table]
+        if name not in cache:
+            self.cursor.execute(f"SELECT id FROM {table} WHERE name = ? ORDER BY id LIMIT 1",
+                                (name,))
+            row = self.cursor.fetchone()
+            if row is None:
+                create()
+                row = (self.cursor.lastrowid,)
+            cache[name] = row[0]
+        return cache[name]
+
+    def _barber(self, row):
+        return self._by_name('barbers', row['barber_name'], lambda: self.cursor.execute(
+            "INSERT INTO barbers (name, phone, status) VALUES (?, '', 'inactive')",
+            (row['barber_name'],)))
+
+    def _service(self, row):
+        return self._by_name('services', row['service_name'], lambda: self.cursor.execute("""
+            INSERT INTO services (name, category, duration, price, cost, status)
+            VALUES (?, ?, ?, ?, ?, 'inactive')
+        """, (row['service_name'], BRANCH_CATEGORY, row.get('duration') or 30, row['price'],
+              row.get('cost') or 0)))
+
+    # ==================== المواعيد والجلسات ====================
+
+    def _record(self, table, remote_id, row, changed_at):
+        number = NUMBER_COLUMNS[table]
+        values = {c: v for c, v in row.items() if c != 'id'}
+        if not values[number].startswith(f'{self.origin}/'):
+            values[number] = f'{self.origin}/{values[number]}'
+        values['customer_id'] = self._local_customer(row.get('customer_id'), row.get('phone'))
+        values['barber_id'] = self._barber(row)
+        if table == 'appointments':
+            values['service_id'] = self._service(row)
+
+        columns = list(values)
+        updates = ', '.join(f'{c} = excluded.{c}' for c in columns if c != number)
+        self.cursor.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join('?' * len(columns))})
+            ON CONFLICT ({number}) DO UPDATE SET {updates}
+        """, [values[c] for c in columns])
+        self.cursor.execute(f"SELECT id FROM {table} WHERE {number} = ?", (values[number],))
+        self._map(table, remote_id, self.cursor.fetchone()[0], changed_at, created=1)
+
+    def _delete_record(self, table, remote_id):
+        mapped = self._mapped(table, remote_id)
+        if mapped:
+            self.cursor.execute(f"DELETE FROM {table} WHERE id = ?", (mapped[0],))
+            self._unmap(table, remote_id)
+
+    # ==================== التطبيق ====================
+
+    def apply(self, table, op, row_key, data, changed_at):
+        """تطبيق تغيير واحد (row_key و data بعد تحليل JSON)"""
+        remote_id = row_key[0]
+        if table == 'customers':
+            if op == 'D':
+                self._delete_customer(remote_id)
+            else:
+                self._customer(remote_id, data, changed_at)
+        elif op == 'D':
+            self._delete_record(table, remote_id)
+        else:
+            self._record(table, remote_id, data, changed_at)
+
+
+def apply_batch(db, header, changes, job=None):
+    """تطبيق دفعة من فرع آخر على دفعات من BATCH_CHANGES تغيير، كل منها في معاملة
+
+    changes: قوائم [id, table, op, row_key, data, changed_at] بعد تحليل JSON.
+    applied_id للفرع يُحدَّث مع كل معاملة، فالدفعة المقطوعة تُستأنف وإعادة
+    الدفعة نفسها لا تكرر شيئاً.
+    """
+    started = time.perf_counter()
+    origin = header['origin']
+    if origin == branch_id(db):
+        raise ReplicationError("الدفعة من نفس الفرع")
+
+    _, applied_id = _peer(db.connection().cursor(), origin)
+    if header['snapshot']:
+        applied_id = 0
+    elif header['from_id'] > applied_id:
+        raise ReplicationError(f"دفعة ناقصة من {origin}: متوقع بداية {applied_id} "
+                               f"ووُجد {header['from_id']}")
+    if header['to_id'] <= applied_id and not header['snapshot']:
+        return SyncResult(origin, header['from_id'], header['to_id'], 0,
+                          time.perf_counter() - started)
+
+    applied = 0
+    changes = iter(changes)
+    while True:
+        with db.transaction('replication_apply') as cursor:
+            merger = Merger(cursor, origin)
+            log_start = changelog.sequence_position(cursor.connection)
+            count = 0
+            for change_id, table, op, row_key, data, changed_at in changes:
+                # لقطة (id = 0) أو تغيير لم يُطبق بعد
+                if change_id == 0 or change_id > applied_id:
+                    merger.apply(table, op, row_key, data, changed_at)
+                    applied_id = max(applied_id, change_id)
+                    count += 1
+                if count >= BATCH_CHANGES:
+                    break
+            else:
+                applied_id = header['to_id']
+            # ما سجّلته triggers هنا من تطبيق الدفعة: للنسخ الاحتياطي فقط، لا يُعاد تصديره
+            cursor.execute("UPDATE change_log SET origin = ? WHERE id > ?", (origin, log_start))
+            _set_peer(cursor, origin, applied_id=applied_id)
+        applied += count
+        if job:
+            job.check()
+        if applied_id == header['to_id']:
+            break
+    return SyncResult(origin, header['from_id'], header['to_id'], applied,
+                      time.perf_counter() - started)
+
+
+def _parse(lines):
+    header = json.loads(next(lines))
+    return header, (json.loads(line) for line in lines)
+
+
+def import_batch(db, path, job=None):
+    """تطبيق ملف دفعة"""
+    with gzip.open(path, 'rt', encoding='utf-8') as source:
+        header, changes = _parse(iter(source))
+        result = apply_batch(db, header, changes, job)
+    result.path = path
+    return result
+
+
+def import_folder(db, folder=SYNC_FOLDER, job=None):
+    """تطبيق كل ملفات الدفعات في مجلد بترتيب بدايتها (ما طُبق مسبقاً يُتخطى)"""
+    headers = []
+    for name in os.listdir(folder):
+        if name.startswith('sync_') and name.endswith('.jsonl.gz'):
+            path = os.path.join(folder, name)
+            with gzip.open(path, 'rt', encoding='utf-8') as source:
+                header = json.loads(source.readline())
+            headers.append((header['origin'], not header['snapshot'], header['from_id'], path))
+    mine = branch_id(db)
+    return [import_batch(db, path, job) for origin, _, _, path in sorted(headers)
+            if origin != mine]
+
+
+# ==================== عبر الشبكة المحلية ====================
+
+def serve(db, host='127.0.0.1', port=DEFAULT_PORT, once=False):
+    """خادم الدفعات: الفرع الطالب يرسل آخر ما طبقه منا، فيستلم ما بعده
+
+    الطلب نفسه إقرار بالاستلام: acked_id للطالب = آخر ما طبقه.
+    """
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            self.wfile.write((json.dumps({'origin': branch_id(db)}) + '\n').encode())
+            request = json.loads(self.rfile.readline())
+            if request.get('after') is not None:
+                with db.transaction('replication_ack') as cursor:
+                    _set_peer(cursor, request['peer'], acked_id=request['after'])
+            for line in batch_lines(db, request.get('after')):
+                self.wfile.write(line.encode('utf-8'))
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+        if once:
+            server.handle_request()
+        else:
+            print(f"🔁 فرع {branch_id(db)} ينتظر الطلبات على {host}:{port}")
+            server.serve_forever()
+
+
+def pull(db, host='127.0.0.1', port=DEFAULT_PORT, job=None):
+    """سحب وتطبيق تغييرات فرع يشغّل serve"""
+    import socket
+
+    with socket.create_connection((host, port)) as conn, \
+            conn.makefile('rb') as reader, conn.makefile('wb') as writer:
+        origin = json.loads(reader.readline())['origin']
+        known = db.fetchone("SELECT applied_id FROM replication_peers WHERE peer = ?",
+                            (origin,), op='replication_peers')
+        writer.write((json.dumps({'peer': branch_id(db),
+                                  'after': known[0] if known else None}) + '\n').encode())
+        writer.flush()
+        header, changes = _parse(line.decode('utf-8') for line in reader)
+        return apply_batch(db, header, changes, job)
+
+
+# ==================== قياس الأداء ====================
+
+def _digest(db, rollup_columns):
+    """محتوى قابل للمقارنة بين قاعدتين (بدون المعرفات المحلية)"""
+    return (
+        db.fetchall("""SELECT phone, name, loyalty_points, total_visits, ROUND(total_spent, 2),
+                              last_visit FROM customers ORDER BY phone"""),
+        db.fetchall("""SELECT a.appointment_number, c.phone, a.barber_name, a.service_name,
+                              a.status, a.price FROM appointments a
+                       LEFT JOIN customers c ON c.id = a.customer_id
+                       ORDER BY a.appointment_number"""),
+        db.fetchall("""SELECT s.session_number, c.phone, s.final_price FROM sessions s
+                       LEFT JOIN customers c ON c.id = s.customer_id ORDER BY s.session_number"""),
+        # التجميعات بأسماء الحلاقين والخدمات (معرفاتها هنا تختلف بترتيب إنشائها)
+        db.fetchall(f"""SELECT r.day, b.name, s.name, {', '.join(f'r.{c}' for c in rollup_columns)}
+                        FROM rollup_barber_service r
+                        JOIN barbers b ON b.id = r.barber_id
+                        JOIN services s ON s.id = r.service_id
+                        ORDER BY 1, 2, 3"""),
+    )
+
+
+def benchmark(changes=20000):
+    """فرعان يتبادلان مع مكتبين رئيسيين بترتيبين مختلفين (ملفات و socket)"""
+    import tempfile
+    import threading
+    from datetime import timedelta
+    from database import Database
+    from benchmarks.generator import generate
+    from engine import BookingService, CheckoutService, BookingRequest, CheckoutRequest
+    from migrations import apply_migrations
+    from rollups import ROLLUP_COLUMNS
+    from schema import create_tables, insert_default_data
+
+    folder = tempfile.mkdtemp()
+    branches = []
+    for seed in (1, 2):
+        path = os.path.join(folder, f'branch_{seed}.db')
+        # نفس أرقام الجوال في الفرعين (العملاء المشتركون يُدمجون بالجوال)
+        generate(path, 20000, 5000, days=90, seed=seed, verbose=False)
+        branches.append(Database(path))
+
+    def work(db, count, tag):
+        """حجوزات وإنهاء وإلغاء وجلسات فورية (كلها تُسجَّل في change_log)"""
+        booking, checkout = BookingService(db), CheckoutService(db)
+        barber_id, barber_name = db.fetchone("SELECT id, name FROM barbers LIMIT 1")
+        service_id, service_name, price = db.fetchone("SELECT id, name, price FROM services LIMIT 1")
+        day = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        results = booking.book_many([
+            BookingRequest(f'عميل {tag}{i}', f'05{i % 3000:08d}', barber_id, barber_name,
+                           service_id, service_name, day, '10:00', price)
+            for i in range(count)])
+        for i, result in enumerate(results):
+            if i % 3 == 0:
+                booking.complete(result.appointment_id)
+            elif i % 7 == 0:
+                booking.cancel(result.appointment_id)
+        for i in range(count // 10):
+            checkout.checkout(CheckoutRequest(f'عميل {tag}{i}', f'05{i:08d}', barber_id,
+                                              barber_name, service_id, service_name, price))
+
+    def head_office(name):
+        db = Database(os.path.join(folder, f'{name}.db'))
+        with db.transaction() as cursor:
+            create_tables(cursor)
+        apply_migrations(db, verbose=False)
+        with db.transaction() as cursor:
+            insert_default_data(cursor)
+        return db
+
+    per_branch = max(1, changes // 8)
+    hq_files, hq_socket = head_office('hq_files'), head_office('hq_socket')
+
+    def over_files(hq, order):
+        results = []
+        for db in order:
+            batch = export_batch(db, branch_id(hq), os.path.join(folder, 'sync'))
+            results.append(import_batch(hq, batch.path))
+        return results
+
+    def over_socket(hq, order):
+        results = []
+        for port, db in enumerate(order, DEFAULT_PORT):
+            server = threading.Thread(target=serve, args=(db, '127.0.0.1', port, True))
+            server.start()
+            time.sleep(0.05)
+            results.append(pull(hq, '127.0.0.1', port))
+            server.join()
+        return results
+
+    def report(label, results):
+        for result in results:
+            print(f"{label:<14} {result.origin} ({result.from_id}, {result.to_id}]: "
+                  f"{result.changes:>7,} تغيير في {result.seconds:6.2f}s = "
+                  f"{result.changes_per_second:>8,.0f} تغيير/ث")
+
+    # اللقطة الأولى، ثم تغييرات جديدة في الفرعين، ثم الدفعات التزايدية
+    report('لقطة/ملفات', over_files(hq_files, branches))
+    report('لقطة/socket', over_socket(hq_socket, branches[::-1]))
+    for tag, db in zip('AB', branches):
+        work(db, per_branch, tag)
+    incremental = over_files(hq_files, branches)
+    report('تزايدي/ملفات', incremental)
+    report('تزايدي/socket', over_socket(hq_socket, branches[::-1]))
+
+    same = _digest(hq_files, ROLLUP_COLUMNS) == _digest(hq_socket, ROLLUP_COLUMNS)
+    # إعادة تطبيق دفعة سبق تطبيقها لا تغيّر شيئاً
+    replayed = import_batch(hq_files, incremental[0].path).changes == 0 \
+        and _digest(hq_files, ROLLUP_COLUMNS) == _digest(hq_socket, ROLLUP_COLUMNS)
+    customers = hq_files.fetchvalue("SELECT COUNT(*) FROM customers")
+    appointments = hq_files.fetchvalue("SELECT COUNT(*) FROM appointments")
+    print(f"المكتب الرئيسي: {customers:,} عميل، {appointments:,} موعد؛ "
+          f"نفس النتيجة بترتيبين مختلفين: {same}؛ إعادة دفعة بلا أثر: {replayed}")
+    for db in branches + [hq_files, hq_socket]:
+        db.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    command, args = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else (None, [])
+    if command == 'bench':
+        benchmark(int(args[0]) if args else 20000)
+    elif command in ('export', 'import', 'pull') and args or command in ('serve', 'status'):
+        database = Database('database/barbershop.db')
+        if command == 'export':
+            result = export_batch(database, args[0], *args[1:2])
+            print(f"📤 {result.changes:,} تغيير → {result.path}" if result.path
+                  else "لا توجد تغييرات جديدة لهذا الفرع")
+        elif command == 'import':
+            for path in args:
+                result = import_batch(database, path)
+                print(f"📥 {os.path.basename(path)}: {result.changes:,} تغيير "
+                      f"({result.changes_per_second:,.0f}/ث)")
+        elif command == 'serve':
+            serve(database, port=int(args[0]) if args else DEFAULT_PORT)
+        elif command == 'pull':
+            result = pull(database, args[0], int(args[1]) if len(args) > 1 else DEFAULT_PORT)
+            print(f"📥 {result.origin}: {result.changes:,} تغيير ({result.changes_per_second:,.0f}/ث)")
+        else:
+            print(f"هذا الفرع: {branch_id(database)}")
+            for peer, acked_id, applied_id, updated_at in peers(database):
+                print(f"{peer:<10} استلم منا حتى {acked_id}  طبقنا منه حتى {applied_id}  {updated_at}")
+        database.close()
+    else:
+        print(__doc__)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📈 التقارير
+Reports engine
+
+تقارير الإيرادات والأرباح والعمولات وشعبية الخدمات لأي فترة، تُقرأ من
+جداول التجميع (rollups.py) وليس من المواعيد والجلسات مباشرة، فيبقى زمنها
+بالميلي ثانية حتى مع سنوات من البيانات.
+
+مثال:
+    reports = ReportsService(db, reference)
+    for row in reports.by_barber('2025-01-01', '2025-01-31'):
+        print(row.name, row.revenue, row.commission, row.profit)
+
+قياس الأداء (التجميعات مقابل مسح الجداول الأصلية):
+    python reports.py bench [عدد_المواعيد]
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from rollups import ROLLUP_COLUMNS
+
+SUMS = ', '.join(f'COALESCE(SUM({c}), 0)' for c in ROLLUP_COLUMNS)
+
+
+def split_period(start, end):
+    """تقسيم فترة إلى أشهر كاملة (من الجدول الشهري) وأيام على الطرفين (من اليومي)
+
+    يُرجع [(الجدول، العمود، من، إلى)].
+    """
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    # أول يوم من أول شهر كامل، وأول يوم بعد آخر شهر كامل
+    month_start = first if first.day == 1 else (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    after_last = last + timedelta(days=1)
+    month_end = after_last if after_last.day == 1 else after_last.replace(day=1)
+
+    if month_start >= month_end:
+        return [('rollup_barber_service', 'day', start, end)]
+
+    parts = [('rollup_month_barber_service', 'month', month_start.isoformat()[:7],
+              (month_end - timedelta(days=1)).isoformat()[:7])]
+    if first < month_start:
+        parts.append(('rollup_barber_service', 'day', start,
+                      (month_start - timedelta(days=1)).isoformat()))
+    if month_end <= last:
+        parts.append(('rollup_barber_service', 'day', month_end.isoformat(), end))
+    return parts
+
+
+@dataclass
+class ReportRow:
+    """صف تقرير: المفتاح (يوم/حلاق/خدمة) واسمه والمجاميع"""
+    key: object
+    name: str
+    bookings: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    revenue: float = 0
+    cost: float = 0
+    commission: float = 0
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost - self.commission
+
+
+@dataclass
+class PaymentRow:
+    """إيرادات طريقة دفع"""
+    payment_method: str
+    count: int
+    revenue: float
+
+
+class ReportsService:
+    """تقارير فترة من جداول التجميع"""
+
+    def __init__(self, db, reference=None):
+        self.db = db
+        self.reference = reference
+
+    def _grouped(self, column, start, end, order, op):
+        """مجاميع الفترة مجمّعة بعمود (barber_id أو service_id)"""
+        parts = split_period(start, end)
+        union = ' UNION ALL '.join(
+            f"SELECT {column}, {', '.join(ROLLUP_COLUMNS)} FROM {table} "
+            f"WHERE {key} BETWEEN ? AND ?" for table, key, _, _ in parts)
+        params = [value for _, _, low, high in parts for value in (low, high)]
+        return self.db.fetchall(f"""
+            SELECT {column}, {SUMS} FROM ({union})
+            GROUP BY {column}
+            ORDER BY {order}
+        """, params, op=op)
+
+    def summary(self, start, end):
+        """مجاميع الفترة كاملة"""
+        totals = [0] * len(ROLLUP_COLUMNS)
+        for table, key, low, high in split_period(start, end):
+            row = self.db.fetchone(f"SELECT {SUMS} FROM {table} WHERE {key} BETWEEN ? AND ?",
+                                   (low, high), op='report_summary')
+            totals = [a + b for a, b in zip(totals, row)]
+        return ReportRow((start, end), f'{start} — {end}', *totals)
+
+    def by_day(self, start, end):
+        """الإيرادات والأرباح يوماً بيوم"""
+        rows = self.db.fetchall(f"""
+            SELECT day, {SUMS} FROM rollup_barber_service
+            WHERE day BETWEEN ? AND ?
+            GROUP BY day ORDER BY day
+        """, (start, end), op='report_by_day')
+        return [ReportRow(day, day, *sums) for day, *sums in rows]
+
+    def by_barber(self, start, end):
+        """أداء الحلاقين: المكتمل والإيرادات والعمولة والربح (الأعلى إيراداً أولاً)"""
+        rows = self._grouped('barber_id', start, end, 'revenue DESC', 'report_by_barber')
+        return [ReportRow(barber_id, self._name('barber', barber_id), *sums)
+                for barber_id, *sums in rows]
+
+    def by_service(self, start, end):
+        """شعبية الخدمات: عدد المكتمل أولاً ثم الإيرادات"""
+        rows = self._grouped('service_id', start, end, 'completed DESC, revenue DESC',
+                             'report_by_service')
+        return [ReportRow(service_id, self._name('service', service_id), *sums)
+                for service_id, *sums in rows]
+
+    def by_payment(self, start, end):
+        """الإيرادات حسب طريقة الدفع"""
+        rows = self.db.fetchall("""
+            SELECT payment_method, SUM(count), SUM(revenue) FROM rollup_payment
+            WHERE day BETWEEN ? AND ?
+            GROUP BY payment_method
+            ORDER BY SUM(revenue) DESC
+        """, (start, end), op='report_by_payment')
+        return [PaymentRow(*row) for row in rows]
+
+    def _name(self, kind, item_id):
+        item = getattr(self.reference, kind)(item_id) if self.reference else None
+        return item.name if item else f'#{item_id}'
+
+
+# ==================== قياس الأداء ====================
+
+# نفس تقرير الحلاقين بمسح المواعيد والجلسات (للمقارنة فقط)
+RAW_BY_BARBER = """
+    SELECT barber_id, SUM(completed), SUM(revenue) FROM (
+        SELECT barber_id, SUM(status = 'completed') AS completed,
+               SUM(CASE WHEN status = 'completed' THEN price ELSE 0 END) AS revenue
+        FROM appointments WHERE appointment_date BETWEEN ? AND ?
+        GROUP BY barber_id
+        UNION ALL
+        SELECT barber_id, COUNT(*), SUM(final_price)
+        FROM sessions WHERE check_out_time >= ? AND check_out_time < ? || '~'
+          AND status = 'completed'
+        GROUP BY barber_id
+    ) GROUP BY barber_id
+"""
+
+
+def benchmark(appointments=1000000, repeats=5):
+    """زمن التقارير من التجميعات ومن الجداول الأصلية لفترات مختلفة"""
+    import os
+    import tempfile
+    import time
+    from database import Database
+    from benchmarks.generator import generate
+    from reference_data import ReferenceData
+
+    path = os.path.join(tempfile.mkdtemp(), 'reports_bench.db')
+    generate(path, appointments, max(1000, appointments // 5), days=3 * 365, verbose=False)
+    db = Database(path)
+    reports = ReportsService(db, ReferenceData(db).load())
+    today = date.today()
+
+    def timed(fn):
+        fn()
+        started = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - started) / repeats * 1000
+
+    print(f"{'period':<8}{'summary':>10}{'barber':>10}{'service':>10}{'payment':>10}{'raw':>12}")
+    for label, days in (('day', 1), ('month', 30), ('year', 365), ('3 years', 3 * 365)):
+        start, end = (today - timedelta(days=days - 1)).isoformat(), today.isoformat()
+        times = [timed(lambda f=f: f(start, end)) for f in
+                 (reports.summary, reports.by_barber, reports.by_service, reports.by_payment)]
+        raw = timed(lambda: db.fetchall(RAW_BY_BARBER, (start, end, start, end)))
+        print(f"{label:<8}" + ''.join(f"{t:>8.2f}ms" for t in times) + f"{raw:>10.2f}ms")
+
+    # التحقق: تجميعات الـ triggers بعد حجوزات وإنهاء وإلغاء = إعادة الحساب الكامل
+    from engine import BookingService, CheckoutService, BookingRequest, CheckoutRequest
+    from rollups import rebuild_range
+    booking, checkout = BookingService(db), CheckoutService(db)
+    for i in range(200):
+        result = booking.book(BookingRequest(f'عميل {i}', f'07{i:08d}', 1 + i % 8, 'حلاق',
+                                             1 + i % 22, 'خدمة', today.isoformat(), '10:00', 50))
+        (booking.complete, booking.cancel, booking.delete, booking.confirm)[i % 4](
+            result.appointment_id)
+        checkout.checkout(CheckoutRequest(f'عميل {i}', f'07{i:08d}', 1 + i % 8, 'حلاق',
+                                          1 + i % 22, 'خدمة', 30))
+
+    def snapshot():
+        return [tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                for table in ('rollup_barber_service', 'rollup_month_barber_service',
+                              'rollup_payment')
+                for row in db.fetchall(f"SELECT * FROM {table} ORDER BY 1, 2, 3")]
+
+    before = snapshot()
+    started = time.perf_counter()
+    rebuild_range(db)
+    print(f"rebuild: {time.perf_counter() - started:.2f}s، مطابق للـ triggers: {before == snapshot()}")
+    db.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000000)
+    else:
+        print(__doc__)
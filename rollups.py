@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧮 جداول التجميع المسبق للتقارير
+Report rollups
+
+- rollup_barber_service: صف لكل (يوم، حلاق، خدمة) فيه عدد الحجوزات
+  والمكتمل والملغي والإيرادات والتكلفة والعمولة، من المواعيد والجلسات.
+- rollup_month_barber_service: نفس المجاميع لكل (شهر، حلاق، خدمة)، للفترات
+  الطويلة (سنة = 12 شهراً بدلاً من 365 يوماً).
+- rollup_payment: صف لكل (يوم، طريقة دفع) فيه عدد العمليات المكتملة وإيرادها.
+
+تحدّثها triggers على appointments و sessions مع كل إدخال أو تعديل أو حذف
+(مثل daily_stats)، فتقرأ التقارير آلاف الصفوف المجمّعة لفترة طويلة بدلاً من
+مسح كل المواعيد والجلسات.
+
+الجلسة تُحسب على أول خدمة في قائمة خدماتها (الجلسات الفورية بخدمة واحدة).
+
+إعادة الحساب الكامل لفترة:
+    python rollups.py rebuild [من YYYY-MM-DD] [إلى YYYY-MM-DD]
+"""
+
+from daily_stats import FIRST_DAY, LAST_DAY, SESSION_DAY
+
+UNKNOWN_PAYMENT = 'غير محدد'
+
+# خدمة الجلسة: أول عنصر في JSON الخدمات
+SESSION_SERVICE = "COALESCE(json_extract({row}.services, '$[0].id'), 0)"
+
+ROLLUP_COLUMNS = ('bookings', 'completed', 'cancelled', 'revenue', 'cost', 'commission')
+
+
+# ==================== تعريف الجداول والـ triggers ====================
+
+def _upsert(table, key_columns, values):
+    """INSERT ... ON CONFLICT DO UPDATE يجمع القيم على الصف الموجود"""
+    columns = list(values)
+    updates = ',\n                '.join(f'{c} = {c} + excluded.{c}'
+                                          for c in columns if c not in key_columns)
+    return f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        VALUES ({', '.join(values.values())})
+        ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET
+                {updates};"""
+
+
+def _payment_upsert(day, row, amount, condition, sign):
+    return f"""
+        INSERT INTO rollup_payment (day, payment_method, count, revenue)
+        SELECT {day}, COALESCE({row}.payment_method, '{UNKNOWN_PAYMENT}'), {sign}, {sign} * {amount}
+        WHERE {condition}
+        ON CONFLICT (day, payment_method) DO UPDATE SET
+            count = count + excluded.count,
+            revenue = revenue + excluded.revenue;"""
+
+
+def _barber_service_upserts(day, values):
+    """نفس المجاميع في الجدول اليومي والشهري"""
+    return (_upsert('rollup_barber_service', ('day', 'barber_id', 'service_id'),
+                    {'day': day, **values})
+            + _upsert('rollup_month_barber_service', ('month', 'barber_id', 'service_id'),
+                      {'month': f'substr({day}, 1, 7)', **values}))
+
+
+def _appointment_delta(row, sign):
+    """أوامر إضافة (sign=+1) أو طرح (sign=-1) مساهمة موعد في التجميعات"""
+    completed = f"({row}.status = 'completed')"
+    day = f"{row}.appointment_date"
+    return _barber_service_upserts(day, {
+        'barber_id': f'{row}.barber_id',
+        'service_id': f'{row}.service_id',
+        'bookings': f'{sign}',
+        'completed': f'{sign} * {completed}',
+        'cancelled': f"{sign} * ({row}.status = 'cancelled')",
+        'revenue': f'{sign} * {completed} * {row}.price',
+        'cost': f'{sign} * {completed} * COALESCE({row}.cost, 0)',
+        'commission': f'{sign} * {completed} * COALESCE({row}.commission, 0)',
+    }) + _payment_upsert(day, row, f'{row}.price', completed, sign)
+
+
+def _session_delta(row, sign):
+    """أوامر إضافة أو طرح مساهمة جلسة في التجميعات"""
+    completed = f"({row}.status = 'completed')"
+    day = SESSION_DAY.format(row=row)
+    return _barber_service_upserts(day, {
+        'barber_id': f'{row}.barber_id',
+        'service_id': SESSION_SERVICE.format(row=row),
+        'bookings': '0',
+        'completed': f'{sign} * {completed}',
+        'cancelled': f"{sign} * ({row}.status = 'cancelled')",
+        'revenue': f'{sign} * {completed} * {row}.final_price',
+        'cost': f'{sign} * {completed} * COALESCE({row}.total_cost, 0)',
+        'commission': f'{sign} * {completed} * COALESCE({row}.total_commission, 0)',
+    }) + _payment_upsert(day, row, f'{row}.final_price', completed, sign)
+
+
+def schema_statements():
+    """أوامر إنشاء الجداول والـ triggers (تُستخدم في الترحيلات)"""
+    watched_appointments = ('appointment_date, status, price, cost, commission, '
+                            'barber_id, service_id, payment_method')
+    watched_sessions = ('check_out_time, status, final_price, total_cost, total_commission, '
+                        'barber_id, services, payment_method')
+    return [
+        '''CREATE TABLE IF NOT EXISTS rollup_barber_service (
+               day TEXT NOT NULL,
+               barber_id INTEGER NOT NULL,
+               service_id INTEGER NOT NULL,
+               bookings INTEGER NOT NULL DEFAULT 0,
+               completed INTEGER NOT NULL DEFAULT 0,
+               cancelled INTEGER NOT NULL DEFAULT 0,
+               revenue REAL NOT NULL DEFAULT 0,
+               cost REAL NOT NULL DEFAULT 0,
+               commission REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (day, barber_id, service_id)
+           ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS rollup_month_barber_service (
+               month TEXT NOT NULL,
+               barber_id INTEGER NOT NULL,
+               service_id INTEGER NOT NULL,
+               bookings INTEGER NOT NULL DEFAULT 0,
+               completed INTEGER NOT NULL DEFAULT 0,
+               cancelled INTEGER NOT NULL DEFAULT 0,
+               revenue REAL NOT NULL DEFAULT 0,
+               cost REAL NOT NULL DEFAULT 0,
+               commission REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (month, barber_id, service_id)
+           ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS rollup_payment (
+               day TEXT NOT NULL,
+               payment_method TEXT NOT NULL,
+               count INTEGER NOT NULL DEFAULT 0,
+               revenue REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (day, payment_method)
+           ) WITHOUT ROWID''',
+
+        f'''CREATE TRIGGER IF NOT EXISTS trg_rollups_appointment_insert
+            AFTER INSERT ON appointments BEGIN
+            {_appointment_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_rollups_appointment_update
+            AFTER UPDATE OF {watched_appointments} ON appointments BEGIN
+            {_appointment_delta('OLD', -1)}
+            {_appointment_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_rollups_appointment_delete
+            AFTER DELETE ON appointments BEGIN
+            {_appointment_delta('OLD', -1)}
+            END''',
+
+        f'''CREATE TRIGGER IF NOT EXISTS trg_rollups_session_insert
+            AFTER INSERT ON sessions BEGIN
+            {_session_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_rollups_session_update
+            AFTER UPDATE OF {watched_sessions} ON sessions BEGIN
+            {_session_delta('OLD', -1)}
+            {_session_delta('NEW', 1)}
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_rollups_session_delete
+            AFTER DELETE ON sessions BEGIN
+            {_session_delta('OLD', -1)}
+            END''',
+
+        rebuild,
+    ]
+
+
+# ==================== إعادة الحساب ====================
+
+def rebuild(cursor, start=FIRST_DAY, end=LAST_DAY):
+    """إعادة حساب التجميعات لفترة كاملة من الجداول الأصلية (استعلامات مجمّعة)"""
+    session_day = SESSION_DAY.format(row='s')
+    session_service = SESSION_SERVICE.format(row='s')
+    # نفس حدود الجلسات في daily_stats.rebuild (على check_out_time لاستخدام الفهرس)
+    session_range = f"""((s.check_out_time >= :start AND s.check_out_time < :end || '~')
+        OR (s.check_out_time IS NULL AND {session_day} BETWEEN :start AND :end))"""
+    params = {'start': start, 'end': end}
+
+    cursor.execute("DELETE FROM rollup_barber_service WHERE day BETWEEN :start AND :end", params)
+    cursor.execute("DELETE FROM rollup_payment WHERE day BETWEEN :start AND :end", params)
+
+    cursor.execute(f"""
+        INSERT INTO rollup_barber_service (
+            day, barber_id, service_id, bookings, completed, cancelled, revenue, cost, commission)
+        SELECT day, barber_id, service_id, SUM(bookings), SUM(completed), SUM(cancelled),
+               SUM(revenue), SUM(cost), SUM(commission)
+        FROM (
+            SELECT a.appointment_date AS day, a.barber_id, a.service_id,
+                   COUNT(*) AS bookings,
+                   SUM(a.status = 'completed') AS completed,
+                   SUM(a.status = 'cancelled') AS cancelled,
+                   SUM(CASE WHEN a.status = 'completed' THEN a.price ELSE 0 END) AS revenue,
+                   SUM(CASE WHEN a.status = 'completed' THEN COALESCE(a.cost, 0) ELSE 0 END) AS cost,
+                   SUM(CASE WHEN a.status = 'completed'
+                       THEN COALESCE(a.commission, 0) ELSE 0 END) AS commission
+            FROM appointments a
+            WHERE a.appointment_date BETWEEN :start AND :end
+            GROUP BY a.appointment_date, a.barber_id, a.service_id
+            UNION ALL
+            SELECT {session_day}, s.barber_id, {session_service}, 0,
+                   SUM(s.status = 'completed'),
+                   SUM(s.status = 'cancelled'),
+                   SUM(CASE WHEN s.status = 'completed' THEN s.final_price ELSE 0 END),
+                   SUM(CASE WHEN s.status = 'completed' THEN COALESCE(s.total_cost, 0) ELSE 0 END),
+                   SUM(CASE WHEN s.status = 'completed'
+                       THEN COALESCE(s.total_commission, 0) ELSE 0 END)
+            FROM sessions s
+            WHERE {session_range}
+            GROUP BY {session_day}, s.barber_id, {session_service}
+        ) t
+        GROUP BY day, barber_id, service_id
+    """, params)
+
+    # الأشهر التي تمسها الفترة تُعاد من الجدول اليومي كاملة
+    months = {'first': start[:7], 'last': end[:7]}
+    cursor.execute("DELETE FROM rollup_month_barber_service WHERE month BETWEEN :first AND :last",
+                   months)
+    cursor.execute(f"""
+        INSERT INTO rollup_month_barber_service (
+            month, barber_id, service_id, bookings, completed, cancelled, revenue, cost, commission)
+        SELECT substr(day, 1, 7), barber_id, service_id, {', '.join(f'SUM({c})' for c in ROLLUP_COLUMNS)}
+        FROM rollup_barber_service
+        WHERE day BETWEEN :first || '-01' AND :last || '-31'
+        GROUP BY substr(day, 1, 7), barber_id, service_id
+    """, months)
+
+    cursor.execute(f"""
+        INSERT INTO rollup_payment (day, payment_method, count, revenue)
+        SELECT day, method, SUM(count), SUM(revenue)
+        FROM (
+            SELECT a.appointment_date AS day,
+                   COALESCE(a.payment_method, '{UNKNOWN_PAYMENT}') AS method,
+                   COUNT(*) AS count, SUM(a.price) AS revenue
+            FROM appointments a
+            WHERE a.appointment_date BETWEEN :start AND :end AND a.status = 'completed'
+            GROUP BY 1, 2
+            UNION ALL
+            SELECT {session_day}, COALESCE(s.payment_method, '{UNKNOWN_PAYMENT}'),
+                   COUNT(*), SUM(s.final_price)
+            FROM sessions s
+            WHERE {session_range} AND s.status = 'completed'
+            GROUP BY 1, 2
+        ) t
+        GROUP BY day, method
+    """, params)
+
+
+def rebuild_range(db, start=FIRST_DAY, end=LAST_DAY):
+    """إعادة الحساب داخل معاملة واحدة"""
+    with db.transaction('rebuild_rollups') as cursor:
+        rebuild(cursor, start, end)
+
+
+if __name__ == "__main__":
+    import sys
+    from database import Database
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'rebuild':
+        start = sys.argv[2] if len(sys.argv) > 2 else FIRST_DAY
+        end = sys.argv[3] if len(sys.argv) > 3 else start if len(sys.argv) > 2 else LAST_DAY
+        db = Database('database/barbershop.db')
+        rebuild_range(db, start, end)
+        db.print_latency_report()
+        db.close()
+        print(f"✅ تمت إعادة حساب التجميعات من {start} إلى {end}")
+    else:
+        print(__doc__)
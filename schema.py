@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📐 مخطط قاعدة البيانات والبيانات الافتراضية
+Database schema and default data
+
+تعريف الجداول الأساسية والخدمات الافتراضية في وحدة مستقلة عن الواجهة
+حتى يمكن استخدامها من الترحيلات وأدوات القياس بدون tkinter.
+"""
+
+
+def create_tables(cursor):
+    """إنشاء الجداول الأساسية"""
+    # جدول العملاء
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT UNIQUE NOT NULL,
+            email TEXT,
+            birth_date DATE,
+            address TEXT,
+            preferences TEXT,
+            loyalty_points INTEGER DEFAULT 0,
+            total_visits INTEGER DEFAULT 0,
+            total_spent REAL DEFAULT 0,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            last_visit DATETIME
+        )
+    ''')
+
+    # جدول الحلاقين
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS barbers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            email TEXT,
+            hire_date DATE,
+            specialization TEXT,
+            commission_rate REAL DEFAULT 30,
+            status TEXT DEFAULT 'active',
+            working_days TEXT,
+            working_hours TEXT,
+            total_services INTEGER DEFAULT 0,
+            total_revenue REAL DEFAULT 0,
+            rating REAL DEFAULT 5.0,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # جدول الخدمات
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS services (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            description TEXT,
+            duration INTEGER NOT NULL,
+            price REAL NOT NULL,
+            cost REAL DEFAULT 0,
+            commission_rate REAL,
+            status TEXT DEFAULT 'active',
+            popularity INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # جدول المواعيد
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            appointment_number TEXT UNIQUE NOT NULL,
+            customer_id INTEGER,
+            customer_name TEXT NOT NULL,
+            phone TEXT NOT NULL,
+            barber_id INTEGER NOT NULL,
+            barber_name TEXT NOT NULL,
+            service_id INTEGER NOT NULL,
+            service_name TEXT NOT NULL,
+            appointment_date DATE NOT NULL,
+            appointment_time TIME NOT NULL,
+            duration INTEGER,
+            status TEXT DEFAULT 'pending',
+            price REAL NOT NULL,
+            cost REAL DEFAULT 0,
+            commission REAL DEFAULT 0,
+            payment_method TEXT,
+            payment_status TEXT DEFAULT 'unpaid',
+            rating INTEGER,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            completed_at DATETIME,
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (barber_id) REFERENCES barbers(id),
+            FOREIGN KEY (service_id) REFERENCES services(id)
+        )
+    ''')
+
+    # جدول الجلسات
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_number TEXT UNIQUE NOT NULL,
+            customer_id INTEGER,
+            customer_name TEXT NOT NULL,
+            barber_id INTEGER NOT NULL,
+            barber_name TEXT NOT NULL,
+            services TEXT NOT NULL,
+            total_price REAL NOT NULL,
+            total_cost REAL DEFAULT 0,
+            total_commission REAL DEFAULT 0,
+            discount REAL DEFAULT 0,
+            final_price REAL NOT NULL,
+            payment_method TEXT NOT NULL,
+            payment_status TEXT DEFAULT 'paid',
+            loyalty_points_earned INTEGER DEFAULT 0,
+            loyalty_points_used INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'completed',
+            check_in_time DATETIME,
+            check_out_time DATETIME,
+            duration INTEGER,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (customer_id) REFERENCES customers(id),
+            FOREIGN KEY (barber_id) REFERENCES barbers(id)
+        )
+    ''')
+
+    # جدول الإعدادات
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+
+
+def insert_default_data(cursor):
+    """إدخال الخدمات والحلاق التجريبي والإعدادات الافتراضية"""
+
+    # التحقق من وجود خدمات
+    cursor.execute("SELECT COUNT(*) FROM services")
+    if cursor.fetchone()[0] == 0:
+        # تحميل الخدمات الافتراضية
+        services = [
+            # قص الشعر
+            ('قص شعر عادي', 'قص شعر', 'قص شعر كلاسيكي بسيط', 30, 40, 5, 30, 'active'),
+            ('قص شعر + تشكيل', 'قص شعر', 'قص شعر مع تشكيل الشعر', 40, 50, 6, 30, 'active'),
+            ('قص شعر للأطفال', 'قص شعر', 'قص شعر للأطفال تحت 12 سنة', 25, 30, 4, 30, 'active'),
+            ('قص شعر كلاسيكي', 'قص شعر', 'قص شعر بأسلوب كلاسيكي', 35, 45, 5, 30, 'active'),
+            ('قص شعر حديث (Fade)', 'قص شعر', 'قص شعر حديث مع تدرج', 45, 60, 8, 35, 'active'),
+
+            # حلاقة الذقن
+            ('حلاقة ذقن عادية', 'حلاقة ذقن', 'حلاقة الذقن بشكل عادي', 20, 30, 3, 30, 'active'),
+            ('حلاقة ذقن + تشذيب', 'حلاقة ذقن', 'حلاقة وتشذيب الذقن', 30, 40, 5, 30, 'active'),
+            ('تشذيب الذقن فقط', 'حلاقة ذقن', 'تشذيب وتنظيف الذقن', 15, 25, 3, 30, 'active'),
+            ('حلاقة ملكية', 'حلاقة ذقن', 'حلاقة فاخرة مع منشفة ساخنة', 40, 70, 10, 35, 'active'),
+
+            # الصبغة
+            ('صبغة شعر كاملة', 'صبغة', 'صبغة الشعر بالكامل', 90, 150, 40, 30, 'active'),
+            ('صبغة شعر جزئية', 'صبغة', 'صبغة جزء من الشعر', 60, 100, 25, 30, 'active'),
+            ('صبغة ذقن', 'صبغة', 'صبغة شعر الذقن', 45, 80, 20, 30, 'active'),
+            ('إزالة الشيب', 'صبغة', 'إخفاء الشعر الأبيض', 75, 120, 30, 30, 'active'),
+
+            # الباكجات
+            ('باكج VIP', 'باكجات', 'قص شعر + حلاقة + تدليك', 90, 120, 20, 35, 'active'),
+            ('باكج العريس', 'باكجات', 'باكج كامل للعريس', 120, 200, 40, 35, 'active'),
+            ('باكج تجديد كامل', 'باكجات', 'قص + حلاقة + صبغة', 100, 180, 35, 35, 'active'),
+
+            # خدمات إضافية
+            ('غسيل الشعر', 'إضافية', 'غسيل وتنظيف الشعر', 10, 15, 2, 30, 'active'),
+            ('تدليك الرأس', 'إضافية', 'تدليك فروة الرأس', 15, 25, 3, 30, 'active'),
+            ('ماسك للشعر', 'إضافية', 'ماسك معالج للشعر', 20, 40, 8, 30, 'active'),
+            ('تنظيف البشرة', 'إضافية', 'تنظيف عميق للبشرة', 30, 60, 10, 30, 'active'),
+            ('تشقير الحواجب', 'إضافية', 'تشقير وتنظيف الحواجب', 20, 35, 5, 30, 'active'),
+            ('حمام مغربي', 'إضافية', 'جلسة حمام مغربي', 60, 100, 20, 30, 'active'),
+        ]
+
+        cursor.executemany('''
+            INSERT INTO services (name, category, description, duration, price, cost, commission_rate, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', services)
+
+        print(f"✅ تم تحميل {len(services)} خدمة")
+
+    # التحقق من وجود حلاقين
+    cursor.execute("SELECT COUNT(*) FROM barbers")
+    if cursor.fetchone()[0] == 0:
+        # إضافة حلاق تجريبي
+        cursor.execute('''
+            INSERT INTO barbers (name, phone, specialization, commission_rate, status, working_days, working_hours)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', ('خالد محمد', '0501234567', 'قص شعر حديث', 35, 'active',
+              'السبت,الأحد,الاثنين,الثلاثاء,الأربعاء,الخميس', '09:00-18:00'))
+
+        print("✅ تم إضافة حلاق تجريبي")
+
+    # الإعدادات الافتراضية
+    default_settings = [
+        ('shop_name', 'محل الحلاقة'),
+        ('shop_address', 'الرياض، المملكة العربية السعودية'),
+        ('shop_phone', '0501234567'),
+        ('shop_email', 'info@barbershop.com'),
+        ('working_hours', '09:00-21:00'),
+        ('tax_rate', '15'),
+        # النسخ الاحتياطي: الضغط (gzip/zstd/none) وسياسة الاحتفاظ
+        ('backup_compression', 'gzip'),
+        ('backup_keep_last', '3'),
+        ('backup_keep_daily', '7'),
+        ('backup_keep_weekly', '4'),
+        ('backup_keep_monthly', '12'),
+        # نسخة كاملة كل N أيام، وبينها نسخ تزايدية (التغييرات فقط)
+        ('backup_full_every_days', '7'),
+    ]
+
+    for key, value in default_settings:
+        cursor.execute('''
+            INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
+        ''', (key, value))
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔢 مولّد أرقام المواعيد والجلسات
+Sequence allocator
+
+عدّاد لكل (بادئة، يوم) في جدول sequences بدلاً من
+SELECT COUNT(*) ... LIKE 'APP-YYYYMMDD%' الذي يمسح الجدول
+ويعطي أرقاماً مكررة عند الحجز المتزامن أو بعد الحذف.
+
+يجب استدعاء next_number داخل نفس معاملة الإدخال، ويفضَّل أن يكون
+أول أمر كتابة فيها حتى يُحجز قفل الكتابة مبكراً.
+الجدول يُنشأ في الترحيل رقم 3 (migrations.py).
+"""
+
+from datetime import datetime
+
+APPOINTMENT_PREFIX = 'APP'
+SESSION_PREFIX = 'SES'
+
+
+def next_value(cursor, prefix, day):
+    """زيادة العدّاد ذرياً وإرجاع القيمة الجديدة"""
+    cursor.execute('''
+        INSERT INTO sequences (prefix, day, value) VALUES (?, ?, 1)
+        ON CONFLICT (prefix, day) DO UPDATE SET value = value + 1
+    ''', (prefix, day))
+    cursor.execute("SELECT value FROM sequences WHERE prefix=? AND day=?", (prefix, day))
+    return cursor.fetchone()[0]
+
+
+def reserve_values(cursor, prefix, day, count):
+    """حجز count قيمة متتالية دفعة واحدة (للاستيراد)؛ يُرجع أول قيمة"""
+    cursor.execute('''
+        INSERT INTO sequences (prefix, day, value) VALUES (?, ?, ?)
+        ON CONFLICT (prefix, day) DO UPDATE SET value = value + excluded.value
+    ''', (prefix, day, count))
+    cursor.execute("SELECT value FROM sequences WHERE prefix=? AND day=?", (prefix, day))
+    return cursor.fetchone()[0] - count + 1
+
+
+def next_number(cursor, prefix, when=None):
+    """الرقم التالي بالشكل PREFIX-YYYYMMDD-NNN"""
+    day = (when or datetime.now()).strftime('%Y%m%d')
+    return f'{prefix}-{day}-{next_value(cursor, prefix, day):03d}'
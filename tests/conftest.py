@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""إعداد مشترك للاختبارات: قاعدة بيانات مؤقتة بالمخطط الكامل والبيانات الافتراضية"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from availability import works_on
+from database import Database
+from migrations import apply_migrations
+from reference_data import ReferenceData
+from schema import create_tables, insert_default_data
+
+
+def create_database(path):
+    """قاعدة جديدة كما ينشئها البرنامج عند أول تشغيل"""
+    database = Database(str(path))
+    with database.transaction() as cursor:
+        create_tables(cursor)
+        insert_default_data(cursor)
+    apply_migrations(database, verbose=False)
+    return database
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = create_database(tmp_path / 'barbershop.db')
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def make_database(tmp_path):
+    """make_database(name): قاعدة إضافية مستقلة (فروع أو نسخ مستعادة)"""
+    databases = []
+
+    def make(name):
+        databases.append(create_database(tmp_path / f'{name}.db'))
+        return databases[-1]
+
+    yield make
+    for database in databases:
+        database.close()
+
+
+@pytest.fixture
+def reference(db):
+    return ReferenceData(db).load()
+
+
+@pytest.fixture
+def work_day(db):
+    """أول يوم قادم يعمل فيه الحلاق الافتراضي"""
+    working_days = db.fetchvalue("SELECT working_days FROM barbers WHERE id = 1")
+    day = date.today() + timedelta(days=1)
+    while not works_on(working_days, day.isoformat()):
+        day += timedelta(days=1)
+    return day.isoformat()
+
+
+@pytest.fixture
+def freeze(monkeypatch):
+    """freeze(module, value): تثبيت datetime.now() في وحدة تستورد datetime مباشرة"""
+
+    def apply(module, value):
+        class FixedDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return value
+
+        monkeypatch.setattr(module, 'datetime', FixedDatetime)
+
+    return apply
+
+
+@pytest.fixture
+def add_appointment():
+    """add_appointment(cursor, number, day, ...): موعد مباشرة في الجدول (بيانات قديمة)"""
+
+    def insert(cursor, number, day, time='10:00', status='pending', price=50, customer_id=None):
+        cursor.execute("""
+            INSERT INTO appointments (appointment_number, customer_id, customer_name, phone,
+                                      barber_id, barber_name, service_id, service_name,
+                                      appointment_date, appointment_time, price, status)
+            VALUES (?, ?, 'عميل', '0500000001', 1, 'خالد محمد', 1, 'خدمة', ?, ?, ?, ?)
+        """, (number, customer_id, day, time, price, status))
+        return cursor.lastrowid
+
+    return insert
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""تحليلات السجل: المكعب المبني على دفعات يطابق الحساب المباشر، وحدود الذاكرة والإلغاء"""
+
+from datetime import date, timedelta
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from analytics import (MIN_BATCH_ROWS, TYPED_ROW_BYTES, HistoryAnalytics, MemoryBudgetError,
+                       _python_loop, batch_rows_for)
+from engine import CheckoutRequest, CheckoutService
+from worker import Job, JobCancelled
+
+FIRST = date(2025, 1, 25)
+
+
+@pytest.fixture
+def history(db, reference, add_appointment):
+    """مواعيد على شهرين بحالات مختلفة (منها يومان لنفس الحلاق) وجلسات فورية"""
+    statuses = ('completed', 'cancelled', 'completed', 'no_show', 'pending', 'completed')
+    with db.transaction() as cursor:
+        for i in range(60):
+            day = (FIRST + timedelta(days=i // 2)).isoformat()
+            add_appointment(cursor, f'APP-{i}', day, f'{10 + i % 2}:00',
+                            statuses[i % 6], price=50 + i)
+        cursor.execute("UPDATE appointments SET service_id = 2, cost = 5, commission = price * 0.2, "
+                       "duration = 30 WHERE id % 4 = 0")
+        cursor.execute("UPDATE appointments SET duration = 45 WHERE duration IS NULL "
+                       "OR duration = 0")
+    checkout = CheckoutService(db, reference)
+    for i, method in enumerate(('نقدي', 'شبكة')):
+        checkout.checkout(CheckoutRequest('عميل', f'05000000{i:02d}', 1, 'خالد محمد', 1,
+                                          'خدمة', 40 + i, method))
+    return db
+
+
+def _completed_revenue(db):
+    return db.fetchvalue("""
+        SELECT (SELECT TOTAL(price) FROM appointments WHERE status = 'completed')
+             + (SELECT TOTAL(final_price) FROM sessions WHERE status = 'completed')""")
+
+
+def test_small_batches_give_the_same_cube(history):
+    whole = HistoryAnalytics(history).load()
+    batched = HistoryAnalytics(history)
+    batched.batch_rows = 7
+    batched.load()
+
+    assert whole.rows == batched.rows == history.fetchvalue(
+        "SELECT (SELECT COUNT(*) FROM appointments) + (SELECT COUNT(*) FROM sessions)")
+    columns = ['month', 'barber_id', 'service_id', 'source', 'status']
+
+    def normalized(cube):
+        cube = cube.astype({'barber_id': int, 'service_id': int, 'source': str, 'status': str})
+        return cube.sort_values(columns).reset_index(drop=True)
+
+    assert len(whole.cube) > 1
+    pd.testing.assert_frame_equal(normalized(whole.cube), normalized(batched.cube),
+                                  check_dtype=False)
+
+
+def test_reports_match_direct_totals(history):
+    analytics = HistoryAnalytics(history).load()
+
+    profit = analytics.profitability('month')
+    # الشهران + شهر الجلسات الفورية (اليوم)
+    assert list(profit.index[:2]) == ['2025-01', '2025-02']
+    assert list(profit.index) == sorted(profit.index)
+    assert profit['revenue'].sum() == pytest.approx(_completed_revenue(history))
+    january = history.fetchone("""
+        SELECT TOTAL(price), TOTAL(COALESCE(cost, 0) + COALESCE(commission, 0))
+        FROM appointments WHERE status = 'completed' AND appointment_date < '2025-02-01'""")
+    assert profit.loc['2025-01', 'revenue'] == pytest.approx(january[0])
+    assert profit.loc['2025-01', 'profit'] == pytest.approx(january[0] - january[1])
+
+    # نفس ربح الحلاق بحلقة بايثون صفاً بصف
+    by_barber = analytics.profitability('barber_id')
+    assert by_barber['profit'].tolist() == pytest.approx(list(_python_loop(history).values()))
+
+    tickets = analytics.average_ticket('barber_id')
+    completed = history.fetchvalue("""
+        SELECT (SELECT COUNT(*) FROM appointments WHERE status = 'completed')
+             + (SELECT COUNT(*) FROM sessions WHERE status = 'completed')""")
+    assert tickets['tickets'].sum() == completed
+
+    mix = analytics.service_mix()
+    assert mix['count'].sum() == completed
+    assert mix['count_share'].sum() == pytest.approx(1)
+
+
+def test_barber_productivity(history):
+    row = HistoryAnalytics(history).load().barber_productivity().iloc[0]
+    bookings, cancelled, no_show = history.fetchone("""
+        SELECT COUNT(*), SUM(status = 'cancelled'), SUM(status = 'no_show')
+        FROM appointments""")
+    days = history.fetchvalue("""
+        SELECT COUNT(*) FROM (
+            SELECT appointment_date FROM appointments WHERE status = 'completed'
+            UNION SELECT date(check_out_time) FROM sessions WHERE status = 'completed')""")
+
+    assert row['bookings'] == bookings
+    assert row['working_days'] == days
+    assert row['cancellation_rate'] == pytest.approx(cancelled / bookings)
+    assert row['no_show_rate'] == pytest.approx(no_show / bookings)
+    assert row['revenue_per_day'] == pytest.approx(_completed_revenue(history) / days)
+
+
+def test_memory_budget_and_cancel(history):
+    with pytest.raises(MemoryBudgetError):
+        batch_rows_for(0.01)
+    assert batch_rows_for(1024) > MIN_BATCH_ROWS
+
+    analytics = HistoryAnalytics(history, memory_budget_mb=2)
+    rows = analytics.count_rows()
+    assert len(analytics.load_frame()) == rows
+    # الإطار الكامل لا يتسع مع دفعة التحميل
+    analytics.memory_budget_mb = rows * TYPED_ROW_BYTES / 1024 / 1024
+    with pytest.raises(MemoryBudgetError):
+        analytics.load_frame()
+
+    job = Job(None, (), {}, None, None, 'analytics')
+    job.cancel()
+    with pytest.raises(JobCancelled):
+        HistoryAnalytics(history).load(job=job)
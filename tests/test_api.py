@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""واجهة HTTP: حجز متزامن لنفس الوقت، تعارض الحالات، الأخطاء، وطابور الكتابة المجمّع"""
+
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from api import ApiServer, ApiService, WriteQueue
+from availability import Availability
+
+
+@pytest.fixture
+def server(db, reference):
+    server = ApiServer(ApiService(db, reference, Availability(db, reference)),
+                       port=0, threads=8).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def request_api(server):
+    def send(method, url, body=None, raw=None):
+        conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=30)
+        try:
+            data = raw if raw is not None else json.dumps(body).encode('utf-8') if body else None
+            conn.request(method, url, body=data, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+    return send
+
+
+@pytest.fixture
+def service_id(db):
+    return db.fetchvalue("SELECT id FROM services WHERE status = 'active' ORDER BY id LIMIT 1")
+
+
+def _booking(service_id, day, time, n=0):
+    return {'customer_name': f'عميل {n}', 'phone': f'05000000{n:02d}', 'barber_id': 1,
+            'service_id': service_id, 'date': day, 'time': time}
+
+
+def test_concurrent_bookings_of_one_slot(db, request_api, service_id, work_day):
+    status, slots = request_api('GET', f'/api/availability?service_id={service_id}'
+                                       f'&barber_id=1&date={work_day}')
+    assert status == 200
+    slot = slots['slots'][0]
+
+    results = []
+    start = threading.Barrier(10)
+
+    def client(n):
+        start.wait()
+        results.append(request_api('POST', '/api/appointments',
+                                   _booking(service_id, work_day, slot, n)))
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # واحد فقط يحجز، والباقون 409 (وليس 500 أو حجزاً مكرراً)
+    statuses = sorted(status for status, _ in results)
+    assert statuses == [201] + [409] * 9
+    assert db.fetchvalue("SELECT COUNT(*) FROM appointments WHERE appointment_date = ? "
+                         "AND appointment_time = ?", (work_day, slot)) == 1
+
+    status, slots = request_api('GET', f'/api/availability?service_id={service_id}'
+                                       f'&barber_id=1&date={work_day}')
+    assert slot not in slots['slots']
+
+
+def test_status_changes_and_conflicts(db, request_api, service_id, work_day):
+    status, booked = request_api('POST', '/api/appointments',
+                                 _booking(service_id, work_day, '10:00'))
+    assert status == 201
+    url = f"/api/appointments/{booked['appointment_id']}"
+
+    assert request_api('POST', url + '/status',
+                       {'status': 'confirmed', 'expected': 'pending'})[0] == 200
+    # العميل يعرض حالة قديمة: 409 مع الحالة الحالية
+    status, body = request_api('POST', url + '/status',
+                               {'status': 'completed', 'expected': 'pending'})
+    assert status == 409 and body['current'] == 'confirmed'
+    assert request_api('POST', url + '/status', {'status': 'completed'})[0] == 200
+    # المكتمل لا يُلغى
+    assert request_api('POST', url + '/status', {'status': 'cancelled'})[0] == 409
+    assert request_api('POST', url + '/status', {'status': 'archived'})[0] == 400
+
+    assert request_api('DELETE', url)[0] == 200
+    assert request_api('DELETE', url)[0] == 404
+    assert request_api('POST', '/api/appointments/999999/status', {'status': 'confirmed'})[0] \
+        == 404
+
+
+def test_bad_requests(request_api, service_id, work_day):
+    assert request_api('GET', '/api/nothing')[0] == 404
+    assert request_api('POST', '/api/appointments', raw=b'{not json')[0] == 400
+    body = _booking(service_id, work_day, '25:00')
+    assert request_api('POST', '/api/appointments', body)[0] == 400
+    body.update(time='10:00', barber_id=999)
+    assert request_api('POST', '/api/appointments', body)[0] == 400
+    assert request_api('GET', '/api/availability?service_id=1&date=tomorrow')[0] == 400
+    # خدمة الطلبات ما زالت تعمل بعد الأخطاء
+    assert request_api('GET', '/api/services')[0] == 200
+
+
+def test_write_group_rolls_back_only_the_failed_write(db):
+    writes = WriteQueue(db, group=8)
+    release = threading.Event()
+
+    def insert(key):
+        db.execute("INSERT INTO settings (key, value) VALUES (?, 'x')", (key,))
+        return key
+
+    def fail():
+        db.execute("INSERT INTO settings (key, value) VALUES ('failed', 'x')")
+        raise ValueError("فشل")
+
+    try:
+        # الأول يحجز الخيط حتى تصطف البقية فتُنفَّذ في معاملة واحدة
+        first = writes.run_write(release.wait, 5)
+        while not first.running():
+            time.sleep(0.001)
+        futures = [writes.run_write(insert, 'a'), writes.run_write(fail),
+                   writes.run_write(insert, 'b')]
+        release.set()
+        assert first.result(5) is True
+        assert futures[0].result(5) == 'a' and futures[2].result(5) == 'b'
+        with pytest.raises(ValueError):
+            futures[1].result(5)
+    finally:
+        writes.close()
+
+    keys = {row[0] for row in db.fetchall("SELECT key FROM settings")}
+    assert {'a', 'b'} <= keys and 'failed' not in keys
+    assert writes.groups == 2
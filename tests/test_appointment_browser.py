@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""تصفح المواعيد بالنافذة المنزلقة: الترتيب والحدود والانتقال والفلاتر"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from appointment_browser import AppointmentPager, BrowseFilter, count_appointments, row_key
+
+DAYS = [(date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(10)]
+
+
+@pytest.fixture
+def appointments(db, add_appointment):
+    """ستة مواعيد يومياً، اثنان منها في نفس الوقت (يحسمهما id)"""
+    with db.transaction() as cursor:
+        for day in DAYS:
+            for i, time in enumerate(('09:00', '10:00', '10:00', '11:00', '12:00', '13:00')):
+                status = 'cancelled' if i == 4 else 'pending'
+                add_appointment(cursor, f'APP-{day}-{i}', day, time, status)
+    return db.fetchall("""SELECT appointment_date, appointment_time, id FROM appointments
+                          ORDER BY appointment_date, appointment_time, id""")
+
+
+def _pager(db, **filters):
+    return AppointmentPager(db, BrowseFilter(DAYS[0], DAYS[-1], **filters),
+                            page_size=7, window_rows=14)
+
+
+def test_scrolling_visits_every_row_once_in_order(db, appointments):
+    pager = _pager(db)
+    seen = [row_key(row) for row in pager.first_page()]
+    while not pager.at_end:
+        page, _ = pager.next_page()
+        seen += [row_key(row) for row in page]
+        assert len(pager.rows) <= 14
+
+    assert seen == [tuple(key) for key in appointments]
+    assert not pager.at_start
+
+    # الرجوع للخلف حتى البداية يعيد نفس الصفوف بالترتيب العكسي للصفحات
+    back = []
+    while not pager.at_start:
+        page, _ = pager.previous_page()
+        back[:0] = [row_key(row) for row in page]
+        assert len(pager.rows) <= 14
+    assert [tuple(key) for key in appointments[:len(back)]] == back
+    assert [row_key(row) for row in pager.rows] == seen[:len(pager.rows)]
+
+
+def test_jump_and_ends(db, appointments):
+    pager = _pager(db)
+    rows = pager.jump(DAYS[4])
+    assert rows[0][1] == DAYS[4] and not pager.at_start
+
+    assert [row_key(row) for row in pager.last_page()] == \
+        [tuple(key) for key in appointments[-7:]]
+    assert pager.at_end
+
+    # بعد آخر موعد: آخر صفحة؛ قبل البداية: أول صفحة
+    assert pager.jump('2030-01-01') == pager.rows and pager.at_end
+    assert pager.jump('2000-01-01')[0][1] == DAYS[0] and pager.at_start
+
+
+def test_filters_apply_to_pages_and_count(db, appointments):
+    browse = BrowseFilter(DAYS[2], DAYS[3], status='cancelled')
+    assert count_appointments(db, browse) == 2
+    assert count_appointments(db, BrowseFilter(DAYS[0], DAYS[-1])) == len(appointments)
+
+    pager = _pager(db, status='pending', barber_id=1)
+    rows = list(pager.first_page())
+    while not pager.at_end:
+        rows += pager.next_page()[0]
+    assert len(rows) == 50
+    assert {row[8] for row in rows} == {'pending'}
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""الأوقات المتاحة والتحقق من التداخل، خاصة بعد إنهاء موعد مبكراً"""
+
+from datetime import datetime
+
+import pytest
+
+import engine
+from availability import Availability, SlotTakenError, busy_until
+from engine import BookingRequest, BookingService
+
+
+def _book(booking, day, time, service_id, phone='0500000001'):
+    return booking.book(BookingRequest('عميل', phone, 1, 'خالد محمد', service_id, 'خدمة',
+                                       day, time, 100)).appointment_id
+
+
+@pytest.fixture
+def long_service(db):
+    return db.fetchvalue("SELECT id FROM services WHERE duration = 60 ORDER BY id LIMIT 1")
+
+
+def test_busy_until_same_day_completion():
+    assert busy_until('2026-01-10', 600, 60) == 660
+    assert busy_until('2026-01-10', 600, 60, '2026-01-10 10:15:00.123') == 615
+    # قبل البداية: فترة فارغة؛ بعد النهاية أو في يوم آخر: المدة كاملة
+    assert busy_until('2026-01-10', 600, 60, '2026-01-10 09:00:00') == 600
+    assert busy_until('2026-01-10', 600, 60, '2026-01-10 12:00:00') == 660
+    assert busy_until('2026-01-10', 600, 60, '2026-01-11 10:15:00') == 660
+
+
+def test_booking_rejects_overlap(db, reference, work_day, long_service):
+    availability = Availability(db, reference)
+    booking = BookingService(db, reference, availability)
+    _book(booking, work_day, '10:00', long_service)
+
+    assert '10:30' not in availability.free_slots(1, long_service, work_day, after='00:00')
+    with pytest.raises(SlotTakenError):
+        _book(booking, work_day, '10:30', long_service, phone='0500000002')
+
+
+def test_complete_early_frees_rest_of_slot(db, reference, work_day, long_service, freeze):
+    availability = Availability(db, reference)
+    booking = BookingService(db, reference, availability)
+    appointment_id = _book(booking, work_day, '10:00', long_service)
+
+    freeze(engine, datetime.fromisoformat(f'{work_day} 10:15'))
+    booking.complete(appointment_id)
+
+    assert '10:15' in availability.free_slots(1, long_service, work_day, after='00:00')
+    # الحجز في الوقت المعروض ينجح (check_free يقرأ completed_at من القاعدة)
+    _book(booking, work_day, '10:15', long_service, phone='0500000002')
+
+    # فهرس جديد يُحمَّل من القاعدة يرى نفس الفترات
+    fresh = Availability(db, reference)
+    assert '10:15' not in fresh.free_slots(1, long_service, work_day, after='00:00')
+    assert fresh.free_slots(1, long_service, work_day, after='00:00') == \
+        availability.free_slots(1, long_service, work_day, after='00:00')
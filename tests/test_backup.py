@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""النسخ الاحتياطي: لقطة سليمة تطابق القاعدة، واستعادة مفحوصة، وتدوير حسب السياسة"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+
+import pytest
+
+import changelog
+from backup import (BackupError, RetentionPolicy, create_backup, list_backups,
+                    restore_backup, rotate_backups)
+
+
+def _dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT * FROM {table} ORDER BY rowid").fetchall()
+                for table in ('customers', 'appointments', 'sessions', 'settings')}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def activity(db, add_appointment, work_day):
+    with db.transaction() as cursor:
+        for i in range(50):
+            add_appointment(cursor, f'APP-{i}', work_day, f'{9 + i % 10}:00', price=50 + i)
+        cursor.execute("INSERT INTO customers (name, phone) VALUES ('عميل', '0500000001')")
+    return db
+
+
+@pytest.mark.parametrize('compression', ['gzip', 'none'])
+def test_backup_restores_to_the_same_data(activity, tmp_path, compression):
+    db = activity
+    result = create_backup(db, str(tmp_path / 'backups'), compression)
+
+    assert os.path.basename(result.path).endswith(('.db.gz' if compression == 'gzip' else '.db'))
+    assert not [name for name in os.listdir(tmp_path / 'backups') if name != os.path.basename(
+        result.path)]  # لا ملفات مؤقتة متبقية
+    assert result.change_id == changelog.sequence_position(db.connection())
+
+    restored = restore_backup(result.path, str(tmp_path / 'restored.db'))
+    with open(restored, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == result.sha256
+    assert _dump(restored) == _dump(db.path)
+
+    with pytest.raises(FileExistsError):
+        restore_backup(result.path, restored)
+
+
+def test_corrupt_backup_is_not_restored(activity, tmp_path):
+    result = create_backup(activity, str(tmp_path / 'backups'), 'none')
+    assert result.database_size > 4096 * 6
+    with open(result.path, 'r+b') as f:
+        # تخريب صفحات الجداول (بعد الصفحة الأولى حتى يبقى الملف قاعدة بيانات)
+        f.seek(4096 * 3)
+        f.write(b'\xff' * 4096 * 3)
+
+    target = tmp_path / 'restored.db'
+    with pytest.raises((BackupError, sqlite3.DatabaseError)):
+        restore_backup(result.path, str(target))
+    assert not target.exists() and not (tmp_path / 'restored.db.part').exists()
+
+    # ملف مضغوط مقطوع
+    compressed = create_backup(activity, str(tmp_path / 'backups'), 'gzip').path
+    with open(compressed, 'rb') as f:
+        data = f.read()
+    with open(compressed, 'wb') as f:
+        f.write(data[:len(data) // 2])
+    with pytest.raises((EOFError, gzip.BadGzipFile, BackupError, sqlite3.DatabaseError)):
+        restore_backup(compressed, str(target))
+    assert not target.exists()
+
+
+def test_rotation_keeps_policy_backups_only(tmp_path):
+    folder = tmp_path / 'backups'
+    folder.mkdir()
+    stamps = ['20250310_120000', '20250310_090000', '20250309_180000', '20250309_080000',
+              '20250308_100000', '20250301_100000', '20250215_100000', '20250120_100000']
+    for stamp in stamps:
+        (folder / f'backup_{stamp}_000000.db.gz').write_bytes(b'')
+    for other in ('notes.txt', 'backup_20250101_000000.db.gz.part'):
+        (folder / other).write_bytes(b'')
+
+    policy = RetentionPolicy(keep_last=2, daily=3, weekly=2, monthly=2)
+    result = rotate_backups(str(folder), policy)
+
+    # آخر نسختين + أحدث نسخة في آخر 3 أيام وآخر أسبوعين وآخر شهرين
+    kept = {'20250310_120000', '20250310_090000', '20250309_180000', '20250308_100000',
+            '20250215_100000'}
+    assert {os.path.basename(p)[7:22] for p in result.kept} == kept
+    assert {os.path.basename(p)[7:22] for p in result.deleted} == set(stamps) - kept
+    assert [when.strftime('%Y%m%d_%H%M%S') for when, _ in list_backups(str(folder))] == \
+        sorted(kept, reverse=True)
+    assert (folder / 'notes.txt').exists()
+    assert (folder / 'backup_20250101_000000.db.gz.part').exists()
+
+    # تدوير ثانٍ لا يحذف شيئاً
+    assert rotate_backups(str(folder), policy).deleted == []
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""ترتيب نتائج البحث بفهرس FTS"""
+
+import pytest
+
+import customer_search
+from customer_search import has_index, search
+
+
+def test_best_match_survives_many_newer_hits(db, monkeypatch):
+    if not has_index(db):
+        pytest.skip("FTS5 غير متوفر")
+    monkeypatch.setattr(customer_search, 'MAX_RESULTS', 20)
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO customers (name, phone) VALUES ('خالد العتيبي', '0500000000')")
+        best = cursor.lastrowid
+        # تطابقات أحدث وأضعف (أسماء أطول) أكثر من حد النتائج
+        cursor.executemany("INSERT INTO customers (name, phone) VALUES (?, ?)",
+                           [(f'خالد العتيبي بن عبدالرحمن الطويل {i}', f'05100{i:05d}')
+                            for i in range(50)])
+
+    rows = search(db, 'خالد العتيبي')
+    assert rows[0][0] == best
+    # المطابقة التامة للجوال أولاً
+    assert search(db, '0510000007')[0][2] == '0510000007'
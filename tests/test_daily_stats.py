@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""الإحصائيات اليومية والتجميعات: ما تحدّثه الـ triggers يساوي إعادة الحساب الكاملة"""
+
+import pytest
+
+import daily_stats
+import rollups
+from engine import BookingRequest, BookingService, CheckoutRequest, CheckoutService
+
+TABLES = {
+    'daily_stats': ('day',),
+    'daily_customers': ('day', 'customer_id'),
+    'rollup_barber_service': ('day', 'barber_id', 'service_id'),
+    'rollup_month_barber_service': ('month', 'barber_id', 'service_id'),
+    'rollup_payment': ('day', 'payment_method'),
+}
+
+
+def _snapshot(db):
+    """محتوى الجداول المشتقة بدون الصفوف الصفرية (تبقى بعد الطرح ولا تنشئها إعادة الحساب)"""
+    tables = {}
+    for table, keys in TABLES.items():
+        rows = {}
+        for row in db.fetchall(f"SELECT * FROM {table}"):
+            key, values = row[:len(keys)], tuple(round(v, 6) for v in row[len(keys):])
+            if any(values):
+                rows[key] = values
+        tables[table] = rows
+    return tables
+
+
+@pytest.fixture
+def activity(db, reference, work_day):
+    """حجوزات بحالات مختلفة وجلسات فورية وحذف، عبر نفس خدمات البرنامج"""
+    booking = BookingService(db, reference)
+    ids = [booking.book(BookingRequest('عميل', f'05000000{i:02d}', 1, 'خالد محمد', 1, 'خدمة',
+                                       work_day, f'{10 + i}:00', 50 + i)).appointment_id
+           for i in range(6)]
+    booking.complete(ids[0])
+    booking.complete_many(ids[1:3])
+    booking.cancel(ids[3])
+    booking.delete(ids[1])
+    booking.no_show_many([ids[4]])
+
+    checkout = CheckoutService(db, reference)
+    for i, method in enumerate(('نقدي', 'شبكة', 'نقدي')):
+        checkout.checkout(CheckoutRequest('عميل', f'05000000{i:02d}', 1, 'خالد محمد', 1,
+                                          'خدمة', 40, method))
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE appointments SET price = price + 5 WHERE id = ?", (ids[2],))
+        cursor.execute("UPDATE sessions SET status = 'cancelled' WHERE id = "
+                       "(SELECT MIN(id) FROM sessions)")
+
+
+def test_triggers_match_rebuild(db, activity):
+    maintained = _snapshot(db)
+    assert maintained['daily_stats'] and maintained['rollup_payment']
+
+    daily_stats.rebuild_range(db)
+    rollups.rebuild_range(db)
+    assert _snapshot(db) == maintained
+
+
+def test_read_day_reflects_completed_work(db, activity, work_day):
+    stats = daily_stats.read_day(db, work_day)
+    # 6 حجوزات حُذف منها واحد؛ المكتمل: الأول والثالث (السعر بعد التعديل)
+    assert stats['appointments_count'] == 5
+    assert stats['completed_count'] == 2
+    assert stats['appointments_revenue'] == 50 + 57
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""معاملات الكتابة: انتظار القفل محدود بمهلة واحدة"""
+
+import sqlite3
+import time
+
+import pytest
+
+import database
+from database import Database, DatabaseBusyError
+
+
+def test_busy_wait_is_bounded_for_the_whole_transaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'BUSY_WAIT_MAX', 0.5)
+    path = str(tmp_path / 'locked.db')
+    db = Database(path, {'busy_timeout': 5000})
+    db.execute("CREATE TABLE t (x)")
+
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        with pytest.raises(DatabaseBusyError):
+            with db.transaction() as cursor:
+                cursor.execute("INSERT INTO t VALUES (1)")
+        # بدون المهلة: busy_timeout (5s) لكل محاولة من المحاولات السبع
+        assert time.monotonic() - started < 2
+    finally:
+        other.rollback()
+        other.close()
+
+    # busy_timeout يعود كما كان، والكتابة تنجح بعد تحرير القفل
+    assert db.fetchvalue("PRAGMA busy_timeout") == 5000
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO t VALUES (1)")
+    assert db.fetchvalue("SELECT COUNT(*) FROM t") == 1
+    db.close()
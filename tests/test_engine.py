@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""تغيير حالات المواعيد: موعد واحد ودفعات"""
+
+import pytest
+
+from engine import BookingError, BookingRequest, BookingService, StaleStatusError
+
+
+@pytest.fixture
+def booking(db, reference):
+    return BookingService(db, reference)
+
+
+def _book(booking, day, time, phone):
+    return booking.book(BookingRequest('عميل', phone, 1, 'خالد محمد', 1, 'خدمة',
+                                       day, time, 100)).appointment_id
+
+
+def test_change_many_accepts_tree_ids(booking, db, work_day):
+    first = _book(booking, work_day, '10:00', '0500000001')
+    second = _book(booking, work_day, '11:00', '0500000002')
+
+    # معرفات الجدول نصوص: مفردة أو مع الحالة المعروضة
+    result = booking.confirm_many([str(first), [str(second), 'pending'], '999999'])
+
+    assert sorted(result.changed) == [first, second]
+    assert result.skipped == {999999: None}
+    assert db.fetchvalue("SELECT COUNT(*) FROM appointments WHERE status = 'confirmed'") == 2
+
+
+def test_transition_checks_allowed_and_expected_status(booking, db, work_day):
+    appointment_id = _book(booking, work_day, '10:00', '0500000001')
+
+    with pytest.raises(StaleStatusError) as error:
+        booking.confirm(appointment_id, expected='confirmed')
+    assert error.value.current == 'pending'
+
+    booking.confirm(appointment_id, expected='pending')
+    booking.complete(appointment_id)
+    # المكتمل لا يُلغى، ولا يُنهى مرتين (فلا تُضاف النقاط مرتين)
+    with pytest.raises(StaleStatusError):
+        booking.cancel(appointment_id)
+    with pytest.raises(StaleStatusError):
+        booking.complete(appointment_id)
+    with pytest.raises(BookingError):
+        booking.confirm(999999)
+
+    assert db.fetchone("SELECT total_visits, loyalty_points FROM customers "
+                       "WHERE phone = '0500000001'") == (1, 10)
+
+
+def test_batch_skips_ineligible_and_updates_counters(booking, db, work_day):
+    ids = [_book(booking, work_day, f'{hour}:00', f'050000000{hour - 10}')
+           for hour in range(10, 14)]
+    booking.cancel(ids[0])
+    booking.confirm(ids[1])
+
+    result = booking.complete_many([ids[0], (ids[1], 'pending'), ids[2], ids[3]])
+
+    assert result.changed == ids[2:]
+    assert result.skipped == {ids[0]: 'cancelled', ids[1]: 'confirmed'}
+    assert result.points_earned == 20
+    assert db.fetchone("SELECT total_services, total_revenue FROM barbers WHERE id = 1") == \
+        (2, 200)
+
+    # حذف المكتمل يطرح عدّاداته
+    deleted = booking.delete_many([ids[2], ids[3]])
+    assert sorted(deleted.changed) == ids[2:]
+    assert db.fetchone("SELECT total_services, total_revenue FROM barbers WHERE id = 1") == \
+        (0, 0)
+    assert db.fetchvalue("SELECT SUM(loyalty_points) FROM customers") == 0
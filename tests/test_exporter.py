@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""تصدير المواعيد إلى Excel"""
+
+import pytest
+
+from engine import BookingRequest, BookingService
+from exporter import export_appointments
+from worker import Job, JobCancelled
+
+
+def test_failed_cleanup_keeps_original_error(db, reference, work_day, tmp_path):
+    pytest.importorskip('xlsxwriter')
+    BookingService(db, reference).book(BookingRequest(
+        'عميل', '0500000001', 1, 'خالد محمد', 1, 'خدمة', work_day, '10:00', 100))
+    job = Job(None, (), {}, None, None, 'export')
+    job.cancel()
+
+    # إغلاق الملف يفشل أيضاً (المجلد غير موجود) لكن الخطأ المرفوع هو الإلغاء
+    with pytest.raises(JobCancelled):
+        export_appointments(db, str(tmp_path / 'missing' / 'out.xlsx'), work_day, work_day,
+                            job=job)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""الاستيراد: العدّادات بنفس قواعد الإنهاء، والنقاط المستوردة رصيد افتتاحي"""
+
+import csv
+
+from importer import import_file
+from reconcile import reconcile
+
+
+def _write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as target:
+        writer = csv.writer(target)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_completed_appointments_update_all_counters(db, tmp_path):
+    service = db.fetchvalue("SELECT name FROM services ORDER BY id LIMIT 1")
+    path = _write_csv(tmp_path / 'appointments.csv',
+                      ['name', 'phone', 'barber', 'service', 'date', 'time', 'price', 'status'],
+                      [[f'عميل {i}', f'05500000{i:02d}', 'خالد محمد', service,
+                        f'2025-03-0{i + 1}', '10:00', 100, 'completed'] for i in range(5)]
+                      + [['عميل 0', '0550000000', 'خالد محمد', service, '2025-03-09', '11:00', 80,
+                          'cancelled']])
+
+    result = import_file(db, path)
+
+    assert result.inserted == 6
+    assert db.fetchone("SELECT total_services, total_revenue FROM barbers WHERE id = 1") == \
+        (5, 500)
+    assert db.fetchone("""SELECT total_visits, total_spent, loyalty_points, last_visit
+                          FROM customers WHERE phone = '0550000000'""") == \
+        (1, 100, 10, '2025-03-01 10:00:00')
+    check = reconcile(db)
+    assert (check.customers_changed, check.barbers_changed) == (0, 0)
+
+
+def test_imported_points_are_opening_balance(db, tmp_path):
+    path = _write_csv(tmp_path / 'customers.csv', ['name', 'phone', 'loyalty_points'],
+                      [['سالم', '0551111111', 40]])
+
+    import_file(db, path)
+
+    assert db.fetchone("SELECT loyalty_points, opening_points FROM customers "
+                       "WHERE phone = '0551111111'") == (40, 40)
+    assert reconcile(db).customers_changed == 0
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""سلسلة النسخ: كاملة ثم تزايدية، والاستعادة منها"""
+
+import os
+import sqlite3
+
+import pytest
+
+from backup import BackupError
+from engine import BookingRequest, BookingService
+from incremental_backup import (create_delta, create_full_backup, incremental_backup,
+                                list_deltas, remove_orphan_deltas, restore_point_in_time)
+
+
+def _book(booking, day, time):
+    return booking.book(BookingRequest('عميل', '0500000001', 1, 'خالد محمد', 1, 'خدمة',
+                                       day, time, 100)).appointment_id
+
+
+def _appointments(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT id, appointment_number, status, price FROM appointments "
+                            "ORDER BY id").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def chain(db, reference, work_day, tmp_path):
+    """نسخة كاملة ثم ملفا تغييرات بعدها"""
+    folder = str(tmp_path / 'backups')
+    booking = BookingService(db, reference)
+    _book(booking, work_day, '10:00')
+    full = incremental_backup(db, folder)
+
+    first = _book(booking, work_day, '11:00')
+    booking.complete(first)
+    create_delta(db, folder)
+
+    second = _book(booking, work_day, '12:00')
+    booking.cancel(second)
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE appointments SET price = 80 WHERE id = ?", (first,))
+    incremental_backup(db, folder)
+    return folder, full
+
+
+def test_full_backup_prunes_change_log(db, chain):
+    _, full = chain
+    assert full.change_id > 0
+    assert db.fetchvalue("SELECT MIN(id) FROM change_log") > full.change_id
+    assert db.fetchall("SELECT kind FROM backup_chain ORDER BY id") == \
+        [('full',), ('delta',), ('delta',)]
+
+
+def test_restore_replays_deltas_in_order(db, chain, tmp_path):
+    folder, _ = chain
+    deltas = list_deltas(folder)
+    assert [h['from_id'] for h, _ in deltas][1:] == [h['to_id'] for h, _ in deltas][:-1]
+
+    dest, applied, _ = restore_point_in_time(str(tmp_path / 'restored.db'), folder)
+
+    assert applied > 0
+    assert _appointments(dest) == _appointments(db.path)
+    # لا جديد: لا ملف تغييرات فارغ
+    assert create_delta(db, folder).path is None
+
+
+def test_missing_delta_breaks_the_chain(chain, tmp_path):
+    folder, _ = chain
+    os.remove(list_deltas(folder)[0][1])
+    dest = str(tmp_path / 'restored.db')
+
+    with pytest.raises(BackupError):
+        restore_point_in_time(dest, folder)
+    assert not os.path.exists(dest)
+
+
+def test_orphan_deltas_are_removed_with_their_full_backup(db, chain):
+    folder, full = chain
+    create_full_backup(db, folder)
+    os.remove(full.path)
+
+    removed = remove_orphan_deltas(folder)
+    assert len(removed) == 2
+    assert list_deltas(folder) == []
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""تتبع SQL: توحيد الجمل، المدرج المتحرك، سجل البطء مع الخطة، وأزمنة الإجراءات"""
+
+import pytest
+
+import instrumentation
+from instrumentation import (SLICE_SECONDS, SLICES, RollingHistogram, Tracer, from_environment,
+                             normalize_sql)
+
+
+@pytest.fixture
+def tracer(db, tmp_path):
+    tracer = Tracer(slow_ms=0, log_path=str(tmp_path / 'logs' / 'slow.log')).attach(db)
+    yield tracer
+    tracer.close()
+    db.tracer = None
+
+
+def test_normalize_sql_groups_by_shape():
+    assert normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b = 12.5\n  AND c IN (?, ?,?)") == \
+        "SELECT * FROM t WHERE a = ? AND b = ? AND c IN (?, …)"
+    # الأرقام داخل الأسماء لا تتغير
+    assert normalize_sql("SELECT col1 FROM t2 LIMIT 10") == "SELECT col1 FROM t2 LIMIT ?"
+
+
+def test_rolling_histogram_window():
+    histogram = RollingHistogram()
+    for ms in (1, 1, 1, 1, 1, 1, 1, 1, 1, 40):
+        histogram.record(ms, now=0)
+    stats = histogram.summary(now=0)
+    assert stats['count'] == 10 and stats['max_ms'] == 40 and stats['total_ms'] == 49
+    # المئين حد خانته الأعلى: دقة ضعفين
+    assert 1 <= stats['p50_ms'] < 2
+    assert 40 <= stats['p99_ms'] <= 40
+
+    histogram.record(5, now=SLICE_SECONDS * (SLICES - 1))
+    assert histogram.summary(now=SLICE_SECONDS * (SLICES - 1))['count'] == 11
+    # بعد مرور النافذة تختفي الشريحة الأولى
+    assert histogram.summary(now=SLICE_SECONDS * SLICES)['count'] == 1
+
+
+def test_statements_are_aggregated_and_slow_ones_logged(db, tracer, tmp_path):
+    with tracer.context('save_appointment'):
+        for phone in ('0500000001', '0500000002'):
+            db.fetchall("SELECT id FROM customers WHERE phone = ?", (phone,), op='lookup')
+        with db.transaction() as cursor:
+            cursor.execute("UPDATE settings SET value = value WHERE key = 'shop_name'")
+    tracer.flush()
+
+    assert tracer.queries["SELECT id FROM customers WHERE phone = ?"].summary()['count'] == 2
+    assert "BEGIN IMMEDIATE" in tracer.queries
+
+    log = (tmp_path / 'logs' / 'slow.log').read_text(encoding='utf-8')
+    # slow_ms=0: كل جملة (بقيمها) في السجل مع اسم الإجراء وخطة التنفيذ
+    entry = "| save_appointment | SELECT id FROM customers WHERE phone = '0500000001'\n"
+    assert entry in log
+    assert log.split(entry, 1)[1].startswith('    └ ')
+    assert tracer.report().count('SELECT id FROM customers') == 1
+
+
+def test_wrapped_handlers_record_ui_time(tracer):
+    class Window:
+        def save_appointment(self):
+            return 'saved'
+
+    window = Window()
+    tracer.wrap(window)
+    assert window.save_appointment() == 'saved'
+    tracer.flush()
+    assert tracer.handlers[('save_appointment', 'ui')].summary()['count'] == 1
+    assert 'save_appointment [ui]' in tracer.report()
+
+
+def test_from_environment(db, monkeypatch, tmp_path):
+    monkeypatch.delenv(instrumentation.ENV_TRACE, raising=False)
+    assert from_environment(db) is None and db.tracer is None
+
+    monkeypatch.setenv(instrumentation.ENV_TRACE, '1')
+    monkeypatch.setenv(instrumentation.ENV_SLOW_MS, 'غير رقم')
+    monkeypatch.setenv(instrumentation.ENV_LOG, str(tmp_path / 'trace.log'))
+    tracer = from_environment(db)
+    try:
+        assert db.tracer is tracer
+        assert tracer.slow_ms == instrumentation.DEFAULT_SLOW_MS
+        assert tracer.log_path == str(tmp_path / 'trace.log')
+    finally:
+        tracer.close()
+        db.tracer = None
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""ترقية قاعدة قديمة (قبل الترحيلات) حتى آخر نسخة من المخطط"""
+
+from datetime import datetime
+
+import daily_stats
+from database import Database
+from migrations import (MIGRATIONS, apply_migrations, get_schema_version, latest_version,
+                        pending_migrations, schema_is_current)
+from schema import create_tables, insert_default_data
+from sequences import APPOINTMENT_PREFIX, next_number
+
+
+def test_versions_are_increasing():
+    versions = [version for version, _, _ in MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+
+def test_upgrade_from_unversioned_database(tmp_path, add_appointment):
+    db = Database(str(tmp_path / 'old.db'))
+    with db.transaction() as cursor:
+        create_tables(cursor)
+        insert_default_data(cursor)
+        # أرقام بالطريقة القديمة (COUNT + 1) قبل جدول العدّادات
+        add_appointment(cursor, 'APP-20260301-001', '2026-03-01', status='completed')
+        add_appointment(cursor, 'APP-20260301-007', '2026-03-01', '11:00', status='cancelled')
+    assert not schema_is_current(db)
+    assert get_schema_version(db.connection().cursor()) == 0
+
+    # خطوة خطوة: العدّادات تبدأ بعد أكبر رقم موجود
+    assert apply_migrations(db, target=3, verbose=False) == [1, 2, 3]
+    with db.transaction() as cursor:
+        assert next_number(cursor, APPOINTMENT_PREFIX, datetime(2026, 3, 1)) == \
+            'APP-20260301-008'
+
+    applied = apply_migrations(db, verbose=False)
+    assert applied == [v for v, _, _ in MIGRATIONS if v > 3]
+    assert schema_is_current(db)
+    assert pending_migrations(db) == []
+    assert get_schema_version(db.connection().cursor()) == latest_version()
+    assert apply_migrations(db, verbose=False) == []
+
+    # الإحصائيات المجمّعة تُعبّأ من البيانات الموجودة عند الترحيل
+    stats = daily_stats.read_day(db, '2026-03-01')
+    assert (stats['appointments_count'], stats['completed_count'], stats['revenue']) == \
+        (2, 1, 50)
+    db.close()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""مطابقة العدّادات: الكاملة والتزايدية والرجوع للكاملة بعد تنظيف السجل"""
+
+import changelog
+from engine import BookingRequest, BookingService, CheckoutRequest, CheckoutService
+from reconcile import reconcile
+
+
+def _history(db, work_day, customers=3):
+    booking = BookingService(db)
+    ids = []
+    for i in range(customers):
+        ids.append(booking.book(BookingRequest(
+            f'عميل {i}', f'05600000{i:02d}', 1, 'خالد محمد', 1, 'خدمة', work_day,
+            f'1{i}:00', 50 + 10 * i)).appointment_id)
+    booking.complete_many(ids)
+    CheckoutService(db).checkout(CheckoutRequest('عميل 0', '0560000000', 1, 'خالد محمد',
+                                                 1, 'خدمة', 30))
+    return ids
+
+
+def test_services_keep_counters_consistent(db, work_day):
+    ids = _history(db, work_day)
+    BookingService(db).delete(ids[1])
+
+    result = reconcile(db)
+    assert (result.customers_changed, result.barbers_changed) == (0, 0)
+    assert result.differences == {}
+
+
+def test_full_report_then_apply(db, work_day):
+    _history(db, work_day)
+    db.execute("UPDATE customers SET loyalty_points = 0, total_visits = 9 "
+               "WHERE phone = '0560000000'")
+    db.execute("UPDATE barbers SET total_revenue = 0 WHERE id = 1")
+
+    report = reconcile(db)
+    assert not report.applied
+    assert report.differences['customers.total_visits'] == (1, -7)
+    assert report.differences['customers.loyalty_points'] == (1, 8)
+    assert report.barbers_changed == 1
+    # التقرير وحده لا يغيّر شيئاً
+    assert db.fetchvalue("SELECT total_visits FROM customers WHERE phone = '0560000000'") == 9
+
+    applied = reconcile(db, apply=True)
+    assert applied.applied and applied.customers_changed == 1
+    assert db.fetchone("SELECT total_visits, loyalty_points FROM customers "
+                       "WHERE phone = '0560000000'") == (2, 8)
+    assert reconcile(db).customers_changed == 0
+
+
+def test_incremental_scopes_to_changed_rows(db, work_day):
+    ids = _history(db, work_day)
+    first = reconcile(db, apply=True, incremental=True)
+    assert first.mode == 'full' and first.fallback
+
+    # حذف مباشر لموعد مكتمل (بدون عكس العدّادات): صاحبه من صورته السابقة في السجل
+    db.execute("DELETE FROM appointments WHERE id = ?", (ids[2],))
+    result = reconcile(db, apply=True, incremental=True)
+
+    assert result.mode == 'incremental' and result.fallback is None
+    assert result.customers_checked == 1
+    assert result.differences['customers.total_visits'] == (1, -1)
+    assert result.differences['barbers.total_services'] == (1, -1)
+    assert reconcile(db).customers_changed == 0
+
+
+def test_incremental_falls_back_after_prune(db, work_day):
+    _history(db, work_day)
+    reconcile(db, apply=True)
+    db.execute("UPDATE customers SET total_visits = 5 WHERE phone = '0560000001'")
+    with db.transaction() as cursor:
+        changelog.prune(cursor, changelog.last_change_id(cursor))
+
+    result = reconcile(db, apply=True, incremental=True)
+
+    assert result.mode == 'full'
+    assert 'حُذفت' in result.fallback
+    assert result.customers_changed == 1
+    assert reconcile(db).customers_changed == 0
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""الذاكرة المؤقتة للبيانات المرجعية"""
+
+from reference_data import ReferenceData
+
+
+def test_unknown_id_reloads_once_per_version(db):
+    reference = ReferenceData(db).load()
+    loads = reference.stats()['misses']['services']
+
+    assert reference.service(999) is None
+    assert reference.service(999) is None
+    assert reference.stats()['misses']['services'] == loads + 1
+
+    # خدمة أُضيفت بعد التحميل تُقرأ بإعادة تحميل واحدة
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO services (name, category, price, duration) "
+                       "VALUES ('جديدة', 'قص', 10, 30)")
+        new_id = cursor.lastrowid
+    assert reference.service(new_id).name == 'جديدة'
+
+    # بعد invalidate يُعاد فحص المعرف الغائب
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO services (id, name, category, price, duration) "
+                       "VALUES (999, 'متأخرة', 'قص', 10, 30)")
+    assert reference.service(999) is None
+    reference.invalidate('services')
+    assert reference.service(999).name == 'متأخرة'
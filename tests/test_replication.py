@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""النسخ المتماثل بين الفروع: الدمج وإعادة التطبيق والفروع المتبادلة"""
+
+import pytest
+
+from database import Database
+from engine import BookingRequest, BookingService, CheckoutRequest, CheckoutService
+from incremental_backup import create_delta, create_full_backup, restore_point_in_time
+from replication import branch_id, export_batch, import_batch
+
+PHONE = '0590000000'
+
+
+def _sessions(db, *prices):
+    checkout = CheckoutService(db)
+    for price in prices:
+        checkout.checkout(CheckoutRequest('عميل مشترك', PHONE, 1, 'خالد محمد', 1, 'خدمة',
+                                          price))
+
+
+def _completed_appointment(db, day, price):
+    booking = BookingService(db)
+    booking.complete(booking.book(BookingRequest('عميل مشترك', PHONE, 1, 'خالد محمد', 1,
+                                                 'خدمة', day, '10:00', price)).appointment_id)
+
+
+def _own_work(db):
+    """(الزيارات، المصروف) من جلسات ومواعيد هذا الفرع نفسه (بدون ما دمجه)"""
+    return db.fetchone("""
+        SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM (
+            SELECT final_price AS amount FROM sessions
+            WHERE session_number NOT LIKE '%/%' AND status = 'completed'
+            UNION ALL
+            SELECT price FROM appointments
+            WHERE appointment_number NOT LIKE '%/%' AND status = 'completed')
+    """)
+
+
+def _counters(db):
+    return db.fetchone("""SELECT total_visits, ROUND(total_spent, 2), loyalty_points
+                          FROM customers WHERE phone = ?""", (PHONE,))
+
+
+def _send(source, target, folder):
+    """دفعة من source إلى target عبر ملف؛ يُرجع نتيجة التطبيق (أو None بلا تغييرات)"""
+    batch = export_batch(source, branch_id(target), folder)
+    return import_batch(target, batch.path) if batch.path else None
+
+
+@pytest.fixture
+def mesh(make_database, tmp_path):
+    """فرعان يتبادلان فيما بينهما ومع المكتب الرئيسي"""
+    return make_database('branch_a'), make_database('branch_b'), make_database('hq'), \
+        str(tmp_path / 'sync')
+
+
+def test_branch_to_branch_exchange_is_not_counted_twice(mesh, work_day):
+    a, b, hq, folder = mesh
+    _sessions(a, 100, 10)
+    _sessions(b, 50)
+
+    # الفرع A يستلم من B قبل أن يرسل الفرعان إلى المكتب الرئيسي (لقطة أولى)
+    _send(b, a, folder)
+    assert _counters(a) == (3, 160, 16)
+    _send(a, hq, folder)
+    _send(b, hq, folder)
+    assert _counters(hq) == (3, 160, 16)
+
+    # تغييرات تزايدية بعد اللقطة، وتبادل في الاتجاهين
+    _sessions(a, 20)
+    _sessions(b, 30)
+    _completed_appointment(b, work_day, 40)
+    _send(a, b, folder)
+    _send(b, a, folder)
+    for target in (hq, hq):
+        _send(a, target, folder)
+        _send(b, target, folder)
+
+    assert _counters(hq) == (6, 250, 25)
+    assert _counters(a) == _counters(b) == (6, 250, 25)
+    # المكتب الرئيسي = مجموع عمل كل فرع نفسه
+    visits, spent = zip(_own_work(a), _own_work(b))
+    assert _counters(hq)[:2] == (sum(visits), sum(spent))
+    assert hq.fetchvalue("SELECT COUNT(*) FROM sessions") == 5
+
+
+def test_replayed_batch_changes_nothing(mesh):
+    a, _, hq, folder = mesh
+    _sessions(a, 100)
+    _send(a, hq, folder)
+    _sessions(a, 30)
+    batch = export_batch(a, branch_id(hq), folder)
+    assert import_batch(hq, batch.path).changes > 0
+    before = _counters(hq), hq.fetchvalue("SELECT COUNT(*) FROM sessions")
+
+    assert import_batch(hq, batch.path).changes == 0
+    assert (_counters(hq), hq.fetchvalue("SELECT COUNT(*) FROM sessions")) == before
+    assert before == ((2, 130, 13), 2)
+
+
+def _replication_state(db, after):
+    """مصادر التغييرات بعد after وجدولا حالة النسخ المتماثل"""
+    return (db.fetchall("""SELECT origin, COUNT(*) FROM change_log WHERE id > ?
+                           GROUP BY origin ORDER BY 1""", (after,)),
+            db.fetchall("SELECT * FROM replica_rows ORDER BY 1, 2, 3"),
+            db.fetchall("SELECT peer, acked_id, applied_id FROM replication_peers ORDER BY 1"))
+
+
+def test_point_in_time_restore_keeps_replication_state(mesh, tmp_path):
+    a, b, hq, folder = mesh
+    backups = str(tmp_path / 'backups')
+    full = create_full_backup(a, backups)
+    _sessions(b, 50)
+    _send(b, a, folder)
+    create_delta(a, backups)
+
+    restored = Database(restore_point_in_time(str(tmp_path / 'restored.db'), backups)[0])
+    try:
+        assert _replication_state(restored, full.change_id) == \
+            _replication_state(a, full.change_id)
+
+        # الدفعة التالية من B تُطبق مرة واحدة فوق النسخة المستعادة
+        _sessions(b, 30)
+        _send(b, restored, folder)
+        assert _counters(restored) == (2, 80, 8)
+        # وما دمجته من B لا يُعاد تصديره كأنه من هذا الفرع
+        _send(restored, hq, folder)
+        assert hq.fetchvalue("SELECT COUNT(*) FROM sessions") == 0
+    finally:
+        restored.close()
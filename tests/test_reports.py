@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""التقارير من جداول التجميع: تطابق مسح المواعيد مباشرة لأي فترة، قبل وبعد إعادة الحساب"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import rollups
+from reports import ReportsService, split_period
+
+FIRST = date(2025, 1, 20)
+
+
+@pytest.fixture
+def history(db, add_appointment):
+    """مواعيد على ثلاثة أشهر بحالات وخدمات وعمولات مختلفة، ثم تعديلات وحذف"""
+    statuses = ('completed', 'completed', 'cancelled', 'pending', 'completed')
+    with db.transaction() as cursor:
+        for i in range(70):
+            day = (FIRST + timedelta(days=i)).isoformat()
+            add_appointment(cursor, f'APP-{i}', day, status=statuses[i % 5], price=40 + i)
+        cursor.execute("UPDATE appointments SET service_id = 2, commission = price * 0.1 "
+                       "WHERE id % 3 = 0")
+        cursor.execute("UPDATE appointments SET status = 'completed' WHERE id % 10 = 4")
+        cursor.execute("DELETE FROM appointments WHERE id % 7 = 0")
+    return db
+
+
+def _raw(db, start, end, group=None):
+    """نفس مجاميع التقرير بمسح المواعيد (لا جلسات في هذه البيانات)"""
+    key = f"{group}," if group else ''
+    return db.fetchall(f"""
+        SELECT {key} COUNT(*), SUM(status = 'completed'), SUM(status = 'cancelled'),
+               TOTAL(CASE WHEN status = 'completed' THEN price END),
+               TOTAL(CASE WHEN status = 'completed' THEN COALESCE(commission, 0) END)
+        FROM appointments WHERE appointment_date BETWEEN ? AND ?
+        {f'GROUP BY {group} ORDER BY {group}' if group else ''}
+    """, (start, end))
+
+
+def _values(row):
+    return (row.bookings, row.completed, row.cancelled, round(row.revenue, 6),
+            round(row.commission, 6))
+
+
+def test_split_period_uses_whole_months():
+    assert split_period('2025-02-03', '2025-02-20') == \
+        [('rollup_barber_service', 'day', '2025-02-03', '2025-02-20')]
+    assert split_period('2025-01-01', '2025-02-28') == \
+        [('rollup_month_barber_service', 'month', '2025-01', '2025-02')]
+    assert split_period('2025-01-15', '2025-03-10') == [
+        ('rollup_month_barber_service', 'month', '2025-02', '2025-02'),
+        ('rollup_barber_service', 'day', '2025-01-15', '2025-01-31'),
+        ('rollup_barber_service', 'day', '2025-03-01', '2025-03-10'),
+    ]
+
+
+@pytest.mark.parametrize('start, end', [('2025-01-20', '2025-03-30'),
+                                        ('2025-01-25', '2025-03-03'),
+                                        ('2025-02-01', '2025-02-28'),
+                                        ('2025-02-10', '2025-02-10')])
+def test_reports_match_raw_scan_before_and_after_rebuild(history, start, end):
+    reports = ReportsService(history)
+
+    def report():
+        # الصفوف الصفرية (بعد حذف كل مواعيد اليوم) تبقى في التجميع ولا تنشئها إعادة الحساب
+        return (_values(reports.summary(start, end)),
+                [(row.key, *_values(row)) for row in reports.by_day(start, end)
+                 if any(_values(row))],
+                sorted((row.key, *_values(row)) for row in reports.by_service(start, end)))
+
+    total = _raw(history, start, end)[0]
+    expected = (tuple(round(v, 6) for v in total),
+                [tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                 for row in _raw(history, start, end, 'appointment_date')],
+                [tuple(round(v, 6) if isinstance(v, float) else v for v in row)
+                 for row in _raw(history, start, end, 'service_id')])
+    maintained = report()
+    assert maintained == expected
+
+    # إعادة الحساب الكامل تعطي نفس ما حدّثته الـ triggers
+    rollups.rebuild_range(history)
+    assert report() == maintained
+
+
+def test_payment_report_counts_completed_only(history):
+    reports = ReportsService(history)
+    rows = reports.by_payment('2025-01-01', '2025-12-31')
+    completed, revenue = history.fetchone("""
+        SELECT COUNT(*), TOTAL(price) FROM appointments WHERE status = 'completed'""")
+    assert [(row.payment_method, row.count, row.revenue) for row in rows] == \
+        [(rollups.UNKNOWN_PAYMENT, completed, revenue)]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""عدّادات أرقام المواعيد والجلسات"""
+
+from datetime import datetime
+
+from sequences import APPOINTMENT_PREFIX, SESSION_PREFIX, next_number, reserve_values
+
+
+def test_next_number_counts_per_prefix_and_day(db):
+    day = datetime(2026, 3, 1, 9, 0)
+    with db.transaction() as cursor:
+        first = next_number(cursor, APPOINTMENT_PREFIX, day)
+        second = next_number(cursor, APPOINTMENT_PREFIX, day)
+        session = next_number(cursor, SESSION_PREFIX, day)
+        next_day = next_number(cursor, APPOINTMENT_PREFIX, datetime(2026, 3, 2))
+
+    assert (first, second) == ('APP-20260301-001', 'APP-20260301-002')
+    assert session == 'SES-20260301-001'
+    assert next_day == 'APP-20260302-001'
+
+
+def test_numbers_are_not_reused_after_delete(db, add_appointment):
+    day = datetime(2026, 3, 1)
+    with db.transaction() as cursor:
+        number = next_number(cursor, APPOINTMENT_PREFIX, day)
+        add_appointment(cursor, number, '2026-03-01')
+        cursor.execute("DELETE FROM appointments WHERE appointment_number = ?", (number,))
+        assert next_number(cursor, APPOINTMENT_PREFIX, day) == 'APP-20260301-002'
+
+
+def test_reserve_values_returns_first_of_block(db):
+    with db.transaction() as cursor:
+        assert reserve_values(cursor, APPOINTMENT_PREFIX, '20260301', 5) == 1
+        assert reserve_values(cursor, APPOINTMENT_PREFIX, '20260301', 3) == 6
+        assert next_number(cursor, APPOINTMENT_PREFIX, datetime(2026, 3, 1)) == \
+            'APP-20260301-009'
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""بدء التشغيل: فحص المخطط بدل الإعداد الكامل، وبدون استيراد المكتبات الثقيلة"""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.startup import HEAVY_MODULES, PROJECT_ROOT
+from database import Database
+from migrations import SCHEMA_VERSION_KEY, latest_version, schema_is_current
+
+
+def test_schema_is_current_only_for_a_ready_database(db, tmp_path):
+    assert schema_is_current(db)
+
+    empty = Database(str(tmp_path / 'empty.db'))
+    try:
+        assert not schema_is_current(empty)
+    finally:
+        empty.close()
+
+    # ترحيل معلّق، أو بيانات افتراضية ناقصة: الإعداد الكامل مطلوب
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE settings SET value = ? WHERE key = ?",
+                       (str(latest_version() - 1), SCHEMA_VERSION_KEY))
+    assert not schema_is_current(db)
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE settings SET value = ? WHERE key = ?",
+                       (str(latest_version()), SCHEMA_VERSION_KEY))
+        cursor.execute("DELETE FROM services")
+    assert not schema_is_current(db)
+
+
+@pytest.mark.parametrize('module', ['barbershop', 'api'])
+def test_heavy_modules_are_not_imported_at_startup(module):
+    pytest.importorskip('tkinter')
+    code = (f"import json, sys; import {module}; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    assert json.loads(output.splitlines()[-1]) == []
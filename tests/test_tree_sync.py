@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""TreeSync: تطبيق الفروقات فقط على الجدول"""
+
+import random
+
+from tree_sync import TreeSync
+
+
+class FakeTree:
+    """ما يستخدمه TreeSync من ttk.Treeview (جذر واحد بدون أبناء)"""
+
+    def __init__(self):
+        self.children = []
+        self.detached = set()
+        self.items = {}
+
+    def insert(self, parent, index, iid, values, tags):
+        self.children.insert(index, iid)
+        self.items[iid] = (values, tags)
+
+    def delete(self, *iids):
+        for iid in iids:
+            if iid in self.detached:
+                self.detached.discard(iid)
+            else:
+                self.children.remove(iid)
+            del self.items[iid]
+
+    def detach(self, iid):
+        self.children.remove(iid)
+        self.detached.add(iid)
+
+    def move(self, iid, parent, index):
+        if iid in self.detached:
+            self.detached.discard(iid)
+        else:
+            self.children.remove(iid)
+        self.children.insert(index, iid)
+
+    def item(self, iid, values, tags):
+        self.items[iid] = (values, tags)
+
+    def rows(self):
+        return [(iid, *self.items[iid]) for iid in self.children]
+
+
+def _rows(*iids, tag=()):
+    return [(iid, (iid, f'value-{iid}'), tag) for iid in iids]
+
+
+def test_unchanged_rows_are_not_touched():
+    sync = TreeSync(FakeTree())
+    assert sync.apply(_rows('1', '2', '3'))['inserted'] == 3
+    assert sync.apply(_rows('1', '2', '3')) == \
+        {'inserted': 0, 'updated': 0, 'deleted': 0, 'moved': 0}
+
+
+def test_diff_counts_each_operation():
+    tree = FakeTree()
+    sync = TreeSync(tree)
+    sync.apply(_rows('1', '2', '3', '4'))
+
+    rows = _rows('4', '1', '3') + _rows('5')
+    rows[2] = ('3', ('3', 'تغيّر'), ('done',))
+    stats = sync.apply(rows)
+
+    assert stats == {'inserted': 1, 'updated': 1, 'deleted': 1, 'moved': 1}
+    assert tree.rows() == rows
+    assert not tree.detached
+
+
+def test_random_changes_reach_the_same_order():
+    rng = random.Random(3)
+    tree = FakeTree()
+    sync = TreeSync(tree)
+    rows = _rows(*map(str, range(50)))
+    for _ in range(30):
+        rows = [row for row in rows if rng.random() > 0.1]
+        if rng.random() < 0.3:
+            rng.shuffle(rows)
+        rows += _rows(*(str(rng.randrange(1000, 2000)) for _ in range(rng.randrange(4))))
+        rows = list({iid: (iid, values, tags) for iid, values, tags in rows}.values())
+        sync.apply(rows)
+        assert tree.rows() == rows
+
+    sync.clear()
+    assert tree.rows() == [] and sync.order == []
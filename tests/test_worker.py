@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""الأعمال في الخلفية: التسليم لخيط الواجهة والترتيب والإلغاء"""
+
+import threading
+import time
+
+import pytest
+
+from worker import BackgroundWorker
+
+
+class FakeRoot:
+    """ما يستخدمه BackgroundWorker من Tk: root.after، تُنفَّذ عند pump في هذا الخيط"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append(callback)
+        return len(self.pending)
+
+    def pump(self, until, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not until():
+            assert time.monotonic() < deadline, "انتهت المهلة"
+            callbacks, self.pending = self.pending, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.005)
+
+
+@pytest.fixture
+def root():
+    return FakeRoot()
+
+
+@pytest.fixture
+def worker(root):
+    worker = BackgroundWorker(root)
+    yield worker
+    worker.shutdown()
+
+
+def test_results_are_delivered_on_the_ui_thread(root, worker):
+    delivered = []
+    worker.submit(lambda job: threading.current_thread().name,
+                  on_done=lambda name: delivered.append((name, threading.current_thread())))
+
+    root.pump(lambda: delivered)
+    name, thread = delivered[0]
+    assert name.startswith('db-reader')
+    assert thread is threading.main_thread()
+    assert not worker.active
+
+
+def test_errors_go_to_on_error(root, worker):
+    errors = []
+    worker.submit(lambda job: 1 / 0, on_error=errors.append)
+    root.pump(lambda: errors)
+    assert isinstance(errors[0], ZeroDivisionError)
+
+
+def test_writes_run_in_order_on_one_thread(root, worker):
+    order, threads = [], set()
+
+    def write(job, i):
+        threads.add(threading.current_thread().name)
+        order.append(i)
+        return i
+
+    done = []
+    for i in range(20):
+        worker.submit(write, i, write=True, on_done=done.append)
+    root.pump(lambda: len(done) == 20)
+    assert order == done == list(range(20))
+    assert threads == {'db-writer'}
+
+
+def test_cancel_all_keeps_started_writes(root, worker):
+    running, release = threading.Event(), threading.Event()
+    ran, done = [], []
+
+    def slow_write(job):
+        running.set()
+        release.wait(5)
+        job.check()  # لا يرفع الإلغاء: الكتابة بدأت
+        ran.append('started')
+        return 'saved'
+
+    def queued_write(job):
+        ran.append('queued')
+
+    def slow_read(job):
+        release.wait(5)
+        job.check()
+        ran.append('read')
+
+    worker.submit(slow_write, write=True, on_done=done.append)
+    running.wait(5)
+    queued = worker.submit(queued_write, write=True, on_done=done.append)
+    read = worker.submit(slow_read, on_done=done.append)
+    worker.cancel_all()
+    release.set()
+
+    root.pump(lambda: not worker.active)
+    # الكتابة التي بدأت حُفظت ووصلت نتيجتها؛ ما لم يبدأ لم يُنفَّذ
+    assert done == ['saved']
+    assert ran == ['started']
+    assert queued.cancelled and read.cancelled
+
+
+def test_background_jobs_are_hidden_and_not_cancelled(root):
+    statuses = []
+    worker = BackgroundWorker(root, on_status=lambda count, progress: statuses.append(count))
+    try:
+        release = threading.Event()
+        done = []
+        worker.submit(lambda job: release.wait(5) and 'checked', on_done=done.append,
+                      background=True)
+        worker.cancel_all()
+        release.set()
+
+        root.pump(lambda: done)
+        assert done == ['checked']
+        assert set(statuses) == {0}
+    finally:
+        worker.shutdown()
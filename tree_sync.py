@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌳 تحديث جداول Treeview بالفروقات فقط
+Diff-based Treeview refresh
+
+بدلاً من حذف كل الصفوف وإعادة إدخالها في كل تحديث، يحتفظ TreeSync
+بنسخة من الصفوف المعروضة (بالمعرّف) ويطبّق على الجدول فقط:
+الإدخال والتعديل والحذف وتغيير الترتيب. الصف الذي لم يتغير لا يُلمس.
+
+قياس الأداء (يحتاج شاشة):
+    python tree_sync.py bench [عدد_الصفوف]
+"""
+
+from bisect import bisect_left
+
+
+def _stable_items(kept, new_index):
+    """أطول تسلسل من الصفوف الباقية حافظ على ترتيبه (لا داعي لتحريكه)"""
+    positions = [new_index[iid] for iid in kept]
+    tails, tails_at, parent = [], [], [None] * len(positions)
+    for i, pos in enumerate(positions):
+        j = bisect_left(tails, pos)
+        if j == len(tails):
+            tails.append(pos)
+            tails_at.append(i)
+        else:
+            tails[j] = pos
+            tails_at[j] = i
+        parent[i] = tails_at[j - 1] if j else None
+
+    stable = set()
+    i = tails_at[-1] if tails_at else None
+    while i is not None:
+        stable.add(kept[i])
+        i = parent[i]
+    return stable
+
+
+class TreeSync:
+    """مزامنة Treeview مع قائمة صفوف (iid, values, tags)"""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.rows = {}
+        self.order = []
+
+    def apply(self, rows):
+        """تطبيق الصفوف الجديدة بالترتيب وإرجاع عدد العمليات لكل نوع"""
+        stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'moved': 0}
+        new_index = {iid: i for i, (iid, _, _) in enumerate(rows)}
+
+        # 1) حذف الصفوف التي اختفت
+        gone = [iid for iid in self.order if iid not in new_index]
+        if gone:
+            self.tree.delete(*gone)
+            for iid in gone:
+                del self.rows[iid]
+            stats['deleted'] = len(gone)
+
+        # 2) فصل الصفوف التي تغيّر ترتيبها (خارج أطول تسلسل مرتب)
+        kept = [iid for iid in self.order if iid in new_index]
+        stable = _stable_items(kept, new_index)
+        for iid in kept:
+            if iid not in stable:
+                self.tree.detach(iid)
+
+        # 3) الإدخال والتعديل وإعادة الإرفاق بالترتيب الجديد
+        for index, (iid, values, tags) in enumerate(rows):
+            old = self.rows.get(iid)
+            if old is None:
+                self.tree.insert('', index, iid=iid, values=values, tags=tags)
+                stats['inserted'] += 1
+            else:
+                if old != (values, tags):
+                    self.tree.item(iid, values=values, tags=tags)
+                    stats['updated'] += 1
+                if iid not in stable:
+                    self.tree.move(iid, '', index)
+                    stats['moved'] += 1
+            self.rows[iid] = (values, tags)
+
+        self.order = [iid for iid, _, _ in rows]
+        return stats
+
+    def clear(self):
+        """حذف كل الصفوف"""
+        if self.order:
+            self.tree.delete(*self.order)
+        self.rows.clear()
+        self.order = []
+
+
+# ==================== قياس الأداء ====================
+
+def benchmark(count=600, rounds=20):
+    """مقارنة إعادة الإدخال الكاملة مع التحديث بالفروقات ليوم مزدحم"""
+    import random
+    import time
+    import tkinter as tk
+    from tkinter import ttk
+
+    root = tk.Tk()
+    root.withdraw()
+    rng = random.Random(3)
+    columns = ('#', 'الوقت', 'العميل', 'الجوال', 'الحلاق', 'الخدمة', 'السعر', 'الحالة')
+    statuses = ['pending', 'confirmed', 'completed', 'cancelled']
+
+    rows = [(str(i), (f'{i:03d}', f'{9 + i * 12 // count:02d}:{(i % 2) * 30:02d}', f'عميل {i}',
+                      f'05{i:08d}', f'حلاق {i % 12}', 'قص شعر', '40 ر.س', 'معلق'), ('pending',))
+            for i in range(count)]
+
+    def mutate(rows):
+        # تغيير حالة بعض المواعيد وإضافة موعد وحذف آخر (مثل يوم عمل حقيقي)
+        rows = list(rows)
+        for _ in range(3):
+            i = rng.randrange(len(rows))
+            iid, values, _ = rows[i]
+            status = rng.choice(statuses)
+            rows[i] = (iid, values[:7] + (status,), (status,))
+        rows.pop(rng.randrange(len(rows)))
+        new_id = str(int(max(rows, key=lambda r: int(r[0]))[0]) + 1)
+        rows.insert(rng.randrange(len(rows)), (new_id, rows[0][1], ('pending',)))
+        return rows
+
+    results = {}
+    for label in ('full', 'diff'):
+        tree = ttk.Treeview(root, columns=columns, show='headings')
+        sync = TreeSync(tree)
+        current = rows
+        if label == 'diff':
+            sync.apply(current)
+        timings = []
+        for _ in range(rounds):
+            current = mutate(current)
+            start = time.perf_counter()
+            if label == 'full':
+                for item in tree.get_children():
+                    tree.delete(item)
+                for iid, values, tags in current:
+                    tree.insert('', 'end', iid=iid, values=values, tags=tags)
+            else:
+                sync.apply(current)
+            root.update_idletasks()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        results[label] = timings
+        print(f"{label:<5} rows={len(current)} p50={timings[len(timings) // 2]:.2f}ms "
+              f"max={timings[-1]:.2f}ms")
+        tree.destroy()
+
+    root.destroy()
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 600)
+    else:
+        print(__doc__)
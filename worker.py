@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧵 تنفيذ أعمال قاعدة البيانات والملفات في الخلفية
+Background worker
+
+حتى لا تتجمد النافذة أثناء استعلام بطيء أو انتظار قفل أو تصدير كبير:
+- خيط كتابة واحد (كل أوامر الكتابة بالترتيب، فلا تتنافس على القفل)
+- مجموعة خيوط صغيرة للقراءة والملفات
+- النتائج تُسلَّم لخيط الواجهة عبر root.after (Tk لا يقبل الاستدعاء من خيوط أخرى)
+
+كل عمل يستقبل كائن Job كأول معامل، ويمكنه استدعاء job.check() لدعم
+الإلغاء و job.set_progress() لتحديث مؤشر التقدم.
+
+عمل الكتابة يُلغى فقط قبل أن يبدأ: بعد بدئه قد يحفظ تغييراته، فتُسلَّم
+نتيجته دائماً (حتى تُفرَّغ النماذج ويُحدَّث العرض ولا يُعاد الحفظ مرتين).
+
+الأعمال الدورية (background=True) لا تظهر في عدد الأعمال بشريط الحالة
+ولا يلغيها cancel_all.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# فترة فحص النتائج أثناء وجود أعمال قيد التنفيذ (ميلي ثانية)
+POLL_MS = 30
+
+
+class JobCancelled(Exception):
+    """تم إلغاء العمل قبل اكتماله"""
+
+
+class Job:
+    """عمل واحد في الخلفية"""
+
+    def __init__(self, fn, args, kwargs, on_done, on_error, description, write=False):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.description = description
+        self.progress = None
+        self.write = write
+        self.submitted = time.perf_counter()
+        self._cancelled = False
+        self._started = False
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def cancel(self):
+        """طلب الإلغاء (لن تُستدعى on_done حتى لو اكتمل العمل)
+
+        يُرجع False لعمل كتابة بدأ تنفيذه: يكمل وتُسلَّم نتيجته.
+        """
+        with self._lock:
+            if self.write and self._started:
+                return False
+            self._cancelled = True
+            return True
+
+    def start(self):
+        """يُستدعى من الخيط المنفِّذ قبل البدء؛ False إن أُلغي العمل قبل ذلك"""
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._started = True
+            return True
+
+    def check(self):
+        """يُستدعى من داخل العمل: إيقاف التنفيذ إذا طُلب الإلغاء"""
+        if self._cancelled:
+            raise JobCancelled(self.description)
+
+    def set_progress(self, fraction):
+        """نسبة الإنجاز من 0 إلى 1"""
+        self.progress = max(0.0, min(1.0, fraction))
+
+
+class BackgroundWorker:
+    """خيط كتابة واحد + خيوط قراءة، مع تسليم النتائج لخيط الواجهة"""
+
+    def __init__(self, root, readers=2, on_status=None, tracer=None):
+        self.root = root
+        self.on_status = on_status
+        # instrumentation.Tracer اختياري: زمن الانتظار والتنفيذ والتسليم لكل عمل
+        self.tracer = tracer
+        self.active = set()
+        # أعمال دورية خارج active (لا تُعرض ولا تُلغى)
+        self._background = set()
+        self._results = queue.Queue()
+        self._writes = queue.Queue()
+        self._poll_job = None
+
+        self._writer = threading.Thread(target=self._writer_loop, name='db-writer', daemon=True)
+        self._writer.start()
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+
+    # ==================== الإرسال ====================
+
+    def submit(self, fn, *args, on_done=None, on_error=None, write=False,
+               background=False, description='', **kwargs):
+        """إرسال عمل للخلفية؛ on_done/on_error تُستدعى في خيط الواجهة
+
+        background=True لعمل دوري لا يطلبه المستخدم: لا يُحسب في شريط الحالة
+        ولا يوقفه cancel_all.
+        """
+        job = Job(fn, args, kwargs, on_done, on_error, description or fn.__name__, write)
+        (self._background if background else self.active).add(job)
+        if write:
+            self._writes.put(job)
+        else:
+            self._readers.submit(self._run, job)
+        self._schedule_poll()
+        self._notify()
+        return job
+
+    def run_write(self, fn, *args):
+        """تنفيذ fn(*args) في خيط الكتابة من أي خيط (بدون Tk)؛ يُرجع Future
+
+        لعملاء من خارج الواجهة (api.py) حتى تبقى كل الكتابات في خيط واحد.
+        """
+        future = Future()
+
+        def call():
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+        self._writes.put(call)
+        return future
+
+    def _run(self, job):
+        """تنفيذ العمل في خيط الخلفية ووضع النتيجة في الطابور"""
+        if self.tracer is not None:
+            return self._run_traced(job)
+        try:
+            if not job.start():
+                raise JobCancelled(job.description)
+            value = job.fn(job, *job.args, **job.kwargs)
+            self._results.put((job, value, None))
+        except BaseException as e:
+            self._results.put((job, None, e))
+
+    def _run_traced(self, job):
+        """نفس _run مع تسجيل زمن الانتظار في الطابور وزمن التنفيذ"""
+        started = time.perf_counter()
+        self.tracer.record_handler(job.description, 'wait', started - job.submitted)
+        with self.tracer.context(job.description):
+            try:
+                if not job.start():
+                    raise JobCancelled(job.description)
+                value = job.fn(job, *job.args, **job.kwargs)
+                self._results.put((job, value, None))
+            except BaseException as e:
+                self._results.put((job, None, e))
+            finally:
+                self.tracer.record_handler(job.description, 'job',
+                                           time.perf_counter() - started)
+
+    def _writer_loop(self):
+        while True:
+            job = self._writes.get()
+            if job is None:
+                break
+            if isinstance(job, Job):
+                self._run(job)
+            else:
+                job()
+
+    # ==================== التسليم لخيط الواجهة ====================
+
+    def _schedule_poll(self):
+        if self._poll_job is None:
+            self._poll_job = self.root.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        """تسليم النتائج الجاهزة (يعمل في خيط الواجهة)"""
+        self._poll_job = None
+        while True:
+            try:
+                job, value, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.active.discard(job)
+            self._background.discard(job)
+            if job.cancelled or isinstance(error, JobCancelled):
+                continue
+            try:
+                if error is not None:
+                    if job.on_error:
+                        job.on_error(error)
+                    else:
+                        print(f"خطأ في {job.description}: {error}")
+                elif job.on_done:
+                    job.on_done(value)
+            except Exception as e:
+                print(f"خطأ في معالجة نتيجة {job.description}: {e}")
+            if self.tracer is not None:
+                self.tracer.record_handler(job.description, 'total',
+                                           time.perf_counter() - job.submitted)
+
+        self._notify()
+        if self.active or self._background:
+            self._schedule_poll()
+
+    def _notify(self):
+        """إبلاغ الواجهة بعدد الأعمال الجارية ونسبة التقدم (إن وُجدت)"""
+        if not self.on_status:
+            return
+        progress = [job.progress for job in self.active if job.progress is not None]
+        self.on_status(len(self.active), min(progress) if progress else None)
+
+    def cancel_all(self):
+        """إلغاء كل الأعمال الجارية (عدا الكتابات التي بدأت، انظر Job.cancel)"""
+        for job in list(self.active):
+            job.cancel()
+
+    def shutdown(self, wait=True):
+        """إيقاف الخيوط بعد إنهاء الأعمال المرسلة"""
+        self._writes.put(None)
+        if wait:
+            self._writer.join()
+        self._readers.shutdown(wait=wait)